@@ -8,7 +8,7 @@ import logging
 from datetime import datetime
 from ..models import Agent, Article
 from ..services.unified_ai import UnifiedAIClient
-from .knowledge.retriever import KnowledgeRetriever
+from ..services.knowledge_service import get_knowledge_tenancy, article_document
 
 logger = logging.getLogger(__name__)
 
@@ -31,12 +31,8 @@ class EnhancedAgent:
         self.agent = agent
         self.ai_client = UnifiedAIClient(api_key)
 
-        # 为每个Agent创建独立的知识库
-        collection_name = f"agent_{agent.id}_knowledge"
-        self.retriever = KnowledgeRetriever(
-            persist_dir=knowledge_dir,
-            collection_name=collection_name
-        )
+        # 每个Agent是分片知识库中的一个租户
+        self.retriever = get_knowledge_tenancy(knowledge_dir).retriever(f"agent_{agent.id}")
 
     def build_knowledge_base(self, articles: List[Article], quality_threshold: float = 0.7):
         """
@@ -45,41 +41,28 @@ class EnhancedAgent:
         Args:
             articles: 文章列表
             quality_threshold: 质量阈值（可以基于用户反馈、发布状态等判断）
+
+        Returns:
+            加入知识库的文章数（只计产生了块的文章，分块失败的文章记录在日志中）
         """
-        added_count = 0
+        # 判断文章质量（这里简化处理，实际可以更复杂）
+        high_quality = [
+            article for article in articles
+            if article.publishStatus == "published" or article.githubUrl is not None
+        ]
 
-        for article in articles:
-            # 判断文章质量（这里简化处理，实际可以更复杂）
-            is_high_quality = (
-                article.publishStatus == "published" or
-                article.githubUrl is not None
-            )
+        # 所有文章的块合并后按大批次嵌入和写入，正文中的HTML在分块前转换为文本
+        report = {}
+        ids = self.retriever.add_documents(
+            (article_document(article) for article in high_quality),
+            chunk_strategy="markdown",
+            report=report
+        )
+        added_count = report["documents"]
 
-            if not is_high_quality:
-                continue
-
-            # 添加到知识库
-            metadata = {
-                "article_id": article.id,
-                "title": article.title,
-                "author": article.author,
-                "created_at": article.createdAt.isoformat() if article.createdAt else None,
-                "published": article.publishStatus == "published",
-                "source": "article"
-            }
-
-            try:
-                self.retriever.add_document(
-                    text=article.content,
-                    metadata=metadata,
-                    chunk_strategy="markdown"
-                )
-                added_count += 1
-                logger.info(f"Added article {article.id} to knowledge base")
-            except Exception as e:
-                logger.error(f"Failed to add article {article.id}: {e}")
-
-        logger.info(f"Built knowledge base with {added_count} articles")
+        if report["failed"]:
+            logger.warning(f"Failed to chunk {len(report['failed'])} articles: {report['failed']}")
+        logger.info(f"Built knowledge base with {added_count} articles ({len(ids)} chunks)")
         return added_count
 
     def add_external_knowledge(self, text: str, source: str, metadata: Optional[Dict] = None):
@@ -105,7 +88,8 @@ class EnhancedAgent:
     def generate_with_context(self,
                              prompt: str,
                              use_knowledge: bool = True,
-                             n_contexts: int = 3) -> str:
+                             n_contexts: int = 3,
+                             max_context_tokens: Optional[int] = None) -> str:
         """
         基于上下文生成内容
 
@@ -113,6 +97,7 @@ class EnhancedAgent:
             prompt: 用户提示
             use_knowledge: 是否使用知识库
             n_contexts: 使用的上下文数量
+            max_context_tokens: 上下文token预算，不指定时按字符数限制
 
         Returns:
             生成的内容
@@ -122,7 +107,9 @@ class EnhancedAgent:
 
         # 如果使用知识库，检索相关上下文
         if use_knowledge and self.retriever.store.count() > 0:
-            context = self.retriever.get_context(prompt, n_chunks=n_contexts)
+            context = self.retriever.get_context(
+                prompt, n_chunks=n_contexts, max_tokens=max_context_tokens
+            )
 
             if context:
                 # 增强提示
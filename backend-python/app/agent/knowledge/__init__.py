@@ -6,11 +6,24 @@ Knowledge base module for RAG-enhanced writing.
 from .embedder import TextEmbedder
 from .storage import VectorStore
 from .retriever import KnowledgeRetriever
-from .chunker import TextChunker
+from .chunker import TextChunker, StreamingChunker
+from .quantization import QuantizedIndex
+from .packer import ContextPacker, PackedContext
+from .cache import QueryCache, get_query_cache
+from .tenancy import KnowledgeTenancy, TenantStore, get_tenancy
 
 __all__ = [
     "TextEmbedder",
     "VectorStore",
     "KnowledgeRetriever",
-    "TextChunker"
+    "TextChunker",
+    "StreamingChunker",
+    "QuantizedIndex",
+    "ContextPacker",
+    "PackedContext",
+    "QueryCache",
+    "get_query_cache",
+    "KnowledgeTenancy",
+    "TenantStore",
+    "get_tenancy"
 ]
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""
+Versioned query-result cache for knowledge search.
+知识库检索结果缓存：以集合版本号作为缓存键的一部分，集合有任何写入即失效。
+"""
+
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = str.maketrans({"　": " ", "\t": " ", "\n": " ", "\r": " "})
+
+
+def normalize_query(query: str) -> str:
+    """
+    规范化查询文本：全角转半角、合并空白、转小写
+
+    Args:
+        query: 原始查询
+
+    Returns:
+        规范化后的查询
+    """
+    query = unicodedata.normalize("NFKC", query).translate(_WHITESPACE)
+    return " ".join(query.split()).lower()
+
+
+class QueryCache:
+    """
+    检索结果缓存
+
+    - 集合版本号保存在SQLite中，多个worker进程共享；写入集合时递增版本号，
+      旧版本的缓存键不会再被命中，因此不会返回过期结果
+    - 进程内为有界LRU；开启shared后结果同时写入SQLite，其他worker可直接复用
+    """
+
+    def __init__(self,
+                 db_path: str,
+                 max_entries: int = 1024,
+                 shared: bool = False):
+        """
+        初始化缓存
+
+        Args:
+            db_path: 版本号（及共享结果）所在的SQLite文件
+            max_entries: 进程内最多缓存的结果数，同时也是共享层每个集合的上限
+            shared: 是否启用SQLite共享结果层
+        """
+        self.db_path = db_path
+        self.max_entries = max(1, max_entries)
+        self.shared = shared
+
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS collection_versions ("
+                "collection_id TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+            if shared:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS query_results ("
+                    "key TEXT PRIMARY KEY, collection_id TEXT NOT NULL, "
+                    "value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_query_results_collection "
+                    "ON query_results (collection_id, created_at)"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    # ------------------------------------------------------------------
+    # 版本号
+    # ------------------------------------------------------------------
+
+    def version(self, collection_id: str) -> int:
+        """获取集合当前版本号"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT version FROM collection_versions WHERE collection_id = ?",
+                (collection_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, collection_id: str) -> int:
+        """
+        集合内容变化后递增版本号，并清理该集合的共享结果
+
+        Returns:
+            新版本号
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO collection_versions (collection_id, version) VALUES (?, 1) "
+                "ON CONFLICT(collection_id) DO UPDATE SET version = version + 1",
+                (collection_id,)
+            )
+            if self.shared:
+                conn.execute("DELETE FROM query_results WHERE collection_id = ?", (collection_id,))
+            version = conn.execute(
+                "SELECT version FROM collection_versions WHERE collection_id = ?",
+                (collection_id,)
+            ).fetchone()[0]
+        return version
+
+    # ------------------------------------------------------------------
+    # 结果
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(collection_id: str,
+                 version: int,
+                 query: str,
+                 n_results: int,
+                 filter_metadata: Optional[Dict] = None,
+                 **options) -> str:
+        """
+        生成缓存键
+
+        Args:
+            collection_id: 集合ID
+            version: 集合版本号
+            query: 查询文本（内部会规范化）
+            n_results: 返回结果数
+            filter_metadata: 元数据过滤条件
+            **options: 其他影响结果的参数（如rerank）
+
+        Returns:
+            缓存键
+        """
+        payload = json.dumps(
+            [collection_id, version, normalize_query(query), n_results, filter_metadata or {}, options],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存，先查进程内LRU，再查共享层
+
+        Returns:
+            缓存结果的副本，未命中返回None
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return copy.deepcopy(self._entries[key])
+
+        if self.shared:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value FROM query_results WHERE key = ?", (key,)).fetchone()
+            if row:
+                value = json.loads(row[0])
+                with self._lock:
+                    self._shared_hits += 1
+                    self._remember(key, value)
+                return copy.deepcopy(value)
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, key: str, collection_id: str, value: Any):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            collection_id: 所属集合ID，用于共享层按集合清理
+            value: 可JSON序列化的检索结果
+        """
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, value)
+
+        if self.shared:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO query_results (key, collection_id, value, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, collection_id, json.dumps(value, ensure_ascii=False, default=str), time.time())
+                )
+                # 每个集合只保留最近的max_entries条
+                conn.execute(
+                    "DELETE FROM query_results WHERE collection_id = ? AND key NOT IN ("
+                    "SELECT key FROM query_results WHERE collection_id = ? "
+                    "ORDER BY created_at DESC LIMIT ?)",
+                    (collection_id, collection_id, self.max_entries)
+                )
+
+    def _remember(self, key: str, value: Any):
+        """写入进程内LRU（调用方持有锁）"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空进程内缓存（版本号保留）"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取命中率统计
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            lookups = self._hits + self._shared_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "shared": self.shared,
+                "hits": self._hits,
+                "shared_hits": self._shared_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._hits + self._shared_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+# 每个持久化目录在进程内共享一个缓存实例，避免每次请求新建检索器时丢失缓存
+_caches: Dict[str, QueryCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_query_cache(persist_dir: str,
+                    max_entries: int = 1024,
+                    shared: bool = False) -> QueryCache:
+    """
+    获取持久化目录对应的进程级缓存实例
+
+    Args:
+        persist_dir: 向量数据库持久化目录
+        max_entries: 进程内最多缓存的结果数
+        shared: 是否启用SQLite共享结果层
+
+    Returns:
+        QueryCache
+    """
+    db_path = os.path.abspath(os.path.join(persist_dir, "query_cache.sqlite3"))
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = QueryCache(db_path, max_entries=max_entries, shared=shared)
+            _caches[db_path] = cache
+            logger.info(f"Created query cache at {db_path} (max_entries={max_entries}, shared={shared})")
+        return cache
@@ -3,7 +3,9 @@ Text chunking module for semantic splitting.
 文本分块模块，进行语义化切分。
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable, Iterator, Tuple, Deque
+from collections import deque
+from html.parser import HTMLParser
 import re
 
 
@@ -129,7 +131,10 @@ class TextChunker:
             # 如果节内容太长，进一步分块
             if len(section["content"]) > self.chunk_size:
                 sub_chunks = self.chunk_text(section["content"], section_metadata)
-                chunks.extend(sub_chunks)
+                # chunk_index 在整篇文档内连续编号，用于按原文顺序还原
+                for sub_chunk in sub_chunks:
+                    sub_chunk["metadata"]["chunk_index"] = len(chunks)
+                    chunks.append(sub_chunk)
             else:
                 chunks.append({
                     "text": section["content"],
@@ -220,4 +225,340 @@ class TextChunker:
                 "content": markdown.strip()
             })
 
-        return sections
\ No newline at end of file
+        return sections
+
+# 单遍扫描使用的块级正则：代码围栏、Markdown标题、段落分隔（均以行首为锚点）
+_BLOCK_PATTERN = re.compile(
+    r'^[ \t]*(?:'
+    r'(?P<fence>```|~~~)[^\n]*'
+    r'|(?P<hashes>#{1,6})[ \t]+(?P<title>[^\n]+?)[ \t#]*$'
+    r'|(?P<para>$))',  # 空行
+    re.MULTILINE  # 以 ^ 为锚点时正则引擎可以直接跳到行首，比 (?:\A|\n) 快
+)
+
+# 句末标点：英文标点后需跟空白，避免切开 3.14、example.com
+_SENTENCE_END = re.compile(r'[.!?]+(?=\s|\Z)|[。！？]+')
+
+_WORD_PATTERN = re.compile(r'[A-Za-z0-9_]+')
+
+
+def approximate_token_count(text: str) -> int:
+    """
+    近似token数：每个CJK字符、英文单词、标点各记为1个token。
+    没有分词器时使用，与bge系列分词器的计数接近。
+    """
+    # 非空白字符数，每个英文单词的字符折算为1个：只有单词需要正则匹配（逐个匹配CJK字符太慢）
+    words = _WORD_PATTERN.findall(text)
+    return len("".join(text.split())) - sum(map(len, words)) + len(words)
+
+
+class StreamingChunker:
+    """
+    单遍流式分块器
+
+    - 块级正则从头到尾扫描一次文本，只有超长段落才在原文区间内按句切分
+    - 代码块不按句切分：放得下时整体作为一个单元，超长时只在行边界切分
+    - 块是原文的连续切片，不做字符串拼接，元数据记录起止偏移
+    - 以生成器方式逐块产出，调用方可以边分块边嵌入，不需要一次性持有全部块
+    - 块大小按token计算（默认近似计数，也可传入嵌入模型的分词器）
+    - Markdown标题形成面包屑（如 "安装 > 依赖"）写入元数据
+    """
+
+    def __init__(self,
+                 chunk_size: int = 256,
+                 chunk_overlap: int = 32,
+                 token_counter: Optional[Callable[[str], int]] = None):
+        """
+        初始化流式分块器
+
+        Args:
+            chunk_size: 块大小（token数）
+            chunk_overlap: 块之间的重叠大小（token数，按整段/整句保留）
+            token_counter: token计数函数，默认使用近似计数
+        """
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.count_tokens = token_counter or approximate_token_count
+
+    def iter_chunks(self,
+                    text: str,
+                    metadata: Optional[Dict] = None,
+                    markdown: bool = True) -> Iterator[Dict]:
+        """
+        逐块产出文本块
+
+        Args:
+            text: 输入文本
+            metadata: 附加元数据
+            markdown: 是否识别Markdown标题和代码块
+
+        Yields:
+            块字典，包含text和metadata（含token_count、breadcrumbs、起止偏移）
+        """
+        if not text:
+            return
+
+        state = _ChunkState(self, text, metadata or {})
+        block_start = 0
+        code_start = None
+
+        for match in _BLOCK_PATTERN.finditer(text):
+            kind = match.lastgroup
+
+            if kind == "fence":
+                if not markdown:
+                    continue
+                if code_start is None:
+                    state.add_block(block_start, match.start())
+                    code_start = match.start()
+                else:
+                    # 代码块（含围栏行）不按句切分
+                    state.add_code(code_start, match.end())
+                    code_start = None
+                    block_start = match.end()
+                if state.ready:
+                    yield from state.drain()
+                continue
+
+            # 代码块内部的 # 和空行不是标题和段落分隔
+            if code_start is not None:
+                continue
+
+            if kind == "title":
+                if not markdown:
+                    continue
+                state.add_block(block_start, match.start())
+                state.flush()
+                state.enter_section(len(match.group("hashes")), match.group("title").strip())
+            else:  # para
+                state.add_block(block_start, match.start())
+
+            block_start = match.end()
+            if state.ready:
+                yield from state.drain()
+
+        if code_start is not None:
+            # 未闭合的代码块延续到文末
+            state.add_code(code_start, len(text))
+        else:
+            state.add_block(block_start, len(text))
+        state.flush()
+        yield from state.drain()
+
+
+class _ChunkState:
+    """StreamingChunker的扫描状态：当前块中的单元、面包屑和块序号"""
+
+    def __init__(self, chunker: StreamingChunker, text: str, base_metadata: Dict):
+        self.chunker = chunker
+        self.text = text
+        self.base_metadata = base_metadata
+        self.breadcrumbs: List[Tuple[int, str]] = []
+        self.units: Deque[Tuple[int, int, int]] = deque()  # (start, end, tokens)
+        self.tokens = 0
+        self.chunk_index = 0
+        self.ready: List[Dict] = []  # 已产出、等待交给调用方的块
+
+    def drain(self) -> Iterator[Dict]:
+        """交出已产出的块（状态方法只追加到列表，避免每个段落都创建一层生成器）"""
+        ready, self.ready = self.ready, []
+        yield from ready
+
+    def enter_section(self, level: int, title: str):
+        """进入新的标题章节，更新面包屑"""
+        while self.breadcrumbs and self.breadcrumbs[-1][0] >= level:
+            self.breadcrumbs.pop()
+        self.breadcrumbs.append((level, title))
+
+    def add_block(self, start: int, end: int) -> None:
+        """添加一个段落；超过块大小的段落在原文区间内按句切分"""
+        segment = self.text[start:end]
+        if not segment.strip():
+            return
+        tokens = self.chunker.count_tokens(segment)
+        if tokens <= self.chunker.chunk_size:
+            self._append(start, end, tokens)
+            return
+
+        sentence_start = start
+        for match in _SENTENCE_END.finditer(self.text, start, end):
+            self.add_unit(sentence_start, match.end())
+            sentence_start = match.end()
+        self.add_unit(sentence_start, end)
+
+    def add_code(self, start: int, end: int) -> None:
+        """添加一个代码块：放得下时整体作为一个单元，否则只在行边界切分"""
+        segment = self.text[start:end]
+        if not segment.strip():
+            return
+        tokens = self.chunker.count_tokens(segment)
+        if tokens <= self.chunker.chunk_size:
+            self._append(start, end, tokens)
+            return
+
+        line_start = start
+        while line_start < end:
+            line_end = self.text.find("\n", line_start + 1, end)
+            line_end = end if line_end < 0 else line_end
+            self.add_unit(line_start, line_end)
+            line_start = line_end
+
+    def add_unit(self, start: int, end: int) -> None:
+        """追加一个单元，超出块大小时先产出当前块"""
+        segment = self.text[start:end]
+        if not segment.strip():
+            return
+
+        tokens = self.chunker.count_tokens(segment)
+        chunk_size = self.chunker.chunk_size
+
+        # 单个句子超过块大小时按比例切成多段，切点尽量退回到空白处
+        if tokens > chunk_size:
+            step = max(1, (end - start) * chunk_size // tokens)
+            piece_start = start
+            while piece_start < end:
+                piece_end = min(end, piece_start + step)
+                if piece_end < end:
+                    space = self.text.rfind(" ", piece_start + 1, piece_end)
+                    if space > piece_start:
+                        piece_end = space
+                self.add_unit(piece_start, piece_end)
+                piece_start = piece_end
+            return
+
+        self._append(start, end, tokens)
+
+    def _append(self, start: int, end: int, tokens: int) -> None:
+        """追加一个不超过块大小的单元，当前块放不下时先产出"""
+        if self.units and self.tokens + tokens > self.chunker.chunk_size:
+            self._emit()
+            self._keep_overlap()
+
+        self.units.append((start, end, tokens))
+        self.tokens += tokens
+
+    def flush(self) -> None:
+        """章节结束时产出剩余内容，不跨章节重叠"""
+        if self.units:
+            self._emit()
+        self.units.clear()
+        self.tokens = 0
+
+    def _keep_overlap(self):
+        """保留尾部若干单元作为下一块的开头"""
+        overlap_tokens = 0
+        keep = 0
+        for _, _, unit_tokens in reversed(self.units):
+            if overlap_tokens + unit_tokens > self.chunker.chunk_overlap or keep + 1 >= len(self.units):
+                break
+            overlap_tokens += unit_tokens
+            keep += 1
+        while len(self.units) > keep:
+            self.units.popleft()
+        self.tokens = overlap_tokens
+
+    def _emit(self) -> None:
+        start, end = self.units[0][0], self.units[-1][1]
+        chunk_text = self.text[start:end].strip()
+        if not chunk_text:
+            return
+
+        self.ready.append({
+            "text": chunk_text,
+            "metadata": {
+                **self.base_metadata,
+                "chunk_index": self.chunk_index,
+                "chunk_size": len(chunk_text),
+                "token_count": self.tokens,
+                "section_title": self.breadcrumbs[-1][1] if self.breadcrumbs else "",
+                "section_level": self.breadcrumbs[-1][0] if self.breadcrumbs else 0,
+                "breadcrumbs": " > ".join(title for _, title in self.breadcrumbs),
+                "start_offset": start,
+                "end_offset": end
+            }
+        })
+        self.chunk_index += 1
+
+
+_HTML_TAG = re.compile(r'<(?:[a-zA-Z][a-zA-Z0-9]*)(?:\s[^>]*)?/?>')
+
+# 作为段落边界的HTML标签
+_HTML_BLOCK_TAGS = {
+    "p", "div", "section", "article", "blockquote", "pre", "ul", "ol", "li",
+    "table", "tr", "hr", "br", "figure", "figcaption", "header", "footer"
+}
+
+
+def looks_like_html(text: str) -> bool:
+    """判断文本是否包含HTML标签（只检查开头部分）"""
+    return bool(_HTML_TAG.search(text[:2000]))
+
+
+class _HtmlTextExtractor(HTMLParser):
+    """单遍HTML转文本：标题转为Markdown标题，块级标签转为段落分隔，忽略script/style"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[str] = []
+        self.current: List[str] = []
+        self.prefix = ""
+        self.skip_depth = 0
+        self.pre_depth = 0
+
+    def _break(self, prefix: str = ""):
+        text = "".join(self.current)
+        if self.pre_depth:
+            # 代码块保留原始空白，并加上围栏，避免被按句切分
+            text = text.strip("\n")
+            if text.strip():
+                self.blocks.append(f"```\n{text}\n```")
+        else:
+            text = " ".join(text.split())
+            if text:
+                self.blocks.append(self.prefix + text)
+        self.current = []
+        self.prefix = prefix
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style", "noscript"):
+            self.skip_depth += 1
+        elif len(tag) == 2 and tag[0] == "h" and tag[1] in "123456":
+            self._break("#" * int(tag[1]) + " ")
+        elif tag in _HTML_BLOCK_TAGS:
+            self._break("- " if tag == "li" else "")
+            if tag == "pre":
+                self.pre_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style", "noscript"):
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif (len(tag) == 2 and tag[0] == "h" and tag[1] in "123456") or tag in _HTML_BLOCK_TAGS:
+            self._break()
+            if tag == "pre":
+                self.pre_depth = max(0, self.pre_depth - 1)
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.current.append(data)
+
+    def close(self):
+        super().close()
+        self._break()
+
+
+def html_to_text(html: str) -> str:
+    """
+    将文章HTML转换为适合分块的纯文本，标题保留为Markdown标题以便按章节切分
+
+    Args:
+        html: HTML文本
+
+    Returns:
+        以空行分隔段落的文本
+    """
+    if not html:
+        return ""
+    parser = _HtmlTextExtractor()
+    parser.feed(html)
+    parser.close()
+    return "\n\n".join(parser.blocks)
@@ -1,26 +1,79 @@
 """
-Text embedding module using sentence-transformers.
-使用sentence-transformers进行文本嵌入。
+Text embedding module using sentence-transformers or ONNX Runtime.
+使用sentence-transformers（PyTorch）或ONNX Runtime进行文本嵌入。
 """
 
-from typing import List
-import numpy as np
-from sentence_transformers import SentenceTransformer
+from typing import List, Dict, Optional
+import json
 import logging
+import os
+import platform
+import numpy as np
+from .chunker import approximate_token_count
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+except ImportError:
+    ort = None
+    Tokenizer = None
 
 logger = logging.getLogger(__name__)
 
+# export_onnx_model 写入的配置文件
+ONNX_CONFIG_FILE = "embedder_config.json"
+
 
 class TextEmbedder:
     """文本嵌入器，使用中文优化的模型"""
 
-    def __init__(self, model_name: str = "BAAI/bge-small-zh-v1.5"):
+    SUPPORTED_BACKENDS = ("torch", "onnx")
+
+    def __init__(self,
+                 model_name: str = "BAAI/bge-small-zh-v1.5",
+                 backend: str = "torch",
+                 onnx_dir: Optional[str] = None,
+                 threads: Optional[int] = None,
+                 batch_size: int = 32):
         """
         初始化嵌入器
 
         Args:
             model_name: 模型名称，默认使用bge-small-zh-v1.5（中文效果好且轻量）
+            backend: 推理后端 ("torch", "onnx")。onnx需要先用export_onnx_model导出模型，加载失败时抛出异常
+            onnx_dir: ONNX模型目录（含model_quantized.onnx或model.onnx、tokenizer.json）
+            threads: 推理线程数，None表示使用运行时默认值
+            batch_size: 每批嵌入的文本数
         """
+        if backend not in self.SUPPORTED_BACKENDS:
+            raise ValueError(f"Unsupported embedding backend: {backend}")
+
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.model = None
+        self.onnx: Optional[OnnxEncoder] = None
+
+        if backend == "onnx":
+            # 显式要求onnx时不退回torch：两者的向量不一定兼容，且退回后推理会静默变慢
+            self.onnx = OnnxEncoder(onnx_dir, threads=threads)
+            logger.info(f"Loaded ONNX embedding model from {onnx_dir} ({self.onnx.model_file})")
+            self.backend = "onnx"
+            self.dimension = self.onnx.dimension
+            return
+
+        self.backend = "torch"
+        if SentenceTransformer is None:
+            raise ImportError("sentence-transformers is required for the torch embedding backend")
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+
         try:
             self.model = SentenceTransformer(model_name)
             logger.info(f"Loaded embedding model: {model_name}")
@@ -46,9 +99,13 @@ class TextEmbedder:
         if not texts:
             return np.array([])
 
+        if self.onnx is not None:
+            return self.onnx.encode(texts, self.batch_size)
+
         # 批量嵌入，提高效率
         embeddings = self.model.encode(
             texts,
+            batch_size=self.batch_size,
             normalize_embeddings=True,  # 归一化便于计算余弦相似度
             show_progress_bar=False
         )
@@ -65,4 +122,180 @@ class TextEmbedder:
         Returns:
             向量 shape: (dimension,)
         """
-        return self.embed([text])[0]
\ No newline at end of file
+        return self.embed([text])[0]
+
+    def count_tokens(self, text: str) -> int:
+        """
+        统计文本的token数（不含特殊token），用于按token分块
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            token数
+        """
+        if self.onnx is not None:
+            return self.onnx.count_tokens(text)
+
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return approximate_token_count(text)
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+class OnnxEncoder:
+    """
+    ONNX Runtime编码器
+
+    复现sentence-transformers的推理流程：分词 -> Transformer -> 池化（cls/mean）-> L2归一化，
+    池化方式和最大长度从导出时写入的 embedder_config.json 读取，保证与PyTorch路径的向量兼容。
+    """
+
+    def __init__(self, model_dir: Optional[str], threads: Optional[int] = None):
+        """
+        加载ONNX模型
+
+        Args:
+            model_dir: export_onnx_model 的输出目录
+            threads: 算子内并行线程数
+        """
+        if ort is None or Tokenizer is None:
+            raise ImportError("onnxruntime and tokenizers are required for the onnx embedding backend")
+        if not model_dir or not os.path.isdir(model_dir):
+            raise FileNotFoundError(f"ONNX model directory not found: {model_dir}")
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.model_name = config.get("model_name")
+        self.pooling = config.get("pooling", "cls")
+        if self.pooling not in ("cls", "mean"):
+            raise ValueError(f"Unsupported pooling mode: {self.pooling}")
+        self.max_seq_length = int(config.get("max_seq_length", 512))
+
+        # 优先使用int8量化模型
+        for name in ("model_quantized.onnx", "model.onnx"):
+            if os.path.exists(os.path.join(model_dir, name)):
+                self.model_file = name
+                break
+        else:
+            raise FileNotFoundError(f"No ONNX model found in {model_dir}")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, self.model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {item.name for item in self.session.get_inputs()}
+
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        # 计数用的分词器不截断，编码用的分词器截断并按批内最长补齐
+        self.counter = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        pad_token = config.get("pad_token", "[PAD]")
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+
+        self.dimension = int(config.get("dimension") or self.session.get_outputs()[0].shape[-1])
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        批量编码并归一化
+
+        Args:
+            texts: 文本列表
+            batch_size: 每批文本数
+
+        Returns:
+            float32向量 shape: (n_texts, dimension)
+        """
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        # 按长度排序后分批，减少同一批内的padding
+        order = np.argsort([len(text) for text in texts], kind="stable")
+
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            encodings = self.tokenizer.encode_batch([texts[i] for i in rows])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+            hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+
+            if self.pooling == "cls":
+                pooled = hidden[:, 0]
+            else:
+                mask = attention_mask[:, :, None].astype(np.float32)
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings[rows] = pooled
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.clip(norms, 1e-12, None)
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.counter.encode(text, add_special_tokens=False).ids)
+
+
+def export_onnx_model(model_name: str,
+                      output_dir: str,
+                      quantize: bool = True) -> Dict:
+    """
+    将sentence-transformers模型导出为ONNX，并可选做动态int8量化（需要optimum[onnxruntime]和torch）
+
+    Args:
+        model_name: Hugging Face模型名称
+        output_dir: 输出目录
+        quantize: 是否生成 model_quantized.onnx（动态int8，权重量化、激活按批动态量化）
+
+    Returns:
+        写入的embedder_config
+    """
+    from huggingface_hub import hf_hub_download
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+    model.save_pretrained(output_dir)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(output_dir)
+
+    if quantize:
+        if platform.machine().lower() in ("arm64", "aarch64"):
+            qconfig = AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+        else:
+            qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        ORTQuantizer.from_pretrained(output_dir).quantize(save_dir=output_dir, quantization_config=qconfig)
+
+    # 读取sentence-transformers的池化配置，保证与PyTorch路径一致
+    pooling, max_seq_length = "mean", tokenizer.model_max_length
+    try:
+        with open(hf_hub_download(model_name, "1_Pooling/config.json"), "r", encoding="utf-8") as f:
+            pooling_config = json.load(f)
+        if pooling_config.get("pooling_mode_cls_token"):
+            pooling = "cls"
+        with open(hf_hub_download(model_name, "sentence_bert_config.json"), "r", encoding="utf-8") as f:
+            max_seq_length = json.load(f).get("max_seq_length", max_seq_length)
+    except Exception as e:
+        logger.warning(f"No sentence-transformers pooling config for {model_name}, using mean pooling: {e}")
+
+    config = {
+        "model_name": model_name,
+        "pooling": pooling,
+        "max_seq_length": min(int(max_seq_length), 512),
+        "dimension": model.config.hidden_size,
+        "pad_token": tokenizer.pad_token or "[PAD]",
+        "quantized": quantize
+    }
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+    logger.info(f"Exported {model_name} to {output_dir} (pooling={pooling}, quantized={quantize})")
+    return config
\ No newline at end of file
@@ -0,0 +1,267 @@
+"""
+Token-budgeted context packing for RAG prompts.
+RAG上下文打包：合并同源相邻块、去除重叠、按原文顺序排列并精确填满token预算。
+"""
+
+from typing import List, Dict, Optional, Callable, Tuple
+from dataclasses import dataclass, field
+import logging
+import re
+
+from .chunker import approximate_token_count
+
+logger = logging.getLogger(__name__)
+
+# 判定为块间重叠的最短公共长度（字符），过短的重合多为巧合
+_MIN_OVERLAP_CHARS = 8
+
+# 截断时的句末位置
+_SENTENCE_BOUNDARY = re.compile(r'[.!?]+(?=\s|\Z)|[。！？]+|\n')
+
+
+@dataclass
+class PackedContext:
+    """打包结果"""
+
+    text: str = ""  # 拼接后的上下文
+    tokens: int = 0  # 上下文实际token数
+    naive_tokens: int = 0  # 相同块直接拼接时的token数
+    chunks_used: int = 0  # 使用的块数（含被截断的块）
+    chunks_dropped: int = 0  # 因预算不足未使用的块数
+    truncated: bool = False  # 最后一个块是否被截断
+    sources: List[Dict] = field(default_factory=list)  # 每个来源的元数据和块数
+
+    @property
+    def tokens_saved(self) -> int:
+        """合并去重节省的token数"""
+        return max(0, self.naive_tokens - self.tokens)
+
+
+class ContextPacker:
+    """
+    上下文打包器
+
+    按相关度依次尝试加入检索结果，每次加入后重新合并同一来源的块：
+    同源块按原文位置排序，相邻块的重叠部分只保留一份。
+    来源之间按最高相关度排序，来源内部按原文顺序排列。
+    """
+
+    def __init__(self,
+                 token_counter: Optional[Callable[[str], int]] = None,
+                 separator: str = "\n\n",
+                 min_truncated_tokens: int = 32):
+        """
+        初始化打包器
+
+        Args:
+            token_counter: token计数函数，默认使用近似计数；传入len即按字符计量
+            separator: 不相邻片段之间的分隔符
+            min_truncated_tokens: 截断块至少保留的token数，剩余预算更少时不再截断
+        """
+        self.count_tokens = token_counter or approximate_token_count
+        self.separator = separator
+        self.min_truncated_tokens = min_truncated_tokens
+
+    def pack(self, results: List[Dict], max_tokens: int) -> PackedContext:
+        """
+        将检索结果打包到token预算内
+
+        Args:
+            results: 检索结果，每个包含text、metadata，可选score、id
+            max_tokens: token预算
+
+        Returns:
+            PackedContext
+        """
+        packed = PackedContext()
+        if not results or max_tokens <= 0:
+            packed.chunks_dropped = len(results or [])
+            return packed
+
+        ranked = sorted(
+            enumerate(results),
+            key=lambda item: (-item[1].get("score", 0.0), item[0])
+        )
+
+        groups: Dict[str, Dict] = {}
+        seen_texts = set()
+        text = ""
+
+        for rank, (_, result) in enumerate(ranked):
+            chunk_text = (result.get("text") or "").strip()
+            if not chunk_text or chunk_text in seen_texts:
+                continue
+
+            metadata = result.get("metadata") or {}
+            key = self._source_key(metadata, rank)
+            group = groups.get(key)
+            is_new_group = group is None
+            if is_new_group:
+                group = groups[key] = {"rank": rank, "metadata": metadata, "chunks": []}
+
+            chunk = {"text": chunk_text, "position": self._position(metadata, rank)}
+            group["chunks"].append(chunk)
+            candidate = self._render(groups)
+            candidate_tokens = self.count_tokens(candidate)
+
+            if candidate_tokens <= max_tokens:
+                text, packed.tokens = candidate, candidate_tokens
+                packed.chunks_used += 1
+                packed.naive_tokens += self.count_tokens(chunk_text)
+                seen_texts.add(chunk_text)
+                continue
+
+            # 放不下：尝试截断这个块填满剩余预算，之后停止
+            fitted = self._fit(groups, chunk, max_tokens)
+            if fitted is not None:
+                text, packed.tokens = fitted
+                packed.chunks_used += 1
+                packed.naive_tokens += self.count_tokens(chunk["text"])
+                packed.truncated = True
+            else:
+                group["chunks"].remove(chunk)
+                if is_new_group:
+                    del groups[key]
+            packed.chunks_dropped = len(ranked) - rank - (1 if fitted is not None else 0)
+            break
+
+        # naive_tokens 按直接拼接计算，包含分隔符
+        if packed.chunks_used > 1:
+            packed.naive_tokens += self.count_tokens(self.separator) * (packed.chunks_used - 1)
+
+        packed.text = text
+        packed.sources = [
+            {
+                **{k: v for k, v in group["metadata"].items() if k in ("doc_id", "title", "source", "article_id")},
+                "chunks": len(group["chunks"])
+            }
+            for group in sorted(groups.values(), key=lambda g: g["rank"])
+            if group["chunks"]
+        ]
+
+        logger.debug(
+            f"Packed {packed.chunks_used} chunks into {packed.tokens}/{max_tokens} tokens "
+            f"(saved {packed.tokens_saved})"
+        )
+        return packed
+
+    # ------------------------------------------------------------------
+    # 合并
+    # ------------------------------------------------------------------
+
+    def _render(self, groups: Dict[str, Dict]) -> str:
+        """按来源相关度、来源内原文位置拼接全部已选块"""
+        parts = []
+        for group in sorted(groups.values(), key=lambda g: g["rank"]):
+            chunks = sorted(group["chunks"], key=lambda c: c["position"])
+            parts.extend(self._merge(chunks))
+        return self.separator.join(parts)
+
+    def _merge(self, chunks: List[Dict]) -> List[str]:
+        """合并同一来源内有重叠或包含关系的块"""
+        merged: List[str] = []
+        for chunk in chunks:
+            chunk_text = chunk["text"]
+            if not chunk_text:
+                continue
+            if merged:
+                previous = merged[-1]
+                if chunk_text in previous:
+                    continue
+                if previous in chunk_text:
+                    merged[-1] = chunk_text
+                    continue
+                overlap = self._overlap(previous, chunk_text)
+                if overlap:
+                    merged[-1] = previous + chunk_text[overlap:]
+                    continue
+            merged.append(chunk_text)
+        return merged
+
+    @staticmethod
+    def _overlap(left: str, right: str) -> int:
+        """left的后缀与right的前缀的最长重合长度"""
+        head = right[:_MIN_OVERLAP_CHARS]
+        if len(head) < _MIN_OVERLAP_CHARS:
+            return 0
+
+        # 只在right开头片段出现的位置上比较，最靠前的位置即最长重合
+        start = left.find(head, max(0, len(left) - len(right)))
+        while start != -1:
+            if right.startswith(left[start:]):
+                return len(left) - start
+            start = left.find(head, start + 1)
+        return 0
+
+    # ------------------------------------------------------------------
+    # 截断
+    # ------------------------------------------------------------------
+
+    def _fit(self, groups: Dict[str, Dict], chunk: Dict, max_tokens: int) -> Optional[Tuple[str, int]]:
+        """
+        二分查找chunk能保留的最长前缀，并尽量退回到句末
+
+        Returns:
+            (上下文, token数)，剩余预算不足min_truncated_tokens时返回None
+        """
+        full_text = chunk["text"]
+        chunk["text"] = ""
+        base = self._render(groups)
+        base_tokens = self.count_tokens(base) if base else 0
+        chunk["text"] = full_text
+
+        if max_tokens - base_tokens < self.min_truncated_tokens:
+            return None
+
+        best = None
+        low, high = 1, len(full_text) - 1
+        while low <= high:
+            middle = (low + high) // 2
+            chunk["text"] = full_text[:middle]
+            candidate = self._render(groups)
+            candidate_tokens = self.count_tokens(candidate)
+            if candidate_tokens <= max_tokens:
+                best = middle
+                low = middle + 1
+            else:
+                high = middle - 1
+
+        if best is None:
+            chunk["text"] = full_text
+            return None
+
+        # 在保留部分的最后四分之一内寻找句末，避免截断在句子中间
+        boundary = None
+        for match in _SENTENCE_BOUNDARY.finditer(full_text, best - best // 4, best):
+            boundary = match.end()
+        cut = boundary or best
+
+        chunk["text"] = full_text[:cut].rstrip()
+        candidate = self._render(groups)
+        candidate_tokens = self.count_tokens(candidate)
+        if candidate_tokens - base_tokens < self.min_truncated_tokens and boundary:
+            chunk["text"] = full_text[:best].rstrip()
+            candidate = self._render(groups)
+            candidate_tokens = self.count_tokens(candidate)
+        return candidate, candidate_tokens
+
+    # ------------------------------------------------------------------
+    # 来源与位置
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _source_key(metadata: Dict, rank: int) -> str:
+        """同一来源的块使用相同的key；无法识别来源时每个块单独成组"""
+        for field_name in ("doc_id", "article_id"):
+            if metadata.get(field_name):
+                return f"{field_name}:{metadata[field_name]}"
+        return f"result:{rank}"
+
+    @staticmethod
+    def _position(metadata: Dict, rank: int) -> Tuple[int, int]:
+        """块在原文中的位置：优先使用起始偏移，其次块序号"""
+        if "start_offset" in metadata:
+            return (int(metadata["start_offset"]), rank)
+        if "chunk_index" in metadata:
+            return (int(metadata["chunk_index"]), rank)
+        return (rank, rank)
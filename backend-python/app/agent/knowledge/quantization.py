@@ -0,0 +1,458 @@
+"""
+Quantized vector index with full-precision rescoring.
+量化向量索引：int8/float16压缩向量常驻内存，候选结果按全精度向量重新打分。
+"""
+
+from typing import List, Dict, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import shutil
+import uuid
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 分块打分时每块的行数，限制int8 -> float32转换带来的临时内存
+_BLOCK_ROWS = 8192
+
+# 内存中量化向量缓冲区的初始行数，不够时按倍数扩容
+_INITIAL_CAPACITY = 1024
+
+# 旧版索引文件（每次写入都整体重写），加载时转换为分段追加格式
+_LEGACY_FILES = ("ids.json", "codes.npy", "scales.npy", "full.npy")
+
+
+class QuantizedIndex:
+    """
+    量化向量索引
+
+    - int8: 每个向量单独保存一个缩放系数，内存约为float32的1/4
+    - float16: 直接半精度存储，内存约为float32的1/2
+
+    全精度向量保存在磁盘上的 full.bin，以内存映射方式读取，
+    只有进入候选集的行才会被真正读入内存用于重新打分。
+
+    磁盘格式为追加写入的段目录（segment）：ids.txt、codes.bin、scales.bin、full.bin，
+    meta.json 记录当前段和已提交的行数（最后写入）。add 只追加新行，update 原地改写对应行，
+    成本与本次写入的行数成正比；delete 和切换量化方式时把剩余行写入新段，再原子切换 meta.json。
+    """
+
+    SUPPORTED_MODES = ("int8", "float16")
+
+    def __init__(self,
+                 index_dir: str,
+                 mode: str = "int8",
+                 rescore_factor: int = 4):
+        """
+        初始化量化索引
+
+        Args:
+            index_dir: 索引文件目录
+            mode: 量化方式 ("int8", "float16")
+            rescore_factor: 粗排候选数量为 n_results 的倍数
+        """
+        if mode not in self.SUPPORTED_MODES:
+            raise ValueError(f"Unsupported quantization mode: {mode}")
+
+        self.index_dir = index_dir
+        self.mode = mode
+        self.rescore_factor = max(1, rescore_factor)
+
+        self._ids: List[str] = []
+        self._id_to_row: Dict[str, int] = {}
+        # 量化向量缓冲区（容量按倍数增长），_codes/_scales 是其中已使用部分的视图
+        self._codes_buffer: Optional[np.ndarray] = None
+        self._scales_buffer: Optional[np.ndarray] = None
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._full: Optional[np.ndarray] = None
+        self._dimension: Optional[int] = None
+        self._segment: Optional[str] = None
+
+        os.makedirs(index_dir, exist_ok=True)
+        self._load()
+
+    # ------------------------------------------------------------------
+    # 量化
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def quantize(vectors: np.ndarray, mode: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        量化向量
+
+        Args:
+            vectors: float32向量 shape: (n, dimension)
+            mode: 量化方式
+
+        Returns:
+            (codes, scales)，float16模式下scales全为1
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        if mode == "float16":
+            return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+
+        # 对称量化：每个向量按自身最大绝对值缩放到[-127, 127]
+        max_abs = np.abs(vectors).max(axis=1) if len(vectors) else np.zeros(0, dtype=np.float32)
+        scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+
+    # ------------------------------------------------------------------
+    # 写操作
+    # ------------------------------------------------------------------
+
+    def add(self, ids: Sequence[str], embeddings: np.ndarray):
+        """
+        添加向量
+
+        Args:
+            ids: 文档ID列表
+            embeddings: 向量数组 shape: (n, dimension)
+        """
+        embeddings = self._as_matrix(embeddings)
+        if not len(ids):
+            return
+
+        duplicated = [doc_id for doc_id in ids if doc_id in self._id_to_row]
+        if duplicated:
+            raise ValueError(f"IDs already exist in quantized index: {duplicated[:5]}")
+
+        new_segment = self._segment is None
+        if new_segment:
+            self._start_segment(embeddings.shape[1])
+
+        codes, scales = self.quantize(embeddings, self.mode)
+        self._append_rows(codes, scales)
+        for doc_id in ids:
+            self._id_to_row[doc_id] = len(self._ids)
+            self._ids.append(doc_id)
+
+        # 追加到段文件末尾，最后更新行数（提交点）
+        self._append_file("codes.bin", codes)
+        self._append_file("scales.bin", scales)
+        self._append_file("full.bin", embeddings)
+        with open(self._segment_path("ids.txt"), "a", encoding="utf-8") as f:
+            f.write("".join(f"{doc_id}\n" for doc_id in ids))
+        self._write_meta()
+        if new_segment:
+            self._remove_segments(keep=self._segment)
+        self._open_full()
+
+    def update(self, ids: Sequence[str], embeddings: np.ndarray):
+        """
+        更新已存在的向量
+
+        Args:
+            ids: 文档ID列表
+            embeddings: 新向量 shape: (n, dimension)
+        """
+        embeddings = self._as_matrix(embeddings)
+        rows = [self._id_to_row[doc_id] for doc_id in ids if doc_id in self._id_to_row]
+        if len(rows) != len(ids):
+            missing = [doc_id for doc_id in ids if doc_id not in self._id_to_row]
+            raise KeyError(f"IDs not found in quantized index: {missing[:5]}")
+
+        codes, scales = self.quantize(embeddings, self.mode)
+        self._codes[rows] = codes
+        self._scales[rows] = scales
+        # 只改写对应行
+        self._write_rows("codes.bin", rows, codes)
+        self._write_rows("scales.bin", rows, scales)
+        self._write_rows("full.bin", rows, embeddings)
+        self._open_full()
+
+    def delete(self, ids: Sequence[str]):
+        """
+        删除向量
+
+        Args:
+            ids: 要删除的文档ID列表
+        """
+        rows = [self._id_to_row[doc_id] for doc_id in ids if doc_id in self._id_to_row]
+        if not rows:
+            return
+
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[rows] = False
+
+        self._rewrite(
+            [doc_id for doc_id, kept in zip(self._ids, keep) if kept],
+            self._codes[keep], self._scales[keep], np.asarray(self._full)[keep]
+        )
+
+    def clear(self):
+        """清空索引"""
+        self._reset()
+        for name in ("meta.json", *_LEGACY_FILES):
+            path = self._path(name)
+            if os.path.exists(path):
+                os.remove(path)
+        self._remove_segments()
+
+    # ------------------------------------------------------------------
+    # 检索
+    # ------------------------------------------------------------------
+
+    def search(self,
+               query_embedding: np.ndarray,
+               n_results: int = 5,
+               candidate_ids: Optional[Sequence[str]] = None) -> Tuple[List[str], List[float]]:
+        """
+        两阶段检索：量化向量粗排，全精度向量重新打分
+
+        Args:
+            query_embedding: 查询向量 shape: (dimension,)
+            n_results: 返回结果数
+            candidate_ids: 候选ID（来自元数据过滤），为None时检索全部
+
+        Returns:
+            (ids, distances)，distance为余弦距离，与Chroma的cosine空间一致
+        """
+        if not self._ids or n_results <= 0:
+            return [], []
+
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+
+        if candidate_ids is not None:
+            rows = np.array(
+                sorted(self._id_to_row[doc_id] for doc_id in set(candidate_ids) if doc_id in self._id_to_row),
+                dtype=np.int64
+            )
+            if not len(rows):
+                return [], []
+        else:
+            rows = None
+
+        # 粗排：在量化向量上计算近似内积
+        approx = self._approximate_scores(query, rows)
+        n_candidates = min(len(approx), n_results * self.rescore_factor)
+        top = np.argpartition(-approx, n_candidates - 1)[:n_candidates]
+        candidate_rows = rows[top] if rows is not None else top
+        candidate_rows = np.sort(candidate_rows)  # 顺序读取内存映射文件
+
+        # 精排：只读取候选行的全精度向量计算余弦相似度
+        vectors = np.asarray(self._full[candidate_rows], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(query) or 1.0)
+        scores = vectors @ query / np.where(norms > 0, norms, 1.0)
+
+        order = np.argsort(-scores)[:n_results]
+        ids = [self._ids[candidate_rows[i]] for i in order]
+        distances = [float(1.0 - scores[i]) for i in order]
+        return ids, distances
+
+    def _approximate_scores(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """分块计算量化向量与查询的近似内积"""
+        codes = self._codes if rows is None else self._codes[rows]
+        scales = self._scales if rows is None else self._scales[rows]
+
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _BLOCK_ROWS):
+            block = codes[start:start + _BLOCK_ROWS].astype(np.float32)
+            scores[start:start + _BLOCK_ROWS] = block @ query
+        if self.mode == "int8":
+            scores *= scales
+        return scores
+
+    def get_full(self, ids: Sequence[str]) -> np.ndarray:
+        """
+        读取指定ID的全精度向量
+
+        Args:
+            ids: 文档ID列表
+
+        Returns:
+            float32向量 shape: (len(ids), dimension)
+        """
+        rows = [self._id_to_row[doc_id] for doc_id in ids]
+        return np.asarray(self._full[rows], dtype=np.float32)
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._id_to_row
+
+    def memory_bytes(self) -> int:
+        """常驻内存的索引大小（不含内存映射的全精度向量和缓冲区的预留容量）"""
+        if self._codes is None:
+            return 0
+        return int(self._codes.nbytes + self._scales.nbytes)
+
+    def full_precision_bytes(self) -> int:
+        """等价的float32索引大小，用于对比压缩率"""
+        if self._codes is None:
+            return 0
+        return int(self._codes.shape[0] * self._codes.shape[1] * 4)
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def _as_matrix(self, embeddings: np.ndarray) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 1:
+            embeddings = embeddings.reshape(1, -1)
+        if self._dimension is not None and len(embeddings) and embeddings.shape[1] != self._dimension:
+            raise ValueError(
+                f"Embedding dimension {embeddings.shape[1]} does not match index dimension {self._dimension}"
+            )
+        return embeddings
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _segment_path(self, name: str, segment: Optional[str] = None) -> str:
+        return os.path.join(self.index_dir, segment or self._segment, name)
+
+    @property
+    def _code_dtype(self) -> np.dtype:
+        return np.dtype(np.int8 if self.mode == "int8" else np.float16)
+
+    def _reset(self):
+        self._ids = []
+        self._id_to_row = {}
+        self._codes_buffer = self._scales_buffer = None
+        self._codes = self._scales = None
+        self._full = None
+        self._dimension = None
+        self._segment = None
+
+    def _append_rows(self, codes: np.ndarray, scales: np.ndarray):
+        """把新行写入内存缓冲区，容量不够时按倍数扩容（均摊O(1)）"""
+        n = len(self._ids)
+        needed = n + len(codes)
+        if self._codes_buffer is None or needed > len(self._codes_buffer):
+            current = len(self._codes_buffer) if self._codes_buffer is not None else 0
+            capacity = max(_INITIAL_CAPACITY, needed, 2 * current)
+            codes_buffer = np.empty((capacity, self._dimension), dtype=self._code_dtype)
+            scales_buffer = np.empty(capacity, dtype=np.float32)
+            if n:
+                codes_buffer[:n] = self._codes
+                scales_buffer[:n] = self._scales
+            self._codes_buffer, self._scales_buffer = codes_buffer, scales_buffer
+        self._codes_buffer[n:needed] = codes
+        self._scales_buffer[n:needed] = scales
+        self._codes = self._codes_buffer[:needed]
+        self._scales = self._scales_buffer[:needed]
+
+    def _append_file(self, name: str, array: np.ndarray):
+        with open(self._segment_path(name), "ab") as f:
+            f.write(np.ascontiguousarray(array).tobytes())
+
+    def _write_rows(self, name: str, rows: Sequence[int], values: np.ndarray):
+        values = np.ascontiguousarray(values)
+        row_bytes = values[0].nbytes if len(values) else 0
+        with open(self._segment_path(name), "r+b") as f:
+            for row, value in zip(rows, values):
+                f.seek(row * row_bytes)
+                f.write(value.tobytes())
+
+    def _open_full(self):
+        """以内存映射方式打开当前段的全精度向量（只映射已提交的行）"""
+        self._full = None
+        if self._ids:
+            self._full = np.memmap(self._segment_path("full.bin"), dtype=np.float32, mode="r",
+                                   shape=(len(self._ids), self._dimension))
+
+    def _write_meta(self):
+        meta = {"mode": self.mode, "dimension": self._dimension, "count": len(self._ids), "segment": self._segment}
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def _start_segment(self, dimension: int):
+        self._dimension = dimension
+        self._segment = f"segment-{uuid.uuid4().hex[:12]}"
+        os.makedirs(os.path.join(self.index_dir, self._segment))
+
+    def _remove_segments(self, keep: Optional[str] = None):
+        for name in os.listdir(self.index_dir):
+            if name.startswith("segment-") and name != keep:
+                shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True)
+
+    def _rewrite(self, ids: List[str], codes: np.ndarray, scales: np.ndarray, full: np.ndarray):
+        """把给定的行写入新段，原子切换 meta.json 后删除旧段"""
+        full = np.ascontiguousarray(full, dtype=np.float32)
+        dimension = self._dimension or (full.shape[1] if full.ndim == 2 else None)
+        self._reset()
+        if not ids:
+            self.clear()
+            return
+
+        self._start_segment(dimension)
+        self._append_rows(codes, scales)
+        self._ids = list(ids)
+        self._id_to_row = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._append_file("codes.bin", codes)
+        self._append_file("scales.bin", scales)
+        self._append_file("full.bin", full)
+        with open(self._segment_path("ids.txt"), "w", encoding="utf-8") as f:
+            f.write("".join(f"{doc_id}\n" for doc_id in self._ids))
+        self._write_meta()
+        self._remove_segments(keep=self._segment)
+        self._open_full()
+
+    def _load(self):
+        if not os.path.exists(self._path("meta.json")):
+            if os.path.exists(self._path("ids.json")):
+                self._load_legacy()
+            else:
+                self._remove_segments()  # 首次提交前中断留下的段
+            return
+
+        with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        count, segment = meta["count"], meta["segment"]
+        self._remove_segments(keep=segment)  # 切换段后中断留下的旧段
+        if not count:
+            return
+
+        mode, self.mode = self.mode, meta["mode"]
+        self._dimension, self._segment = meta["dimension"], segment
+        with open(self._segment_path("ids.txt"), "r", encoding="utf-8") as f:
+            ids = f.read().splitlines()[:count]
+        codes = np.fromfile(self._segment_path("codes.bin"), dtype=self._code_dtype,
+                            count=count * self._dimension).reshape(count, self._dimension)
+        scales = np.fromfile(self._segment_path("scales.bin"), dtype=np.float32, count=count)
+        # 丢弃最后一次提交之后写入了一半的数据
+        for name, row_bytes in (("codes.bin", self._code_dtype.itemsize * self._dimension),
+                                ("scales.bin", 4), ("full.bin", 4 * self._dimension)):
+            os.truncate(self._segment_path(name), count * row_bytes)
+        with open(self._segment_path("ids.txt"), "w", encoding="utf-8") as f:
+            f.write("".join(f"{doc_id}\n" for doc_id in ids))
+
+        self._append_rows(codes, scales)
+        self._ids = ids
+        self._id_to_row = {doc_id: row for row, doc_id in enumerate(ids)}
+        self._open_full()
+
+        if mode != self.mode:
+            # 切换了量化方式：用全精度向量重新量化
+            logger.info(f"Re-quantizing index from {self.mode} to {mode}")
+            self.mode = mode
+            full = np.asarray(self._full)
+            codes, scales = self.quantize(full, mode)
+            self._rewrite(ids, codes, scales, full)
+
+        logger.info(f"Loaded quantized index ({self.mode}) with {len(self._ids)} vectors")
+
+    def _load_legacy(self):
+        """转换旧版（整体重写的.npy文件）索引"""
+        with open(self._path("ids.json"), "r", encoding="utf-8") as f:
+            ids = json.load(f)
+        if ids:
+            full = np.load(self._path("full.npy"))
+            codes, scales = self.quantize(full, self.mode)
+            self._rewrite(ids, codes, scales, full)
+        for name in _LEGACY_FILES:
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+        logger.info(f"Converted legacy quantized index with {len(ids)} vectors")
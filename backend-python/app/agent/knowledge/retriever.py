@@ -3,11 +3,15 @@ Knowledge retrieval module with semantic search.
 知识检索模块，提供语义搜索能力。
 """
 
-from typing import List, Dict, Optional, Tuple
+from typing import Any, List, Dict, Optional, Tuple, Iterable, Iterator
+from itertools import islice
 import logging
+import uuid
 from .embedder import TextEmbedder
 from .storage import VectorStore
-from .chunker import TextChunker
+from .chunker import TextChunker, StreamingChunker, html_to_text, looks_like_html
+from .packer import ContextPacker, PackedContext
+from .cache import QueryCache
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +22,11 @@ class KnowledgeRetriever:
     def __init__(self,
                  persist_dir: str = "./chroma_db",
                  collection_name: str = "muses_knowledge",
-                 embedding_model: str = "BAAI/bge-small-zh-v1.5"):
+                 embedding_model: str = "BAAI/bge-small-zh-v1.5",
+                 quantization: Optional[str] = None,
+                 query_cache: Optional[QueryCache] = None,
+                 embedder: Optional[TextEmbedder] = None,
+                 store: Optional[VectorStore] = None):
         """
         初始化检索器
 
@@ -26,10 +34,19 @@ class KnowledgeRetriever:
             persist_dir: 向量数据库持久化目录
             collection_name: 集合名称
             embedding_model: 嵌入模型名称
+            quantization: 向量量化方式 (None, "int8", "float16")
+            query_cache: 检索结果缓存，None表示不缓存
+            embedder: 共享的嵌入器，提供时不再加载embedding_model
+            store: 已打开的存储（VectorStore或TenantStore），提供时忽略persist_dir等参数
         """
-        self.embedder = TextEmbedder(embedding_model)
-        self.store = VectorStore(persist_dir, collection_name)
+        self.embedder = embedder or TextEmbedder(embedding_model)
+        self.store = store or VectorStore(
+            persist_dir, collection_name, quantization=quantization, query_cache=query_cache
+        )
+        self.query_cache = query_cache if store is None else store.query_cache
         self.chunker = TextChunker()
+        self.streaming_chunker = StreamingChunker(token_counter=self.embedder.count_tokens)
+        self.packer = ContextPacker(token_counter=self.embedder.count_tokens)
 
     def add_document(self,
                     text: str,
@@ -41,11 +58,18 @@ class KnowledgeRetriever:
         Args:
             text: 文档文本
             metadata: 文档元数据
-            chunk_strategy: 分块策略 ("auto", "markdown", "fixed")
+            chunk_strategy: 分块策略 ("auto", "markdown", "fixed", "stream")。
+                "stream" 使用按token计量的流式分块，边分块边嵌入
 
         Returns:
             添加的块ID列表
         """
+        # 同一文档的块共享doc_id，检索后可据此合并相邻块
+        metadata = {"doc_id": uuid.uuid4().hex, **(metadata or {})}
+
+        if chunk_strategy == "stream":
+            return self._add_document_stream(text, metadata)
+
         # 选择分块策略
         if chunk_strategy == "markdown" or (chunk_strategy == "auto" and self._is_markdown(text)):
             chunks = self.chunker.chunk_markdown(text, metadata)
@@ -62,16 +86,126 @@ class KnowledgeRetriever:
         # 生成嵌入
         embeddings = self.embedder.embed(texts)
 
-        # 存储
+        # 存储（直接传递NumPy数组，避免转换为Python列表）
         ids = self.store.add(
             texts=texts,
-            embeddings=embeddings.tolist(),
+            embeddings=embeddings,
             metadatas=metadatas
         )
 
         logger.info(f"Added document with {len(chunks)} chunks")
         return ids
 
+    def _add_document_stream(self,
+                             text: str,
+                             metadata: Optional[Dict] = None,
+                             batch_size: int = 64) -> List[str]:
+        """
+        流式添加文档：分块、嵌入、写入按批次交替进行，内存中最多保留一个批次的块
+
+        Args:
+            text: 文档文本
+            metadata: 文档元数据
+            batch_size: 每批嵌入的块数
+
+        Returns:
+            添加的块ID列表
+        """
+        chunks = self.streaming_chunker.iter_chunks(
+            text, metadata, markdown=self._is_markdown(text)
+        )
+        ids = self._add_chunks(chunks, batch_size)
+
+        logger.info(f"Added document with {len(ids)} chunks (streaming)")
+        return ids
+
+    def _add_chunks(self, chunks: Iterator[Dict], batch_size: int) -> List[str]:
+        """按固定大小的批次嵌入并写入块，每批只调用一次embed和一次store.add"""
+        ids = []
+        while True:
+            batch = list(islice(chunks, batch_size))
+            if not batch:
+                break
+
+            texts = [chunk["text"] for chunk in batch]
+            embeddings = self.embedder.embed(texts)
+            ids.extend(self.store.add(
+                texts=texts,
+                embeddings=embeddings,
+                metadatas=[chunk["metadata"] for chunk in batch]
+            ))
+        return ids
+
+    def add_documents(self,
+                      documents: Iterable[Dict],
+                      chunk_strategy: str = "auto",
+                      batch_size: int = 256,
+                      strip_html: bool = True,
+                      report: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        批量添加文档：跨文档分块，按固定大小批次嵌入并批量写入存储
+
+        与逐篇调用add_document相比，嵌入调用和存储写入的次数由文档数降为块数/batch_size。
+
+        Args:
+            documents: 文档列表，每个包含text和可选的metadata
+            chunk_strategy: 分块策略 ("auto", "markdown", "fixed", "stream")
+            batch_size: 每批嵌入和写入的块数
+            strip_html: 是否先将HTML内容转换为文本（标题保留为Markdown标题）
+            report: 传入字典时写入统计：documents（产生了块的文档数）和
+                    failed（分块失败的文档，article_id或doc_id列表）
+
+        Returns:
+            添加的块ID列表
+        """
+        if report is None:
+            report = {}
+        report.update(documents=0, failed=[])
+        chunks = self._iter_document_chunks(documents, chunk_strategy, strip_html, report)
+        ids = self._add_chunks(chunks, batch_size)
+
+        logger.info(f"Added {len(ids)} chunks in batches of {batch_size}")
+        return ids
+
+    def _iter_document_chunks(self,
+                              documents: Iterable[Dict],
+                              chunk_strategy: str,
+                              strip_html: bool,
+                              report: Dict[str, Any]) -> Iterator[Dict]:
+        """逐篇分块并连续产出所有块；单篇文档分块失败时记录日志、计入report并跳过"""
+        for document in documents:
+            text = document.get("text") or ""
+            # Chroma的元数据不接受None
+            metadata = {
+                "doc_id": uuid.uuid4().hex,
+                **{k: v for k, v in (document.get("metadata") or {}).items() if v is not None}
+            }
+            try:
+                if strip_html and looks_like_html(text):
+                    text = html_to_text(text)
+                if not text.strip():
+                    continue
+
+                if chunk_strategy == "stream":
+                    chunks = self.streaming_chunker.iter_chunks(
+                        text, metadata, markdown=self._is_markdown(text)
+                    )
+                elif chunk_strategy == "markdown" or (chunk_strategy == "auto" and self._is_markdown(text)):
+                    chunks = self.chunker.chunk_markdown(text, metadata)
+                else:
+                    chunks = self.chunker.chunk_text(text, metadata)
+
+                produced = False
+                for chunk in chunks:
+                    produced = True
+                    yield chunk
+                if produced:
+                    report["documents"] += 1
+            except Exception as e:
+                document_id = metadata.get("article_id", metadata["doc_id"])
+                report["failed"].append(document_id)
+                logger.error(f"Failed to chunk document {document_id}: {e}")
+
     def search(self,
               query: str,
               n_results: int = 5,
@@ -89,12 +223,34 @@ class KnowledgeRetriever:
         Returns:
             搜索结果列表，每个结果包含text, metadata, score
         """
+        if self.query_cache is None:
+            return self._search(query, n_results, filter_metadata, rerank)
+
+        # 先读版本号再检索：检索期间发生写入时，结果只会落在旧版本的键下
+        collection_id = self.store.collection_id
+        key = self.query_cache.make_key(
+            collection_id, self.store.version(), query, n_results, filter_metadata, rerank=rerank
+        )
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        results = self._search(query, n_results, filter_metadata, rerank)
+        self.query_cache.set(key, collection_id, results)
+        return results
+
+    def _search(self,
+                query: str,
+                n_results: int,
+                filter_metadata: Optional[Dict],
+                rerank: bool) -> List[Dict]:
+        """未经缓存的语义搜索"""
         # 生成查询向量
         query_embedding = self.embedder.embed_single(query)
 
         # 搜索
         results = self.store.search(
-            query_embedding=query_embedding.tolist(),
+            query_embedding=query_embedding,
             n_results=n_results * 2 if rerank else n_results,  # 如果重排序，多取一些
             where=filter_metadata
         )
@@ -154,36 +310,44 @@ class KnowledgeRetriever:
     def get_context(self,
                    query: str,
                    max_length: int = 2000,
-                   n_chunks: int = 5) -> str:
+                   n_chunks: int = 5,
+                   max_tokens: Optional[int] = None) -> str:
         """
         获取查询相关的上下文
 
         Args:
             query: 查询文本
-            max_length: 最大上下文长度
+            max_length: 最大上下文长度（字符），未指定max_tokens时生效
             n_chunks: 最多使用的块数
+            max_tokens: token预算，指定后按嵌入模型分词器计量
 
         Returns:
             拼接的上下文文本
         """
-        results = self.search(query, n_chunks)
+        return self.pack_context(query, max_length, n_chunks, max_tokens).text
 
-        context_parts = []
-        current_length = 0
+    def pack_context(self,
+                     query: str,
+                     max_length: int = 2000,
+                     n_chunks: int = 5,
+                     max_tokens: Optional[int] = None) -> PackedContext:
+        """
+        检索并打包上下文：同源相邻块合并去重叠，按原文顺序排列，填满预算
 
-        for result in results:
-            text = result["text"]
-            if current_length + len(text) > max_length:
-                # 截断以适应长度限制
-                remaining = max_length - current_length
-                if remaining > 100:  # 至少保留100字符
-                    context_parts.append(text[:remaining])
-                break
-            else:
-                context_parts.append(text)
-                current_length += len(text)
+        Args:
+            query: 查询文本
+            max_length: 最大上下文长度（字符），未指定max_tokens时生效
+            n_chunks: 最多使用的块数
+            max_tokens: token预算
+
+        Returns:
+            PackedContext，包含上下文文本、token数和节省的token数
+        """
+        results = self.search(query, n_chunks)
 
-        return "\n\n".join(context_parts)
+        if max_tokens is not None:
+            return self.packer.pack(results, max_tokens)
+        return ContextPacker(token_counter=len, min_truncated_tokens=100).pack(results, max_length)
 
     def update_document(self,
                        doc_id: str,
@@ -201,7 +365,7 @@ class KnowledgeRetriever:
         if text is not None:
             embedding = self.embedder.embed_single(text)
             updates["documents"] = [text]
-            updates["embeddings"] = [embedding.tolist()]
+            updates["embeddings"] = embedding.reshape(1, -1)
         if metadata is not None:
             updates["metadatas"] = [metadata]
 
@@ -227,7 +391,10 @@ class KnowledgeRetriever:
         return {
             "total_documents": self.store.count(),
             "embedding_dimension": self.embedder.dimension,
-            "collection_name": self.store.collection.name
+            "embedding_backend": getattr(self.embedder, "backend", None),
+            "collection_name": self.store.name,
+            **self.store.index_stats(),
+            "query_cache": self.query_cache.stats() if self.query_cache is not None else None
         }
 
     def _is_markdown(self, text: str) -> bool:
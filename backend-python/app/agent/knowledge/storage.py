@@ -3,31 +3,59 @@ Vector storage using ChromaDB.
 使用ChromaDB存储向量。
 """
 
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Union
 import chromadb
+from chromadb.api import ClientAPI
 from chromadb.config import Settings
 import logging
+import os
 from datetime import datetime
 import json
+import uuid
+import numpy as np
+from .quantization import QuantizedIndex
+from .cache import QueryCache
 
 logger = logging.getLogger(__name__)
 
+# 向量可以是NumPy数组或Python列表，优先直接传递NumPy缓冲区
+Embeddings = Union[np.ndarray, List[List[float]]]
+
+# 集合元数据中记录Chroma保存的是真实向量（full）还是量化模式下的1维占位向量（placeholder）
+STORAGE_KEY = "embedding_storage"
+
+# 从Chroma重建量化索引时每批读取的向量数
+_REBUILD_BATCH = 1000
+
 
 class VectorStore:
     """向量存储，使用ChromaDB作为持久化存储"""
 
     def __init__(self,
                  persist_directory: str = "./chroma_db",
-                 collection_name: str = "muses_knowledge"):
+                 collection_name: str = "muses_knowledge",
+                 quantization: Optional[str] = None,
+                 rescore_factor: int = 4,
+                 query_cache: Optional[QueryCache] = None,
+                 client: Optional[ClientAPI] = None):
         """
         初始化向量存储
 
         Args:
             persist_directory: 持久化目录
             collection_name: 集合名称
+            quantization: 向量量化方式 (None, "int8", "float16")。
+                新建集合时启用，Chroma只保存文档、元数据和占位向量，向量由QuantizedIndex管理；
+                已保存真实向量的集合启用后仍写入真实向量，量化索引从Chroma重建。
+                保存占位向量的集合不能关闭量化（向量只在量化索引中）
+            rescore_factor: 量化检索时粗排候选数量为返回结果数的倍数
+            query_cache: 检索结果缓存，写入时递增集合版本号使其失效
+            client: 共享的Chroma客户端，不提供时为该目录新建持久化客户端
         """
+        self.query_cache = query_cache
+
         # 使用持久化存储
-        self.client = chromadb.PersistentClient(
+        self.client = client or chromadb.PersistentClient(
             path=persist_directory,
             settings=Settings(
                 anonymized_telemetry=False,
@@ -40,15 +68,77 @@ class VectorStore:
             self.collection = self.client.get_collection(collection_name)
             logger.info(f"Loaded existing collection: {collection_name}")
         except:
-            self.collection = self.client.create_collection(
-                name=collection_name,
-                metadata={"hnsw:space": "cosine"}  # 使用余弦相似度
-            )
+            self.collection = self._create_collection(collection_name, quantization)
             logger.info(f"Created new collection: {collection_name}")
 
+        self.quantization = quantization
+        self.storage = self._embedding_storage()
+        if self.storage == "placeholder" and not quantization:
+            raise ValueError(
+                f"Collection {collection_name} keeps its vectors in a quantized index; "
+                f"open it with quantization enabled or rebuild the collection"
+            )
+
+        self.quantized: Optional[QuantizedIndex] = None
+        if quantization:
+            self.quantized = QuantizedIndex(
+                os.path.join(persist_directory, "quantized", collection_name),
+                mode=quantization,
+                rescore_factor=rescore_factor
+            )
+            self._check_quantized_index()
+
+    @staticmethod
+    def _metadata(quantization: Optional[str]) -> Dict[str, str]:
+        return {
+            "hnsw:space": "cosine",  # 使用余弦相似度
+            STORAGE_KEY: "placeholder" if quantization else "full"
+        }
+
+    def _create_collection(self, name: str, quantization: Optional[str]):
+        return self.client.create_collection(name=name, metadata=self._metadata(quantization))
+
+    def _embedding_storage(self) -> str:
+        """集合中保存的向量类型；早期创建的集合没有记录，按已有向量的维度判断"""
+        storage = (self.collection.metadata or {}).get(STORAGE_KEY)
+        if storage:
+            return storage
+        peek = self.collection.get(limit=1, include=["embeddings"])
+        if not peek["ids"]:
+            return "placeholder" if self.quantization else "full"
+        return "placeholder" if len(peek["embeddings"][0]) == 1 else "full"
+
+    def _check_quantized_index(self):
+        """量化索引与集合的文档数不一致时，从Chroma中的真实向量重建"""
+        count = self.collection.count()
+        if len(self.quantized) == count:
+            return
+        if self.storage == "placeholder":
+            logger.error(
+                f"Quantized index of {self.collection.name} has {len(self.quantized)} vectors "
+                f"but the collection has {count} documents; re-add the missing documents"
+            )
+            return
+        self.rebuild_quantized_index()
+
+    def rebuild_quantized_index(self):
+        """按批读取Chroma中的真实向量，重建量化索引（集合保存真实向量时可用）"""
+        if self.quantized is None or self.storage != "full":
+            raise ValueError("Quantized index can only be rebuilt from a collection that stores full vectors")
+        self.quantized.clear()
+        offset = 0
+        while True:
+            batch = self.collection.get(limit=_REBUILD_BATCH, offset=offset, include=["embeddings"])
+            if not batch["ids"]:
+                break
+            self.quantized.add(batch["ids"], np.asarray(batch["embeddings"], dtype=np.float32))
+            offset += len(batch["ids"])
+        self._bump_version()
+        logger.info(f"Rebuilt quantized index of {self.collection.name} with {len(self.quantized)} vectors")
+
     def add(self,
             texts: List[str],
-            embeddings: List[List[float]],
+            embeddings: Embeddings,
             metadatas: Optional[List[Dict]] = None,
             ids: Optional[List[str]] = None) -> List[str]:
         """
@@ -68,8 +158,10 @@ class VectorStore:
 
         # 自动生成ID
         if ids is None:
+            # 时间戳加随机批次号，避免同一秒内多次添加时ID冲突
             timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            ids = [f"{timestamp}_{i}" for i in range(len(texts))]
+            batch = uuid.uuid4().hex[:8]
+            ids = [f"{timestamp}_{batch}_{i}" for i in range(len(texts))]
 
         # 确保元数据存在
         if metadatas is None:
@@ -80,19 +172,24 @@ class VectorStore:
             if "created_at" not in metadata:
                 metadata["created_at"] = datetime.now().isoformat()
 
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
         # 添加到集合
         self.collection.add(
             documents=texts,
-            embeddings=embeddings,
+            embeddings=self._chroma_embeddings(embeddings),
             metadatas=metadatas,
             ids=ids
         )
+        if self.quantized is not None:
+            self.quantized.add(ids, embeddings)
+        self._bump_version()
 
         logger.info(f"Added {len(texts)} documents to vector store")
         return ids
 
     def search(self,
-               query_embedding: List[float],
+               query_embedding: Union[np.ndarray, List[float]],
                n_results: int = 5,
                where: Optional[Dict] = None) -> Dict[str, List]:
         """
@@ -104,24 +201,65 @@ class VectorStore:
             where: 过滤条件
 
         Returns:
-            搜索结果字典，包含documents, metadatas, distances
+            搜索结果字典，包含ids, documents, metadatas, distances
         """
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+
+        if self.quantized is not None:
+            return self._search_quantized(query_embedding, n_results, where)
+
+        total = self.collection.count()
+        if total == 0:
+            return {"ids": [], "documents": [], "metadatas": [], "distances": []}
+
         results = self.collection.query(
             query_embeddings=[query_embedding],
-            n_results=min(n_results, self.collection.count()),
+            n_results=min(n_results, total),
             where=where
         )
 
         # 扁平化结果
         return {
+            "ids": results["ids"][0] if results["ids"] else [],
             "documents": results["documents"][0] if results["documents"] else [],
             "metadatas": results["metadatas"][0] if results["metadatas"] else [],
             "distances": results["distances"][0] if results["distances"] else []
         }
 
+    def _search_quantized(self,
+                          query_embedding: np.ndarray,
+                          n_results: int,
+                          where: Optional[Dict]) -> Dict[str, List]:
+        """在量化索引上检索，再从Chroma取回文档和元数据"""
+        candidate_ids = None
+        if where:
+            candidate_ids = self.collection.get(where=where, include=[])["ids"]
+
+        ids, distances = self.quantized.search(query_embedding, n_results, candidate_ids)
+        if not ids:
+            return {"ids": [], "documents": [], "metadatas": [], "distances": []}
+
+        # Chroma不保证按请求顺序返回，按ID重新对齐
+        fetched = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        by_id = {
+            doc_id: (document, metadata)
+            for doc_id, document, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"])
+        }
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for doc_id, distance in zip(ids, distances):
+            if doc_id not in by_id:
+                continue
+            document, metadata = by_id[doc_id]
+            results["ids"].append(doc_id)
+            results["documents"].append(document)
+            results["metadatas"].append(metadata or {})
+            results["distances"].append(distance)
+        return results
+
     def update(self,
                ids: List[str],
-               embeddings: Optional[List[List[float]]] = None,
+               embeddings: Optional[Embeddings] = None,
                metadatas: Optional[List[Dict]] = None,
                documents: Optional[List[str]] = None):
         """
@@ -135,14 +273,21 @@ class VectorStore:
         """
         update_dict = {}
         if embeddings is not None:
-            update_dict["embeddings"] = embeddings
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            if self.quantized is not None:
+                self.quantized.update(ids, embeddings)
+            update_dict["embeddings"] = self._chroma_embeddings(embeddings)
         if metadatas is not None:
             update_dict["metadatas"] = metadatas
         if documents is not None:
             update_dict["documents"] = documents
+            if self.storage == "placeholder" and "embeddings" not in update_dict:
+                # 避免Chroma用默认嵌入函数为新文档生成向量
+                update_dict["embeddings"] = np.ones((len(ids), 1), dtype=np.float32)
 
         if update_dict:
             self.collection.update(ids=ids, **update_dict)
+            self._bump_version()
             logger.info(f"Updated {len(ids)} documents")
 
     def delete(self, ids: List[str]):
@@ -153,6 +298,9 @@ class VectorStore:
             ids: 要删除的文档ID列表
         """
         self.collection.delete(ids=ids)
+        if self.quantized is not None:
+            self.quantized.delete(ids)
+        self._bump_version()
         logger.info(f"Deleted {len(ids)} documents")
 
     def get_all(self, limit: int = 100) -> Dict[str, List]:
@@ -175,9 +323,54 @@ class VectorStore:
         """清空所有文档"""
         # ChromaDB不支持直接清空，需要删除并重建集合
         collection_name = self.collection.name
+        self._bump_version()
         self.client.delete_collection(collection_name)
-        self.collection = self.client.create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
-        logger.info(f"Cleared collection: {collection_name}")
\ No newline at end of file
+        # 清空后按当前配置决定保存的向量类型
+        self.collection = self._create_collection(collection_name, self.quantization)
+        self.storage = "placeholder" if self.quantization else "full"
+        if self.quantized is not None:
+            self.quantized.clear()
+        logger.info(f"Cleared collection: {collection_name}")
+
+    def index_stats(self) -> Dict[str, Any]:
+        """
+        获取向量索引的内存占用
+
+        Returns:
+            包含量化方式和索引字节数的字典
+        """
+        if self.quantized is None:
+            return {"quantization": None}
+        return {
+            "quantization": self.quantization,
+            "index_memory_bytes": self.quantized.memory_bytes(),
+            "full_precision_bytes": self.quantized.full_precision_bytes()
+        }
+
+    @property
+    def name(self) -> str:
+        """集合名称"""
+        return self.collection.name
+
+    @property
+    def collection_id(self) -> str:
+        """集合ID，删除重建后会变化"""
+        return str(self.collection.id)
+
+    def version(self) -> int:
+        """集合版本号，未启用缓存时恒为0"""
+        if self.query_cache is None:
+            return 0
+        return self.query_cache.version(self.collection_id)
+
+    def _bump_version(self):
+        if self.query_cache is not None:
+            self.query_cache.bump(self.collection_id)
+
+    def _chroma_embeddings(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        量化模式新建的集合只需要占位向量（1维），真实向量存放在量化索引中
+        """
+        if self.storage != "placeholder":
+            return embeddings
+        return np.ones((len(embeddings), 1), dtype=np.float32)
\ No newline at end of file
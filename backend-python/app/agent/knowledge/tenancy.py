@@ -0,0 +1,349 @@
+"""
+Multi-tenant knowledge layout on a fixed number of sharded collections.
+多租户知识库：租户按哈希分布到固定数量的物理集合中，通过tenant_id元数据隔离。
+"""
+
+from typing import List, Dict, Optional, Any
+import hashlib
+import json
+import logging
+import os
+import threading
+import chromadb
+from chromadb.config import Settings
+
+from .embedder import TextEmbedder
+from .storage import VectorStore, Embeddings
+from .retriever import KnowledgeRetriever
+from .cache import QueryCache
+
+logger = logging.getLogger(__name__)
+
+TENANT_KEY = "tenant_id"
+
+# 按批读取/删除租户文档ID的批大小，避免一次取出全部ID或过长的SQL参数列表
+_ID_BATCH = 5000
+
+
+def scope_where(tenant_id: str, where: Optional[Dict] = None) -> Dict:
+    """
+    将租户条件合并进Chroma的where过滤条件
+
+    Args:
+        tenant_id: 租户ID
+        where: 原始过滤条件
+
+    Returns:
+        包含租户条件的过滤条件
+    """
+    tenant_clause = {TENANT_KEY: tenant_id}
+    if not where:
+        return tenant_clause
+
+    # Chroma要求多个条件使用$and显式组合
+    clauses = [tenant_clause]
+    if "$and" in where and len(where) == 1:
+        clauses.extend(where["$and"])
+    elif len(where) == 1:
+        clauses.append(where)
+    else:
+        clauses.extend({key: value} for key, value in where.items())
+    return {"$and": clauses}
+
+
+class TenantStore:
+    """
+    单个租户在分片集合上的视图，接口与VectorStore一致
+
+    写入时自动附加tenant_id，读取、更新、删除都限定在该租户的文档内。
+    """
+
+    def __init__(self, shard: VectorStore, tenant_id: str):
+        """
+        初始化租户视图
+
+        Args:
+            shard: 租户所在的分片存储
+            tenant_id: 租户ID
+        """
+        self.shard = shard
+        self.tenant_id = tenant_id
+
+    @property
+    def collection(self):
+        return self.shard.collection
+
+    @property
+    def query_cache(self) -> Optional[QueryCache]:
+        return self.shard.query_cache
+
+    @property
+    def name(self) -> str:
+        return self.tenant_id
+
+    @property
+    def collection_id(self) -> str:
+        """缓存命名空间：分片集合ID + 租户，保证各租户的版本号互不影响"""
+        return f"{self.shard.collection_id}:{self.tenant_id}"
+
+    def version(self) -> int:
+        if self.query_cache is None:
+            return 0
+        return self.query_cache.version(self.collection_id)
+
+    def _bump_version(self):
+        if self.query_cache is not None:
+            self.query_cache.bump(self.collection_id)
+
+    def _owned(self, ids: List[str]) -> List[str]:
+        """过滤出属于当前租户的ID"""
+        if not ids:
+            return []
+        return self.collection.get(ids=list(ids), where={TENANT_KEY: self.tenant_id}, include=[])["ids"]
+
+    def _tag(self, metadatas: List[Dict]) -> List[Dict]:
+        return [{**(metadata or {}), TENANT_KEY: self.tenant_id} for metadata in metadatas]
+
+    def add(self,
+            texts: List[str],
+            embeddings: Embeddings,
+            metadatas: Optional[List[Dict]] = None,
+            ids: Optional[List[str]] = None) -> List[str]:
+        """添加文档，元数据自动附加tenant_id"""
+        if not texts:
+            return []
+        ids = self.shard.add(
+            texts=texts,
+            embeddings=embeddings,
+            metadatas=self._tag(metadatas or [{} for _ in texts]),
+            ids=ids
+        )
+        self._bump_version()
+        return ids
+
+    def search(self,
+               query_embedding: Embeddings,
+               n_results: int = 5,
+               where: Optional[Dict] = None) -> Dict[str, List]:
+        """在当前租户的文档中检索"""
+        return self.shard.search(query_embedding, n_results, scope_where(self.tenant_id, where))
+
+    def update(self,
+               ids: List[str],
+               embeddings: Optional[Embeddings] = None,
+               metadatas: Optional[List[Dict]] = None,
+               documents: Optional[List[str]] = None):
+        """更新当前租户的文档，ID不属于该租户时抛出KeyError"""
+        owned = set(self._owned(ids))
+        missing = [doc_id for doc_id in ids if doc_id not in owned]
+        if missing:
+            raise KeyError(f"Documents not found for tenant {self.tenant_id}: {missing[:5]}")
+
+        self.shard.update(
+            ids=ids,
+            embeddings=embeddings,
+            metadatas=self._tag(metadatas) if metadatas is not None else None,
+            documents=documents
+        )
+        self._bump_version()
+
+    def delete(self, ids: List[str]):
+        """删除当前租户的文档，其他租户的ID会被忽略"""
+        owned = self._owned(ids)
+        if owned:
+            self.shard.delete(owned)
+            self._bump_version()
+
+    def get_all(self, limit: int = 100) -> Dict[str, List]:
+        return self.collection.get(where={TENANT_KEY: self.tenant_id}, limit=limit)
+
+    def _id_page(self, offset: int) -> List[str]:
+        return self.collection.get(
+            where={TENANT_KEY: self.tenant_id}, include=[], limit=_ID_BATCH, offset=offset
+        )["ids"]
+
+    def count(self) -> int:
+        """
+        统计当前租户的文档数
+
+        Chroma的count()不支持过滤条件，这里按批分页读取ID计数，内存占用不随租户文档数增长
+        """
+        total = 0
+        while True:
+            page = self._id_page(total)
+            total += len(page)
+            if len(page) < _ID_BATCH:
+                return total
+
+    def clear(self):
+        """只清空当前租户的文档"""
+        removed = 0
+        while True:
+            # 已删除的文档不再出现在结果中，每次都从头读取一批
+            page = self._id_page(0)
+            if page:
+                self.shard.delete(page)
+                removed += len(page)
+            if len(page) < _ID_BATCH:
+                break
+        self._bump_version()
+        logger.info(f"Cleared {removed} documents of tenant {self.tenant_id}")
+
+    def index_stats(self) -> Dict[str, Any]:
+        return {**self.shard.index_stats(), "shard": self.shard.name}
+
+
+class KnowledgeTenancy:
+    """
+    多租户知识库布局
+
+    - 所有租户共享一个Chroma客户端和一个嵌入模型
+    - 租户按ID哈希分布到固定数量的分片集合（knowledge_shard_000 ...），
+      集合数量不随租户数增长，分片在首次使用时才打开
+    - 分片数量在首次创建时写入 tenancy.json，之后以文件为准，避免租户被重新映射
+    """
+
+    LAYOUT_FILE = "tenancy.json"
+
+    def __init__(self,
+                 persist_dir: str,
+                 n_shards: int = 16,
+                 embedding_model: str = "BAAI/bge-small-zh-v1.5",
+                 quantization: Optional[str] = None,
+                 query_cache: Optional[QueryCache] = None,
+                 embedder_options: Optional[Dict[str, Any]] = None):
+        """
+        初始化多租户布局
+
+        Args:
+            persist_dir: 向量数据库持久化目录
+            n_shards: 分片数量（仅在目录首次初始化时生效）
+            embedding_model: 嵌入模型名称
+            quantization: 向量量化方式 (None, "int8", "float16")
+            query_cache: 检索结果缓存
+            embedder_options: 传给TextEmbedder的推理参数（backend、onnx_dir、threads、batch_size）
+        """
+        self.persist_dir = persist_dir
+        self.embedding_model = embedding_model
+        self.embedder_options = embedder_options or {}
+        self.quantization = quantization
+        self.query_cache = query_cache
+        self.n_shards = self._load_layout(n_shards)
+
+        self.client = chromadb.PersistentClient(
+            path=persist_dir,
+            settings=Settings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+        )
+
+        self._embedder: Optional[TextEmbedder] = None
+        self._shards: Dict[int, VectorStore] = {}
+        self._lock = threading.Lock()
+
+    def _load_layout(self, n_shards: int) -> int:
+        os.makedirs(self.persist_dir, exist_ok=True)
+        path = os.path.join(self.persist_dir, self.LAYOUT_FILE)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)["shards"]
+            if stored != n_shards:
+                logger.warning(
+                    f"Knowledge layout at {self.persist_dir} uses {stored} shards, ignoring requested {n_shards}"
+                )
+            return stored
+
+        if n_shards < 1:
+            raise ValueError("n_shards must be at least 1")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"shards": n_shards}, f)
+        return n_shards
+
+    @property
+    def embedder(self) -> TextEmbedder:
+        """共享的嵌入器，首次使用时加载"""
+        if self._embedder is None:
+            with self._lock:
+                if self._embedder is None:
+                    self._embedder = TextEmbedder(self.embedding_model, **self.embedder_options)
+        return self._embedder
+
+    @staticmethod
+    def shard_name(index: int) -> str:
+        return f"knowledge_shard_{index:03d}"
+
+    def shard_for(self, tenant_id: str) -> int:
+        """租户所在的分片序号（稳定哈希，与进程无关）"""
+        digest = hashlib.md5(tenant_id.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % self.n_shards
+
+    def shard(self, index: int) -> VectorStore:
+        """打开（或复用已打开的）分片存储"""
+        store = self._shards.get(index)
+        if store is None:
+            with self._lock:
+                store = self._shards.get(index)
+                if store is None:
+                    store = VectorStore(
+                        self.persist_dir,
+                        self.shard_name(index),
+                        quantization=self.quantization,
+                        query_cache=self.query_cache,
+                        client=self.client
+                    )
+                    self._shards[index] = store
+        return store
+
+    def store(self, tenant_id: str) -> TenantStore:
+        """获取租户的存储视图"""
+        return TenantStore(self.shard(self.shard_for(tenant_id)), tenant_id)
+
+    def retriever(self, tenant_id: str) -> KnowledgeRetriever:
+        """获取租户的检索器（共享嵌入器与分片，构造开销很小）"""
+        return KnowledgeRetriever(embedder=self.embedder, store=self.store(tenant_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "shards": self.n_shards,
+            "open_shards": len(self._shards),
+            "documents": {self.shard_name(i): store.count() for i, store in sorted(self._shards.items())}
+        }
+
+
+# 每个持久化目录在进程内只保留一个布局实例（共享客户端、嵌入器和已打开的分片）
+_tenancies: Dict[str, KnowledgeTenancy] = {}
+_tenancies_lock = threading.Lock()
+
+
+def get_tenancy(persist_dir: str,
+                n_shards: int = 16,
+                quantization: Optional[str] = None,
+                query_cache: Optional[QueryCache] = None,
+                embedder_options: Optional[Dict[str, Any]] = None) -> KnowledgeTenancy:
+    """
+    获取持久化目录对应的进程级多租户布局
+
+    Args:
+        persist_dir: 向量数据库持久化目录
+        n_shards: 分片数量（仅在目录首次初始化时生效）
+        quantization: 向量量化方式
+        query_cache: 检索结果缓存
+        embedder_options: 传给TextEmbedder的推理参数
+
+    Returns:
+        KnowledgeTenancy
+    """
+    key = os.path.abspath(persist_dir)
+    with _tenancies_lock:
+        tenancy = _tenancies.get(key)
+        if tenancy is None:
+            tenancy = KnowledgeTenancy(
+                persist_dir,
+                n_shards=n_shards,
+                quantization=quantization,
+                query_cache=query_cache,
+                embedder_options=embedder_options
+            )
+            _tenancies[key] = tenancy
+        return tenancy
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Path, UploadFile, File, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 import os
@@ -16,6 +16,7 @@ from ..schemas.agent import (
 from ..schemas.auth import SuccessResponse
 from ..dependencies import get_current_user_db
 from ..utils.exceptions import HTTPNotFoundError, HTTPValidationError
+from ..utils.http_cache import weak_etag, has_validator, conditional
 from ..services.ai_service import AIService
 from ..services.ai_service_enhanced import EnhancedAIService
 from ..agent import agent_service
@@ -60,35 +61,64 @@ AGENT_TEMPLATES = [
 ]
 
 
+def _agents_etag(user_id: str, rows) -> str:
+    """Agent列表的ETag：由 (Agent ID, 版本) 列表决定"""
+    return weak_etag("agents", user_id, *(f"{agent_id}:{version}" for agent_id, version in rows))
+
+
 @router.get("", response_model=AgentListResponse)
 async def get_agents(
+    request: Request,
+    response: Response,
     current_user = Depends(get_current_user_db),
     db: Session = Depends(get_db)
 ):
-    """获取用户的所有Agent"""
+    """获取用户的所有Agent（支持If-None-Match，未变化时返回304）"""
     
-    agents = db.query(Agent).filter(Agent.userId == current_user.id).order_by(
+    query = db.query(Agent).filter(Agent.userId == current_user.id).order_by(
         Agent.isDefault.desc(), Agent.createdAt.desc()
-    ).all()
+    )
+
+    # 客户端带ETag时先只查询版本号
+    if has_validator(request):
+        cached = conditional(request, response, _agents_etag(
+            current_user.id, query.with_entities(Agent.id, Agent.version).all()
+        ))
+        if cached is not None:
+            return cached
+
+    agents = query.all()
+    conditional(request, response, _agents_etag(current_user.id, [(agent.id, agent.version) for agent in agents]))
     
     return AgentListResponse(agents=agents)
 
 
 @router.get("/{agent_id}", response_model=AgentResponse)
 async def get_agent(
+    request: Request,
+    response: Response,
     agent_id: str = Path(..., description="Agent ID"),
     current_user = Depends(get_current_user_db),
     db: Session = Depends(get_db)
 ):
-    """获取单个Agent详情"""
-    
-    agent = db.query(Agent).filter(
-        Agent.id == agent_id,
-        Agent.userId == current_user.id
-    ).first()
+    """获取单个Agent详情（支持If-None-Match，未变化时返回304）"""
+
+    ownership = (Agent.id == agent_id, Agent.userId == current_user.id)
+
+    if has_validator(request):
+        version = db.query(Agent.version).filter(*ownership).scalar()
+        if version is None:
+            raise HTTPNotFoundError("Agent not found")
+        cached = conditional(request, response, weak_etag("agent", current_user.id, agent_id, version))
+        if cached is not None:
+            return cached
+
+    agent = db.query(Agent).filter(*ownership).first()
     
     if not agent:
         raise HTTPNotFoundError("Agent not found")
+
+    conditional(request, response, weak_etag("agent", current_user.id, agent_id, agent.version))
     
     return AgentResponse(agent=agent)
 
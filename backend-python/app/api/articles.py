@@ -1,69 +1,118 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, BackgroundTasks, Body
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, or_
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Body, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, contains_eager, defer
+from sqlalchemy import desc, func, tuple_
 from typing import Optional
 from datetime import datetime
+import base64
+import json
 import logging
-from bs4 import BeautifulSoup
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
-from ..database import get_db, SessionLocal
-from ..models import Article, Agent, User
+from ..config import settings
+from ..database import get_db
+from ..models import Article, Agent
 from ..schemas.article import (
     Article as ArticleSchema, ArticleCreate, ArticleUpdate,
-    ArticleListResponse, ArticleResponse, ArticleAgent
+    ArticleListResponse, ArticleResponse, ArticleAgent, ArticleSummary, ArticleBulkResponse
 )
 from ..schemas.auth import SuccessResponse
 from ..dependencies import get_current_user_db
+from ..services.search_index import search_hits, resolve_snippets
+from ..services.article_counts import article_counts
+from ..services.article_export import iter_records, ndjson_stream, zip_stream
+from ..services.article_ingest import ArticleIngestor, iter_ndjson_lines, parse_line
+from ..services.translation_memory import get_translation_memory
 from ..utils.exceptions import HTTPNotFoundError, HTTPValidationError
-from ..utils.task_tracker import task_tracker, TaskStatus
+from ..utils.task_tracker import task_tracker
+from ..utils.http_cache import weak_etag, has_validator, conditional
+from .tasks import get_task
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _encode_cursor(article: Article, sort_order: str) -> str:
+    """将当前页最后一篇文章的 (createdAt, id) 编码为游标"""
+    payload = json.dumps([article.createdAt.isoformat(), article.id, sort_order])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, article_id, sort_order = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), article_id, sort_order
+    except (ValueError, TypeError):
+        raise HTTPValidationError("Invalid cursor")
+
+
+# 整页结果一次性校验，避免逐条构造schema
+_list_adapters = {
+    "full": TypeAdapter(list[ArticleSchema]),
+    "summary": TypeAdapter(list[ArticleSummary])
+}
+
+
+def _list_etag(user_id: str, view: str, total: int, rows) -> str:
+    """文章列表的ETag：由本页 (文章ID, 文章版本, Agent版本) 和总数决定"""
+    return weak_etag("articles", user_id, view, total, *(f"{a}:{v}:{g}" for a, v, g in rows))
+
+
 @router.get("", response_model=ArticleListResponse)
 async def get_articles(
+    request: Request,
+    response: Response,
     current_user = Depends(get_current_user_db),
     db: Session = Depends(get_db),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=50, description="每页数量"),
     search: Optional[str] = Query(None, description="搜索关键词"),
     status: Optional[str] = Query(None, description="发布状态筛选"),
-    sort_by: str = Query("createdAt", description="排序字段"),
-    sort_order: str = Query("desc", description="排序方向")
+    sort_by: Optional[str] = Query(None, description="排序字段（createdAt、title、publishStatus、relevance），搜索时默认按相关度"),
+    sort_order: str = Query("desc", description="排序方向"),
+    view: str = Query("full", pattern="^(full|summary)$", description="full包含正文，summary不加载正文"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor，传入时忽略page（仅按createdAt排序且不搜索时可用）")
 ):
     """获取用户的文章列表，支持分页、搜索和筛选"""
     
     # 构建基础查询
-    query = db.query(Article).join(Agent).filter(
+    query = db.query(Article).join(Article.agent).filter(
         Article.userId == current_user.id
     )
     
-    # 添加搜索条件
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Article.title.ilike(search_term),
-                Article.summary.ilike(search_term),
-                Article.content.ilike(search_term)
-            )
-        )
+    # 添加搜索条件（全文索引，按相关度排序并返回高亮片段）
+    hits = search_hits(db, current_user.id, search) if search else None
+    if hits is not None:
+        query = query.join(hits, hits.c.article_id == Article.id)
     
     # 添加状态筛选
     if status:
         query = query.filter(Article.publishStatus == status)
     
-    # 计算总数
-    total = query.count()
-    
+    # 计算总数（不搜索时按用户缓存）
+    count_query = query.with_entities(func.count(Article.id))
+    if hits is None:
+        total = article_counts.get(current_user.id, status, current_user.articlesVersion, count_query.scalar)
+    else:
+        total = count_query.scalar()
+
     # 添加排序
-    if sort_by == "createdAt":
+    if sort_by is None:
+        sort_by = "relevance" if hits is not None else "createdAt"
+
+    keyset = sort_by == "createdAt" and hits is None
+    if cursor and not keyset:
+        raise HTTPValidationError("cursor requires sort_by=createdAt without search")
+
+    if sort_by == "relevance" and hits is not None:
+        query = query.order_by(hits.c.rank, desc(Article.createdAt))
+    elif sort_by == "createdAt":
+        # id作为第二排序键，保证游标分页的顺序稳定
         if sort_order == "asc":
-            query = query.order_by(Article.createdAt)
+            query = query.order_by(Article.createdAt, Article.id)
         else:
-            query = query.order_by(desc(Article.createdAt))
+            query = query.order_by(desc(Article.createdAt), desc(Article.id))
     elif sort_by == "title":
         if sort_order == "asc":
             query = query.order_by(Article.title)
@@ -75,61 +124,120 @@ async def get_articles(
         else:
             query = query.order_by(desc(Article.publishStatus))
     
-    # 添加分页
-    offset = (page - 1) * page_size
-    articles = query.offset(offset).limit(page_size).all()
-    
-    # 转换为响应格式，包含agent信息
-    article_list = []
-    for article in articles:
-        agent_info = ArticleAgent(
-            name=article.agent.name,
-            avatar=article.agent.avatar
-        )
-        
-        article_data = ArticleSchema(
-            id=article.id,
-            userId=article.userId,
-            agentId=article.agentId,
-            title=article.title,
-            content=article.content,
-            summary=article.summary,
-            publishStatus=article.publishStatus,
-            publishedAt=article.publishedAt,
-            githubUrl=article.githubUrl,
-            repoPath=article.repoPath,
-            sourceFiles=article.sourceFiles,
-            metadata=article.article_metadata,
-            createdAt=article.createdAt,
-            updatedAt=article.updatedAt,
-            agent=agent_info
-        )
-        article_list.append(article_data)
+    # 添加分页：游标分页直接定位到 (createdAt, id) 之后，不随页码变深而变慢
+    if cursor:
+        created_at, last_id, cursor_order = _decode_cursor(cursor)
+        if cursor_order != sort_order:
+            raise HTTPValidationError("cursor does not match sort_order")
+        boundary = tuple_(Article.createdAt, Article.id)
+        if sort_order == "asc":
+            query = query.filter(boundary > tuple_(created_at, last_id))
+        else:
+            query = query.filter(boundary < tuple_(created_at, last_id))
+    else:
+        query = query.offset((page - 1) * page_size)
+
+    # 多取一条判断是否还有下一页
+    limit = page_size + 1 if keyset else page_size
+
+    # 客户端带ETag时先只查询本页的版本号，未变化则不加载正文（搜索结果的片段依赖查询词，不参与）
+    if hits is None and has_validator(request):
+        rows = query.with_entities(Article.id, Article.version, Agent.version).limit(limit).all()
+        cached = conditional(request, response, _list_etag(current_user.id, view, total, rows))
+        if cached is not None:
+            return cached
+
+    # Agent随文章一起查询，只加载列表需要的字段；summary视图不加载正文
+    query = query.options(contains_eager(Article.agent).load_only(Agent.name, Agent.avatar, Agent.version))
+    if view == "summary":
+        query = query.options(defer(Article.content))
+
+    snippets = {}
+    if hits is not None:
+        rows = query.add_columns(hits.c.snippet).limit(limit).all()
+        articles = [article for article, _ in rows]
+        snippets = resolve_snippets(db, search, [(article.id, snippet) for article, snippet in rows])
+    else:
+        articles = query.limit(limit).all()
+        conditional(request, response, _list_etag(
+            current_user.id, view, total,
+            [(article.id, article.version, article.agent.version) for article in articles]
+        ))
+
+    next_cursor = None
+    if keyset and len(articles) > page_size:
+        articles = articles[:page_size]
+        next_cursor = _encode_cursor(articles[-1], sort_order)
+
+    article_list = _list_adapters[view].validate_python(articles, from_attributes=True)
+    for item in article_list:
+        item.searchSnippet = snippets.get(item.id)
     
     return ArticleListResponse(
         articles=article_list,
         total=total,
         page=page,
         page_size=page_size,
-        total_pages=(total + page_size - 1) // page_size
+        total_pages=(total + page_size - 1) // page_size,
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/export")
+async def export_articles(
+    current_user = Depends(get_current_user_db),
+    db: Session = Depends(get_db),
+    format: str = Query("ndjson", pattern="^(ndjson|zip)$", description="ndjson每行一篇，zip为带frontmatter的Markdown文件"),
+    status: Optional[str] = Query(None, description="发布状态筛选")
+):
+    """流式导出用户的全部文章（游标分批读取，内存占用与文章数无关）"""
+    # 响应在请求依赖关闭后才开始发送，导出使用同一数据库上的独立会话
+    export_db = Session(bind=db.get_bind())
+
+    def generate():
+        try:
+            records = iter_records(export_db, current_user.id, status)
+            yield from (zip_stream(records) if format == "zip" else ndjson_stream(records))
+        finally:
+            export_db.close()
+
+    filename = f"muses-articles-{datetime.utcnow():%Y%m%d}.{format}"
+    return StreamingResponse(
+        generate(),
+        media_type="application/zip" if format == "zip" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 
 @router.get("/{article_id}", response_model=ArticleResponse)
 async def get_article(
+    request: Request,
+    response: Response,
     article_id: str = Path(..., description="Article ID"),
     current_user = Depends(get_current_user_db),
     db: Session = Depends(get_db)
 ):
-    """获取单篇文章详情"""
-    
-    article = db.query(Article).join(Agent).filter(
-        Article.id == article_id,
-        Article.userId == current_user.id
-    ).first()
+    """获取单篇文章详情（支持If-None-Match，未变化时返回304）"""
+
+    ownership = (Article.id == article_id, Article.userId == current_user.id)
+
+    # 客户端带ETag时先只查询版本号
+    if has_validator(request):
+        versions = db.query(Article.version, Agent.version).join(Agent).filter(*ownership).first()
+        if not versions:
+            raise HTTPNotFoundError("Article not found")
+        cached = conditional(request, response, weak_etag("article", current_user.id, article_id, *versions))
+        if cached is not None:
+            return cached
+
+    article = db.query(Article).join(Agent).filter(*ownership).first()
     
     if not article:
         raise HTTPNotFoundError("Article not found")
+
+    conditional(request, response, weak_etag(
+        "article", current_user.id, article_id, article.version, article.agent.version
+    ))
     
     agent_info = ArticleAgent(
         name=article.agent.name,
@@ -198,6 +306,43 @@ async def create_article(
         raise HTTPValidationError(f"Failed to create article: {str(e)}")
 
 
+@router.post("/bulk", response_model=ArticleBulkResponse)
+async def bulk_create_articles(
+    request: Request,
+    current_user = Depends(get_current_user_db),
+    db: Session = Depends(get_db)
+):
+    """
+    批量导入文章：请求体为NDJSON（每行一个ArticleBulkItem），边接收边按批写入，
+    每批一个事务；externalId已存在的文章不会重复创建
+    """
+    ingestor = ArticleIngestor(db, current_user.id)
+    batch_size = settings.bulk_ingest_batch_size
+    result = ArticleBulkResponse()
+    batch = []
+
+    def flush():
+        result.items.extend(ingestor.ingest(batch))
+        batch.clear()
+
+    async for line_no, line in iter_ndjson_lines(request.stream()):
+        item, failure = parse_line(line_no, line)
+        if failure is not None:
+            result.items.append(failure)
+            continue
+        batch.append((line_no, item))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    result.items.sort(key=lambda item: item.line)
+    for item in result.items:
+        setattr(result, item.status, getattr(result, item.status) + 1)
+    logger.info(f"📦 Bulk import: {result.created} created, {result.existing} existing, {result.failed} failed")
+    return result
+
+
 @router.put("/{article_id}", response_model=ArticleResponse)
 async def update_article(
     article_data: ArticleUpdate,
@@ -359,214 +504,8 @@ class TranslateRequest(BaseModel):
     targetLanguage: str = "zh-CN"
 
 
-async def _translate_article_background(
-    task_id: str,
-    article_id: str,
-    user_id: str,
-    target_language: str
-):
-    """
-    后台翻译任务
-    在独立的数据库会话中运行
-    """
-    from ..services.ai_service_enhanced import EnhancedAIService
-
-    db = SessionLocal()
-
-    try:
-        # 更新任务状态
-        task_tracker.update_task(task_id, status=TaskStatus.RUNNING)
-
-        # 获取文章和用户
-        article = db.query(Article).filter(Article.id == article_id).first()
-        if not article:
-            task_tracker.update_task(
-                task_id,
-                status=TaskStatus.FAILED,
-                error="文章不存在"
-            )
-            return
-
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            task_tracker.update_task(
-                task_id,
-                status=TaskStatus.FAILED,
-                error="用户不存在"
-            )
-            return
-
-        # 获取Agent
-        agent = db.query(Agent).filter(Agent.id == article.agentId).first()
-        if not agent:
-            task_tracker.update_task(
-                task_id,
-                status=TaskStatus.FAILED,
-                error="Agent不存在"
-            )
-            return
-
-        # 语言映射
-        language_map = {
-            "zh-CN": "简体中文",
-            "en": "English",
-            "ja": "日本語",
-            "ko": "한국어",
-            "fr": "Français",
-            "de": "Deutsch",
-            "es": "Español"
-        }
-
-        language_name = language_map.get(target_language, "简体中文")
-
-        logger.info(f"🌍 [Task {task_id}] Translating article {article_id} to {language_name}")
-
-        # 解析HTML内容
-        soup = BeautifulSoup(article.content, 'html.parser')
-
-        # 提取所有段落和标题
-        elements = []
-        for tag in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'blockquote']):
-            text = tag.get_text().strip()
-            if text:
-                elements.append({
-                    'tag': tag.name,
-                    'text': text,
-                    'html': str(tag)
-                })
-
-        # 提取所有图片
-        images = []
-        for img in soup.find_all('img'):
-            images.append(str(img))
-
-        total = len(elements)
-        logger.info(f"📝 [Task {task_id}] Found {total} text elements and {len(images)} images")
-
-        # 更新任务总数
-        task_tracker.update_task(task_id, total=total)
-
-        # 翻译每个段落
-        translated_elements = []
-
-        for i, element in enumerate(elements):
-            try:
-                # 更新当前步骤
-                task_tracker.update_task(
-                    task_id,
-                    progress=i,
-                    current_step=f"正在翻译第 {i+1}/{total} 段"
-                )
-
-                # 使用 translate action 翻译文本（强制使用Claude）
-                result = await EnhancedAIService.perform_text_action(
-                    user=user,
-                    agent=agent,
-                    text=element['text'],
-                    action_type='translate',
-                    language=language_name,
-                    provider='claude'  # 强制使用Claude
-                )
-
-                translated_text = result.get('processedText', element['text'])
-
-                translated_elements.append({
-                    'original': element,
-                    'translation': translated_text.strip()
-                })
-
-                # 记录进度
-                progress = int((i + 1) / total * 100)
-                logger.info(f"✅ [Task {task_id}] 翻译进度: {i+1}/{total} ({progress}%)")
-
-            except Exception as e:
-                logger.error(f"❌ [Task {task_id}] Error translating element {i+1}: {str(e)}")
-                # 翻译失败时使用原文
-                translated_elements.append({
-                    'original': element,
-                    'translation': element['text']
-                })
-
-        # 构建双语对照HTML
-        bilingual_html = []
-
-        # 添加标题说明
-        bilingual_html.append(f'<div style="background-color: #f0f9ff; border-left: 4px solid #0284c7; padding: 12px; margin-bottom: 24px;">')
-        bilingual_html.append(f'<p style="margin: 0; font-size: 14px; color: #0c4a6e;">💡 本文为双语对照版本 | This is a bilingual version</p>')
-        bilingual_html.append(f'</div>')
-
-        # 图片索引
-        img_index = 0
-
-        for item in translated_elements:
-            original = item['original']
-            translation = item['translation']
-            tag = original['tag']
-
-            # 原文（浅灰色背景）
-            bilingual_html.append(f'<div style="background-color: #f9fafb; padding: 12px; margin: 8px 0; border-radius: 4px;">')
-            bilingual_html.append(f'<{tag} style="margin: 0; color: #374151;">{original["text"]}</{tag}>')
-            bilingual_html.append(f'</div>')
-
-            # 译文（浅蓝色背景）
-            bilingual_html.append(f'<div style="background-color: #eff6ff; padding: 12px; margin: 8px 0 24px 0; border-radius: 4px;">')
-            bilingual_html.append(f'<{tag} style="margin: 0; color: #1e40af;">{translation}</{tag}>')
-            bilingual_html.append(f'</div>')
-
-            # 每隔几段插入一张图片
-            if img_index < len(images) and (len(translated_elements) < 5 or (item == translated_elements[len(translated_elements) // (len(images) + 1) * (img_index + 1)])):
-                bilingual_html.append(images[img_index])
-                img_index += 1
-
-        # 添加剩余的图片
-        while img_index < len(images):
-            bilingual_html.append(images[img_index])
-            img_index += 1
-
-        new_content = '\n'.join(bilingual_html)
-
-        # 创建新文章
-        new_article = Article(
-            userId=user.id,
-            agentId=article.agentId,
-            title=f"{article.title} ({language_name}双语版)",
-            content=new_content,
-            summary=f"双语对照翻译版本 - {article.summary or ''}",
-            publishStatus="draft",
-            sourceFiles=article.sourceFiles
-        )
-
-        db.add(new_article)
-        db.commit()
-        db.refresh(new_article)
-
-        logger.info(f"✅ [Task {task_id}] Created bilingual article: {new_article.id}")
-
-        # 更新任务状态为完成
-        task_tracker.update_task(
-            task_id,
-            status=TaskStatus.COMPLETED,
-            progress=total,
-            result={
-                "article_id": new_article.id,
-                "title": new_article.title
-            }
-        )
-
-    except Exception as e:
-        logger.error(f"❌ [Task {task_id}] Translation failed: {str(e)}")
-        task_tracker.update_task(
-            task_id,
-            status=TaskStatus.FAILED,
-            error=str(e)
-        )
-    finally:
-        db.close()
-
-
 @router.post("/{article_id}/translate")
 async def translate_article(
-    background_tasks: BackgroundTasks,
     article_id: str = Path(..., description="文章ID"),
     request: TranslateRequest = Body(default=TranslateRequest()),
     current_user = Depends(get_current_user_db),
@@ -575,8 +514,8 @@ async def translate_article(
     """
     启动文章翻译任务（异步）
     - 立即返回task_id
-    - 翻译在后台进行
-    - 通过 /tasks/{task_id} 查询进度
+    - 翻译由后台worker执行
+    - 通过 /api/tasks/{task_id} 查询进度
     """
     # 验证文章存在且属于用户
     article = db.query(Article).filter(
@@ -589,25 +528,16 @@ async def translate_article(
 
     target_language = request.targetLanguage if request else "zh-CN"
 
-    # 创建任务
+    # 创建任务，worker领取后执行（见 app/worker.py）
     task_id = task_tracker.create_task(
         task_type="translate_article",
-        article_id=article_id,
         user_id=current_user.id,
+        article_id=article_id,
         target_language=target_language
     )
 
     logger.info(f"🚀 Created translation task {task_id} for article {article_id}")
 
-    # 启动后台任务
-    background_tasks.add_task(
-        _translate_article_background,
-        task_id,
-        article_id,
-        current_user.id,
-        target_language
-    )
-
     # 立即返回task_id
     return {
         "taskId": task_id,
@@ -622,35 +552,17 @@ async def get_task_status(
     current_user = Depends(get_current_user_db)
 ):
     """
-    查询任务进度
-    返回任务状态、进度、结果或错误信息
+    查询任务进度（兼容旧路径，同 /api/tasks/{task_id}）
     """
-    task = task_tracker.get_task(task_id)
-
-    if not task:
-        raise HTTPNotFoundError("任务不存在")
-
-    # 验证任务属于当前用户
-    if task.get("user_id") != current_user.id:
-        raise HTTPValidationError("无权访问此任务")
-
-    # 返回任务信息
-    response = {
-        "taskId": task["id"],
-        "status": task["status"],
-        "progress": task["progress"],
-        "total": task["total"],
-        "currentStep": task["current_step"],
-        "createdAt": task["created_at"],
-        "updatedAt": task["updated_at"]
-    }
-
-    # 如果任务完成，返回结果
-    if task["status"] == TaskStatus.COMPLETED:
-        response["result"] = task["result"]
+    return await get_task(task_id, current_user)
 
-    # 如果任务失败，返回错误信息
-    if task["status"] == TaskStatus.FAILED:
-        response["error"] = task["error"]
 
-    return response
\ No newline at end of file
+@router.get("/translation-memory/stats")
+async def get_translation_memory_stats(
+    current_user = Depends(get_current_user_db)
+):
+    """查询翻译记忆的条目数和命中率（命中计数为当前进程的统计）"""
+    memory = get_translation_memory()
+    if memory is None:
+        return {"enabled": False}
+    return {"enabled": True, **memory.stats()}
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -10,20 +10,23 @@ from ..schemas.chat_history import (
 )
 from ..dependencies import get_current_user_db
 from ..utils.exceptions import HTTPNotFoundError, HTTPValidationError
+from ..utils.http_cache import weak_etag, has_validator, conditional
 
 router = APIRouter()
 
 
 @router.get("/{article_id}", response_model=ChatHistoryResponse)
 async def get_chat_history(
+    request: Request,
+    response: Response,
     article_id: str = Path(..., description="文章ID"),
     current_user = Depends(get_current_user_db),
     db: Session = Depends(get_db)
 ):
-    """获取文章的对话历史"""
+    """获取文章的对话历史（支持If-None-Match，未变化时返回304）"""
 
-    # 验证文章是否存在且属于当前用户
-    article = db.query(Article).filter(
+    # 验证文章是否存在且属于当前用户（只查询ID，不加载正文）
+    article = db.query(Article.id).filter(
         Article.id == article_id,
         Article.userId == current_user.id
     ).first()
@@ -31,11 +34,21 @@ async def get_chat_history(
     if not article:
         raise HTTPNotFoundError("Article not found")
 
-    # 获取对话历史，按序号排序
-    chat_history = db.query(ChatHistory).filter(
+    query = db.query(ChatHistory).filter(
         ChatHistory.articleId == article_id,
         ChatHistory.userId == current_user.id
-    ).order_by(ChatHistory.sequence).all()
+    ).order_by(ChatHistory.sequence)
+
+    # 对话历史只会整体替换（新消息ID）或删除，ETag由消息ID集合决定
+    if has_validator(request):
+        ids = [row[0] for row in query.with_entities(ChatHistory.id)]
+        cached = conditional(request, response, weak_etag("chat", current_user.id, article_id, *ids))
+        if cached is not None:
+            return cached
+
+    # 获取对话历史，按序号排序
+    chat_history = query.all()
+    conditional(request, response, weak_etag("chat", current_user.id, article_id, *(msg.id for msg in chat_history)))
 
     messages = [
         ChatHistoryItem(
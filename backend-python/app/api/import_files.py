@@ -14,6 +14,8 @@ from ..models.user import User
 from ..models.article import Article
 from ..database import SessionLocal
 from ..utils.security import decrypt
+from ..utils.upload_store import UploadTooLarge, stream_to_file
+from ..config import settings
 import httpx
 
 logger = logging.getLogger(__name__)
@@ -71,6 +73,8 @@ async def upload_files(
             # 处理上传的文件
             markdown_files = []
             image_files = {}
+            image_hashes = {}  # 图片路径 -> 内容哈希
+            github_urls = {}   # 内容哈希 -> 已上传的GitHub地址（同一图片只上传一次）
 
             for file in files:
                 file_path = temp_path / file.filename
@@ -78,10 +82,12 @@ async def upload_files(
                 # 创建必要的目录
                 file_path.parent.mkdir(parents=True, exist_ok=True)
 
-                # 保存文件
-                content = await file.read()
-                with open(file_path, 'wb') as f:
-                    f.write(content)
+                # 按块保存文件，超过大小限制的文件跳过
+                try:
+                    sha256, _ = await stream_to_file(file, str(file_path), settings.max_file_size)
+                except UploadTooLarge:
+                    logger.warning(f"⚠️ Skipping file over size limit: {file.filename}")
+                    continue
 
                 logger.info(f"📄 Saved file: {file.filename}")
 
@@ -96,6 +102,7 @@ async def upload_files(
                     # 保存多种可能的键值映射
                     image_files[filename_only] = file_path  # 只有文件名
                     image_files[rel_path] = file_path       # 完整相对路径
+                    image_hashes[file_path] = sha256
 
                     logger.info(f"🖼️ Registered image: {filename_only} -> {file_path}")
 
@@ -107,7 +114,9 @@ async def upload_files(
 
             for md_file in markdown_files:
                 try:
-                    article_data = await process_markdown_file(md_file, image_files, current_user)
+                    article_data = await process_markdown_file(
+                        md_file, image_files, current_user, image_hashes, github_urls
+                    )
                     imported_articles.append(article_data)
                 except Exception as e:
                     logger.error(f"❌ Failed to process {md_file}: {str(e)}")
@@ -126,7 +135,8 @@ async def upload_files(
         raise HTTPException(status_code=500, detail=f"文件上传失败: {str(e)}")
 
 
-async def process_markdown_file(md_file: Path, image_files: dict, current_user: User) -> dict:
+async def process_markdown_file(md_file: Path, image_files: dict, current_user: User,
+                                image_hashes: Optional[dict] = None, github_urls: Optional[dict] = None) -> dict:
     """处理单个 Markdown 文件"""
     logger.info(f"📖 Processing markdown file: {md_file.name}")
 
@@ -141,7 +151,9 @@ async def process_markdown_file(md_file: Path, image_files: dict, current_user:
     logger.info(f"📋 Article title: {title}")
 
     # 上传图片并替换链接
-    processed_content = await process_images_in_markdown(content, image_files, current_user)
+    processed_content = await process_images_in_markdown(
+        content, image_files, current_user, image_hashes, github_urls
+    )
 
     # 在转换前保存所有iframe标签
     iframe_placeholders = {}
@@ -225,8 +237,12 @@ async def process_markdown_file(md_file: Path, image_files: dict, current_user:
         db.close()
 
 
-async def process_images_in_markdown(content: str, image_files: dict, current_user: User) -> str:
-    """处理 Markdown 中的图片链接"""
+async def process_images_in_markdown(content: str, image_files: dict, current_user: User,
+                                     image_hashes: Optional[dict] = None,
+                                     github_urls: Optional[dict] = None) -> str:
+    """处理 Markdown 中的图片链接（内容相同的图片只上传一次）"""
+    image_hashes = image_hashes if image_hashes is not None else {}
+    github_urls = github_urls if github_urls is not None else {}
     logger.info(f"🖼️ Processing images in markdown content")
 
     # 匹配 ![](image/filename) 格式的图片链接
@@ -252,10 +268,16 @@ async def process_images_in_markdown(content: str, image_files: dict, current_us
             logger.info(f"📁 Found image by filename: {local_image_path}")
 
         if local_image_path:
+            sha256 = image_hashes.get(local_image_path)
+            if sha256 in github_urls:
+                logger.info(f"♻️ Reusing uploaded image: {github_urls[sha256]}")
+                return f"![{alt_text}]({github_urls[sha256]})"
             try:
                 # 上传图片到 GitHub
                 github_url = await upload_image_to_github(local_image_path, current_user)
                 logger.info(f"✅ Uploaded image to GitHub: {github_url}")
+                if sha256:
+                    github_urls[sha256] = github_url
 
                 # 返回新的 Markdown 链接
                 return f"![{alt_text}]({github_url})"
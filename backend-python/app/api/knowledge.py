@@ -13,6 +13,8 @@ from ..database import get_db
 from ..models import User, Article
 from ..dependencies import get_current_user
 from ..agent.knowledge import KnowledgeRetriever
+from ..services.knowledge_service import get_user_retriever, article_document
+from ..utils.task_tracker import task_tracker
 
 logger = logging.getLogger(__name__)
 
@@ -44,17 +46,9 @@ class SearchResult(BaseModel):
 class KnowledgeStats(BaseModel):
     total_documents: int
     embedding_dimension: int
+    embedding_backend: Optional[str] = None
     collection_name: str
-
-
-# 为每个用户创建独立的知识库实例
-def get_user_retriever(user_id: str) -> KnowledgeRetriever:
-    """获取用户的知识库检索器"""
-    collection_name = f"user_{user_id}_knowledge"
-    return KnowledgeRetriever(
-        persist_dir="./knowledge_db",
-        collection_name=collection_name
-    )
+    query_cache: Optional[Dict] = None
 
 
 @router.post("/add", response_model=DocumentResponse)
@@ -149,28 +143,18 @@ async def build_from_articles(
                 detail="No articles found"
             )
 
-        # 添加文章到知识库
-        total_ids = []
-        for article in articles:
-            metadata = {
-                "article_id": article.id,
-                "title": article.title,
-                "author": article.author,
-                "created_at": article.createdAt.isoformat() if article.createdAt else None,
-                "source": "article"
-            }
-
-            ids = retriever.add_document(
-                text=article.content,
-                metadata=metadata,
-                chunk_strategy="markdown"
-            )
-            total_ids.extend(ids)
-
-        return DocumentResponse(
-            ids=total_ids,
-            message=f"Successfully built knowledge base from {len(articles)} articles with {len(total_ids)} chunks"
+        # 批量添加文章到知识库（跨文章按大批次嵌入和写入）
+        report = {}
+        total_ids = retriever.add_documents(
+            (article_document(article) for article in articles),
+            chunk_strategy="markdown",
+            report=report
         )
+
+        message = f"Successfully built knowledge base from {report['documents']} articles with {len(total_ids)} chunks"
+        if report["failed"]:
+            message += f" ({len(report['failed'])} articles failed: {', '.join(map(str, report['failed']))})"
+        return DocumentResponse(ids=total_ids, message=message)
     except HTTPException:
         raise
     except Exception as e:
@@ -181,6 +165,25 @@ async def build_from_articles(
         )
 
 
+@router.post("/build-tasks")
+async def create_build_task(
+    request: BuildKnowledgeRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    创建知识库构建任务（异步）
+    - 立即返回task_id，构建由后台worker执行
+    - 通过 /api/tasks/{task_id} 查询进度
+    """
+    task_id = task_tracker.create_task(
+        task_type="build_knowledge",
+        user_id=current_user.id,
+        article_ids=request.article_ids
+    )
+    logger.info(f"Created knowledge build task {task_id} for user {current_user.id}")
+    return {"taskId": task_id, "status": "pending"}
+
+
 @router.get("/stats", response_model=KnowledgeStats)
 async def get_knowledge_stats(
     current_user: User = Depends(get_current_user)
@@ -195,7 +198,9 @@ async def get_knowledge_stats(
         return KnowledgeStats(
             total_documents=stats["total_documents"],
             embedding_dimension=stats["embedding_dimension"],
-            collection_name=stats["collection_name"]
+            embedding_backend=stats["embedding_backend"],
+            collection_name=stats["collection_name"],
+            query_cache=stats["query_cache"]
         )
     except Exception as e:
         logger.error(f"Failed to get stats: {e}")
@@ -228,6 +233,7 @@ async def clear_knowledge(
 @router.post("/test-rag")
 async def test_rag_generation(
     query: str,
+    max_tokens: Optional[int] = None,
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -236,8 +242,9 @@ async def test_rag_generation(
     try:
         retriever = get_user_retriever(current_user.id)
 
-        # 获取相关上下文
-        context = retriever.get_context(query, max_length=2000)
+        # 获取相关上下文（同源相邻块合并去重叠）
+        packed = retriever.pack_context(query, max_length=2000, max_tokens=max_tokens)
+        context = packed.text
 
         if not context:
             return {
@@ -250,6 +257,9 @@ async def test_rag_generation(
         return {
             "query": query,
             "context": context,
+            "context_tokens": packed.tokens,
+            "tokens_saved": packed.tokens_saved,
+            "sources": packed.sources,
             "message": "Context retrieved successfully"
         }
     except Exception as e:
@@ -10,6 +10,7 @@ from ..models import Article
 from ..models.sync_history import SyncHistory
 from ..dependencies import get_current_user_db
 from ..utils.security import decrypt
+from ..utils.image_pipeline import add_srcset
 from ..utils.exceptions import HTTPNotFoundError, HTTPValidationError
 
 router = APIRouter()
@@ -300,7 +301,7 @@ async def publish_to_github(
 </head>
 <body>
     <h1>{article.title}</h1>
-    {article.content}
+    {add_srcset(article.content or "")}
 </body>
 </html>"""
         else:
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session, load_only
 import httpx
 import base64
 import logging
@@ -13,6 +13,7 @@ from ..models.sync_history import SyncHistory
 from ..dependencies import get_current_user_db
 from ..utils.security import decrypt
 from ..utils.exceptions import HTTPNotFoundError, HTTPValidationError
+from ..utils.http_cache import weak_etag, has_validator, conditional
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -20,24 +21,43 @@ router = APIRouter()
 
 @router.get("/status/{article_id}")
 async def get_sync_status(
+    request: Request,
+    response: Response,
     article_id: str,
     current_user=Depends(get_current_user_db),
     db: Session = Depends(get_db)
 ):
-    """获取文章同步状态"""
+    """获取文章同步状态（支持If-None-Match，未变化时返回304）"""
 
-    article = db.query(Article).filter(
-        Article.id == article_id,
-        Article.userId == current_user.id
-    ).first()
+    ownership = (Article.id == article_id, Article.userId == current_user.id)
+    history_query = db.query(SyncHistory).filter(
+        SyncHistory.articleId == article_id
+    ).order_by(SyncHistory.createdAt.desc()).limit(5)
+
+    # 同步记录只追加不修改，ETag由文章版本和最近记录的ID决定
+    if has_validator(request):
+        version = db.query(Article.version).filter(*ownership).scalar()
+        if version is None:
+            raise HTTPNotFoundError("Article not found")
+        ids = [row[0] for row in history_query.with_entities(SyncHistory.id)]
+        cached = conditional(request, response, weak_etag("sync-status", current_user.id, article_id, version, *ids))
+        if cached is not None:
+            return cached
+
+    # 只加载同步状态需要的字段，不加载正文
+    article = db.query(Article).options(load_only(
+        Article.title, Article.syncStatus, Article.firstSyncAt, Article.lastSyncAt, Article.syncCount,
+        Article.githubUrl, Article.repoPath, Article.updatedAt, Article.githubModifiedAt, Article.version
+    )).filter(*ownership).first()
 
     if not article:
         raise HTTPNotFoundError("Article not found")
 
-    # 获取同步历史记录
-    sync_history = db.query(SyncHistory).filter(
-        SyncHistory.articleId == article_id
-    ).order_by(SyncHistory.createdAt.desc()).limit(5).all()
+    # 获取同步历史记录（同步前后的内容默认不加载）
+    sync_history = history_query.all()
+    conditional(request, response, weak_etag(
+        "sync-status", current_user.id, article_id, article.version, *(history.id for history in sync_history)
+    ))
 
     return {
         "article": {
@@ -353,14 +373,17 @@ async def resolve_conflict(
 
 @router.get("/history/{article_id}")
 async def get_sync_history(
+    request: Request,
+    response: Response,
     article_id: str,
     limit: int = 20,
     current_user=Depends(get_current_user_db),
     db: Session = Depends(get_db)
 ):
-    """获取文章同步历史"""
+    """获取文章同步历史（支持If-None-Match，未变化时返回304）"""
 
-    article = db.query(Article).filter(
+    # 只查询ID验证文章归属，不加载正文
+    article = db.query(Article.id).filter(
         Article.id == article_id,
         Article.userId == current_user.id
     ).first()
@@ -368,9 +391,21 @@ async def get_sync_history(
     if not article:
         raise HTTPNotFoundError("Article not found")
 
-    history = db.query(SyncHistory).filter(
+    query = db.query(SyncHistory).filter(
         SyncHistory.articleId == article_id
-    ).order_by(SyncHistory.createdAt.desc()).limit(limit).all()
+    ).order_by(SyncHistory.createdAt.desc()).limit(limit)
+
+    # 同步记录只追加不修改，ETag由记录ID集合决定
+    if has_validator(request):
+        ids = [row[0] for row in query.with_entities(SyncHistory.id)]
+        cached = conditional(request, response, weak_etag("sync-history", current_user.id, article_id, limit, *ids))
+        if cached is not None:
+            return cached
+
+    history = query.all()
+    conditional(request, response, weak_etag(
+        "sync-history", current_user.id, article_id, limit, *(record.id for record in history)
+    ))
 
     return {
         "history": [{
@@ -0,0 +1,155 @@
+from fastapi import APIRouter, Depends, Path, Query
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional
+import asyncio
+import json
+
+from ..config import settings
+from ..database import get_db
+from ..dependencies import get_current_user_db
+from ..services.auth_service import AuthService
+from ..utils.exceptions import HTTPAuthenticationError, HTTPNotFoundError, HTTPValidationError
+from ..utils.security import create_task_events_token, verify_task_events_token
+from ..utils.task_tracker import task_tracker, TaskStatus
+
+router = APIRouter()
+
+# 没有进度时发送SSE注释，避免代理因空闲断开连接
+_KEEPALIVE_SECONDS = 15
+
+_TERMINAL = (TaskStatus.COMPLETED, TaskStatus.FAILED)
+
+# SSE接口也接受Authorization头（非浏览器客户端），没有时使用查询参数中的令牌
+_optional_bearer = HTTPBearer(auto_error=False)
+
+
+def load_user_task(task_id: str, user_id: str) -> Dict[str, Any]:
+    """获取任务并验证其属于当前用户"""
+    task = task_tracker.get_task(task_id)
+
+    if not task:
+        raise HTTPNotFoundError("任务不存在")
+
+    if task.get("user_id") != user_id:
+        raise HTTPValidationError("无权访问此任务")
+
+    return task
+
+
+def task_response(task: Dict[str, Any]) -> Dict[str, Any]:
+    """任务信息的API表示"""
+    response = {
+        "taskId": task["id"],
+        "type": task["type"],
+        "status": task["status"],
+        "progress": task["progress"],
+        "total": task["total"],
+        "currentStep": task["current_step"],
+        "attempts": task["attempts"],
+        "maxAttempts": task["max_attempts"],
+        "createdAt": task["created_at"],
+        "updatedAt": task["updated_at"]
+    }
+
+    # 如果任务完成，返回结果
+    if task["status"] == TaskStatus.COMPLETED:
+        response["result"] = task["result"]
+
+    # 如果任务失败，返回错误信息
+    if task["status"] == TaskStatus.FAILED:
+        response["error"] = task["error"]
+
+    return response
+
+
+@router.get("/{task_id}")
+async def get_task(
+    task_id: str = Path(..., description="任务ID"),
+    current_user = Depends(get_current_user_db)
+):
+    """
+    查询任务进度
+    返回任务状态、进度、结果或错误信息（任务可能由任意API进程或worker执行）
+    """
+    task = await asyncio.to_thread(load_user_task, task_id, current_user.id)
+    return task_response(task)
+
+
+def task_events_user_id(
+    task_id: str = Path(..., description="任务ID"),
+    token: Optional[str] = Query(None, description="POST /api/tasks/{task_id}/events/token 返回的短期令牌"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_optional_bearer),
+    db: Session = Depends(get_db)
+) -> str:
+    """SSE接口的用户：浏览器 EventSource 不能设置请求头，使用查询参数中的任务令牌"""
+    if token:
+        try:
+            return verify_task_events_token(token, task_id)
+        except ValueError:
+            raise HTTPAuthenticationError("Invalid or expired task events token")
+    if credentials is not None:
+        user = AuthService.verify_user_token(credentials.credentials, db)
+        if user:
+            return user.id
+    raise HTTPAuthenticationError("Invalid authentication credentials")
+
+
+@router.post("/{task_id}/events/token")
+async def create_events_token(
+    task_id: str = Path(..., description="任务ID"),
+    current_user = Depends(get_current_user_db)
+):
+    """
+    获取任务进度推送的短期令牌
+    浏览器用法: new EventSource(`/api/tasks/${taskId}/events?token=${token}`)，令牌只对该任务有效
+    """
+    await asyncio.to_thread(load_user_task, task_id, current_user.id)
+    return {
+        "token": create_task_events_token(current_user.id, task_id),
+        "expiresIn": settings.task_events_token_seconds
+    }
+
+
+@router.get("/{task_id}/events")
+async def stream_task_events(
+    task_id: str = Path(..., description="任务ID"),
+    user_id: str = Depends(task_events_user_id)
+):
+    """
+    以SSE推送任务进度（替代轮询 /api/tasks/{task_id}）
+    - 认证：查询参数 token（POST /api/tasks/{task_id}/events/token 获取，供 EventSource 使用）或 Authorization 头
+    - 连接后立即推送一次当前状态
+    - event: state 表示状态变化，event: progress 表示进度更新，数据格式同 /api/tasks/{task_id}
+    - 任务完成或失败后关闭连接（令牌只在建立连接时验证，过期不影响已建立的连接）
+    """
+    await asyncio.to_thread(load_user_task, task_id, user_id)
+    events = task_tracker.events
+
+    async def stream():
+        # 先订阅再读取当前状态，避免错过两者之间的更新
+        subscription = events.subscribe(task_id)
+        try:
+            task = await asyncio.to_thread(task_tracker.get_task, task_id)
+            if task is None:
+                return
+            subscription.push(task)
+            while True:
+                try:
+                    task = await asyncio.wait_for(subscription.get(), _KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                payload = json.dumps(task_response(task), ensure_ascii=False)
+                yield f"event: {subscription.kind(task)}\ndata: {payload}\n\n"
+                if task["status"] in _TERMINAL:
+                    return
+        finally:
+            events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
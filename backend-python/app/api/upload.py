@@ -1,21 +1,29 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import os
 import uuid
-import PyPDF2
-import io
-from PIL import Image
+import asyncio
+import json
 import httpx
-from bs4 import BeautifulSoup
-import html2text
 from pydantic import BaseModel
-import markdown
+from typing import List
+from urllib.parse import urlparse
 
-from ..database import get_db, SessionLocal
+from ..database import get_db
 from ..dependencies import get_current_user_db
 from ..config import settings
 from ..utils.exceptions import HTTPValidationError
+from ..utils.upload_store import (
+    UploadTooLarge, store_upload, stream_to_temp, read_parsed, write_parsed, parsed_cache_path
+)
+from ..utils.pdf_text import iter_pdf_pages, extract_pdf_text
+from ..utils.image_pipeline import process_upload, srcset, DEFAULT_SIZES
+from ..utils.static_images import is_image_file, image_response
+from ..services.upload_registry import register_upload, get_upload, upload_info, delete_upload
+from ..services.http_fetcher import http_fetcher
+from ..services.content_extractor import extract_article
+from ..models.uploaded_file import UploadedFile
 from ..models.article import Article
 from ..models.agent import Agent
 from datetime import datetime
@@ -40,14 +48,15 @@ class URLFetchRequest(BaseModel):
     url: str
 
 
-# 简化的文件存储（生产环境应使用数据库）
-uploaded_files = {}
+class URLBatchFetchRequest(BaseModel):
+    urls: List[str]
 
 
 @router.post("/file")
 async def upload_file(
     file: UploadFile = File(...),
-    current_user = Depends(get_current_user_db)
+    current_user = Depends(get_current_user_db),
+    db: Session = Depends(get_db)
 ):
     """上传文件"""
     
@@ -58,111 +67,170 @@ async def upload_file(
     if file_ext not in allowed_extensions:
         raise HTTPValidationError("Unsupported file type")
     
-    # 验证文件大小
-    file_size = 0
-    content = await file.read()
-    file_size = len(content)
-    
-    if file_size > settings.max_file_size:
-        raise HTTPValidationError("File too large")
-    
+    # 流式写入内容寻址存储，超过大小限制立即中止
     try:
-        # 生成唯一文件ID
-        file_id = str(uuid.uuid4())
-        file_path = os.path.join(settings.upload_dir, f"{file_id}{file_ext}")
-        
-        # 保存文件
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        # 存储文件信息
-        file_info = {
-            "id": file_id,
-            "originalName": file.filename,
-            "size": file_size,
-            "type": file.content_type,
-            "path": file_path,
-            "userId": current_user.id
-        }
-        
-        uploaded_files[file_id] = file_info
-        
-        return FileUploadResponse(file_info).__dict__
-        
+        stored = await store_upload(file, file_ext, settings.max_file_size)
+    except UploadTooLarge:
+        raise HTTPValidationError("File too large")
     except Exception as e:
         raise HTTPValidationError(f"File upload failed: {str(e)}")
 
+    # 登记上传记录（内容相同的文件共享同一个存储文件）
+    record = register_upload(
+        db, current_user.id, "file", stored.path, stored.size,
+        sha256=stored.sha256, original_name=file.filename, content_type=file.content_type
+    )
+
+    return FileUploadResponse(upload_info(record)).__dict__
+
+
+# 可以解析并缓存结果的文件类型
+_PARSEABLE_EXTENSIONS = {'.pdf', '.txt', '.md'}
+
+
+def _owned_upload(db: Session, file_id, current_user):
+    """获取当前用户的上传记录"""
+    record = get_upload(db, file_id)
+    if record is None:
+        raise HTTPValidationError("File not found")
+    
+    # 验证文件属于当前用户
+    if record.userId != current_user.id:
+        raise HTTPValidationError("Access denied")
+    return record
+
+
+def _word_count(content: str) -> int:
+    return len(content.replace(' ', '').replace('\n', ''))
+
+
+def _read_text(file_path: str) -> str:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+async def _parse_content(file_path: str, original_name: str) -> str:
+    """解析文件内容（PDF在进程池中提取，文本文件在线程中读取，都不阻塞事件循环）"""
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext == '.pdf':
+        return await extract_pdf_text(file_path)
+    if file_ext in ['.txt', '.md']:
+        return await asyncio.to_thread(_read_text, file_path)
+    # 其他格式暂不支持详细解析
+    return f"文件 {original_name} 已上传，但暂不支持自动解析此格式。"
+
+
+def _save_parsed(db: Session, record: UploadedFile, content: str) -> None:
+    """按内容哈希缓存解析结果，并记录到上传记录上"""
+    if os.path.splitext(record.path)[1].lower() not in _PARSEABLE_EXTENSIONS:
+        return
+    write_parsed(record.path, content)
+    record.parsedPath = parsed_cache_path(record.path)
+    db.commit()
+
 
 @router.post("/parse")
 async def parse_file(
     request: dict,
-    current_user = Depends(get_current_user_db)
+    current_user = Depends(get_current_user_db),
+    db: Session = Depends(get_db)
 ):
     """解析文件内容"""
     
-    file_id = request.get("fileId")
-    if not file_id or file_id not in uploaded_files:
-        raise HTTPValidationError("File not found")
-    
-    file_info = uploaded_files[file_id]
-    
-    # 验证文件属于当前用户
-    if file_info["userId"] != current_user.id:
-        raise HTTPValidationError("Access denied")
+    record = _owned_upload(db, request.get("fileId"), current_user)
     
     try:
-        file_path = file_info["path"]
-        file_ext = os.path.splitext(file_path)[1].lower()
-        
-        content = ""
-        
-        if file_ext == '.pdf':
-            # 解析PDF
-            with open(file_path, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                for page in pdf_reader.pages:
-                    content += page.extract_text() + "\n"
-        
-        elif file_ext in ['.txt', '.md']:
-            # 解析文本文件
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        
-        else:
-            # 其他格式暂不支持详细解析
-            content = f"文件 {file_info['originalName']} 已上传，但暂不支持自动解析此格式。"
-        
-        word_count = len(content.replace(' ', '').replace('\n', ''))
+        # 相同内容的文件已解析过时直接使用缓存结果
+        content = read_parsed(record.path)
+        if content is None:
+            content = await _parse_content(record.path, record.originalName)
+            _save_parsed(db, record, content)
         
-        return FileParseResponse(content, word_count).__dict__
+        return FileParseResponse(content, _word_count(content)).__dict__
         
     except Exception as e:
         raise HTTPValidationError(f"File parsing failed: {str(e)}")
 
 
+@router.post("/parse/stream")
+async def parse_file_stream(
+    request: dict,
+    current_user = Depends(get_current_user_db),
+    db: Session = Depends(get_db)
+):
+    """
+    流式解析文件内容（NDJSON）
+
+    PDF每提取完一页输出一行 {"type": "page", "page": 页码, "text": ...}；
+    其他文件或已缓存的结果输出一行 {"type": "content", "content": ...}；
+    最后输出 {"type": "done", "pages": 页数, "word_count": 字数, "cached": 是否命中缓存}，
+    出错时输出 {"type": "error", "content": 错误信息}。
+    """
+    
+    record = _owned_upload(db, request.get("fileId"), current_user)
+    record_id, file_path, original_name = record.id, record.path, record.originalName
+    # 响应体在请求的数据库会话关闭后才生成，完成时用独立会话记录解析缓存
+    bind = db.get_bind()
+
+    def line(payload: dict) -> bytes:
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+
+    async def stream():
+        try:
+            content = read_parsed(file_path)
+            if content is not None:
+                yield line({"type": "content", "content": content})
+                yield line({"type": "done", "pages": None, "word_count": _word_count(content), "cached": True})
+                return
+
+            pages = None
+            if os.path.splitext(file_path)[1].lower() == '.pdf':
+                parts = []
+                pages = 0
+                async for page, text in iter_pdf_pages(file_path):
+                    parts.append(text)
+                    parts.append("\n")
+                    pages += 1
+                    yield line({"type": "page", "page": page, "text": text})
+                content = "".join(parts)
+            else:
+                content = await _parse_content(file_path, original_name)
+                yield line({"type": "content", "content": content})
+
+            with Session(bind=bind) as session:
+                record = session.get(UploadedFile, record_id)
+                if record is not None:
+                    _save_parsed(session, record, content)
+            yield line({"type": "done", "pages": pages, "word_count": _word_count(content), "cached": False})
+        except Exception as e:
+            yield line({"type": "error", "content": f"File parsing failed: {str(e)}"})
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.delete("/{file_id}")
 async def delete_file(
     file_id: str,
-    current_user = Depends(get_current_user_db)
+    current_user = Depends(get_current_user_db),
+    db: Session = Depends(get_db)
 ):
     """删除文件"""
     
-    if file_id not in uploaded_files:
+    record = get_upload(db, file_id)
+    if record is None:
         raise HTTPValidationError("File not found")
     
-    file_info = uploaded_files[file_id]
-    
     # 验证文件属于当前用户
-    if file_info["userId"] != current_user.id:
+    if record.userId != current_user.id:
         raise HTTPValidationError("Access denied")
     
     try:
-        # 删除物理文件
-        if os.path.exists(file_info["path"]):
-            os.remove(file_info["path"])
-        
-        # 删除记录
-        del uploaded_files[file_id]
+        # 删除记录；其他上传记录不再引用相同内容时删除物理文件
+        delete_upload(db, record)
         
         return {"success": True}
         
@@ -173,7 +241,8 @@ async def delete_file(
 @router.post("/image")
 async def upload_image(
     file: UploadFile = File(...),
-    current_user = Depends(get_current_user_db)
+    current_user = Depends(get_current_user_db),
+    db: Session = Depends(get_db)
 ):
     """上传图片文件"""
     
@@ -184,293 +253,248 @@ async def upload_image(
     if file_ext not in allowed_extensions:
         raise HTTPValidationError("Unsupported image type")
     
-    # 验证文件大小（图片限制5MB）
-    content = await file.read()
-    file_size = len(content)
-    
-    max_image_size = 5 * 1024 * 1024  # 5MB
-    if file_size > max_image_size:
-        raise HTTPValidationError("Image file too large (max 5MB)")
-    
+    # 创建用户专用的图片目录
+    user_image_dir = os.path.join(settings.upload_dir, "images", str(current_user.id))
+
+    # 流式写入临时文件并计算哈希，超过大小限制立即中止
     try:
-        # 创建用户专用的图片目录
-        user_image_dir = os.path.join(settings.upload_dir, "images", str(current_user.id))
-        os.makedirs(user_image_dir, exist_ok=True)
-        
-        # 生成唯一文件名
-        file_id = str(uuid.uuid4())
-        filename = f"{file_id}{file_ext}"
+        tmp_path, sha256, _ = await stream_to_temp(file, user_image_dir, settings.max_image_size)
+    except UploadTooLarge:
+        raise HTTPValidationError(f"Image file too large (max {settings.max_image_size // (1024 * 1024)}MB)")
+
+    try:
+        # 以原始内容的哈希命名，重复上传同一图片时复用已优化的文件
+        filename = f"{sha256[:32]}{file_ext}"
         file_path = os.path.join(user_image_dir, filename)
-        
-        # 如果是图片文件且非SVG，进行压缩优化
+
+        manifest = None
         if file_ext != '.svg':
-            try:
-                # 使用PIL优化图片
-                image = Image.open(io.BytesIO(content))
-                
-                # 如果图片过大，进行等比缩放
-                max_size = (1920, 1080)  # 最大尺寸
-                if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-                    image.thumbnail(max_size, Image.Resampling.LANCZOS)
-                
-                # 保存优化后的图片
-                if file_ext in ['.jpg', '.jpeg']:
-                    image = image.convert('RGB')  # JPEG不支持透明度
-                    image.save(file_path, 'JPEG', quality=85, optimize=True)
-                elif file_ext == '.png':
-                    image.save(file_path, 'PNG', optimize=True)
-                elif file_ext == '.webp':
-                    image.save(file_path, 'WEBP', quality=85, optimize=True)
-                else:
-                    # 其他格式直接保存原文件
-                    with open(file_path, "wb") as f:
-                        f.write(content)
-            except Exception as img_error:
-                print(f"Image optimization failed: {img_error}")
-                # 如果优化失败，直接保存原文件
-                with open(file_path, "wb") as f:
-                    f.write(content)
-        else:
+            # 在图片线程池中一次解码生成优化后的主图、WebP响应式版本和占位图（已处理过的图片直接复用）
+            manifest = await process_upload(tmp_path, user_image_dir, sha256[:32], file_ext)
+        elif not os.path.exists(file_path):
             # SVG文件直接保存
-            with open(file_path, "wb") as f:
-                f.write(content)
+            os.replace(tmp_path, file_path)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         
         # 生成可访问的URL
         image_url = f"/api/upload/images/{current_user.id}/{filename}"
         
-        # 存储文件信息
-        file_info = {
-            "id": file_id,
-            "originalName": file.filename,
-            "size": os.path.getsize(file_path),  # 使用实际保存后的文件大小
-            "type": file.content_type,
-            "path": file_path,
-            "url": image_url,  # 可访问的URL
-            "userId": current_user.id
-        }
+        # 登记上传记录（使用实际保存后的文件大小）
+        record = register_upload(
+            db, current_user.id, "image", file_path, os.path.getsize(file_path),
+            sha256=sha256, original_name=file.filename, content_type=file.content_type, url=image_url
+        )
         
-        uploaded_files[file_id] = file_info
+        file_info = upload_info(record)
+        if manifest is not None:
+            file_info.update({
+                "width": manifest["width"],
+                "height": manifest["height"],
+                "srcset": srcset(manifest, f"/api/upload/images/{current_user.id}/"),
+                "sizes": DEFAULT_SIZES,
+                "placeholder": manifest["placeholder"],
+            })
         
         return FileUploadResponse(file_info).__dict__
         
     except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         raise HTTPValidationError(f"Image upload failed: {str(e)}")
 
 
-@router.get("/images/{user_id}/{filename}")
-async def get_image(user_id: str, filename: str):
-    """获取用户上传的图片"""
+@router.api_route("/images/{user_id}/{filename}", methods=["GET", "HEAD"])
+async def get_image(user_id: str, filename: str, request: Request):
+    """获取用户上传的图片（文件名按内容唯一，响应允许长期缓存，支持304和Range）"""
+
+    if not is_image_file(filename) or user_id in ("", ".", "..") or os.path.basename(user_id) != user_id:
+        raise HTTPException(status_code=404, detail="Image not found")
 
     # 构建文件路径
     file_path = os.path.join(settings.upload_dir, "images", user_id, filename)
 
-    # 检查文件是否存在
-    if not os.path.exists(file_path):
+    # 检查文件是否存在（stat结果交给FileResponse复用）
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Image not found")
 
     # 返回文件
-    return FileResponse(file_path)
+    return image_response(request, file_path, stat_result)
+
+
+def _normalize_url(url: str) -> str:
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def _default_agent(db: Session, user_id: str):
+    """用户的默认 Agent 或第一个可用 Agent"""
+    agent = db.query(Agent).filter(Agent.userId == user_id, Agent.isDefault == True).first()
+    if not agent:
+        agent = db.query(Agent).filter(Agent.userId == user_id).first()
+    return agent
+
+
+async def _import_url(db: Session, user_id: str, agent_id: str, url: str) -> dict:
+    """
+    抓取一个URL并创建文章
+
+    Args:
+        db: 数据库会话
+        user_id: 当前用户
+        agent_id: 文章使用的Agent
+        url: 已规范化的URL
+
+    Returns:
+        文件信息、内容和文章信息
+    """
+    # 使用共享连接池抓取，短时间内重复导入同一URL时使用缓存
+    fetched = await http_fetcher.fetch(url)
+    article_content = await asyncio.to_thread(extract_article, fetched.text, url)
+    title_text, markdown_text, content = article_content.title, article_content.markdown, article_content.html
+
+    # 计算字数
+    word_count = len(markdown_text.replace(' ', '').replace('\n', ''))
+
+    # 生成文件ID并保存
+    file_id = str(uuid.uuid4())
+    file_path = os.path.join(settings.upload_dir, f"{file_id}.md")
+
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(f"# {title_text}\n\n")
+        f.write(f"**来源:** {url}\n\n")
+        f.write("---\n\n")
+        f.write(content)
+
+    # 登记上传记录
+    record = register_upload(
+        db, user_id, "url", file_path, os.path.getsize(file_path),
+        original_name=f"{title_text}.md", content_type="text/markdown", url=url
+    )
+    file_info = {**upload_info(record), "title": title_text}
+
+    # 创建文章
+    article = Article(
+        userId=user_id,
+        agentId=agent_id,
+        title=title_text,
+        content=content,
+        summary=f"从URL导入: {url}",
+        publishStatus="draft",
+        sourceFiles=url
+    )
+    db.add(article)
+    db.commit()
+    db.refresh(article)
+
+    print(f"✅ Article created: {article.id} - {article.title}")
+
+    return {
+        "success": True,
+        "file": file_info,
+        "content": content,
+        "word_count": word_count,
+        "title": title_text,
+        "cached": fetched.from_cache,
+        "article": {
+            "id": article.id,
+            "title": article.title,
+            "status": "imported",
+            "created_at": article.createdAt.isoformat() if article.createdAt else datetime.utcnow().isoformat()
+        }
+    }
+
+
+def _fetch_error(e: Exception) -> str:
+    if isinstance(e, httpx.HTTPError):
+        return f"无法访问URL：{str(e)}"
+    return f"内容抓取失败：{str(e)}"
 
 
 @router.post("/fetch-url")
 async def fetch_url_content(
     request: URLFetchRequest,
-    current_user = Depends(get_current_user_db)
+    current_user = Depends(get_current_user_db),
+    db: Session = Depends(get_db)
 ):
     """从URL抓取网页内容并转换为Markdown"""
 
-    try:
-        print(f"🌐 URL Import Request: {request.url}")
-        # 验证URL格式
-        url = request.url.strip()
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-        print(f"📍 Normalized URL: {url}")
-
-        # 发送HTTP请求获取网页内容
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.get(
-                url,
-                headers={
-                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-                }
-            )
-            response.raise_for_status()
-
-        # 解析HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # 只移除脚本和样式标签,保留其他内容
-        for script in soup(['script', 'style']):
-            script.decompose()
-
-        # 将相对URL转换为绝对URL,并移除无效链接
-        from urllib.parse import urljoin
-        for img in soup.find_all('img'):
-            if img.get('src'):
-                img['src'] = urljoin(url, img['src'])
-            elif img.get('data-src'):  # 有些网站使用懒加载
-                img['src'] = urljoin(url, img['data-src'])
-
-        # 处理链接
-        for link in soup.find_all('a'):
-            href = link.get('href')
-            if href:
-                # 跳过JavaScript链接和锚点
-                if href.startswith(('javascript:', '#', 'mailto:')):
-                    # 将链接转换为纯文本
-                    link.replace_with(link.get_text())
-                else:
-                    link['href'] = urljoin(url, href)
-            else:
-                # 如果没有href,将链接转换为纯文本
-                link.replace_with(link.get_text())
-
-        # 尝试提取主要内容区域
-        main_content = None
-        for selector in ['article', 'main', '[role="main"]', '.post-content', '.article-content', '.entry-content']:
-            main_content = soup.select_one(selector)
-            if main_content:
-                print(f"📰 Found main content with selector: {selector}")
-                break
-
-        # 如果没有找到主要内容区域,使用整个body
-        if not main_content:
-            main_content = soup.find('body') or soup
-            print(f"📰 Using body or full document")
-
-        # 转换为Markdown,保留图片和链接
-        h = html2text.HTML2Text()
-        h.ignore_links = False
-        h.ignore_images = False  # 保留图片
-        h.ignore_emphasis = False
-        h.body_width = 0  # 不限制行宽
-        h.default_image_alt = 'Image'  # 为没有alt的图片提供默认文本
-        h.images_to_alt = False  # 不要用alt替换图片,保留完整的markdown图片语法
-        h.protect_links = True  # 保护链接格式
-        h.wrap_links = False  # 不换行链接
-        h.unicode_snob = True  # 使用unicode字符
-        h.skip_internal_links = False  # 保留内部链接
-
-        markdown_content = h.handle(str(main_content))
-
-        # 清理空链接和无效格式
-        import re
-        # 移除空链接 [text]() 或 [text](#) 或 [text](javascript:...)
-        markdown_content = re.sub(r'\[([^\]]+)\]\(\s*\)', r'\1', markdown_content)
-        markdown_content = re.sub(r'\[([^\]]+)\]\(#\)', r'\1', markdown_content)
-        markdown_content = re.sub(r'\[([^\]]+)\]\(javascript:[^\)]*\)', r'\1', markdown_content)
-
-        # 清理多余的空行
-        lines = markdown_content.split('\n')
-        cleaned_lines = []
-        prev_empty = False
-        for line in lines:
-            if line.strip():
-                cleaned_lines.append(line)
-                prev_empty = False
-            elif not prev_empty:
-                cleaned_lines.append('')
-                prev_empty = True
-
-        markdown_text = '\n'.join(cleaned_lines).strip()
-
-        # 将 Markdown 转换为 HTML（用于编辑器渲染）
-        html_content = markdown.markdown(
-            markdown_text,
-            extensions=['extra', 'codehilite', 'tables', 'toc', 'nl2br']
-        )
+    url = _normalize_url(request.url)
+    print(f"🌐 URL Import Request: {url}")
 
-        content = html_content
-
-        # 获取网页标题
-        title = soup.find('title')
-        title_text = title.get_text().strip() if title else url
-
-        # 计算字数
-        word_count = len(markdown_text.replace(' ', '').replace('\n', ''))
-
-        # 生成文件ID并保存
-        file_id = str(uuid.uuid4())
-        file_path = os.path.join(settings.upload_dir, f"{file_id}.md")
-
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(f"# {title_text}\n\n")
-            f.write(f"**来源:** {url}\n\n")
-            f.write("---\n\n")
-            f.write(content)
-
-        # 存储文件信息
-        file_size = os.path.getsize(file_path)
-        file_info = {
-            "id": file_id,
-            "originalName": f"{title_text}.md",
-            "size": file_size,
-            "type": "text/markdown",
-            "path": file_path,
-            "userId": current_user.id,
-            "url": url,
-            "title": title_text
-        }
+    agent = _default_agent(db, current_user.id)
+    if not agent:
+        raise HTTPValidationError("未找到可用的 Agent，请先创建一个 Agent")
 
-        uploaded_files[file_id] = file_info
+    try:
+        return await _import_url(db, current_user.id, agent.id, url)
+    except Exception as e:
+        print(f"❌ URL import failed: {str(e)}")
+        raise HTTPValidationError(_fetch_error(e))
 
-        # 创建文章记录
-        db = SessionLocal()
+
+@router.post("/fetch-urls")
+async def fetch_urls_content(
+    request: URLBatchFetchRequest,
+    current_user = Depends(get_current_user_db),
+    db: Session = Depends(get_db)
+):
+    """
+    批量从URL导入文章（NDJSON流）
+
+    并发抓取（总并发和每个主机的并发都有限制），每完成一个URL输出一行
+    {"type": "result", "index": 请求中的序号, "url": ..., "success": ..., ...}，
+    最后输出 {"type": "done", "succeeded": 成功数, "failed": 失败数}。
+    """
+
+    urls = [_normalize_url(url) for url in request.urls if url.strip()]
+    if not urls:
+        raise HTTPValidationError("No URLs provided")
+    if len(urls) > settings.fetch_batch_max_urls:
+        raise HTTPValidationError(f"Too many URLs (max {settings.fetch_batch_max_urls})")
+
+    agent = _default_agent(db, current_user.id)
+    if not agent:
+        raise HTTPValidationError("未找到可用的 Agent，请先创建一个 Agent")
+    user_id, agent_id = current_user.id, agent.id
+    # 响应体在请求的数据库会话关闭后才生成，每个URL使用独立会话
+    bind = db.get_bind()
+
+    async def stream():
+        limit = asyncio.Semaphore(settings.fetch_batch_concurrency)
+        host_limits = {}
+
+        async def run(index: int, url: str) -> dict:
+            host = urlparse(url).netloc.lower()
+            host_limit = host_limits.setdefault(host, asyncio.Semaphore(settings.fetch_per_host_concurrency))
+            async with host_limit, limit:
+                try:
+                    with Session(bind=bind) as session:
+                        result = await _import_url(session, user_id, agent_id, url)
+                except Exception as e:
+                    print(f"❌ URL import failed: {url}: {str(e)}")
+                    result = {"success": False, "error": _fetch_error(e)}
+            return {"type": "result", "index": index, "url": url, **result}
+
+        jobs = [asyncio.create_task(run(index, url)) for index, url in enumerate(urls)]
+        succeeded = 0
         try:
-            # 获取用户的默认 Agent 或第一个可用 Agent
-            default_agent = db.query(Agent).filter(
-                Agent.userId == current_user.id,
-                Agent.isDefault == True
-            ).first()
-
-            if not default_agent:
-                default_agent = db.query(Agent).filter(
-                    Agent.userId == current_user.id
-                ).first()
-
-            if not default_agent:
-                raise HTTPValidationError("未找到可用的 Agent，请先创建一个 Agent")
-
-            print(f"📝 Using agent: {default_agent.id} - {default_agent.name}")
-
-            # 创建文章
-            article = Article(
-                userId=current_user.id,
-                agentId=default_agent.id,
-                title=title_text,
-                content=content,
-                summary=f"从URL导入: {url}",
-                publishStatus="draft",
-                sourceFiles=url
-            )
-            db.add(article)
-            db.commit()
-            db.refresh(article)
-
-            print(f"✅ Article created: {article.id} - {article.title}")
-
-            return {
-                "success": True,
-                "file": file_info,
-                "content": content,
-                "word_count": word_count,
-                "title": title_text,
-                "article": {
-                    "id": article.id,
-                    "title": article.title,
-                    "status": "imported",
-                    "created_at": article.createdAt.isoformat() if article.createdAt else datetime.utcnow().isoformat()
-                }
-            }
+            for job in asyncio.as_completed(jobs):
+                result = await job
+                succeeded += result["success"]
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+            yield json.dumps({"type": "done", "succeeded": succeeded, "failed": len(urls) - succeeded}) + "\n"
         finally:
-            db.close()
-
-    except httpx.HTTPError as e:
-        print(f"❌ HTTP Error: {str(e)}")
-        raise HTTPValidationError(f"无法访问URL：{str(e)}")
-    except Exception as e:
-        print(f"❌ Unexpected Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPValidationError(f"内容抓取失败：{str(e)}")
\ No newline at end of file
+            # 客户端断开时取消未完成的抓取
+            for job in jobs:
+                job.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -45,7 +45,62 @@ class Settings(BaseSettings):
 
     # 文件上传配置
     max_file_size: int = 10485760  # 10MB
+    max_image_size: int = 5242880  # 5MB
+    upload_chunk_size: int = 1048576  # 上传文件按块写入磁盘的大小（1MB）
     upload_dir: str = "./uploads"
+    upload_retention_hours: int = 24  # 上传文件记录的保留时长，过期后由清理任务删除（图片不过期）
+    upload_sweep_enabled: bool = False  # 任务worker是否删除过期上传的文件和 uploads/blobs 中的孤立文件（过期记录总会删除；多个应用共用一个上传目录时不要开启）
+    upload_sweep_grace_seconds: int = 3600  # 清理任务只删除修改时间早于此时长的未引用文件，避免误删正在写入的文件
+    pdf_extract_workers: Optional[int] = None  # PDF文本提取进程数，None 使用 min(4, CPU核数)
+    pdf_pages_per_task: int = 20  # PDF按页码范围拆分并行提取，每个任务的页数
+    image_workers: Optional[int] = None  # 图片处理线程数，None 使用 min(4, CPU核数)
+    image_variant_widths: str = "480,960,1440"  # 上传图片生成的WebP响应式宽度（逗号分隔）
+    image_webp_quality: int = 80
+    image_static_mount: bool = False  # 把上传图片目录挂载为静态文件，不经过路由和依赖注入
+
+    # 网页导入配置
+    fetch_timeout: float = 30.0
+    fetch_max_bytes: int = 10485760  # 网页响应的大小上限（10MB），超过后中止下载
+    fetch_max_connections: int = 20  # 共享连接池的最大连接数
+    fetch_cache_ttl: int = 600  # 响应没有 Cache-Control max-age 时，缓存可直接使用的秒数
+    fetch_cache_max_bytes: int = 104857600  # 磁盘HTTP缓存的总大小上限（100MB）
+    fetch_batch_max_urls: int = 50  # 批量导入每次最多的URL数
+    fetch_batch_concurrency: int = 8  # 批量导入同时抓取的URL数
+    fetch_per_host_concurrency: int = 2  # 批量导入对同一主机同时抓取的URL数
+
+    # 知识库配置
+    knowledge_quantization: Optional[str] = None  # None, int8, float16
+    knowledge_query_cache_size: int = 1024  # 0 表示不缓存检索结果
+    knowledge_query_cache_shared: bool = False  # 通过SQLite在多个worker间共享缓存结果
+    knowledge_shards: int = 16  # 租户分布到的物理集合数，仅在知识库目录首次初始化时生效
+    knowledge_embedding_backend: str = "torch"  # torch, onnx
+    knowledge_onnx_dir: Optional[str] = None  # export_onnx_model 的输出目录
+    knowledge_embedding_threads: Optional[int] = None  # 推理线程数，None 使用运行时默认值
+    knowledge_embedding_batch_size: int = 32
+
+    # 翻译配置
+    translation_batch_tokens: int = 1500  # 每批原文的token预算
+    translation_batch_segments: int = 24  # 每批最多段落数
+    translation_concurrency: int = 4  # 同时进行的模型请求数
+    translation_checkpoint_dir: str = "./translation_checkpoints"
+    translation_memory_max_entries: int = 100000  # 0 表示不使用翻译记忆
+    translation_memory_fuzzy: bool = True  # 忽略空白和标点差异的近似匹配
+
+    # 后台任务配置
+    task_inline_worker: bool = True  # 在API进程内运行worker；部署独立的 python -m app.worker 时设为False
+    task_worker_concurrency: int = 2  # 每个worker同时执行的任务数
+    task_poll_interval: float = 1.0  # 没有任务时的轮询间隔（秒）
+    task_lease_seconds: int = 60  # 租约时长，worker停止续约超过此时间后任务可被重新领取
+    task_heartbeat_seconds: int = 15  # 续约间隔
+    task_max_attempts: int = 3
+    task_retry_backoff_seconds: int = 30  # 首次重试的等待时间，之后每次翻倍
+    task_retention_hours: int = 72  # 已结束任务的保留时长
+    task_events_token_seconds: int = 300  # 任务进度推送（SSE）令牌的有效期（秒），EventSource 通过查询参数携带
+    task_events_poll_interval: float = 1.0  # 进度推送转发其他进程更新的轮询间隔（秒），0 表示只推送本进程的更新
+
+    # 导入导出配置
+    export_batch_size: int = 200  # 导出时每次从数据库游标读取的文章数
+    bulk_ingest_batch_size: int = 500  # 批量导入时每个事务写入的文章数
 
     # 日志配置
     log_level: str = "debug"
@@ -55,4 +55,36 @@ def run_migrations():
         for col in new_cols:
             if col not in existing:
                 conn.execute(text(f'ALTER TABLE "User" ADD COLUMN "{col}" VARCHAR'))
-                print(f"Migration: added column {col} to User table")
\ No newline at end of file
+                print(f"Migration: added column {col} to User table")
+
+        # 文章计数缓存的版本号
+        if "articlesVersion" not in existing:
+            conn.execute(text('ALTER TABLE "User" ADD COLUMN "articlesVersion" INTEGER NOT NULL DEFAULT 0'))
+            print("Migration: added column articlesVersion to User table")
+
+        # 文章和Agent的版本号（ETag）
+        for table in ("Article", "Agent"):
+            if "version" not in {c["name"] for c in insp.get_columns(table)}:
+                conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN version INTEGER NOT NULL DEFAULT 1'))
+                print(f"Migration: added column version to {table} table")
+
+        # 同步记录改为引用内容版本（旧记录的全文由 scripts/migrate_sync_history_revisions.py 迁移）
+        if "SyncHistory" in insp.get_table_names():
+            existing = {c["name"] for c in insp.get_columns("SyncHistory")}
+            for col in ("contentBeforeRevisionId", "contentAfterRevisionId"):
+                if col not in existing:
+                    conn.execute(text(f'ALTER TABLE "SyncHistory" ADD COLUMN "{col}" VARCHAR'))
+                    print(f"Migration: added column {col} to SyncHistory table")
+
+        # 批量导入的外部ID
+        if "externalId" not in {c["name"] for c in insp.get_columns("Article")}:
+            conn.execute(text('ALTER TABLE "Article" ADD COLUMN "externalId" VARCHAR'))
+            print("Migration: added column externalId to Article table")
+        conn.execute(text(
+            'CREATE UNIQUE INDEX IF NOT EXISTS ux_article_user_external ON "Article" ("userId", "externalId")'
+        ))
+
+        # 已有数据库补建文章列表的复合索引
+        conn.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_article_user_created ON "Article" ("userId", "createdAt", id)'
+        ))
\ No newline at end of file
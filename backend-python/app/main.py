@@ -2,12 +2,19 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import os
 
-from .database import create_tables, run_migrations
+from .database import create_tables, run_migrations, engine
+from .services.search_index import ensure_search_index
+from .services.http_fetcher import http_fetcher
 from .config import settings
+from .worker import TaskWorker
+from .utils.pdf_text import shutdown_pool
+from .utils.static_images import ImageStaticFiles
 
 # Import routers
-from .api import auth, users, agents, articles, generate, upload, publish, process, proxy, image_upload, sync, import_files, knowledge, muses_config, chat_history
+from .api import auth, users, agents, articles, generate, upload, publish, process, proxy, image_upload, sync, import_files, knowledge, muses_config, chat_history, tasks
 
 
 @asynccontextmanager
@@ -15,8 +22,19 @@ async def lifespan(app: FastAPI):
     # 启动时创建数据库表
     create_tables()
     run_migrations()
+    ensure_search_index(engine)
     print("✅ Database tables created")
+
+    # 进程内worker：单进程部署无需额外启动 python -m app.worker
+    stop = asyncio.Event()
+    worker = asyncio.create_task(TaskWorker().run(stop)) if settings.task_inline_worker else None
     yield
+    if worker is not None:
+        stop.set()
+        await worker
+    # 关闭PDF文本提取进程池和共享的抓取连接池
+    shutdown_pool()
+    await http_fetcher.aclose()
 
 
 # 创建FastAPI应用
@@ -53,6 +71,11 @@ from .api import agents_actions
 app.include_router(agents_actions.router, prefix="/api/agents", tags=["agent-actions"])
 app.include_router(articles.router, prefix="/api/articles", tags=["articles"])
 app.include_router(generate.router, prefix="/api/generate", tags=["generate"])
+if settings.image_static_mount:
+    # 图片作为静态文件直接提供（需在upload路由之前注册）
+    _image_dir = os.path.join(settings.upload_dir, "images")
+    os.makedirs(_image_dir, exist_ok=True)
+    app.mount("/api/upload/images", ImageStaticFiles(directory=_image_dir), name="upload-images")
 app.include_router(upload.router, prefix="/api/upload", tags=["upload"])
 app.include_router(publish.router, prefix="/api/publish", tags=["publish"])
 app.include_router(process.router, prefix="/api/process", tags=["process"])
@@ -63,6 +86,7 @@ app.include_router(import_files.router, prefix="/api/import", tags=["import"])
 app.include_router(knowledge.router, tags=["knowledge"])  # prefix已在router中定义
 app.include_router(muses_config.router, prefix="/api", tags=["muses-config"])
 app.include_router(chat_history.router, prefix="/api/chat-history", tags=["chat-history"])
+app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
 
 # Studio: 条件注册（依赖本地文件系统，生产环境可关闭）
 if settings.enable_studio:
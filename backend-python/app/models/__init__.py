@@ -3,5 +3,9 @@ from .agent import Agent
 from .article import Article
 from .muses_config import MusesConfig, ConfigHistory, ConfigTemplate, AgentMusesConfig
 from .chat_history import ChatHistory
+from .translation_memory import TranslationMemoryEntry
+from .task import Task
+from .content_revision import ContentRevision
+from .uploaded_file import UploadedFile
 
-__all__ = ["User", "UserSettings", "Agent", "Article", "MusesConfig", "ConfigHistory", "ConfigTemplate", "AgentMusesConfig", "ChatHistory"]
\ No newline at end of file
+__all__ = ["User", "UserSettings", "Agent", "Article", "MusesConfig", "ConfigHistory", "ConfigTemplate", "AgentMusesConfig", "ChatHistory", "TranslationMemoryEntry", "Task", "ContentRevision", "UploadedFile"]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, String, DateTime, Boolean, Text, ForeignKey, Integer, literal_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -33,6 +33,8 @@ class Agent(Base):
     isDefault = Column(Boolean, default=False)
     createdAt = Column(DateTime, default=func.now())
     updatedAt = Column(DateTime, default=func.now(), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1",
+                     onupdate=literal_column("version") + 1)  # 每次UPDATE递增，用于ETag
     
     # 关系
     user = relationship("User", back_populates="agents")
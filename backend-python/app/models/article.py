@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Index, Integer, literal_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -11,6 +11,12 @@ def generate_uuid():
 
 class Article(Base):
     __tablename__ = "Article"
+    __table_args__ = (
+        # 文章列表按用户 + (createdAt, id) 游标分页
+        Index("ix_article_user_created", "userId", "createdAt", "id"),
+        # 批量导入按 (用户, 外部ID) 幂等
+        Index("ux_article_user_external", "userId", "externalId", unique=True),
+    )
     
     id = Column(String, primary_key=True, default=generate_uuid)
     userId = Column(String, ForeignKey("User.id", ondelete="CASCADE"), nullable=False)
@@ -38,9 +44,12 @@ class Article(Base):
     # 元数据
     sourceFiles = Column(Text, nullable=True)  # 原始素材文件信息JSON字符串
     article_metadata = Column(Text, nullable=True)  # 其他元数据JSON字符串
+    externalId = Column(String, nullable=True)  # 批量导入时客户端提供的外部ID
     
     createdAt = Column(DateTime, default=func.now())
     updatedAt = Column(DateTime, default=func.now(), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1",
+                     onupdate=literal_column("version") + 1)  # 每次UPDATE递增，用于ETag
     
     # 关系
     user = relationship("User", back_populates="articles")
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, String, DateTime, Integer, LargeBinary, ForeignKey, Index
+from ..database import Base
+import uuid
+
+
+def generate_uuid():
+    return str(uuid.uuid4())
+
+
+class ContentRevision(Base):
+    """文章内容的历史版本 - 全文(zlib)或相对上一版本的增量，供同步记录引用"""
+    __tablename__ = "ContentRevision"
+    __table_args__ = (
+        Index("ix_content_revision_article", "articleId", "createdAt"),
+        Index("ix_content_revision_hash", "articleId", "sha256"),
+    )
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    articleId = Column(String, ForeignKey("Article.id", ondelete="CASCADE"), nullable=False)
+
+    # 存储格式
+    encoding = Column(String, nullable=False)  # zlib（全文）, delta（相对baseId的增量）
+    baseId = Column(String, nullable=True)  # 增量的基准版本
+    depth = Column(Integer, nullable=False, default=0)  # 距最近一个全文版本的增量层数
+    data = Column(LargeBinary, nullable=False)
+
+    # 内容信息
+    sha256 = Column(String, nullable=False)  # 原文哈希，相同内容复用同一版本
+    size = Column(Integer, nullable=False)  # 原文UTF-8字节数
+    storedSize = Column(Integer, nullable=False)  # 压缩后字节数
+
+    createdAt = Column(DateTime, nullable=False)
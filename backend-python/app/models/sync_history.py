@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, event
+from sqlalchemy.orm import relationship, deferred, object_session
 from sqlalchemy.sql import func
-from ..database import Base
+from ..database import Base, engine
 import uuid
 
 
@@ -21,9 +21,12 @@ class SyncHistory(Base):
     syncDirection = Column(String, nullable=False)  # "local_to_github", "github_to_local", "bidirectional"
     syncStatus = Column(String, nullable=False)  # "success", "failed", "conflict"
 
-    # 内容变化
-    contentBefore = Column(Text, nullable=True)  # 同步前的内容
-    contentAfter = Column(Text, nullable=True)   # 同步后的内容
+    # 内容变化：引用文章的内容版本（ContentRevision），读写请使用 contentBefore / contentAfter
+    contentBeforeRevisionId = Column(String, nullable=True)  # 同步前的内容版本
+    contentAfterRevisionId = Column(String, nullable=True)   # 同步后的内容版本
+    # 旧版直接保存的全文，迁移后为空
+    legacyContentBefore = deferred(Column("contentBefore", Text, nullable=True))
+    legacyContentAfter = deferred(Column("contentAfter", Text, nullable=True))
     hasChanges = Column(String, default="false")  # 是否有内容变化
 
     # GitHub信息
@@ -44,4 +47,60 @@ class SyncHistory(Base):
 
     # 关系
     article = relationship("Article")
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+    def _get_content(self, field: str):
+        pending = self.__dict__.get("_pending_content", {})
+        if field in pending:
+            return pending[field]
+        legacy = getattr(self, f"legacy{field[0].upper()}{field[1:]}")
+        if legacy is not None:
+            return legacy
+        revision_id = getattr(self, f"{field}RevisionId")
+        if not revision_id:
+            return None
+
+        from ..services.revision_store import load_revision
+        session = object_session(self)
+        if session is not None:
+            return load_revision(session.connection(), revision_id)
+        with engine.connect() as conn:
+            return load_revision(conn, revision_id)
+
+    def _set_content(self, field: str, value):
+        # 写入在flush时转换为内容版本（见 _store_pending_content）
+        self.__dict__.setdefault("_pending_content", {})[field] = value
+        setattr(self, f"{field}RevisionId", None)
+
+    @property
+    def contentBefore(self):
+        """同步前的内容（由内容版本透明还原）"""
+        return self._get_content("contentBefore")
+
+    @contentBefore.setter
+    def contentBefore(self, value):
+        self._set_content("contentBefore", value)
+
+    @property
+    def contentAfter(self):
+        """同步后的内容（由内容版本透明还原）"""
+        return self._get_content("contentAfter")
+
+    @contentAfter.setter
+    def contentAfter(self, value):
+        self._set_content("contentAfter", value)
+
+
+@event.listens_for(SyncHistory, "before_insert")
+@event.listens_for(SyncHistory, "before_update")
+def _store_pending_content(mapper, connection, target):
+    """把待写入的内容保存为文章的内容版本，记录中只保存版本ID"""
+    pending = target.__dict__.pop("_pending_content", None)
+    if not pending:
+        return
+
+    from ..services.revision_store import save_revision
+    for field, value in pending.items():
+        revision_id = save_revision(connection, target.articleId, value) if value is not None else None
+        setattr(target, f"{field}RevisionId", revision_id)
+        setattr(target, f"legacy{field[0].upper()}{field[1:]}", None)
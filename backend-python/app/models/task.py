@@ -0,0 +1,44 @@
+from sqlalchemy import Column, String, DateTime, Text, Integer, Index
+from ..database import Base
+import uuid
+
+
+def generate_uuid():
+    return str(uuid.uuid4())
+
+
+class Task(Base):
+    """后台任务 - 由worker按租约领取执行，多进程共享"""
+    __tablename__ = "Task"
+    __table_args__ = (
+        Index("ix_task_claim", "status", "runAfter"),
+        Index("ix_task_user", "userId", "createdAt"),
+        Index("ix_task_finished", "finishedAt"),
+    )
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    type = Column(String, nullable=False)  # translate_article, build_knowledge
+    userId = Column(String, nullable=True)
+    payload = Column(Text, nullable=True)  # 任务参数JSON字符串
+
+    # 状态和进度
+    status = Column(String, nullable=False, default="pending")  # pending, running, completed, failed
+    progress = Column(Integer, default=0)
+    total = Column(Integer, default=0)
+    currentStep = Column(String, nullable=True)
+    result = Column(Text, nullable=True)  # 结果JSON字符串
+    error = Column(Text, nullable=True)
+
+    # 重试
+    attempts = Column(Integer, default=0)  # 已领取次数
+    maxAttempts = Column(Integer, default=3)
+    runAfter = Column(DateTime, nullable=False)  # 重试退避：此时间之前不会被领取
+
+    # 租约（worker崩溃后租约过期，任务可被其他worker重新领取）
+    leaseOwner = Column(String, nullable=True)
+    leaseExpiresAt = Column(DateTime, nullable=True)
+    heartbeatAt = Column(DateTime, nullable=True)
+
+    createdAt = Column(DateTime, nullable=False)
+    updatedAt = Column(DateTime, nullable=False)
+    finishedAt = Column(DateTime, nullable=True)
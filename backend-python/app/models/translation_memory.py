@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, DateTime, Text, Integer, Index
+from sqlalchemy.sql import func
+from ..database import Base
+import uuid
+
+
+def generate_uuid():
+    return str(uuid.uuid4())
+
+
+class TranslationMemoryEntry(Base):
+    """翻译记忆 - 按 (原文哈希, 目标语言, Agent风格指纹, 模型) 复用段落译文"""
+    __tablename__ = "TranslationMemory"
+    __table_args__ = (
+        Index("ux_translation_memory_source", "sourceHash", "targetLanguage", "fingerprint", "model", unique=True),
+        Index("ix_translation_memory_fuzzy", "fuzzyHash", "targetLanguage", "fingerprint", "model"),
+        Index("ix_translation_memory_last_used", "lastUsedAt"),
+    )
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+
+    # 匹配键
+    sourceHash = Column(String, nullable=False)  # 精确匹配：规范化首尾空白后的原文哈希
+    fuzzyHash = Column(String, nullable=False)  # 近似匹配：忽略空白、标点和大小写后的原文哈希
+    targetLanguage = Column(String, nullable=False)
+    fingerprint = Column(String, nullable=False)  # Agent风格指纹（system prompt哈希）
+    model = Column(String, nullable=False)
+
+    # 内容
+    sourceText = Column(Text, nullable=False)
+    translation = Column(Text, nullable=False)
+
+    # 使用情况（用于按最近使用淘汰）
+    hits = Column(Integer, default=0)
+    createdAt = Column(DateTime, default=func.now())
+    lastUsedAt = Column(DateTime, default=func.now())
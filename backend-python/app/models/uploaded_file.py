@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Index
+from sqlalchemy.sql import func
+from ..database import Base
+import uuid
+
+
+def generate_uuid():
+    return str(uuid.uuid4())
+
+
+class UploadedFile(Base):
+    """上传文件记录 - 多个进程共享，过期后由清理任务删除记录和不再被引用的文件"""
+    __tablename__ = "UploadedFile"
+    __table_args__ = (
+        Index("ix_uploaded_file_path", "path"),
+        Index("ix_uploaded_file_expires", "expiresAt"),
+        Index("ix_uploaded_file_user", "userId", "createdAt"),
+    )
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    userId = Column(String, ForeignKey("User.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False, default="file")  # file, image, url
+
+    # 原始信息
+    originalName = Column(String, nullable=True)
+    contentType = Column(String, nullable=True)
+    url = Column(String, nullable=True)  # 图片的访问地址，或网页导入的来源地址
+
+    # 存储信息（内容相同的文件共享同一个path）
+    sha256 = Column(String, nullable=True)
+    path = Column(String, nullable=False)
+    size = Column(Integer, nullable=False, default=0)
+    parsedPath = Column(String, nullable=True)  # 解析结果缓存文件
+
+    createdAt = Column(DateTime, nullable=False, default=func.now())
+    expiresAt = Column(DateTime, nullable=True)  # None 表示不过期（文章中引用的图片）
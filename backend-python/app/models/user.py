@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Integer
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -28,6 +28,8 @@ class User(Base):
     geminiKey = Column(String, nullable=True)
     githubToken = Column(String, nullable=True)  # 加密存储
     defaultRepoUrl = Column(String, nullable=True)
+    # 文章增删或状态变化时递增，用于校验文章计数缓存
+    articlesVersion = Column(Integer, nullable=False, default=0, server_default="0")
     createdAt = Column(DateTime, default=func.now())
     updatedAt = Column(DateTime, default=func.now(), onupdate=func.now())
     
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Any
+from typing import Optional, Any, Union
 from datetime import datetime
 from enum import Enum
 
@@ -47,23 +47,80 @@ class Article(ArticleBase):
     createdAt: datetime
     updatedAt: datetime
     agent: Optional[ArticleAgent] = None
+    searchSnippet: Optional[str] = None  # 搜索时命中位置的高亮片段（HTML，<mark>标记）
     
     class Config:
         from_attributes = True
 
 
+class ArticleSummary(BaseModel):
+    """列表精简视图：不含正文content"""
+    id: str
+    userId: str
+    agentId: str
+    title: str
+    summary: Optional[str] = None
+    publishStatus: PublishStatusEnum
+    publishedAt: Optional[datetime] = None
+    githubUrl: Optional[str] = None
+    repoPath: Optional[str] = None
+    sourceFiles: Optional[str] = None
+    article_metadata: Optional[str] = None
+    createdAt: datetime
+    updatedAt: datetime
+    agent: Optional[ArticleAgent] = None
+    searchSnippet: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 class ArticleListResponse(BaseModel):
-    articles: list[Article]
+    articles: list[Union[Article, ArticleSummary]]
     total: Optional[int] = None
     page: Optional[int] = None
     page_size: Optional[int] = None
     total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # 按创建时间排序时的下一页游标
 
 
 class ArticleResponse(BaseModel):
     article: Article
 
 
+class ArticleBulkItem(BaseModel):
+    """批量导入的一篇文章（NDJSON中的一行）"""
+    externalId: str = Field(..., min_length=1, max_length=200)  # 客户端提供的唯一ID，重复导入时跳过
+    agentId: Optional[str] = None
+    agentName: Optional[str] = None  # 未提供agentId时按名称匹配当前用户的Agent
+    title: str = Field(..., min_length=1, max_length=200)
+    content: str = ""
+    summary: Optional[str] = None
+    publishStatus: PublishStatusEnum = PublishStatusEnum.draft
+    publishedAt: Optional[datetime] = None
+    githubUrl: Optional[str] = None
+    repoPath: Optional[str] = None
+    sourceFiles: Optional[Any] = None
+    metadata: Optional[Any] = None
+    createdAt: Optional[datetime] = None
+    updatedAt: Optional[datetime] = None
+
+
+class ArticleBulkResult(BaseModel):
+    line: int
+    externalId: Optional[str] = None
+    id: Optional[str] = None
+    status: str  # created, existing, failed
+    error: Optional[str] = None
+
+
+class ArticleBulkResponse(BaseModel):
+    created: int = 0
+    existing: int = 0
+    failed: int = 0
+    items: list[ArticleBulkResult] = []
+
+
 # AI生成相关schemas
 class GenerateArticleRequest(BaseModel):
     agentId: str
@@ -15,6 +15,18 @@ from ..utils.agent_logger import agent_logger
 class EnhancedAIService(AIService):
     """增强的AI服务，集成了prompt系统"""
 
+    @staticmethod
+    def agent_context(agent: Agent) -> AgentContext:
+        """根据Agent配置构建prompt上下文"""
+        return AgentContext(
+            name=agent.name,
+            language=agent.language,
+            tone=agent.tone,
+            target_audience=agent.targetAudience,
+            custom_prompt=agent.customPrompt,
+            description=agent.description
+        )
+
     @classmethod
     async def perform_text_action(
         cls,
@@ -64,14 +76,7 @@ class EnhancedAIService(AIService):
         )
 
         # 构建Agent上下文
-        agent_context = AgentContext(
-            name=agent.name,
-            language=agent.language,
-            tone=agent.tone,
-            target_audience=agent.targetAudience,
-            custom_prompt=agent.customPrompt,
-            description=agent.description
-        )
+        agent_context = cls.agent_context(agent)
 
         # 通过别名系统获取实际的action ID
         actual_action = get_action_by_alias(action_type)
@@ -0,0 +1,96 @@
+"""
+Cached per-user article counts for the list endpoint.
+按用户缓存文章总数：缓存按 User.articlesVersion 校验。文章增删或状态变化时，
+在同一事务中递增该版本号，所以其他worker进程的写入提交后，本进程的缓存也会失效。
+"""
+
+from typing import Callable, Dict, Optional, Tuple
+import threading
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from ..models import Article, User
+
+# session.info 中记录本次flush涉及的用户
+_PENDING_KEY = "article_count_users"
+
+
+class ArticleCountCache:
+    """按 (user_id, status) 缓存文章总数及计算时的版本号"""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, Optional[str]], Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, status: Optional[str], version: int, compute: Callable[[], int]) -> int:
+        """
+        读取计数，未命中或版本号变化时调用compute重新计算
+
+        Args:
+            user_id: 用户ID
+            status: 发布状态筛选，None表示全部
+            version: 用户当前的 articlesVersion
+            compute: 计算总数的函数
+
+        Returns:
+            文章总数
+        """
+        key = (user_id, status)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                return entry[1]
+
+        count = compute()
+        with self._lock:
+            self._entries[key] = (version, count)
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+article_counts = ArticleCountCache()
+
+
+def _touch(article: Article, *user_ids: Optional[str]):
+    session = object_session(article)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).update(user_id for user_id in user_ids if user_id)
+
+
+@event.listens_for(Article, "after_insert")
+def _on_article_insert(mapper, conn, article):
+    _touch(article, article.userId)
+
+
+@event.listens_for(Article, "after_update")
+def _on_article_update(mapper, conn, article):
+    state = inspect(article)
+    if state.attrs.publishStatus.history.has_changes():
+        _touch(article, article.userId)
+    user_history = state.attrs.userId.history
+    if user_history.has_changes():
+        _touch(article, article.userId, *user_history.deleted)
+
+
+@event.listens_for(Article, "after_delete")
+def _on_article_delete(mapper, conn, article):
+    _touch(article, article.userId)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_versions(session, flush_context):
+    # 每次flush每个用户只递增一次（批量导入时不会逐行更新用户）
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    if not user_ids:
+        return
+    table = User.__table__
+    session.connection().execute(
+        table.update()
+        .where(table.c.id.in_(user_ids))
+        # 不触发 updatedAt 的 onupdate
+        .values(articlesVersion=table.c.articlesVersion + 1, updatedAt=table.c.updatedAt)
+    )
@@ -0,0 +1,193 @@
+"""
+文章导出服务 (Article Export)
+把用户的全部文章流式导出为NDJSON（每行一篇，正文原样）或Markdown文件的zip包（带YAML frontmatter，
+HTML正文用html2text转换为Markdown）。
+文章通过服务端游标（yield_per）分批读取，zip包边压缩边输出，
+导出上万篇文章时内存占用恒定，响应在读到第一篇文章后立即开始下载。
+
+Streams a user's articles as NDJSON or a zip of Markdown files with frontmatter,
+using yield_per cursors and an incremental zip writer for constant memory.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+import json
+import re
+import time
+import zipfile
+
+import html2text
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Article, Agent
+
+# frontmatter中导出的字段（正文单独输出）
+FRONTMATTER_FIELDS = [
+    "id", "title", "agent", "publishStatus", "publishedAt", "githubUrl", "repoPath",
+    "syncStatus", "createdAt", "updatedAt", "summary",
+]
+
+_UNSAFE_FILENAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+# 编辑器保存的正文是HTML，导入的正文可能已经是Markdown（只包含少量行内标签时不转换）
+_HTML_BLOCK = re.compile(r'<(?:p|div|h[1-6]|ul|ol|li|pre|blockquote|table|br|hr|section|article)\b[^>]*>', re.I)
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def _json_field(value: Optional[str]) -> Any:
+    """sourceFiles / article_metadata 是JSON字符串，能解析时导出为结构化数据"""
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def article_record(article: Article, agent_name: Optional[str]) -> Dict[str, Any]:
+    """
+    文章的导出记录
+
+    Args:
+        article: 文章
+        agent_name: 所属Agent名称
+
+    Returns:
+        可JSON序列化的字典
+    """
+    return {
+        "id": article.id,
+        "title": article.title,
+        "agentId": article.agentId,
+        "agent": agent_name,
+        "summary": article.summary,
+        "content": article.content,
+        "publishStatus": article.publishStatus,
+        "publishedAt": _iso(article.publishedAt),
+        "githubUrl": article.githubUrl,
+        "repoPath": article.repoPath,
+        "syncStatus": article.syncStatus,
+        "sourceFiles": _json_field(article.sourceFiles),
+        "metadata": _json_field(article.article_metadata),
+        "createdAt": _iso(article.createdAt),
+        "updatedAt": _iso(article.updatedAt),
+    }
+
+
+def html_to_markdown(content: str) -> str:
+    """
+    将HTML正文转换为Markdown，已经是Markdown的正文原样返回
+
+    Args:
+        content: 文章正文
+
+    Returns:
+        Markdown文本
+    """
+    if not _HTML_BLOCK.search(content):
+        return content
+    converter = html2text.HTML2Text()
+    converter.body_width = 0  # 不限制行宽
+    converter.unicode_snob = True
+    converter.backquote_code_style = True  # 代码块输出为```围栏（旧版html2text忽略此选项，使用缩进）
+    return _BLANK_LINES.sub("\n\n", converter.handle(content)).strip()
+
+
+def to_markdown(record: Dict[str, Any]) -> str:
+    """
+    生成带YAML frontmatter的Markdown文件内容
+
+    标量值用JSON编码输出（JSON字符串同时是合法的YAML标量），无需YAML依赖。
+    """
+    lines = ["---"]
+    for field in FRONTMATTER_FIELDS:
+        value = record.get(field)
+        if value is not None and value != "":
+            lines.append(f"{field}: {json.dumps(value, ensure_ascii=False)}")
+    lines.append("---")
+    return "\n".join(lines) + "\n\n" + html_to_markdown(record.get("content") or "")
+
+
+def markdown_filename(record: Dict[str, Any]) -> str:
+    """zip包内的文件名：标题 + ID前缀（保证唯一）"""
+    title = _UNSAFE_FILENAME.sub("-", record.get("title") or "").strip(" .-")[:80] or "untitled"
+    return f"{title}-{record['id'][:8]}.md"
+
+
+def iter_records(db: Session, user_id: str, status: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    按创建时间逐篇读取用户的文章
+
+    Args:
+        db: 数据库会话（迭代期间保持打开）
+        user_id: 用户ID
+        status: 发布状态筛选
+
+    Yields:
+        文章的导出记录
+    """
+    query = (
+        select(Article, Agent.name)
+        .outerjoin(Agent, Agent.id == Article.agentId)
+        .where(Article.userId == user_id)
+    )
+    if status:
+        query = query.where(Article.publishStatus == status)
+    query = query.order_by(Article.createdAt, Article.id).execution_options(yield_per=settings.export_batch_size)
+
+    for article, agent_name in db.execute(query):
+        yield article_record(article, agent_name)
+        # 已导出的文章不再需要留在会话中
+        db.expunge(article)
+
+
+def ndjson_stream(records: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """每篇文章一行JSON"""
+    for record in records:
+        yield (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class _ChunkBuffer:
+    """zipfile写入的只追加缓冲区（不可seek，zipfile会改用数据描述符记录大小和CRC）"""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def zip_stream(records: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """每篇文章一个Markdown文件，逐个压缩并输出"""
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for record in records:
+            modified = record.get("updatedAt") or record.get("createdAt")
+            date_time = datetime.fromisoformat(modified).timetuple()[:6] if modified else time.localtime()[:6]
+            info = zipfile.ZipInfo(markdown_filename(record), date_time=date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, to_markdown(record))
+            data = buffer.drain()
+            if data:
+                yield data
+    # 中央目录在关闭时写入
+    yield buffer.drain()
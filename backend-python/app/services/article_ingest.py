@@ -0,0 +1,172 @@
+"""
+文章批量导入服务 (Article Bulk Ingest)
+接收NDJSON格式的文章流（每行一篇），逐行解析校验，按批写入：
+- 每批一个事务，保留原始的创建/更新时间和发布信息
+- 以客户端提供的 externalId 保证幂等，重复发送的文章直接返回已有ID
+- Agent按ID或名称映射到当前用户的Agent
+
+Ingests streamed NDJSON article batches with one transaction per batch,
+idempotent on a client-supplied external id.
+"""
+
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import json
+import logging
+
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models import Article, Agent
+from ..models.article import generate_uuid
+from ..schemas.article import ArticleBulkItem, ArticleBulkResult
+
+logger = logging.getLogger(__name__)
+
+
+async def iter_ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    把请求体的字节流切分为行（不等待整个请求体）
+
+    Yields:
+        (行号, 行内容字节)，跳过空行；解码在parse_line中进行，编码错误只影响该行
+    """
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield line_no, line
+    if buffer.strip():
+        yield line_no + 1, buffer
+
+
+def parse_line(line_no: int, raw: bytes) -> Tuple[Optional[ArticleBulkItem], Optional[ArticleBulkResult]]:
+    """解析一行，返回 (文章, None) 或 (None, 失败结果)"""
+    try:
+        line = raw.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return None, ArticleBulkResult(line=line_no, status="failed", error=f"Invalid UTF-8: {e}")
+    try:
+        return ArticleBulkItem.model_validate_json(line), None
+    except ValidationError as e:
+        external_id = None
+        try:
+            external_id = json.loads(line).get("externalId")
+        except (ValueError, AttributeError):
+            pass
+        error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        return None, ArticleBulkResult(line=line_no, externalId=external_id, status="failed", error=error)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """带时区的时间转为UTC（数据库中统一存储不带时区的UTC时间）"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _json_text(value) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+class ArticleIngestor:
+    """一次批量导入请求的状态（当前用户的Agent映射）"""
+
+    def __init__(self, db: Session, user_id: str):
+        self.db = db
+        self.user_id = user_id
+        agents = db.query(Agent.id, Agent.name).filter(Agent.userId == user_id).all()
+        self.agent_ids = {agent_id for agent_id, _ in agents}
+        self.agent_names: Dict[str, str] = {}
+        for agent_id, name in agents:
+            self.agent_names.setdefault(name, agent_id)
+
+    def _resolve_agent(self, item: ArticleBulkItem) -> Optional[str]:
+        if item.agentId:
+            return item.agentId if item.agentId in self.agent_ids else None
+        if item.agentName:
+            return self.agent_names.get(item.agentName)
+        return None
+
+    def _existing(self, external_ids: List[str]) -> Dict[str, str]:
+        rows = self.db.query(Article.externalId, Article.id).filter(
+            Article.userId == self.user_id, Article.externalId.in_(external_ids)
+        )
+        return dict(rows.all())
+
+    def ingest(self, batch: List[Tuple[int, ArticleBulkItem]]) -> List[ArticleBulkResult]:
+        """
+        在一个事务中写入一批文章
+
+        Args:
+            batch: (行号, 文章) 列表
+
+        Returns:
+            每行的结果
+        """
+        try:
+            return self._ingest(batch)
+        except IntegrityError:
+            # 并发请求先写入了相同的externalId：回滚后重新查询已有文章再写一次
+            self.db.rollback()
+            logger.info("Bulk ingest batch raced with another request, retrying")
+            return self._ingest(batch)
+
+    def _ingest(self, batch: List[Tuple[int, ArticleBulkItem]]) -> List[ArticleBulkResult]:
+        existing = self._existing(list({item.externalId for _, item in batch}))
+        results = []
+        pending = {}
+        for line_no, item in batch:
+            if item.externalId in existing:
+                results.append(ArticleBulkResult(
+                    line=line_no, externalId=item.externalId, id=existing[item.externalId], status="existing"
+                ))
+                continue
+            if item.externalId in pending:
+                # 同一请求中重复的行指向先写入的那篇
+                results.append(ArticleBulkResult(
+                    line=line_no, externalId=item.externalId, id=pending[item.externalId].id, status="existing"
+                ))
+                continue
+            agent_id = self._resolve_agent(item)
+            if not agent_id:
+                results.append(ArticleBulkResult(
+                    line=line_no, externalId=item.externalId, status="failed", error="Invalid agent"
+                ))
+                continue
+
+            article = Article(
+                id=generate_uuid(),
+                userId=self.user_id,
+                agentId=agent_id,
+                externalId=item.externalId,
+                title=item.title,
+                content=item.content,
+                summary=item.summary,
+                publishStatus=item.publishStatus.value,
+                publishedAt=_naive_utc(item.publishedAt),
+                githubUrl=item.githubUrl,
+                repoPath=item.repoPath,
+                sourceFiles=_json_text(item.sourceFiles),
+                article_metadata=_json_text(item.metadata),
+            )
+            # 未提供时间时使用数据库默认值
+            if item.createdAt:
+                article.createdAt = _naive_utc(item.createdAt)
+            if item.updatedAt or item.createdAt:
+                article.updatedAt = _naive_utc(item.updatedAt or item.createdAt)
+            pending[item.externalId] = article
+            results.append(ArticleBulkResult(
+                line=line_no, externalId=item.externalId, id=article.id, status="created"
+            ))
+
+        self.db.add_all(pending.values())
+        self.db.commit()
+        return results
@@ -0,0 +1,224 @@
+"""
+Article translation job.
+文章翻译任务：由后台worker执行，生成双语对照版本的新文章。
+"""
+
+from typing import Any, Dict
+import asyncio
+import logging
+import time
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Article, Agent, User
+from ..utils.task_tracker import task_tracker, PermanentTaskError
+from .translation_engine import TranslationEngine, TranslationCheckpoint, extract_segments
+from .translation_memory import get_translation_memory, style_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# 进度写入任务表的最小间隔（秒），最后一次进度总会写入
+_PROGRESS_INTERVAL_SECONDS = 1.0
+
+# 语言映射
+LANGUAGE_NAMES = {
+    "zh-CN": "简体中文",
+    "en": "English",
+    "ja": "日本語",
+    "ko": "한국어",
+    "fr": "Français",
+    "de": "Deutsch",
+    "es": "Español"
+}
+
+
+async def translate_article_job(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    翻译文章
+    在独立的数据库会话中运行；重试时已完成的批次从检查点恢复
+
+    Args:
+        task: 任务信息，payload包含 article_id 和 target_language
+
+    Returns:
+        任务结果（新文章ID和标题）
+    """
+    from .ai_service_enhanced import EnhancedAIService
+    from .unified_ai import UnifiedAIClient
+    from ..agent.prompts import PromptBuilder
+    from ..models_config import get_default_model
+
+    task_id = task["id"]
+    article_id = task["payload"]["article_id"]
+    target_language = task["payload"].get("target_language", "zh-CN")
+
+    db = SessionLocal()
+
+    try:
+        # 获取文章和用户
+        article = db.query(Article).filter(Article.id == article_id).first()
+        if not article:
+            raise PermanentTaskError("文章不存在")
+
+        user = db.query(User).filter(User.id == task["user_id"]).first()
+        if not user:
+            raise PermanentTaskError("用户不存在")
+
+        # 获取Agent
+        agent = db.query(Agent).filter(Agent.id == article.agentId).first()
+        if not agent:
+            raise PermanentTaskError("Agent不存在")
+
+        language_name = LANGUAGE_NAMES.get(target_language, "简体中文")
+
+        logger.info(f"🌍 [Task {task_id}] Translating article {article_id} to {language_name}")
+
+        # 提取段落和图片
+        segments, images = extract_segments(article.content)
+
+        total = len(segments)
+        logger.info(f"📝 [Task {task_id}] Found {total} text elements and {len(images)} images")
+
+        # 更新任务总数
+        task_tracker.update_task(task_id, total=total)
+
+        # 所有批次共用一份system prompt（Agent上下文 + 翻译指导）
+        system_prompt = PromptBuilder.build(
+            "translate",
+            EnhancedAIService.agent_context(agent),
+            target_language=language_name
+        )
+
+        # 聚合API的默认模型即Claude；模型显式确定，翻译记忆按模型区分
+        provider = UnifiedAIClient._determine_provider(user)
+        model = get_default_model(provider)
+
+        async def call_model(system: str, prompt: str, max_tokens: int) -> str:
+            # 翻译使用低温度以提高准确性
+            return await UnifiedAIClient.call(
+                user=user,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt}
+                ],
+                provider=provider,
+                model=model,
+                temperature=0.1,
+                max_tokens=max_tokens
+            )
+
+        # 已翻译过的段落（同一Agent风格、目标语言和模型）直接复用
+        memory = get_translation_memory()
+        memory_scope = memory.scope(
+            target_language, style_fingerprint(system_prompt), model
+        ) if memory else None
+
+        # 进度回调在事件循环中执行：任务表写入放到线程中，并按间隔节流；
+        # 加锁保证并发批次的进度按顺序写入，不会被较早的进度覆盖
+        progress_lock = asyncio.Lock()
+        last_progress = {"done": -1, "at": 0.0}
+
+        async def on_progress(done: int, total: int):
+            async with progress_lock:
+                now = time.monotonic()
+                if done <= last_progress["done"]:
+                    return
+                if done < total and now - last_progress["at"] < _PROGRESS_INTERVAL_SECONDS:
+                    return
+                last_progress.update(done=done, at=now)
+                await asyncio.to_thread(
+                    task_tracker.update_task,
+                    task_id,
+                    progress=done,
+                    current_step=f"已翻译 {done}/{total} 段"
+                )
+            logger.info(f"✅ [Task {task_id}] 翻译进度: {done}/{total}")
+
+        # 相邻段落打包成批次并发翻译；任务重试或重新运行同一文章的翻译会跳过已完成的批次
+        checkpoint = TranslationCheckpoint.for_job(
+            settings.translation_checkpoint_dir, article.id, target_language
+        )
+        engine = TranslationEngine(
+            call_model,
+            system_prompt,
+            max_batch_tokens=settings.translation_batch_tokens,
+            max_batch_segments=settings.translation_batch_segments,
+            concurrency=settings.translation_concurrency,
+            checkpoint=checkpoint,
+            memory=memory_scope,
+            on_progress=on_progress
+        )
+        translations = await engine.translate(segments)
+        logger.info(f"📊 [Task {task_id}] Translation stats: {engine.stats}")
+
+        translated_elements = [
+            {
+                'original': {'tag': segment.tag, 'text': segment.text},
+                'translation': translation
+            }
+            for segment, translation in zip(segments, translations)
+        ]
+
+        # 构建双语对照HTML
+        bilingual_html = []
+
+        # 添加标题说明
+        bilingual_html.append(f'<div style="background-color: #f0f9ff; border-left: 4px solid #0284c7; padding: 12px; margin-bottom: 24px;">')
+        bilingual_html.append(f'<p style="margin: 0; font-size: 14px; color: #0c4a6e;">💡 本文为双语对照版本 | This is a bilingual version</p>')
+        bilingual_html.append(f'</div>')
+
+        # 图片索引
+        img_index = 0
+
+        for item in translated_elements:
+            original = item['original']
+            translation = item['translation']
+            tag = original['tag']
+
+            # 原文（浅灰色背景）
+            bilingual_html.append(f'<div style="background-color: #f9fafb; padding: 12px; margin: 8px 0; border-radius: 4px;">')
+            bilingual_html.append(f'<{tag} style="margin: 0; color: #374151;">{original["text"]}</{tag}>')
+            bilingual_html.append(f'</div>')
+
+            # 译文（浅蓝色背景）
+            bilingual_html.append(f'<div style="background-color: #eff6ff; padding: 12px; margin: 8px 0 24px 0; border-radius: 4px;">')
+            bilingual_html.append(f'<{tag} style="margin: 0; color: #1e40af;">{translation}</{tag}>')
+            bilingual_html.append(f'</div>')
+
+            # 每隔几段插入一张图片
+            if img_index < len(images) and (len(translated_elements) < 5 or (item == translated_elements[len(translated_elements) // (len(images) + 1) * (img_index + 1)])):
+                bilingual_html.append(images[img_index])
+                img_index += 1
+
+        # 添加剩余的图片
+        while img_index < len(images):
+            bilingual_html.append(images[img_index])
+            img_index += 1
+
+        new_content = '\n'.join(bilingual_html)
+
+        # 创建新文章
+        new_article = Article(
+            userId=user.id,
+            agentId=article.agentId,
+            title=f"{article.title} ({language_name}双语版)",
+            content=new_content,
+            summary=f"双语对照翻译版本 - {article.summary or ''}",
+            publishStatus="draft",
+            sourceFiles=article.sourceFiles
+        )
+
+        db.add(new_article)
+        db.commit()
+        db.refresh(new_article)
+        checkpoint.clear()
+
+        logger.info(f"✅ [Task {task_id}] Created bilingual article: {new_article.id}")
+
+        task_tracker.update_task(task_id, progress=total)
+        return {
+            "article_id": new_article.id,
+            "title": new_article.title
+        }
+    finally:
+        db.close()
@@ -184,7 +184,8 @@ class AuthService:
             payload = verify_token(token)
             user_id = payload.get("user_id")
             
-            if not user_id:
+            # 带用途的短期令牌（如任务进度推送令牌）不能作为登录令牌使用
+            if not user_id or payload.get("scope"):
                 return None
             
             user = db.query(User).filter(User.id == user_id).first()
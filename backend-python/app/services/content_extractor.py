@@ -0,0 +1,279 @@
+"""
+网页正文提取服务 (Content Extractor)
+URL导入使用的正文提取，基于lxml（C实现的解析器）：
+- 一次遍历完成清理（脚本、样式、导航、页脚、表单控件、注释）、图片和链接的绝对化，以及段落打分
+- 参考 Readability 的打分方式选择正文：段落文本长度和逗号数累加到父节点和祖父节点，
+  再按 class/id 权重和链接密度修正，取最高分节点及得分接近的相邻节点，并删除其中得分为负的块（评论、推荐等）；
+  选出的正文太短时退回整个 body
+- 只把选出的正文交给 html2text 转为 Markdown，不再转换整页
+
+Single-pass lxml cleanup and readability-style main-content scoring for URL imports.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+import re
+
+import html2text
+import lxml.html
+import markdown
+from lxml import etree
+
+# 整个子树删除的标签（不会是正文）。<form> 本身保留：ASP.NET WebForms 等页面用它包住整个正文
+_DROP_TAGS = {"script", "style", "noscript", "template", "nav", "footer", "input", "select", "button", "textarea"}
+# 参与打分的段落级标签
+_PARAGRAPH_TAGS = {"p", "pre", "td", "blockquote"}
+# 子节点中有这些标签的 div 不当作段落
+_BLOCK_TAGS = {"a", "blockquote", "dl", "div", "img", "ol", "p", "pre", "table", "ul", "section", "article"}
+# 正文中得分为负时整块删除的容器标签
+_CONDITIONAL_TAGS = {"div", "section", "ul", "ol", "table"}
+# 段落文本少于此长度时不打分
+_MIN_PARAGRAPH_LENGTH = 25
+# 选出的正文少于此长度时退回整个 body
+_MIN_CONTENT_LENGTH = 100
+
+_POSITIVE = re.compile(r"article|body|content|entry|hentry|h-entry|main|page|post|text|blog|story", re.I)
+_NEGATIVE = re.compile(
+    r"-ad-|hidden|banner|combx|comment|com-|contact|foot|masthead|media|meta|outbrain|promo|related|"
+    r"scroll|share|shoutbox|sidebar|skyscraper|sponsor|shopping|tags|tool|widget|nav|menu|breadcrumb|"
+    r"recommend|subscribe|login|popup|cookie",
+    re.I
+)
+_COMMAS = re.compile(r"[,，、；;]")
+# XHTML 页面开头的XML声明：lxml 不接受带编码声明的 str，解析前去掉（内容已经解码）
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>", re.I)
+
+# 节点本身的基础分
+_TAG_SCORES = {
+    "article": 10, "main": 5, "section": 3, "div": 5,
+    "pre": 3, "td": 3, "blockquote": 3,
+    "address": -3, "ol": -3, "ul": -3, "dl": -3, "dd": -3, "dt": -3, "li": -3, "form": -3,
+    "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5, "th": -5,
+}
+
+
+@dataclass
+class ExtractedArticle:
+    title: str
+    markdown: str  # 正文Markdown
+    html: str  # 由Markdown渲染的HTML（编辑器使用）
+
+
+def _class_weight(el) -> int:
+    weight = 0
+    for value in (el.get("class"), el.get("id")):
+        if value:
+            if _NEGATIVE.search(value):
+                weight -= 25
+            if _POSITIVE.search(value):
+                weight += 25
+    return weight
+
+
+def _text_length(el) -> int:
+    return len(" ".join(el.text_content().split()))
+
+
+def _link_density(el) -> float:
+    length = _text_length(el)
+    if not length:
+        return 0.0
+    link_length = sum(_text_length(link) for link in el.iter("a"))
+    return min(1.0, link_length / length)
+
+
+class _Scorer:
+    """遍历时累计的候选节点得分"""
+
+    def __init__(self):
+        self.scores: Dict[etree._Element, float] = {}
+
+    def _score(self, el) -> float:
+        if el not in self.scores:
+            self.scores[el] = _TAG_SCORES.get(el.tag, 0) + _class_weight(el)
+        return self.scores[el]
+
+    def add_paragraph(self, el) -> None:
+        text = " ".join(el.text_content().split())
+        if len(text) < _MIN_PARAGRAPH_LENGTH:
+            return
+        # 逗号多、文本长的段落更像正文（中文字符信息量高，每50字计1分）
+        content_score = 1 + len(_COMMAS.findall(text)) + min(len(text) // 50, 3)
+        parent = el.getparent()
+        if parent is None:
+            return
+        self.scores[parent] = self._score(parent) + content_score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            self.scores[grandparent] = self._score(grandparent) + content_score / 2
+
+    def best(self) -> Optional[etree._Element]:
+        best, best_score = None, 0.0
+        for el, score in self.scores.items():
+            score *= 1 - _link_density(el)
+            self.scores[el] = score
+            if score > best_score:
+                best, best_score = el, score
+        return best
+
+
+def _clean(root, base_url: str) -> tuple:
+    """
+    一次遍历：记录要删除/展开的节点，绝对化图片和链接，给段落打分
+
+    Returns:
+        (标题, 打分器)
+    """
+    scorer = _Scorer()
+    drops: List[etree._Element] = []
+    unwraps: List[etree._Element] = []
+    title = None
+
+    stack = [root]
+    while stack:
+        el = stack.pop()
+        tag = el.tag
+        if not isinstance(tag, str):
+            # 注释和处理指令
+            drops.append(el)
+            continue
+        tag = tag.lower()
+        if tag in _DROP_TAGS:
+            drops.append(el)
+            continue
+        if tag == "title" and title is None:
+            title = (el.text_content() or "").strip()
+        elif tag == "img":
+            src = el.get("src") or el.get("data-src")  # 有些网站使用懒加载
+            if src:
+                el.set("src", urljoin(base_url, src))
+        elif tag == "a":
+            href = el.get("href")
+            if href and not href.startswith(("javascript:", "#", "mailto:")):
+                el.set("href", urljoin(base_url, href))
+            else:
+                # 脚本链接、锚点和没有href的链接只保留文本
+                unwraps.append(el)
+        elif tag in _PARAGRAPH_TAGS:
+            scorer.add_paragraph(el)
+        elif tag == "div" and not any(child.tag in _BLOCK_TAGS for child in el):
+            # 用 <br> 分段、没有 <p> 的正文
+            scorer.add_paragraph(el)
+        stack.extend(reversed(el))
+
+    for el in unwraps:
+        el.drop_tag()
+    for el in drops:
+        if el.getparent() is not None:
+            el.drop_tree()  # 保留节点后面的文本
+    return title, scorer
+
+
+def _clean_conditionally(el, scorer: _Scorer) -> None:
+    """删除正文中的评论、推荐等块：class/id 权重加得分为负、基本都是链接的列表，或没有正文段落的 <aside>"""
+    for child in list(el.iter(*_CONDITIONAL_TAGS, "aside")):
+        if child is el or child.getparent() is None:
+            continue
+        score = scorer.scores.get(child, 0)
+        if child.tag == "aside":
+            remove = score <= 0
+        else:
+            remove = _class_weight(child) + score < 0 or (child.tag in ("ul", "ol") and _link_density(child) > 0.5)
+        if remove:
+            child.drop_tree()
+
+
+def _body_html(root) -> str:
+    body = root.find(".//body")
+    return lxml.html.tostring(body if body is not None else root, encoding="unicode")
+
+
+def _main_content(root, scorer: _Scorer) -> str:
+    """选出正文节点及得分接近的相邻节点，返回其HTML；没有候选或正文太短时返回整个 body"""
+    best = scorer.best()
+    if best is None:
+        return _body_html(root)
+
+    threshold = max(10.0, scorer.scores[best] * 0.2)
+    parent = best.getparent()
+    siblings = [best] if parent is None else list(parent)
+    parts = []
+    content_length = 0
+    for sibling in siblings:
+        if not isinstance(sibling.tag, str):
+            continue
+        include = sibling is best or scorer.scores.get(sibling, 0) >= threshold
+        if not include and sibling.tag == "p":
+            # 正文旁边的独立段落：文字足够长且链接很少
+            length = _text_length(sibling)
+            include = (length > 80 and _link_density(sibling) < 0.25) or \
+                      (0 < length <= 80 and _link_density(sibling) == 0 and _COMMAS.search(sibling.text_content()))
+        if include:
+            _clean_conditionally(sibling, scorer)
+            content_length += _text_length(sibling)
+            parts.append(lxml.html.tostring(sibling, encoding="unicode", with_tail=False))
+    if content_length < _MIN_CONTENT_LENGTH:
+        return _body_html(root)
+    return "".join(parts)
+
+
+def _to_markdown(content_html: str) -> str:
+    # 转换为Markdown,保留图片和链接
+    h = html2text.HTML2Text()
+    h.ignore_links = False
+    h.ignore_images = False  # 保留图片
+    h.ignore_emphasis = False
+    h.body_width = 0  # 不限制行宽
+    h.default_image_alt = 'Image'  # 为没有alt的图片提供默认文本
+    h.images_to_alt = False  # 不要用alt替换图片,保留完整的markdown图片语法
+    h.protect_links = True  # 保护链接格式
+    h.wrap_links = False  # 不换行链接
+    h.unicode_snob = True  # 使用unicode字符
+    h.skip_internal_links = False  # 保留内部链接
+    markdown_content = h.handle(content_html)
+
+    # 移除空链接 [text]() 或 [text](#) 或 [text](javascript:...)
+    markdown_content = re.sub(r'\[([^\]]+)\]\(\s*\)', r'\1', markdown_content)
+    markdown_content = re.sub(r'\[([^\]]+)\]\(#\)', r'\1', markdown_content)
+    markdown_content = re.sub(r'\[([^\]]+)\]\(javascript:[^\)]*\)', r'\1', markdown_content)
+
+    # 清理多余的空行
+    cleaned_lines = []
+    prev_empty = False
+    for line in markdown_content.split('\n'):
+        if line.strip():
+            cleaned_lines.append(line)
+            prev_empty = False
+        elif not prev_empty:
+            cleaned_lines.append('')
+            prev_empty = True
+    return '\n'.join(cleaned_lines).strip()
+
+
+def extract_article(page_html: str, url: str) -> ExtractedArticle:
+    """
+    从网页HTML中提取正文（CPU密集，调用方应在线程中执行）
+
+    Args:
+        page_html: 网页HTML
+        url: 网页URL（用于把相对地址转换为绝对地址，以及作为缺省标题）
+
+    Returns:
+        标题、正文Markdown和渲染后的HTML
+    """
+    try:
+        root = lxml.html.document_fromstring(_XML_DECLARATION.sub("", page_html, count=1))
+    except (etree.ParserError, ValueError):
+        # 空文档或无法解析
+        return ExtractedArticle(title=url, markdown="", html="")
+
+    title, scorer = _clean(root, url)
+    markdown_text = _to_markdown(_main_content(root, scorer))
+
+    # 将 Markdown 转换为 HTML（用于编辑器渲染）
+    html_content = markdown.markdown(
+        markdown_text,
+        extensions=['extra', 'codehilite', 'tables', 'toc', 'nl2br']
+    )
+    return ExtractedArticle(title=title or url, markdown=markdown_text, html=html_content)
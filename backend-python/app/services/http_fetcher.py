@@ -0,0 +1,274 @@
+"""
+共享HTTP抓取服务 (HTTP Fetcher)
+网页导入使用的抓取客户端：
+- 进程内共享一个 httpx.AsyncClient（按事件循环），复用连接池，不再每次请求新建客户端
+- 流式读取响应，超过 settings.fetch_max_bytes 立即中止
+- 磁盘HTTP缓存：遵守 Cache-Control（no-store / no-cache / max-age），过期后带
+  If-None-Match / If-Modified-Since 重新验证，304时直接使用缓存内容；缓存总大小有上限
+
+Shared pooled HTTP client for URL imports with a size cutoff and an on-disk
+HTTP cache that revalidates with ETag / Last-Modified.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+
+import httpx
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+
+# 缓存目录名（位于上传目录下，上传清理任务会跳过该目录）
+CACHE_DIR_NAME = "http_cache"
+
+_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+class FetchTooLarge(Exception):
+    """响应超过大小限制"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Response too large (max {limit // (1024 * 1024)}MB)")
+        self.limit = limit
+
+
+@dataclass
+class FetchResult:
+    url: str  # 请求的URL
+    final_url: str  # 跟随重定向后的URL
+    status_code: int
+    content_type: str
+    content: bytes
+    from_cache: bool = False  # 未发请求（缓存仍新鲜）或服务器返回304
+
+    @property
+    def encoding(self) -> str:
+        """响应头中的charset，其次是HTML中的<meta charset>，默认UTF-8"""
+        match = re.search(r'charset=["\']?([\w-]+)', self.content_type or "", re.IGNORECASE)
+        if match:
+            return match.group(1)
+        match = _CHARSET.search(self.content[:4096])
+        return match.group(1).decode("ascii") if match else "utf-8"
+
+    @property
+    def text(self) -> str:
+        try:
+            return self.content.decode(self.encoding, errors="replace")
+        except LookupError:
+            return self.content.decode("utf-8", errors="replace")
+
+
+def _cache_control(headers) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (headers.get("cache-control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _freshness(headers) -> Optional[int]:
+    """
+    缓存可以不经验证直接使用的秒数
+
+    Returns:
+        None 表示不可缓存（no-store）
+    """
+    directives = _cache_control(headers)
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    try:
+        return max(0, int(directives["max-age"]))
+    except (KeyError, TypeError, ValueError):
+        # 没有明确的有效期时使用默认值，短时间内重复导入同一URL不再请求
+        return settings.fetch_cache_ttl
+
+
+class HttpFetcher:
+    """带连接池和磁盘缓存的抓取客户端"""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Args:
+            cache_dir: 缓存目录，默认为 上传目录/http_cache
+        """
+        self._cache_dir = cache_dir
+        # httpx的连接池绑定事件循环，每个事件循环一个客户端
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir or os.path.join(settings.upload_dir, CACHE_DIR_NAME)
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=settings.fetch_timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(
+                    max_connections=settings.fetch_max_connections,
+                    max_keepalive_connections=settings.fetch_max_connections
+                )
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环的客户端（应用退出时调用）"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # ---- 磁盘缓存 ----
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        directory = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(directory, f"{key}.json"), os.path.join(directory, f"{key}.body")
+
+    def _load(self, url: str) -> Optional[Tuple[dict, bytes]]:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                return meta, f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_meta(self, meta_path: str, meta: dict) -> None:
+        tmp = f"{meta_path}.tmp{threading.get_ident()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    def _store(self, url: str, meta: dict, content: bytes) -> None:
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        tmp = f"{body_path}.tmp{threading.get_ident()}"
+        with open(tmp, "wb") as f:
+            f.write(content)
+        os.replace(tmp, body_path)
+        self._write_meta(meta_path, meta)
+        self._prune()
+
+    def _prune(self) -> None:
+        """缓存总大小超过上限时删除最久未写入的条目"""
+        entries = []
+        total = 0
+        for directory, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".body"):
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+        if total <= settings.fetch_cache_max_bytes:
+            return
+        with self._lock:
+            for _, size, path in sorted(entries):
+                for target in (path, path[:-len(".body")] + ".json"):
+                    try:
+                        os.remove(target)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                if total <= settings.fetch_cache_max_bytes:
+                    break
+
+    # ---- 抓取 ----
+
+    async def fetch(self, url: str) -> FetchResult:
+        """
+        抓取URL（GET），优先使用缓存
+
+        Args:
+            url: 完整的http(s) URL
+
+        Returns:
+            抓取结果
+
+        Raises:
+            httpx.HTTPError: 网络错误或4xx/5xx响应
+            FetchTooLarge: 响应超过 settings.fetch_max_bytes
+        """
+        cached = await asyncio.to_thread(self._load, url)
+        headers = {}
+        if cached is not None:
+            meta, body = cached
+            if time.time() - meta["storedAt"] < meta["freshFor"]:
+                return FetchResult(url, meta["finalUrl"], meta["status"], meta["contentType"], body, from_cache=True)
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("lastModified"):
+                headers["If-Modified-Since"] = meta["lastModified"]
+
+        limit = settings.fetch_max_bytes
+        async with self._client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached is not None:
+                meta, body = cached
+                fresh_for = _freshness(response.headers)
+                meta.update(storedAt=time.time(), freshFor=fresh_for if fresh_for is not None else meta["freshFor"])
+                meta_path, _ = self._paths(url)
+                await asyncio.to_thread(self._write_meta, meta_path, meta)
+                return FetchResult(url, meta["finalUrl"], meta["status"], meta["contentType"], body, from_cache=True)
+
+            response.raise_for_status()
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > limit:
+                raise FetchTooLarge(limit)
+            chunks = []
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > limit:
+                    raise FetchTooLarge(limit)
+                chunks.append(chunk)
+
+        result = FetchResult(
+            url, str(response.url), response.status_code,
+            response.headers.get("content-type", ""), b"".join(chunks)
+        )
+        fresh_for = _freshness(response.headers)
+        if fresh_for is not None:
+            meta = {
+                "url": url,
+                "finalUrl": result.final_url,
+                "status": result.status_code,
+                "contentType": result.content_type,
+                "etag": response.headers.get("etag"),
+                "lastModified": response.headers.get("last-modified"),
+                "storedAt": time.time(),
+                "freshFor": fresh_for,
+            }
+            try:
+                await asyncio.to_thread(self._store, url, meta, result.content)
+            except OSError as e:
+                logger.warning(f"Failed to cache {url}: {e}")
+        return result
+
+
+# 全局抓取客户端
+http_fetcher = HttpFetcher()
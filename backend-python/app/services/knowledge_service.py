@@ -0,0 +1,127 @@
+"""
+Knowledge base wiring from application settings.
+根据应用配置创建知识库（缓存、分片、嵌入后端）。
+"""
+
+from typing import Any, Dict
+import asyncio
+import logging
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Article
+from ..agent.knowledge import KnowledgeRetriever, KnowledgeTenancy, get_query_cache, get_tenancy
+from ..utils.task_tracker import task_tracker, PermanentTaskError
+
+logger = logging.getLogger(__name__)
+
+# 知识库持久化目录
+KNOWLEDGE_DIR = "./knowledge_db"
+
+
+def embedder_options() -> Dict[str, Any]:
+    """嵌入器推理参数"""
+    return {
+        "backend": settings.knowledge_embedding_backend,
+        "onnx_dir": settings.knowledge_onnx_dir,
+        "threads": settings.knowledge_embedding_threads,
+        "batch_size": settings.knowledge_embedding_batch_size
+    }
+
+
+def get_knowledge_tenancy(persist_dir: str) -> KnowledgeTenancy:
+    """
+    获取按配置初始化的多租户知识库
+
+    Args:
+        persist_dir: 向量数据库持久化目录
+
+    Returns:
+        KnowledgeTenancy（进程内按目录复用）
+    """
+    query_cache = None
+    if settings.knowledge_query_cache_size > 0:
+        query_cache = get_query_cache(
+            persist_dir,
+            max_entries=settings.knowledge_query_cache_size,
+            shared=settings.knowledge_query_cache_shared
+        )
+    return get_tenancy(
+        persist_dir,
+        n_shards=settings.knowledge_shards,
+        quantization=settings.knowledge_quantization,
+        query_cache=query_cache,
+        embedder_options=embedder_options()
+    )
+
+
+def get_user_retriever(user_id: str) -> KnowledgeRetriever:
+    """获取用户的知识库检索器（每个用户是分片知识库中的一个租户）"""
+    return get_knowledge_tenancy(KNOWLEDGE_DIR).retriever(f"user_{user_id}")
+
+
+def article_document(article: Article) -> Dict[str, Any]:
+    """
+    将文章转换为KnowledgeRetriever.add_documents接受的文档
+
+    Args:
+        article: 文章
+
+    Returns:
+        包含text（HTML正文）和metadata的字典
+    """
+    return {
+        "text": article.content or "",
+        "metadata": {
+            "article_id": article.id,
+            "title": article.title,
+            "created_at": article.createdAt.isoformat() if article.createdAt else None,
+            "published": article.publishStatus == "published",
+            "source": "article"
+        }
+    }
+
+
+async def build_knowledge_job(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    从用户的文章构建知识库（后台任务）
+
+    Args:
+        task: 任务信息，payload可包含 article_ids（为空时使用用户的所有文章）
+
+    Returns:
+        任务结果（入库的文章数、分块数和分块失败的文章ID）
+    """
+    user_id = task["user_id"]
+    article_ids = task["payload"].get("article_ids")
+
+    def build() -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            query = db.query(Article).filter(Article.userId == user_id)
+            if article_ids:
+                query = query.filter(Article.id.in_(article_ids))
+            articles = query.all()
+            if not articles:
+                raise PermanentTaskError("No articles found")
+
+            task_tracker.update_task(
+                task["id"], total=len(articles), current_step=f"Indexing {len(articles)} articles"
+            )
+            report = {}
+            ids = get_user_retriever(user_id).add_documents(
+                (article_document(article) for article in articles),
+                chunk_strategy="markdown",
+                report=report
+            )
+            task_tracker.update_task(task["id"], progress=len(articles))
+            logger.info(
+                f"Built knowledge base for user {user_id}: {report['documents']} articles, "
+                f"{len(ids)} chunks, {len(report['failed'])} failed"
+            )
+            return {"articles": report["documents"], "chunks": len(ids), "failed": report["failed"]}
+        finally:
+            db.close()
+
+    # 嵌入计算和向量库写入是同步的，放到线程中执行
+    return await asyncio.to_thread(build)
@@ -0,0 +1,180 @@
+"""
+内容版本存储服务 (Content Revision Store)
+同步记录不再保存两份完整正文，而是引用按文章组织的版本链：
+- 内容相同的版本只存一次（一次同步的"同步后"通常就是下一次同步的"同步前"）
+- 新版本优先存为相对该文章最新版本的增量，增量不够小或链过长时存全文（关键帧）
+- 读取时沿版本链找到全文，依次应用增量还原，并用SHA-256校验
+
+Stores article content revisions as compressed keyframes plus deltas, with
+content-hash deduplication and transparent reconstruction for SyncHistory.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+import hashlib
+import threading
+
+from sqlalchemy import select, func, case
+from sqlalchemy.engine import Connection
+
+from ..models.content_revision import ContentRevision, generate_uuid
+from ..utils.delta_codec import compress_text, decompress_text, make_delta, apply_delta
+
+revisions = ContentRevision.__table__
+
+# 每条版本链上最多连续多少个增量（限制还原时需要应用的增量数）
+KEYFRAME_INTERVAL = 16
+# 增量小于全文压缩结果的这个比例时才存增量
+DELTA_MAX_RATIO = 0.5
+# 还原结果缓存的条目数（连续查看历史时复用基准版本）
+CACHE_SIZE = 32
+
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(revision_id: str) -> Optional[str]:
+    with _cache_lock:
+        content = _cache.get(revision_id)
+        if content is not None:
+            _cache.move_to_end(revision_id)
+        return content
+
+
+def _cache_put(revision_id: str, content: str) -> None:
+    with _cache_lock:
+        _cache[revision_id] = content
+        _cache.move_to_end(revision_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def save_revision(conn: Connection, article_id: str, content: str) -> str:
+    """
+    保存文章内容的一个版本
+
+    Args:
+        conn: 数据库连接（在调用方的事务中写入）
+        article_id: 文章ID
+        content: 完整内容
+
+    Returns:
+        版本ID（内容已存在时返回已有版本）
+    """
+    digest = content_hash(content)
+    existing = conn.execute(
+        select(revisions.c.id)
+        .where(revisions.c.articleId == article_id, revisions.c.sha256 == digest)
+        .limit(1)
+    ).scalar()
+    if existing:
+        return existing
+
+    full = compress_text(content)
+    encoding, data, base_id, depth = "zlib", full, None, 0
+
+    latest = conn.execute(
+        select(revisions.c.id, revisions.c.depth)
+        .where(revisions.c.articleId == article_id)
+        .order_by(revisions.c.createdAt.desc())
+        .limit(1)
+    ).first()
+    if latest is not None and latest.depth + 1 < KEYFRAME_INTERVAL:
+        base = load_revision(conn, latest.id)
+        delta = make_delta(base, content)
+        if len(delta) < len(full) * DELTA_MAX_RATIO:
+            encoding, data, base_id, depth = "delta", delta, latest.id, latest.depth + 1
+
+    revision_id = generate_uuid()
+    conn.execute(revisions.insert().values(
+        id=revision_id, articleId=article_id, encoding=encoding, baseId=base_id, depth=depth,
+        data=data, sha256=digest, size=len(content.encode("utf-8")), storedSize=len(data),
+        createdAt=datetime.utcnow()
+    ))
+    _cache_put(revision_id, content)
+    return revision_id
+
+
+def load_revision(conn: Connection, revision_id: Optional[str]) -> Optional[str]:
+    """
+    还原一个版本的完整内容
+
+    Args:
+        conn: 数据库连接
+        revision_id: 版本ID
+
+    Returns:
+        完整内容，版本不存在时返回None
+    """
+    if not revision_id:
+        return None
+    cached = _cache_get(revision_id)
+    if cached is not None:
+        return cached
+
+    # 沿版本链向上收集增量，直到全文或已缓存的版本
+    deltas = []
+    expected = None
+    current = revision_id
+    while True:
+        row = conn.execute(
+            select(revisions.c.encoding, revisions.c.baseId, revisions.c.data, revisions.c.sha256)
+            .where(revisions.c.id == current)
+        ).first()
+        if row is None:
+            return None
+        expected = expected or row.sha256
+        if row.encoding != "delta":
+            content = decompress_text(row.data)
+            break
+        deltas.append(row.data)
+        content = _cache_get(row.baseId)
+        if content is not None:
+            break
+        current = row.baseId
+
+    for delta in reversed(deltas):
+        content = apply_delta(content, delta)
+    if content_hash(content) != expected:
+        raise ValueError(f"内容版本校验失败: {revision_id}")
+    _cache_put(revision_id, content)
+    return content
+
+
+def storage_stats(conn: Connection, article_id: Optional[str] = None) -> Dict[str, int]:
+    """
+    版本存储统计
+
+    Args:
+        conn: 数据库连接
+        article_id: 只统计该文章（为空时统计全部）
+
+    Returns:
+        版本数、全文/增量数、原文字节数和实际存储字节数
+    """
+    query = select(
+        func.count(), func.coalesce(func.sum(revisions.c.size), 0),
+        func.coalesce(func.sum(revisions.c.storedSize), 0),
+        func.coalesce(func.sum(case((revisions.c.encoding == "delta", 1), else_=0)), 0)
+    )
+    if article_id:
+        query = query.where(revisions.c.articleId == article_id)
+    count, size, stored, deltas = conn.execute(query).one()
+    return {
+        "revisions": count,
+        "keyframes": count - deltas,
+        "deltas": deltas,
+        "raw_bytes": size,
+        "stored_bytes": stored,
+    }
+
+
+def clear_cache() -> None:
+    """清空还原结果缓存"""
+    with _cache_lock:
+        _cache.clear()
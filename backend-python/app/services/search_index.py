@@ -0,0 +1,462 @@
+"""
+Full-text search index for articles.
+文章全文索引：SQLite使用FTS5 trigram（支持中文子串匹配），PostgreSQL使用tsvector + GIN。
+SQLite另有一个只保存中文二元组的FTS5表（无内容表），两个字的中文词（最常见的检索词）也走索引，
+只有单字和短的非中文词才需要LIKE。
+
+索引表保存从HTML中提取的纯文本，通过Article的mapper事件在同一事务中同步，
+因此所有经ORM创建、修改、删除（包括导入）的文章都会自动更新索引。
+"""
+
+from typing import Dict, List, Optional, Tuple
+import html
+import logging
+import re
+
+from bs4 import BeautifulSoup
+from sqlalchemy import Float, String, bindparam, column, event, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from ..models import Article
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "ArticleSearch"
+FTS_TABLE = "ArticleSearchFts"
+CJK_TABLE = "ArticleSearchCjk"
+
+# 标题、摘要、正文的权重
+_WEIGHTS = (10.0, 5.0, 1.0)
+
+# 高亮标记先用控制字符占位，转义HTML后再替换为<mark>
+_MARK_START, _MARK_END = "\x02", "\x03"
+_SNIPPET_CHARS = 80
+
+# trigram分词器要求每个词至少3个字符，更短的词退回LIKE匹配
+_TRIGRAM_MIN = 3
+
+_CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+_BACKFILL_BATCH = 200
+
+_INDEXED_FIELDS = ("title", "summary", "content", "userId")
+
+# 索引表在ensure_search_index之后才存在，此前mapper事件不写索引（启动回填会补齐）
+_ready_engines = set()
+
+
+def extract_text(content: Optional[str]) -> str:
+    """
+    从HTML中提取纯文本
+
+    Args:
+        content: HTML内容
+
+    Returns:
+        以空格分隔的纯文本
+    """
+    if not content:
+        return ""
+    return BeautifulSoup(content, "html.parser").get_text(" ", strip=True)
+
+
+def segment_cjk(value: str) -> str:
+    """
+    将中日韩文字切分为重叠的二元组，供PostgreSQL的simple分词配置使用
+
+    Args:
+        value: 原始文本
+
+    Returns:
+        二元组以空格分隔后的文本
+    """
+    def bigrams(match):
+        run = match.group(0)
+        if len(run) == 1:
+            return f" {run} "
+        return " " + " ".join(run[i:i + 2] for i in range(len(run) - 1)) + " "
+
+    return _CJK_RUN.sub(bigrams, value.lower())
+
+
+def cjk_bigrams(value: str) -> str:
+    """
+    只保留中日韩文字的二元组（SQLite二元组索引的内容，英文由trigram索引覆盖）
+
+    Args:
+        value: 原始文本
+
+    Returns:
+        二元组以空格分隔后的文本
+    """
+    return segment_cjk(" ".join(_CJK_RUN.findall(value)))
+
+
+def _is_postgres(bind) -> bool:
+    return bind.dialect.name == "postgresql"
+
+
+# ----------------------------------------------------------------------
+# 建表与回填
+# ----------------------------------------------------------------------
+
+_SQLITE_SCHEMA = [
+    f'CREATE TABLE IF NOT EXISTS "{SEARCH_TABLE}" ('
+    "id INTEGER PRIMARY KEY, article_id TEXT NOT NULL UNIQUE, user_id TEXT NOT NULL, "
+    "title TEXT, summary TEXT, body TEXT)",
+    f'CREATE INDEX IF NOT EXISTS ix_article_search_user ON "{SEARCH_TABLE}" (user_id)',
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABLE}" USING fts5('
+    f"title, summary, body, content='{SEARCH_TABLE}', content_rowid='id', tokenize='trigram')",
+    # 外部内容表的标准同步触发器
+    f'CREATE TRIGGER IF NOT EXISTS article_search_ai AFTER INSERT ON "{SEARCH_TABLE}" BEGIN '
+    f'INSERT INTO "{FTS_TABLE}" (rowid, title, summary, body) '
+    "VALUES (new.id, new.title, new.summary, new.body); END",
+    f'CREATE TRIGGER IF NOT EXISTS article_search_ad AFTER DELETE ON "{SEARCH_TABLE}" BEGIN '
+    f'INSERT INTO "{FTS_TABLE}" ("{FTS_TABLE}", rowid, title, summary, body) '
+    "VALUES ('delete', old.id, old.title, old.summary, old.body); END",
+    f'CREATE TRIGGER IF NOT EXISTS article_search_au AFTER UPDATE ON "{SEARCH_TABLE}" BEGIN '
+    f'INSERT INTO "{FTS_TABLE}" ("{FTS_TABLE}", rowid, title, summary, body) '
+    "VALUES ('delete', old.id, old.title, old.summary, old.body); "
+    f'INSERT INTO "{FTS_TABLE}" (rowid, title, summary, body) '
+    "VALUES (new.id, new.title, new.summary, new.body); END",
+    # 二元组索引：无内容表，写入和删除由 _upsert / remove_article 维护（分词在Python中完成）
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS "{CJK_TABLE}" USING fts5('
+    "title, summary, body, content='', tokenize='unicode61')",
+]
+
+_POSTGRES_SCHEMA = [
+    f'CREATE TABLE IF NOT EXISTS "{SEARCH_TABLE}" ('
+    "article_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, "
+    "title TEXT, summary TEXT, body TEXT, document TSVECTOR)",
+    f'CREATE INDEX IF NOT EXISTS ix_article_search_user ON "{SEARCH_TABLE}" (user_id)',
+    f'CREATE INDEX IF NOT EXISTS ix_article_search_document ON "{SEARCH_TABLE}" USING GIN (document)',
+]
+
+
+def ensure_search_index(engine: Engine) -> int:
+    """
+    创建索引表，并为尚未索引的文章回填（启动时调用）
+
+    Args:
+        engine: 数据库引擎
+
+    Returns:
+        本次回填的文章数
+    """
+    with engine.begin() as conn:
+        postgres = _is_postgres(conn)
+        cjk_missing = not postgres and conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": CJK_TABLE}
+        ).first() is None
+        for statement in (_POSTGRES_SCHEMA if postgres else _SQLITE_SCHEMA):
+            conn.execute(text(statement))
+
+    if cjk_missing:
+        _backfill_cjk(engine)
+    _ready_engines.add(engine.url.render_as_string())
+
+    backfilled = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                'SELECT a.id, a."userId", a.title, a.summary, a.content FROM "Article" a '
+                f'WHERE NOT EXISTS (SELECT 1 FROM "{SEARCH_TABLE}" s WHERE s.article_id = a.id) '
+                "LIMIT :limit"
+            ), {"limit": _BACKFILL_BATCH}).fetchall()
+            for row in rows:
+                _upsert(conn, row[0], row[1], row[2], row[3], row[4])
+        backfilled += len(rows)
+        if len(rows) < _BACKFILL_BATCH:
+            break
+
+    if backfilled:
+        logger.info(f"Indexed {backfilled} articles for full-text search")
+    return backfilled
+
+
+def _backfill_cjk(engine: Engine):
+    """为已有的索引行补建二元组索引（升级时二元组表刚创建）"""
+    last_id = 0
+    indexed = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                f'SELECT id, title, summary, body FROM "{SEARCH_TABLE}" WHERE id > :last_id ORDER BY id LIMIT :limit'
+            ), {"last_id": last_id, "limit": _BACKFILL_BATCH}).fetchall()
+            for row in rows:
+                _write_cjk(conn, *row)
+        if rows:
+            last_id = rows[-1][0]
+            indexed += len(rows)
+        if len(rows) < _BACKFILL_BATCH:
+            break
+    if indexed:
+        logger.info(f"Built CJK bigram index for {indexed} articles")
+
+
+# ----------------------------------------------------------------------
+# 同步
+# ----------------------------------------------------------------------
+
+def _write_cjk(conn: Connection, row_id: int, title: str, summary: str, body: str, delete: bool = False):
+    """写入或删除一行的二元组索引；无内容表删除时必须提供写入时的同样内容"""
+    command = f'"{CJK_TABLE}", ' if delete else ""
+    values = "'delete', " if delete else ""
+    conn.execute(text(
+        f'INSERT INTO "{CJK_TABLE}" ({command}rowid, title, summary, body) '
+        f"VALUES ({values}:row_id, :title, :summary, :body)"
+    ), {"row_id": row_id, "title": cjk_bigrams(title or ""), "summary": cjk_bigrams(summary or ""),
+        "body": cjk_bigrams(body or "")})
+
+
+def _existing_row(conn: Connection, article_id: str):
+    return conn.execute(text(
+        f'SELECT id, title, summary, body FROM "{SEARCH_TABLE}" WHERE article_id = :article_id'
+    ), {"article_id": article_id}).fetchone()
+
+
+def _upsert(conn: Connection,
+            article_id: str,
+            user_id: str,
+            title: Optional[str],
+            summary: Optional[str],
+            content: Optional[str]):
+    """写入或更新一篇文章的索引行"""
+    params = {
+        "article_id": article_id,
+        "user_id": user_id,
+        "title": title or "",
+        "summary": summary or "",
+        "body": extract_text(content)
+    }
+
+    if _is_postgres(conn):
+        params.update(
+            title_tokens=segment_cjk(params["title"]),
+            summary_tokens=segment_cjk(params["summary"]),
+            body_tokens=segment_cjk(params["body"])
+        )
+        conn.execute(text(
+            f'INSERT INTO "{SEARCH_TABLE}" (article_id, user_id, title, summary, body, document) '
+            "VALUES (:article_id, :user_id, :title, :summary, :body, "
+            "setweight(to_tsvector('simple', :title_tokens), 'A') || "
+            "setweight(to_tsvector('simple', :summary_tokens), 'B') || "
+            "setweight(to_tsvector('simple', :body_tokens), 'D')) "
+            "ON CONFLICT (article_id) DO UPDATE SET user_id = excluded.user_id, "
+            "title = excluded.title, summary = excluded.summary, body = excluded.body, "
+            "document = excluded.document"
+        ), params)
+    else:
+        old = _existing_row(conn, article_id)
+        if old is not None:
+            _write_cjk(conn, *old, delete=True)
+        row_id = conn.execute(text(
+            f'INSERT INTO "{SEARCH_TABLE}" (article_id, user_id, title, summary, body) '
+            "VALUES (:article_id, :user_id, :title, :summary, :body) "
+            "ON CONFLICT (article_id) DO UPDATE SET user_id = excluded.user_id, "
+            "title = excluded.title, summary = excluded.summary, body = excluded.body "
+            "RETURNING id"
+        ), params).scalar_one()
+        _write_cjk(conn, row_id, params["title"], params["summary"], params["body"])
+
+
+def index_article(conn: Connection, article: Article):
+    """
+    更新文章的索引行
+
+    Args:
+        conn: 当前事务的连接
+        article: 文章
+    """
+    _upsert(conn, article.id, article.userId, article.title, article.summary, article.content)
+
+
+def remove_article(conn: Connection, article_id: str):
+    """
+    删除文章的索引行
+
+    Args:
+        conn: 当前事务的连接
+        article_id: 文章ID
+    """
+    if not _is_postgres(conn):
+        old = _existing_row(conn, article_id)
+        if old is None:
+            return
+        _write_cjk(conn, *old, delete=True)
+    conn.execute(text(f'DELETE FROM "{SEARCH_TABLE}" WHERE article_id = :article_id'),
+                 {"article_id": article_id})
+
+
+def _indexing(conn: Connection) -> bool:
+    return conn.engine.url.render_as_string() in _ready_engines
+
+
+@event.listens_for(Article, "after_insert")
+def _on_article_insert(mapper, conn, article):
+    if _indexing(conn):
+        index_article(conn, article)
+
+
+@event.listens_for(Article, "after_update")
+def _on_article_update(mapper, conn, article):
+    # 只有被索引的字段变化时才重新提取文本（同步状态等字段的更新很频繁）
+    state = inspect(article)
+    if _indexing(conn) and any(state.attrs[field].history.has_changes() for field in _INDEXED_FIELDS):
+        index_article(conn, article)
+
+
+@event.listens_for(Article, "after_delete")
+def _on_article_delete(mapper, conn, article):
+    if _indexing(conn):
+        remove_article(conn, article.id)
+
+
+# ----------------------------------------------------------------------
+# 检索
+# ----------------------------------------------------------------------
+
+def _terms(query: str) -> List[str]:
+    return [term for term in query.split() if term]
+
+
+def _fts_query(terms: List[str]) -> str:
+    """每个词作为FTS5短语，多个词之间为AND"""
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_hits(db: Session, user_id: str, query: str):
+    """
+    构建检索命中的子查询，列为article_id、rank（越小越相关）、snippet（可能为空）
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+        query: 搜索关键词（空格分隔的多个词之间为AND）
+
+    Returns:
+        子查询，关键词为空时返回None
+    """
+    terms = _terms(query)
+    if not terms:
+        return None
+
+    params: Dict[str, str] = {"user_id": user_id}
+
+    if _is_postgres(db.get_bind()):
+        params["query"] = segment_cjk(" ".join(terms))
+        sql = (
+            "SELECT s.article_id AS article_id, -ts_rank_cd(s.document, q) AS rank, "
+            "CAST(NULL AS TEXT) AS snippet "
+            f"FROM \"{SEARCH_TABLE}\" s, plainto_tsquery('simple', :query) q "
+            "WHERE s.user_id = :user_id AND s.document @@ q"
+        )
+    else:
+        # 3个字符以上的词走trigram索引，两个字的中文词走二元组索引，
+        # 其余短词（单字、短英文词）在索引命中的候选集上做LIKE，只有全是这类词时才扫描用户的全部文章
+        trigram_terms = [term for term in terms if len(term) >= _TRIGRAM_MIN]
+        bigram_terms = [term for term in terms if len(term) == 2 and _CJK_RUN.fullmatch(term)]
+        like_terms = [term for term in terms if term not in trigram_terms and term not in bigram_terms]
+        title_w, summary_w, body_w = _WEIGHTS
+
+        tables = [f'"{SEARCH_TABLE}" s']
+        clauses = ["s.user_id = :user_id"]
+        rank = snippet = None
+        if trigram_terms:
+            params["query"] = _fts_query(trigram_terms)
+            tables.append(f'JOIN "{FTS_TABLE}" ON "{FTS_TABLE}".rowid = s.id')
+            clauses.append(f'"{FTS_TABLE}" MATCH :query')
+            rank = f'bm25("{FTS_TABLE}", {title_w}, {summary_w}, {body_w})'
+            snippet = f"snippet(\"{FTS_TABLE}\", -1, char(2), char(3), '…', 24)"
+        if bigram_terms:
+            params["bigram_query"] = _fts_query(bigram_terms)
+            tables.append(f'JOIN "{CJK_TABLE}" ON "{CJK_TABLE}".rowid = s.id')
+            clauses.append(f'"{CJK_TABLE}" MATCH :bigram_query')
+            rank = rank or f'bm25("{CJK_TABLE}", {title_w}, {summary_w}, {body_w})'
+        for i, term in enumerate(like_terms):
+            params[f"term_{i}"] = _like_pattern(term)
+            clauses.append(
+                f"(s.title LIKE :term_{i} ESCAPE '\\' OR s.summary LIKE :term_{i} ESCAPE '\\' "
+                f"OR s.body LIKE :term_{i} ESCAPE '\\')"
+            )
+        sql = (
+            f"SELECT s.article_id AS article_id, {rank or '0.0'} AS rank, "
+            f"{snippet or 'CAST(NULL AS TEXT)'} AS snippet "
+            f"FROM {' '.join(tables)} WHERE {' AND '.join(clauses)}"
+        )
+
+    return text(sql).bindparams(**params).columns(
+        column("article_id", String),
+        column("rank", Float),
+        column("snippet", String)
+    ).subquery("hits")
+
+
+def make_snippet(value: str, terms: List[str], width: int = _SNIPPET_CHARS) -> str:
+    """
+    在文本中截取第一个命中词附近的片段并加上高亮标记
+
+    Args:
+        value: 纯文本
+        terms: 搜索词
+        width: 片段长度（字符）
+
+    Returns:
+        带高亮占位符的片段
+    """
+    lowered = value.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [p for p in positions if p >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    fragment = value[start:start + width]
+
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    fragment = pattern.sub(lambda m: f"{_MARK_START}{m.group(0)}{_MARK_END}", fragment)
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + width < len(value) else ""
+    return prefix + fragment + suffix
+
+
+def render_snippet(snippet: str) -> str:
+    """转义片段中的HTML，并将高亮占位符替换为<mark>"""
+    return html.escape(snippet).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+def resolve_snippets(db: Session, query: str, hits: List[Tuple[str, Optional[str]]]) -> Dict[str, str]:
+    """
+    生成当前页结果的高亮片段
+
+    FTS5直接返回的片段原样使用，其余（PostgreSQL、短词）从索引表的纯文本中截取。
+
+    Args:
+        db: 数据库会话
+        query: 搜索关键词
+        hits: (article_id, snippet) 列表
+
+    Returns:
+        article_id -> 已转义的HTML片段
+    """
+    snippets = {article_id: snippet for article_id, snippet in hits if snippet}
+    missing = [article_id for article_id, snippet in hits if not snippet]
+
+    if missing:
+        terms = _terms(query)
+        rows = db.execute(
+            text(f'SELECT article_id, title, summary, body FROM "{SEARCH_TABLE}" '
+                 "WHERE article_id IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": missing}
+        ).fetchall()
+        for article_id, title, summary, body in rows:
+            source = next(
+                (value for value in (body, summary, title)
+                 if value and any(term.lower() in value.lower() for term in terms)),
+                body or summary or title or ""
+            )
+            snippets[article_id] = make_snippet(source, terms)
+
+    return {article_id: render_snippet(snippet) for article_id, snippet in snippets.items()}
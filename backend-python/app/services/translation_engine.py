@@ -0,0 +1,357 @@
+"""
+Batched, concurrent translation of article segments.
+文章分段翻译引擎：相邻段落按token预算打包成批次，用固定标记分隔后并发请求模型，
+译文按标记对齐回段落；对齐失败的批次自动退回逐段翻译，已完成的批次写入检查点以便中断后续跑。
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional, Protocol, Sequence, Tuple
+from dataclasses import dataclass
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# 参与翻译的块级标签
+SEGMENT_TAGS = ["p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "blockquote"]
+
+_MARKER = "<<<SEG {}>>>"
+_MARKER_LINE = re.compile(r"^[ \t]*<<<SEG (\d+)>>>[ \t]*$", re.MULTILINE)
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+
+# (system_prompt, user_prompt, max_tokens) -> 模型输出
+ModelCall = Callable[[str, str, int], Awaitable[str]]
+
+
+class SegmentMemory(Protocol):
+    """翻译记忆接口（见 translation_memory.TranslationMemoryScope）"""
+
+    def lookup(self, texts: Sequence[str]) -> List[Optional[str]]: ...
+
+    def store(self, sources: Sequence[str], translations: Sequence[str]) -> int: ...
+
+
+@dataclass
+class Segment:
+    """待翻译的段落"""
+    index: int
+    tag: str
+    text: str
+
+
+def extract_segments(content: str) -> Tuple[List[Segment], List[str]]:
+    """
+    从文章HTML中提取待翻译段落和图片
+
+    Args:
+        content: 文章HTML
+
+    Returns:
+        (段落列表, 图片HTML列表)
+    """
+    soup = BeautifulSoup(content or "", "html.parser")
+    segments = []
+    for tag in soup.find_all(SEGMENT_TAGS):
+        text = tag.get_text().strip()
+        if text:
+            segments.append(Segment(index=len(segments), tag=tag.name, text=text))
+    images = [str(img) for img in soup.find_all("img")]
+    return segments, images
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中日韩字符每字约1个token，其余约4个字符1个token"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def plan_batches(segments: List[Segment],
+                 max_tokens: int = 1500,
+                 max_segments: int = 24) -> List[List[Segment]]:
+    """
+    将相邻段落打包成批次
+
+    Args:
+        segments: 段落列表
+        max_tokens: 每批原文的token预算（单个超长段落单独成批）
+        max_segments: 每批最多段落数
+
+    Returns:
+        批次列表
+    """
+    batches, current, budget = [], [], 0
+    for segment in segments:
+        tokens = estimate_tokens(segment.text)
+        if current and (budget + tokens > max_tokens or len(current) >= max_segments):
+            batches.append(current)
+            current, budget = [], 0
+        current.append(segment)
+        budget += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def format_batch(segments: List[Segment]) -> str:
+    """构建批量翻译的用户prompt，段落按批内序号加标记"""
+    sections = ["# 待翻译段落", "下面每个段落以独占一行的标记开头，例如 " + _MARKER.format(0) + "。", ""]
+    for i, segment in enumerate(segments):
+        sections.append(_MARKER.format(i))
+        sections.append(segment.text)
+    sections.append("\n# 输出要求")
+    sections.append(
+        "逐段输出译文，每段译文前原样保留对应的标记并独占一行；"
+        "不要合并、拆分或遗漏段落，不要输出其他说明或解释。"
+    )
+    return "\n".join(sections)
+
+
+def format_single(segment: Segment) -> str:
+    """构建单段翻译的用户prompt"""
+    return "\n".join([
+        "# 待处理文本",
+        segment.text,
+        "\n# 输出要求",
+        "请直接输出译文，不要包含其他说明或解释。"
+    ])
+
+
+def parse_batch(output: str, count: int) -> Optional[List[str]]:
+    """
+    按标记切分模型输出
+
+    Args:
+        output: 模型输出
+        count: 批内段落数
+
+    Returns:
+        与段落一一对应的译文；标记缺失、重复、乱序或译文为空时返回None
+    """
+    markers = list(_MARKER_LINE.finditer(output))
+    if [int(m.group(1)) for m in markers] != list(range(count)):
+        return None
+
+    translations = []
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(output)
+        text = output[marker.end():end].strip()
+        if not text:
+            return None
+        translations.append(text)
+    return translations
+
+
+def batch_key(segments: List[Segment]) -> str:
+    """批次的检查点键：由原文内容决定，原文变化后旧结果不会被误用"""
+    payload = "\x1f".join(segment.text for segment in segments)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class TranslationCheckpoint:
+    """已完成批次的译文，保存为JSON文件"""
+
+    def __init__(self, path: str):
+        """
+        初始化检查点
+
+        Args:
+            path: 检查点文件路径
+        """
+        self.path = path
+        self._batches: Dict[str, List[str]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._batches = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable translation checkpoint {path}: {e}")
+
+    @classmethod
+    def for_job(cls, directory: str, *parts: str) -> "TranslationCheckpoint":
+        """按任务标识（如文章ID、目标语言）定位检查点文件"""
+        name = hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+        return cls(os.path.join(directory, f"{name}.json"))
+
+    def get(self, key: str) -> Optional[List[str]]:
+        return self._batches.get(key)
+
+    def save(self, key: str, translations: List[str]):
+        """记录一个已完成批次（先写临时文件再替换，避免中断时文件损坏）"""
+        self._batches[key] = translations
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._batches, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """任务完成后删除检查点"""
+        self._batches = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __len__(self) -> int:
+        return len(self._batches)
+
+
+class TranslationEngine:
+    """批量并发翻译引擎"""
+
+    def __init__(self,
+                 call_model: ModelCall,
+                 system_prompt: str,
+                 max_batch_tokens: int = 1500,
+                 max_batch_segments: int = 24,
+                 concurrency: int = 4,
+                 checkpoint: Optional[TranslationCheckpoint] = None,
+                 memory: Optional[SegmentMemory] = None,
+                 on_progress: Optional[Callable[[int, int], Optional[Awaitable[None]]]] = None):
+        """
+        初始化翻译引擎
+
+        Args:
+            call_model: 调用模型的协程函数 (system_prompt, user_prompt, max_tokens) -> 输出
+            system_prompt: 所有批次共用的system prompt
+            max_batch_tokens: 每批原文的token预算
+            max_batch_segments: 每批最多段落数
+            concurrency: 同时进行的模型请求数
+            checkpoint: 检查点，提供时跳过已完成的批次
+            memory: 翻译记忆，命中的段落不再请求模型，新译文写回记忆
+            on_progress: 进度回调 (已完成段落数, 总段落数)，可以是协程函数；
+                在事件循环中调用，做阻塞操作（如写数据库）的回调应使用协程函数并自行放到线程中
+        """
+        self.call_model = call_model
+        self.system_prompt = system_prompt
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_segments = max_batch_segments
+        self.concurrency = max(1, concurrency)
+        self.checkpoint = checkpoint
+        self.memory = memory
+        self.on_progress = on_progress
+
+        self.stats = {
+            "batches": 0, "resumed_batches": 0, "fallback_batches": 0,
+            "failed_segments": 0, "memory_hits": 0
+        }
+
+    def _max_output_tokens(self, segments: List[Segment]) -> int:
+        # 译文长度随语言变化，按原文的2倍预留
+        return min(8000, 2 * sum(estimate_tokens(s.text) for s in segments) + 256)
+
+    async def translate(self, segments: List[Segment]) -> List[str]:
+        """
+        翻译所有段落
+
+        Args:
+            segments: 段落列表
+
+        Returns:
+            与段落一一对应的译文（翻译失败的段落保留原文）
+        """
+        results: List[Optional[str]] = [None] * len(segments)
+        completed = 0
+        pending = []
+
+        # 先查翻译记忆，只有未命中的段落参与分批
+        remaining = segments
+        if self.memory is not None and segments:
+            try:
+                # 记忆存储是同步的数据库访问，放到线程中执行
+                remembered = await asyncio.to_thread(self.memory.lookup, [segment.text for segment in segments])
+            except Exception as e:
+                logger.warning(f"Translation memory lookup failed: {e}")
+                remembered = [None] * len(segments)
+            for segment, text in zip(segments, remembered):
+                results[segment.index] = text
+            remaining = [segment for segment in segments if results[segment.index] is None]
+            completed = self.stats["memory_hits"] = len(segments) - len(remaining)
+
+        for batch in plan_batches(remaining, self.max_batch_tokens, self.max_batch_segments):
+            cached = self.checkpoint.get(batch_key(batch)) if self.checkpoint else None
+            if cached is not None and len(cached) == len(batch):
+                for segment, text in zip(batch, cached):
+                    results[segment.index] = text
+                completed += len(batch)
+                self.stats["resumed_batches"] += 1
+            else:
+                pending.append(batch)
+
+        self.stats["batches"] = len(pending) + self.stats["resumed_batches"]
+        if self.stats["resumed_batches"]:
+            logger.info(f"Resuming translation: {self.stats['resumed_batches']} batches already done")
+        await self._report(completed, len(segments))
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(batch: List[Segment]):
+            nonlocal completed
+            translations = await self._translate_batch(batch, semaphore)
+            for segment, text in zip(batch, translations):
+                results[segment.index] = text
+            completed += len(batch)
+            await self._report(completed, len(segments))
+
+        await asyncio.gather(*(run(batch) for batch in pending))
+        return [text if text is not None else segment.text for segment, text in zip(segments, results)]
+
+    async def _translate_batch(self, batch: List[Segment], semaphore: asyncio.Semaphore) -> List[str]:
+        """翻译一个批次，对齐失败时退回逐段翻译"""
+        translations = None
+        try:
+            async with semaphore:
+                output = await self.call_model(
+                    self.system_prompt, format_batch(batch), self._max_output_tokens(batch)
+                )
+            translations = parse_batch(output, len(batch))
+            if translations is None:
+                logger.warning(f"Batch of {len(batch)} segments did not align, retrying per segment")
+        except Exception as e:
+            logger.warning(f"Batch of {len(batch)} segments failed ({e}), retrying per segment")
+
+        if translations is None:
+            self.stats["fallback_batches"] += 1
+            singles = await asyncio.gather(*(self._translate_single(s, semaphore) for s in batch))
+            await self._remember([s for s, text in zip(batch, singles) if text is not None],
+                                 [text for text in singles if text is not None])
+            translations = [text if text is not None else s.text for s, text in zip(batch, singles)]
+            if any(text is None for text in singles):
+                # 含失败段落的批次不写检查点，续跑时会重新翻译
+                return translations
+        else:
+            await self._remember(batch, translations)
+
+        if self.checkpoint is not None:
+            self.checkpoint.save(batch_key(batch), translations)
+        return translations
+
+    async def _remember(self, segments: List[Segment], translations: List[str]):
+        if self.memory is None or not segments:
+            return
+        try:
+            await asyncio.to_thread(self.memory.store, [segment.text for segment in segments], translations)
+        except Exception as e:
+            logger.warning(f"Failed to store translations in memory: {e}")
+
+    async def _translate_single(self, segment: Segment, semaphore: asyncio.Semaphore) -> Optional[str]:
+        try:
+            async with semaphore:
+                output = await self.call_model(
+                    self.system_prompt, format_single(segment), self._max_output_tokens([segment])
+                )
+            return output.strip() or None
+        except Exception as e:
+            self.stats["failed_segments"] += 1
+            logger.error(f"Failed to translate segment {segment.index}: {e}")
+            return None
+
+    async def _report(self, completed: int, total: int):
+        if self.on_progress:
+            result = self.on_progress(completed, total)
+            if inspect.isawaitable(result):
+                await result
@@ -0,0 +1,345 @@
+"""
+Segment-level translation memory.
+段落级翻译记忆：翻译前先按原文查找已有译文，命中的段落不再请求模型。
+
+匹配键为 (原文哈希, 目标语言, Agent风格指纹, 模型)。精确匹配只规范化首尾空白和Unicode形式；
+近似匹配另外折叠全角/半角和大小写、合并空白、忽略标点两侧的空格和句末标点；
+句中标点（负号、小数点、千位分隔符、C# 等）保留，避免含义不同的段落共用译文。
+条目数有上限，超出后按最近使用时间淘汰。
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+from datetime import datetime
+import hashlib
+import logging
+import threading
+import unicodedata
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import TranslationMemoryEntry
+
+logger = logging.getLogger(__name__)
+
+# 单次IN查询的哈希数量上限
+_LOOKUP_CHUNK = 500
+
+# 每写入这么多条检查一次容量
+_PRUNE_EVERY = 500
+
+# 近似匹配忽略的句末标点（NFKC之后）
+_TRAILING_PUNCTUATION = ".!?;:。…"
+
+
+def _sha(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def exact_key(text: str) -> str:
+    """精确匹配键：Unicode NFC + 合并空白"""
+    return _sha(" ".join(unicodedata.normalize("NFC", text).split()))
+
+
+def _is_punctuation(ch: str) -> bool:
+    return unicodedata.category(ch).startswith("P")
+
+
+def fuzzy_key(text: str) -> str:
+    """近似匹配键：NFKC（全角转半角）、小写、合并空白，去掉标点两侧的空格和句末标点"""
+    normalized = " ".join(unicodedata.normalize("NFKC", text).lower().split())
+    kept = "".join(
+        ch for i, ch in enumerate(normalized)
+        # 合并后的空格两侧都有字符
+        if ch != " " or not (_is_punctuation(normalized[i - 1]) or _is_punctuation(normalized[i + 1]))
+    )
+    return _sha(kept.rstrip(_TRAILING_PUNCTUATION))
+
+
+def style_fingerprint(system_prompt: str) -> str:
+    """Agent风格指纹：system prompt包含Agent设定和目标语言，任一变化都会产生新的指纹"""
+    return _sha(system_prompt)[:16]
+
+
+class TranslationMemory:
+    """翻译记忆存储"""
+
+    def __init__(self,
+                 session_factory: Callable[[], Session] = SessionLocal,
+                 max_entries: int = 100000,
+                 fuzzy: bool = True):
+        """
+        初始化翻译记忆
+
+        Args:
+            session_factory: 数据库会话工厂
+            max_entries: 最多保留的条目数
+            fuzzy: 是否启用近似匹配
+        """
+        self.session_factory = session_factory
+        self.max_entries = max(1, max_entries)
+        self.fuzzy = fuzzy
+
+        self._lock = threading.Lock()
+        self._exact_hits = 0
+        self._fuzzy_hits = 0
+        self._misses = 0
+        self._writes_since_prune = 0
+
+    def scope(self, target_language: str, fingerprint: str, model: str) -> "TranslationMemoryScope":
+        """
+        获取绑定了目标语言、风格指纹和模型的视图（供翻译引擎使用）
+
+        Args:
+            target_language: 目标语言
+            fingerprint: Agent风格指纹
+            model: 模型ID
+
+        Returns:
+            TranslationMemoryScope
+        """
+        return TranslationMemoryScope(self, target_language, fingerprint, model)
+
+    def lookup(self,
+               texts: Sequence[str],
+               target_language: str,
+               fingerprint: str,
+               model: str) -> List[Optional[str]]:
+        """
+        查找译文
+
+        Args:
+            texts: 原文列表
+            target_language: 目标语言
+            fingerprint: Agent风格指纹
+            model: 模型ID
+
+        Returns:
+            与原文一一对应的译文，未命中为None
+        """
+        if not texts:
+            return []
+
+        exact_keys = [exact_key(text) for text in texts]
+        fuzzy_keys = [fuzzy_key(text) for text in texts] if self.fuzzy else []
+        by_exact: Dict[str, TranslationMemoryEntry] = {}
+        by_fuzzy: Dict[str, TranslationMemoryEntry] = {}
+
+        db = self.session_factory()
+        try:
+            unique_exact = list(dict.fromkeys(exact_keys))
+            unique_fuzzy = list(dict.fromkeys(fuzzy_keys))
+            for start in range(0, max(len(unique_exact), len(unique_fuzzy)), _LOOKUP_CHUNK):
+                exact_chunk = unique_exact[start:start + _LOOKUP_CHUNK]
+                fuzzy_chunk = unique_fuzzy[start:start + _LOOKUP_CHUNK]
+                conditions = [TranslationMemoryEntry.sourceHash.in_(exact_chunk)]
+                if fuzzy_chunk:
+                    conditions.append(TranslationMemoryEntry.fuzzyHash.in_(fuzzy_chunk))
+                rows = db.query(TranslationMemoryEntry).filter(
+                    TranslationMemoryEntry.targetLanguage == target_language,
+                    TranslationMemoryEntry.fingerprint == fingerprint,
+                    TranslationMemoryEntry.model == model,
+                    or_(*conditions)
+                ).all()
+                for row in rows:
+                    by_exact[row.sourceHash] = row
+                    # 近似键可能对应多条，保留最近使用的一条
+                    current = by_fuzzy.get(row.fuzzyHash)
+                    if current is None or (row.lastUsedAt or datetime.min) > (current.lastUsedAt or datetime.min):
+                        by_fuzzy[row.fuzzyHash] = row
+
+            results: List[Optional[str]] = []
+            used = {}
+            exact_hits = fuzzy_hits = 0
+            for i, key in enumerate(exact_keys):
+                row = by_exact.get(key)
+                if row is not None:
+                    exact_hits += 1
+                elif self.fuzzy:
+                    row = by_fuzzy.get(fuzzy_keys[i])
+                    if row is not None:
+                        fuzzy_hits += 1
+                results.append(row.translation if row is not None else None)
+                if row is not None:
+                    used[row.id] = used.get(row.id, 0) + 1
+
+            for entry_id, count in used.items():
+                db.query(TranslationMemoryEntry).filter(TranslationMemoryEntry.id == entry_id).update(
+                    {
+                        TranslationMemoryEntry.hits: TranslationMemoryEntry.hits + count,
+                        TranslationMemoryEntry.lastUsedAt: datetime.utcnow()
+                    },
+                    synchronize_session=False
+                )
+            if used:
+                db.commit()
+        finally:
+            db.close()
+
+        with self._lock:
+            self._exact_hits += exact_hits
+            self._fuzzy_hits += fuzzy_hits
+            self._misses += len(texts) - exact_hits - fuzzy_hits
+        return results
+
+    def store(self,
+              sources: Sequence[str],
+              translations: Sequence[str],
+              target_language: str,
+              fingerprint: str,
+              model: str) -> int:
+        """
+        写入译文（已存在的原文跳过）
+
+        Args:
+            sources: 原文列表
+            translations: 译文列表
+            target_language: 目标语言
+            fingerprint: Agent风格指纹
+            model: 模型ID
+
+        Returns:
+            新写入的条目数
+        """
+        pairs = {}
+        for source, translation in zip(sources, translations):
+            if source.strip() and translation and translation.strip():
+                pairs.setdefault(exact_key(source), (source, translation))
+        if not pairs:
+            return 0
+
+        db = self.session_factory()
+        try:
+            existing = set()
+            keys = list(pairs)
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                existing.update(row[0] for row in db.query(TranslationMemoryEntry.sourceHash).filter(
+                    TranslationMemoryEntry.sourceHash.in_(keys[start:start + _LOOKUP_CHUNK]),
+                    TranslationMemoryEntry.targetLanguage == target_language,
+                    TranslationMemoryEntry.fingerprint == fingerprint,
+                    TranslationMemoryEntry.model == model
+                ).all())
+
+            entries = [
+                TranslationMemoryEntry(
+                    sourceHash=key,
+                    fuzzyHash=fuzzy_key(source),
+                    targetLanguage=target_language,
+                    fingerprint=fingerprint,
+                    model=model,
+                    sourceText=source,
+                    translation=translation
+                )
+                for key, (source, translation) in pairs.items() if key not in existing
+            ]
+            if not entries:
+                return 0
+            db.add_all(entries)
+            try:
+                db.commit()
+            except IntegrityError:
+                # 另一个任务同时写入了相同原文，保留先写入的译文
+                db.rollback()
+                return 0
+        finally:
+            db.close()
+
+        with self._lock:
+            self._writes_since_prune += len(entries)
+            should_prune = self._writes_since_prune >= _PRUNE_EVERY
+            if should_prune:
+                self._writes_since_prune = 0
+        if should_prune:
+            self.prune()
+        return len(entries)
+
+    def prune(self) -> int:
+        """
+        超出容量时删除最久未使用的条目
+
+        Returns:
+            删除的条目数
+        """
+        db = self.session_factory()
+        try:
+            total = db.query(func.count(TranslationMemoryEntry.id)).scalar()
+            excess = total - self.max_entries
+            if excess <= 0:
+                return 0
+            stale = db.query(TranslationMemoryEntry.id).order_by(
+                TranslationMemoryEntry.lastUsedAt
+            ).limit(excess).subquery()
+            deleted = db.query(TranslationMemoryEntry).filter(
+                TranslationMemoryEntry.id.in_(stale.select())
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        logger.info(f"Pruned {deleted} translation memory entries (max {self.max_entries})")
+        return deleted
+
+    def stats(self) -> Dict:
+        """
+        获取命中率统计（进程内计数）和条目数
+
+        Returns:
+            统计信息字典
+        """
+        db = self.session_factory()
+        try:
+            entries = db.query(func.count(TranslationMemoryEntry.id)).scalar()
+        finally:
+            db.close()
+
+        with self._lock:
+            lookups = self._exact_hits + self._fuzzy_hits + self._misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "exact_hits": self._exact_hits,
+                "fuzzy_hits": self._fuzzy_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._exact_hits + self._fuzzy_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+class TranslationMemoryScope:
+    """绑定目标语言、风格指纹和模型的翻译记忆视图"""
+
+    def __init__(self, memory: TranslationMemory, target_language: str, fingerprint: str, model: str):
+        self.memory = memory
+        self.target_language = target_language
+        self.fingerprint = fingerprint
+        self.model = model
+
+    def lookup(self, texts: Sequence[str]) -> List[Optional[str]]:
+        return self.memory.lookup(texts, self.target_language, self.fingerprint, self.model)
+
+    def store(self, sources: Sequence[str], translations: Sequence[str]) -> int:
+        return self.memory.store(sources, translations, self.target_language, self.fingerprint, self.model)
+
+
+_memory: Optional[TranslationMemory] = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory() -> Optional[TranslationMemory]:
+    """
+    获取按配置初始化的进程级翻译记忆
+
+    Returns:
+        TranslationMemory，配置中max_entries为0时返回None（禁用）
+    """
+    global _memory
+    if settings.translation_memory_max_entries <= 0:
+        return None
+    with _memory_lock:
+        if _memory is None:
+            _memory = TranslationMemory(
+                max_entries=settings.translation_memory_max_entries,
+                fuzzy=settings.translation_memory_fuzzy
+            )
+        return _memory
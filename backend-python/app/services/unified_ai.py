@@ -4,6 +4,7 @@
 """
 
 from typing import Dict, List, Optional, Any
+import asyncio
 import openai
 
 from ..models import User
@@ -78,7 +79,8 @@ class UnifiedAIClient:
             if key in kwargs:
                 params[key] = kwargs[key]
 
-        response = client.chat.completions.create(**params)
+        # SDK调用是同步的，放到线程中执行，避免阻塞事件循环（并发请求才能真正并行）
+        response = await asyncio.to_thread(client.chat.completions.create, **params)
         return response.choices[0].message.content or ""
 
     @staticmethod
@@ -0,0 +1,217 @@
+"""
+上传文件登记服务 (Upload Registry)
+上传记录保存在数据库中，多个worker进程共享，重启后不丢失：
+- 文件和网页导入的记录在保留时长后过期，图片记录不过期（文章中引用了图片地址）
+- 删除记录时，只有没有其他记录引用同一路径时才删除物理文件（内容寻址存储会共享文件）
+- 定期清理（settings.upload_sweep_enabled）：删除过期记录及其文件，以及内容寻址目录（blobs）中
+  不被任何记录引用的文件；上传目录中的其他文件（早期上传、图片、抓取缓存）不会被清理
+
+Upload records live in the database so every worker sees the same uploads;
+an opt-in sweep removes expired records, their files, and orphaned blobs.
+"""
+
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Set
+import logging
+import os
+import time
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import UploadedFile
+from ..models.uploaded_file import generate_uuid
+from ..utils.upload_store import parsed_cache_path
+from ..utils.image_pipeline import derived_paths
+
+logger = logging.getLogger(__name__)
+
+# 孤立文件清理只扫描内容寻址目录：其中的文件都由上传登记创建，其他目录可能有登记之前的文件
+_SWEEP_DIR = "blobs"
+
+
+def register_upload(db: Session,
+                    user_id: str,
+                    kind: str,
+                    path: str,
+                    size: int,
+                    sha256: Optional[str] = None,
+                    original_name: Optional[str] = None,
+                    content_type: Optional[str] = None,
+                    url: Optional[str] = None) -> UploadedFile:
+    """
+    登记一个上传文件
+
+    Args:
+        db: 数据库会话
+        user_id: 上传者
+        kind: file, image, url
+        path: 存储路径
+        size: 字节数
+        sha256: 内容哈希
+        original_name: 原始文件名
+        content_type: MIME类型
+        url: 图片访问地址或网页来源地址
+
+    Returns:
+        已提交的上传记录
+    """
+    now = datetime.utcnow()
+    expires_at = None
+    if kind != "image":
+        expires_at = now + timedelta(hours=settings.upload_retention_hours)
+    record = UploadedFile(
+        id=generate_uuid(),
+        userId=user_id,
+        kind=kind,
+        originalName=original_name,
+        contentType=content_type,
+        url=url,
+        sha256=sha256,
+        path=path,
+        size=size,
+        createdAt=now,
+        expiresAt=expires_at,
+    )
+    db.add(record)
+    db.commit()
+    return record
+
+
+def get_upload(db: Session, file_id: Optional[str]) -> Optional[UploadedFile]:
+    """按ID获取未过期的上传记录"""
+    if not file_id:
+        return None
+    record = db.get(UploadedFile, file_id)
+    if record is None or (record.expiresAt is not None and record.expiresAt <= datetime.utcnow()):
+        return None
+    return record
+
+
+def upload_info(record: UploadedFile) -> dict:
+    """接口返回的文件信息"""
+    info = {
+        "id": record.id,
+        "originalName": record.originalName,
+        "size": record.size,
+        "type": record.contentType,
+        "path": record.path,
+        "userId": record.userId,
+    }
+    if record.sha256:
+        info["sha256"] = record.sha256
+    if record.url:
+        info["url"] = record.url
+    if record.expiresAt:
+        info["expiresAt"] = record.expiresAt.isoformat()
+    return info
+
+
+def is_referenced(db: Session, path: str) -> bool:
+    """是否还有上传记录引用该路径"""
+    return db.query(UploadedFile.id).filter(UploadedFile.path == path).first() is not None
+
+
+def _remove_files(path: str) -> int:
+    """删除文件及其解析缓存（图片的清单和响应式版本随主图一起删除），返回删除的文件数"""
+    removed = 0
+    for target in [path, parsed_cache_path(path), *derived_paths(path)]:
+        try:
+            os.remove(target)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def _is_within(path: str, directory: str) -> bool:
+    directory = os.path.abspath(directory)
+    return os.path.commonpath([os.path.abspath(path), directory]) == directory
+
+
+def _is_stale(path: str, cutoff: float) -> bool:
+    """文件最后修改时间早于cutoff（刚被复用的内容寻址文件会更新修改时间）"""
+    try:
+        return os.path.getmtime(path) < cutoff
+    except FileNotFoundError:
+        return False
+
+
+def delete_upload(db: Session, record: UploadedFile) -> None:
+    """删除上传记录；没有其他记录引用同一路径时删除物理文件和解析缓存"""
+    path = record.path
+    db.delete(record)
+    db.commit()
+    if not is_referenced(db, path):
+        _remove_files(path)
+
+
+def _referenced_paths(db: Session) -> Set[str]:
+    paths = set()
+    for path, parsed_path in db.query(UploadedFile.path, UploadedFile.parsedPath):
+        paths.add(os.path.abspath(path))
+        paths.add(os.path.abspath(parsed_cache_path(path)))
+        if parsed_path:
+            paths.add(os.path.abspath(parsed_path))
+    return paths
+
+
+def sweep_uploads(session_factory: Callable[[], Session],
+                  upload_dir: Optional[str],
+                  grace_seconds: Optional[int] = None) -> Dict[str, int]:
+    """
+    清理过期的上传记录及其文件，以及内容寻址目录中的孤立文件
+
+    只删除上传登记创建的文件：过期记录指向的文件（没有其他记录引用时），和 upload_dir/blobs 下
+    不被数据库中任何记录引用的文件；两者都只删除修改时间早于宽限期的文件（同一内容刚被重新上传时，
+    新记录可能还没有提交）。session_factory 必须指向管理 upload_dir 的数据库。
+
+    Args:
+        session_factory: 数据库会话工厂
+        upload_dir: 上传目录；为None时只删除过期记录，不删除任何文件
+        grace_seconds: 只删除修改时间早于此时长的文件，默认使用配置
+
+    Returns:
+        {"records": 删除的记录数, "files": 删除的文件数}
+    """
+    grace = settings.upload_sweep_grace_seconds if grace_seconds is None else grace_seconds
+    cutoff = time.time() - grace
+    stats = {"records": 0, "files": 0}
+    referenced: Set[str] = set()
+
+    db = session_factory()
+    try:
+        # 1. 过期记录：删除记录；没有其他记录引用时删除其文件（限于上传目录内）
+        expired = db.query(UploadedFile).filter(
+            UploadedFile.expiresAt.isnot(None),
+            UploadedFile.expiresAt <= datetime.utcnow()
+        ).all()
+        paths = {record.path for record in expired}
+        for record in expired:
+            db.delete(record)
+        db.commit()
+        stats["records"] = len(expired)
+        if upload_dir is not None:
+            for path in paths:
+                if _is_within(path, upload_dir) and _is_stale(path, cutoff) and not is_referenced(db, path):
+                    stats["files"] += _remove_files(path)
+            referenced = _referenced_paths(db)
+    finally:
+        db.close()
+
+    # 2. 孤立文件：不被任何记录引用，且不是刚写入或刚被复用的文件
+    if upload_dir is not None:
+        for directory, _, files in os.walk(os.path.join(upload_dir, _SWEEP_DIR)):
+            for name in files:
+                path = os.path.join(directory, name)
+                if os.path.abspath(path) in referenced or not _is_stale(path, cutoff):
+                    continue
+                try:
+                    os.remove(path)
+                    stats["files"] += 1
+                except FileNotFoundError:
+                    pass
+
+    if stats["records"] or stats["files"]:
+        logger.info(f"Upload sweep removed {stats['records']} expired records and {stats['files']} files")
+    return stats
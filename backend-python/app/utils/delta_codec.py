@@ -0,0 +1,72 @@
+"""
+文本压缩与增量编码
+全文用zlib压缩；增量按行和HTML标签边界切分为片段，记录"复制基准的第i段起n段"和"插入文本"两种操作，
+再用zlib压缩。同一篇文章相邻版本之间通常只改动少数段落，增量远小于全文。
+"""
+
+from difflib import SequenceMatcher
+from typing import List, Union
+import json
+import re
+import zlib
+
+# 按换行和标签结束符切分，HTML正文即使没有换行也能得到较细的片段
+_TOKEN = re.compile(r"[^\n>]*[\n>]|[^\n>]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text)
+
+
+def compress_text(text: str) -> bytes:
+    """压缩全文"""
+    return zlib.compress(text.encode("utf-8"), 9)
+
+
+def decompress_text(data: bytes) -> str:
+    """解压全文"""
+    return zlib.decompress(data).decode("utf-8")
+
+
+def make_delta(base: str, target: str) -> bytes:
+    """
+    计算从base到target的增量
+
+    Args:
+        base: 基准文本
+        target: 目标文本
+
+    Returns:
+        压缩后的增量
+    """
+    a, b = _tokens(base), _tokens(target)
+    ops: List[Union[List[int], str]] = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2 - i1])
+        elif j2 > j1:
+            ops.append("".join(b[j1:j2]))
+    payload = json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(payload.encode("utf-8"), 9)
+
+
+def apply_delta(base: str, delta: bytes) -> str:
+    """
+    在base上应用增量
+
+    Args:
+        base: 基准文本（必须与计算增量时相同）
+        delta: make_delta 的结果
+
+    Returns:
+        目标文本
+    """
+    tokens = _tokens(base)
+    parts = []
+    for op in json.loads(zlib.decompress(delta).decode("utf-8")):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            start, count = op
+            parts.append("".join(tokens[start:start + count]))
+    return "".join(parts)
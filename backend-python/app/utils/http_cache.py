@@ -0,0 +1,75 @@
+"""
+HTTP条件请求（ETag / If-None-Match）
+编辑器重新聚焦时会重新请求文章、Agent和历史记录；内容未变化时返回304，不再发送正文。
+
+ETag由资源的版本号（version列）、ID集合和用户计算，客户端带If-None-Match时，
+接口先只查询这些版本信息，命中则直接返回304，无需加载和序列化正文。
+"""
+
+from typing import Any, Optional
+import hashlib
+
+from fastapi import Request, Response
+
+# 响应因用户而异，只允许浏览器缓存，每次使用前向服务器验证
+CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts: Any) -> str:
+    """
+    由版本信息计算弱ETag
+
+    Args:
+        *parts: 参与计算的值（用户ID、资源ID、版本号等）
+
+    Returns:
+        形如 W/"..." 的ETag
+    """
+    payload = "\x1f".join("" if part is None else str(part) for part in parts)
+    return f'W/"{hashlib.sha1(payload.encode("utf-8")).hexdigest()[:24]}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def has_validator(request: Request) -> bool:
+    """请求是否带有If-None-Match（没有时无需预先查询版本）"""
+    return bool(request.headers.get("if-none-match"))
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match是否包含该ETag（弱比较）"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    expected = _opaque(etag)
+    return any(_opaque(candidate) == expected for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """304响应"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"})
+
+
+def conditional(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    处理条件请求
+
+    Args:
+        request: 请求
+        response: FastAPI注入的响应（未命中时在其上设置ETag）
+        etag: 资源当前的ETag
+
+    Returns:
+        客户端缓存仍有效时返回304响应，否则返回None（调用方继续返回完整内容）
+    """
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.headers["Vary"] = "Authorization"
+    return None
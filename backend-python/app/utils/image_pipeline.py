@@ -0,0 +1,237 @@
+"""
+上传图片处理流水线
+- 在有界线程池中执行（Pillow解码、缩放、编码时释放GIL），不阻塞事件循环
+- 一次解码生成：优化后的主图（原格式）、多个宽度的WebP响应式版本、用于占位的极小模糊图
+- 结果按内容哈希命名并写入清单文件（{hash}.json），同一图片再次上传直接复用；
+  清单同时记录每个输出文件字节的哈希，作为图片服务的强ETag（重新编码的结果随Pillow版本变化，不能用上传内容的哈希）
+- 提供 srcset 生成和HTML中图片的 srcset 改写，发布文章时浏览器按屏幕宽度选择合适的版本
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import threading
+
+from PIL import Image, ImageFilter, ImageOps
+
+from ..config import settings
+
+# 主图的最大尺寸
+MAX_SIZE = (1920, 1080)
+# 占位图宽度（像素）
+PLACEHOLDER_WIDTH = 16
+# 发布HTML中图片的默认显示宽度提示
+DEFAULT_SIZES = "(max-width: 800px) 100vw, 800px"
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.image_workers or min(4, os.cpu_count() or 1),
+                thread_name_prefix="image"
+            )
+        return _executor
+
+
+def variant_widths() -> List[int]:
+    return sorted({int(w) for w in settings.image_variant_widths.split(",") if w.strip()})
+
+
+def manifest_path(directory: str, stem: str) -> str:
+    return os.path.join(directory, f"{stem}.json")
+
+
+def load_manifest(directory: str, stem: str) -> Optional[dict]:
+    """读取已处理图片的清单，不存在时返回None"""
+    try:
+        with open(manifest_path(directory, stem), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def derived_paths(path: str) -> List[str]:
+    """主图对应的清单和响应式版本文件（删除主图时一并删除）"""
+    directory = os.path.dirname(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    manifest = load_manifest(directory, stem)
+    if manifest is None:
+        return []
+    paths = [os.path.join(directory, v["file"]) for v in manifest.get("variants", [])]
+    return paths + [manifest_path(directory, stem)]
+
+
+def _save_atomic(image: Image.Image, path: str, format: str, **params) -> int:
+    """先写临时文件再重命名，并发处理同一图片时不会读到半个文件"""
+    tmp = f"{path}.tmp{threading.get_ident()}"
+    try:
+        image.save(tmp, format, **params)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return os.path.getsize(path)
+
+
+def file_hash(path: str) -> str:
+    """文件内容的哈希（取前32位，与上传文件名的长度一致）"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def _save_main(image: Image.Image, source: str, path: str, ext: str) -> None:
+    if ext in ('.jpg', '.jpeg'):
+        _save_atomic(image.convert('RGB'), path, 'JPEG', quality=85, optimize=True)  # JPEG不支持透明度
+    elif ext == '.png':
+        _save_atomic(image, path, 'PNG', optimize=True)
+    elif ext == '.webp':
+        _save_atomic(image, path, 'WEBP', quality=85)
+    elif not os.path.exists(path):
+        # 其他格式直接保存原文件
+        tmp = f"{path}.tmp{threading.get_ident()}"
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, path)
+
+
+def _placeholder(image: Image.Image) -> str:
+    """极小的模糊WebP（data URI），图片加载前占位"""
+    small = image.copy()
+    small.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH))
+    small = small.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    small.save(buffer, 'WEBP', quality=30)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def process_image(source: str, directory: str, stem: str, ext: str) -> Optional[dict]:
+    """
+    处理上传的图片（在线程池中执行）
+
+    Args:
+        source: 上传内容的临时文件（处理后由调用方删除）
+        directory: 输出目录
+        stem: 输出文件名（内容哈希）
+        ext: 主图扩展名（含点）
+
+    Returns:
+        清单 {width, height, variants: [{width, height, file, size}], placeholder, hashes: {文件名: 内容哈希}}；
+        无法解码或动图时原样保存主图，返回None
+    """
+    main_path = os.path.join(directory, f"{stem}{ext}")
+    manifest = load_manifest(directory, stem)
+    if manifest is not None and os.path.exists(main_path):
+        return manifest
+
+    try:
+        with Image.open(source) as opened:
+            if getattr(opened, "is_animated", False):
+                raise ValueError("animated image")
+            opened.load()
+            image = ImageOps.exif_transpose(opened)
+    except Exception:
+        # 动图或无法解码的图片直接保存原文件
+        if not os.path.exists(main_path):
+            os.replace(source, main_path)
+        return None
+
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    # 主图：等比缩放到最大尺寸，保存为原格式
+    if image.size[0] > MAX_SIZE[0] or image.size[1] > MAX_SIZE[1]:
+        image.thumbnail(MAX_SIZE, Image.Resampling.LANCZOS)
+    _save_main(image, source, main_path, ext)
+    width, height = image.size
+
+    # 响应式WebP版本：比主图窄的各个宽度，加上主图宽度
+    variants = []
+    for target in [w for w in variant_widths() if w < width] + [width]:
+        resized = image if target == width else image.resize(
+            (target, max(1, round(height * target / width))), Image.Resampling.LANCZOS
+        )
+        filename = f"{stem}-{target}w.webp"
+        size = _save_atomic(resized, os.path.join(directory, filename), 'WEBP',
+                            quality=settings.image_webp_quality, method=4)
+        variants.append({"width": target, "height": resized.size[1], "file": filename, "size": size})
+
+    files = [os.path.basename(main_path)] + [variant["file"] for variant in variants]
+    manifest = {
+        "width": width,
+        "height": height,
+        "variants": variants,
+        "placeholder": _placeholder(image),
+        "hashes": {name: file_hash(os.path.join(directory, name)) for name in files},
+    }
+    tmp = f"{manifest_path(directory, stem)}.tmp{threading.get_ident()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, manifest_path(directory, stem))
+    return manifest
+
+
+async def process_upload(source: str, directory: str, stem: str, ext: str) -> Optional[dict]:
+    """在图片线程池中处理上传的图片，见 process_image"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), process_image, source, directory, stem, ext)
+
+
+def srcset(manifest: dict, base_url: str) -> str:
+    """生成 srcset 属性值，base_url 为图片所在目录的URL（以/结尾）"""
+    return ", ".join(f"{base_url}{v['file']} {v['width']}w" for v in manifest["variants"])
+
+
+_IMG_TAG = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+_IMG_SRC = re.compile(
+    r'(?<![\w-])src=(["\'])((?:https?://[^/"\']+)?/api/upload/images/([^/"\']+)/)([0-9a-f]{32})\.\w+\1', re.IGNORECASE
+)
+
+
+def add_srcset(html: str, sizes: str = DEFAULT_SIZES) -> str:
+    """
+    为HTML中本站上传的图片添加 srcset/sizes/width/height（已有srcset的图片不变）
+
+    Args:
+        html: 文章HTML
+        sizes: sizes 属性值
+
+    Returns:
+        改写后的HTML
+    """
+    manifests = {}
+
+    def rewrite(match):
+        tag = match.group(0)
+        src = _IMG_SRC.search(tag)
+        if not src or re.search(r'(?<![\w-])srcset=', tag, re.IGNORECASE):
+            return tag
+        base_url, user_id, stem = src.group(2), src.group(3), src.group(4)
+        key = (user_id, stem)
+        if key not in manifests:
+            directory = os.path.join(settings.upload_dir, "images", os.path.basename(user_id))
+            manifests[key] = load_manifest(directory, stem)
+        manifest = manifests[key]
+        if not manifest or not manifest.get("variants"):
+            return tag
+        attrs = f' srcset="{srcset(manifest, base_url)}" sizes="{sizes}"'
+        if not re.search(r'(?<![\w-])width=', tag, re.IGNORECASE):
+            attrs += f' width="{manifest["width"]}" height="{manifest["height"]}"'
+        end = -2 if tag.endswith("/>") else -1
+        return tag[:end].rstrip() + attrs + tag[end:]
+
+    return _IMG_TAG.sub(rewrite, html)
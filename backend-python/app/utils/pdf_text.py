@@ -0,0 +1,135 @@
+"""
+PDF文本提取
+- 在进程池中提取，不阻塞事件循环（PyPDF2是纯Python实现，线程中执行仍会占用GIL）
+- 大文档按页码范围拆分为多个任务并行提取，按页序逐段返回，调用方可以边提取边输出
+- 页面文本放入列表后一次拼接，不在循环中做字符串累加
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _worker_count() -> int:
+    return settings.pdf_extract_workers or min(4, os.cpu_count() or 1)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """进程池（首次使用时创建；spawn启动，不继承API进程的线程和连接）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=_worker_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """关闭进程池（应用退出时调用）"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _reset_pool(pool: ProcessPoolExecutor) -> None:
+    """子进程异常退出后进程池不可再用，下次使用时重新创建"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def count_pages(path: str) -> int:
+    """PDF页数（只解析交叉引用表和页面树）"""
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def extract_pages(path: str, start: int, end: int) -> List[str]:
+    """
+    提取 [start, end) 范围内各页的文本（在子进程中执行）
+
+    Returns:
+        每页的文本，提取失败的页为空字符串
+    """
+    import PyPDF2
+
+    texts = []
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for index in range(start, min(end, len(reader.pages))):
+            try:
+                texts.append(reader.pages[index].extract_text() or "")
+            except Exception as e:
+                logger.warning(f"Failed to extract page {index} of {path}: {e}")
+                texts.append("")
+    return texts
+
+
+def page_ranges(pages: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    """把页码拆分为 [start, end) 范围"""
+    step = max(1, pages_per_task)
+    return [(start, min(start + step, pages)) for start in range(0, pages, step)]
+
+
+async def iter_pdf_pages(path: str) -> AsyncIterator[Tuple[int, str]]:
+    """
+    并行提取PDF各页文本，按页序逐页返回
+
+    所有页码范围同时提交给进程池，前面的范围完成后立即输出，不等待整个文档。
+
+    Args:
+        path: PDF文件路径
+
+    Yields:
+        (页码（从0开始）, 页面文本)
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        pages = await loop.run_in_executor(pool, count_pages, path)
+        futures = [
+            loop.run_in_executor(pool, extract_pages, path, start, end)
+            for start, end in page_ranges(pages, settings.pdf_pages_per_task)
+        ]
+        try:
+            index = 0
+            for future in futures:
+                for text in await future:
+                    yield index, text
+                    index += 1
+        finally:
+            # 调用方提前结束（如客户端断开）时取消尚未开始的范围
+            for future in futures:
+                future.cancel()
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise
+
+
+async def extract_pdf_text(path: str) -> str:
+    """提取整个PDF的文本，每页以换行结尾"""
+    parts = []
+    async for _, text in iter_pdf_pages(path):
+        parts.append(text)
+        parts.append("\n")
+    return "".join(parts)
@@ -87,4 +87,38 @@ def verify_token(token: str) -> dict:
         )
         return payload
     except JWTError:
-        raise ValueError("Invalid token")
\ No newline at end of file
+        raise ValueError("Invalid token")
+
+# 任务进度推送令牌的用途，普通访问令牌不能用于该接口的查询参数，反之亦然
+TASK_EVENTS_SCOPE = "task_events"
+
+
+def create_task_events_token(user_id: str, task_id: str) -> str:
+    """
+    创建任务进度推送（SSE）的短期令牌
+
+    浏览器的 EventSource 不能发送 Authorization 头，令牌放在查询参数中；
+    只对一个任务有效且很快过期，出现在访问日志中也不会泄露登录令牌。
+    """
+    expire = datetime.utcnow() + timedelta(seconds=settings.task_events_token_seconds)
+    return jwt.encode(
+        {"user_id": user_id, "task_id": task_id, "scope": TASK_EVENTS_SCOPE, "exp": expire},
+        settings.jwt_secret,
+        algorithm=settings.jwt_algorithm
+    )
+
+
+def verify_task_events_token(token: str, task_id: str) -> str:
+    """
+    验证任务进度推送令牌
+
+    Returns:
+        用户ID
+
+    Raises:
+        ValueError: 令牌无效、过期或不属于该任务
+    """
+    payload = verify_token(token)
+    if payload.get("scope") != TASK_EVENTS_SCOPE or payload.get("task_id") != task_id or not payload.get("user_id"):
+        raise ValueError("Invalid token")
+    return payload["user_id"]
@@ -0,0 +1,110 @@
+"""
+上传图片的静态服务
+图片文件名按内容唯一（内容哈希，早期上传为UUID），同一URL的内容不会改变：
+- 响应带长期缓存和 immutable，浏览器和CDN不再重复请求
+- 强ETag取自清单中记录的文件字节哈希（主图和WebP版本都是重新编码的，与上传内容的哈希不同）；
+  没有清单的文件是原样保存的上传内容，文件名即内容哈希；清单中没有哈希的早期图片使用弱ETag。
+  If-None-Match 命中返回304
+- 由 FileResponse 处理 Range / If-Range（206）和 HEAD；服务器支持 http.response.pathsend 时由服务器直接发送文件
+- 可选把图片目录挂载为静态文件（settings.image_static_mount），不经过路由和依赖注入
+"""
+
+from functools import lru_cache
+from typing import Optional
+import os
+import re
+
+from fastapi import Request
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from .http_cache import etag_matches
+from .image_pipeline import load_manifest
+
+# 一年，且告诉浏览器在有效期内刷新页面也无需验证
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg'}
+
+# WebP响应式版本的宽度后缀（{hash}-480w.webp）
+_VARIANT_SUFFIX = re.compile(r"-\d+w$")
+
+
+def is_image_file(filename: str) -> bool:
+    """只提供图片文件（同目录下的清单和临时文件不对外）"""
+    return (os.path.basename(filename) == filename and not filename.startswith(".")
+            and os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS)
+
+
+@lru_cache(maxsize=4096)
+def _image_etag(path: str, mtime_ns: int) -> str:
+    # 按文件修改时间缓存，重新处理图片后自动失效
+    directory, filename = os.path.split(path)
+    name = os.path.splitext(filename)[0]
+    manifest = load_manifest(directory, _VARIANT_SUFFIX.sub("", name))
+    if manifest is None:
+        # 原样保存的上传文件（文件名即内容哈希）或早期的UUID文件名
+        return f'"{name}"'
+    digest = manifest.get("hashes", {}).get(filename)
+    if digest:
+        return f'"{digest}"'
+    # 早期处理的图片没有记录文件哈希，重新编码的内容不保证逐字节一致
+    return f'W/"{name}"'
+
+
+def image_etag(path: str, stat_result: os.stat_result) -> str:
+    """
+    图片的ETag
+
+    Args:
+        path: 图片文件路径
+        stat_result: 图片的文件信息
+
+    Returns:
+        清单中记录的内容哈希（强ETag）；没有清单时取文件名；清单中没有哈希时为弱ETag
+    """
+    return _image_etag(path, stat_result.st_mtime_ns)
+
+
+def image_headers(path: str, stat_result: os.stat_result) -> dict:
+    return {"ETag": image_etag(path, stat_result), "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+
+
+def image_response(request: Request, path: str, stat_result: Optional[os.stat_result] = None) -> Response:
+    """
+    图片响应
+
+    Args:
+        request: 请求
+        path: 图片文件路径
+        stat_result: 已获取的文件信息（省去FileResponse中再次stat）
+
+    Returns:
+        客户端缓存有效时返回304，否则返回支持Range的文件响应
+    """
+    if stat_result is None:
+        stat_result = os.stat(path)
+    headers = image_headers(path, stat_result)
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers, stat_result=stat_result)
+
+
+class ImageStaticFiles(StaticFiles):
+    """图片目录的静态文件挂载：只提供图片文件，使用与接口相同的缓存头"""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if not is_image_file(os.path.basename(path)):
+            return Response("Not Found", status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result,
+                                headers=image_headers(full_path, stat_result))
+        # Starlette 的 is_not_modified 不能匹配弱ETag，ETag 使用与接口相同的弱比较
+        if status_code == 200 and (etag_matches(Request(scope), response.headers["etag"])
+                                   or self.is_not_modified(response.headers, Headers(scope=scope))):
+            return NotModifiedResponse(response.headers)
+        return response
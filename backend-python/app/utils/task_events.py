@@ -0,0 +1,159 @@
+"""
+任务进度推送
+进程内发布/订阅：TaskTracker写入任务后把最新状态推送给订阅者（SSE连接）。
+其他进程（独立worker或其他API worker）写入的更新由每个进程一个的轮询器合并查询后转发，
+不论有多少连接订阅，每个进程每个间隔只查询一次数据库。
+"""
+
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Set
+from collections import deque
+from datetime import datetime
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 批量查询任务快照：任务ID列表 -> 任务信息列表
+SnapshotFetcher = Callable[[Sequence[str]], List[Dict[str, Any]]]
+
+
+def _updated_at(snapshot: Dict[str, Any]) -> Optional[datetime]:
+    value = snapshot.get("updated_at")
+    return datetime.fromisoformat(value) if value else None
+
+
+class TaskSubscription:
+    """一个订阅者的事件队列（只在所属事件循环中读写）"""
+
+    def __init__(self, task_id: str, loop: asyncio.AbstractEventLoop):
+        self.task_id = task_id
+        self.loop = loop
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._ready = asyncio.Event()
+        self._last_status: Optional[str] = None
+        self._last_updated: Optional[datetime] = None
+
+    def push(self, snapshot: Dict[str, Any]):
+        """
+        加入一个任务快照：早于已收到状态的快照丢弃；
+        状态未变化时只保留最新的进度，状态转换不会被合并
+        """
+        updated = _updated_at(snapshot)
+        if self._last_updated is not None and updated is not None and updated <= self._last_updated:
+            return
+        self._last_updated = updated or self._last_updated
+
+        if self._events and self._events[-1]["status"] == snapshot["status"]:
+            self._events[-1] = snapshot
+        else:
+            self._events.append(snapshot)
+        self._ready.set()
+
+    async def get(self) -> Dict[str, Any]:
+        """等待下一个快照"""
+        await self._ready.wait()
+        snapshot = self._events.popleft()
+        if not self._events:
+            self._ready.clear()
+        return snapshot
+
+    def kind(self, snapshot: Dict[str, Any]) -> str:
+        """事件类型：状态变化为 state，否则为 progress"""
+        status = str(snapshot["status"])
+        changed = status != self._last_status
+        self._last_status = status
+        return "state" if changed else "progress"
+
+
+class TaskEventBus:
+    """任务事件总线"""
+
+    def __init__(self, fetch: Optional[SnapshotFetcher] = None, poll_interval: float = 1.0):
+        """
+        初始化事件总线
+
+        Args:
+            fetch: 批量查询任务快照，用于转发其他进程写入的更新；None表示只推送本进程的更新
+            poll_interval: 轮询间隔（秒），0表示不轮询
+        """
+        self.fetch = fetch
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[str, Set[TaskSubscription]] = {}
+        self._lock = threading.Lock()
+        self._pollers: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+
+    def has_subscribers(self, task_id: str) -> bool:
+        return task_id in self._subscribers
+
+    def subscribe(self, task_id: str) -> TaskSubscription:
+        """
+        订阅任务（需在事件循环中调用，结束后调用 unsubscribe）
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            TaskSubscription
+        """
+        loop = asyncio.get_running_loop()
+        subscription = TaskSubscription(task_id, loop)
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(subscription)
+        self._ensure_poller(loop)
+        return subscription
+
+    def unsubscribe(self, subscription: TaskSubscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.task_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.task_id]
+
+    def publish(self, task_id: str, snapshot: Dict[str, Any]):
+        """
+        推送任务快照（线程安全，可在worker线程中调用）
+
+        Args:
+            task_id: 任务ID
+            snapshot: 任务信息
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(task_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, snapshot)
+            except RuntimeError:
+                # 订阅者所在的事件循环已关闭
+                self.unsubscribe(subscription)
+
+    def _ensure_poller(self, loop: asyncio.AbstractEventLoop):
+        if self.fetch is None or self.poll_interval <= 0:
+            return
+        poller = self._pollers.get(loop)
+        if poller is None or poller.done():
+            self._pollers[loop] = loop.create_task(self._poll(loop))
+
+    async def _poll(self, loop: asyncio.AbstractEventLoop):
+        """合并查询本事件循环中所有订阅的任务，没有订阅者时退出"""
+        try:
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                with self._lock:
+                    task_ids = [
+                        task_id for task_id, subscribers in self._subscribers.items()
+                        if any(s.loop is loop for s in subscribers)
+                    ]
+                if not task_ids:
+                    return
+                try:
+                    snapshots = await asyncio.to_thread(self.fetch, task_ids)
+                except Exception as e:
+                    logger.warning(f"Task event poll failed: {e}")
+                    continue
+                for snapshot in snapshots:
+                    self.publish(snapshot["id"], snapshot)
+        finally:
+            if self._pollers.get(loop) is asyncio.current_task():
+                del self._pollers[loop]
@@ -1,12 +1,30 @@
 """
 后台任务跟踪系统
-用于跟踪长时间运行的异步任务（如文章翻译）
+用于跟踪长时间运行的异步任务（如文章翻译、知识库构建）。
+
+任务保存在数据库中，API进程和独立worker进程（python -m app.worker）共享同一份状态：
+worker按租约领取任务并定期续约，崩溃后租约过期，任务会被其他worker重新领取；
+失败的任务按退避时间重试，超过最大次数后标记为失败，完成的任务保留一段时间后清理。
 """
 
-from typing import Dict, Any, Optional
-from datetime import datetime
-import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from datetime import datetime, timedelta
 from enum import Enum
+import json
+import logging
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Task
+from .task_events import TaskEventBus
+
+logger = logging.getLogger(__name__)
+
+# 每次领取时检查的候选任务数（其他worker可能抢先领取）
+_CLAIM_CANDIDATES = 8
 
 
 class TaskStatus(str, Enum):
@@ -17,102 +35,371 @@ class TaskStatus(str, Enum):
     FAILED = "failed"
 
 
+class PermanentTaskError(Exception):
+    """不可重试的任务错误（如文章不存在），任务直接标记为失败"""
+    pass
+
+
+def _dumps(value: Any) -> Optional[str]:
+    return json.dumps(value, ensure_ascii=False) if value is not None else None
+
+
+def _loads(value: Optional[str]) -> Any:
+    return json.loads(value) if value else None
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
 class TaskTracker:
-    """任务跟踪器（内存存储）"""
+    """任务跟踪器（数据库存储）"""
+
+    def __init__(self,
+                 session_factory: Callable[[], Session] = SessionLocal,
+                 events_poll_interval: Optional[float] = None):
+        """
+        初始化任务跟踪器
 
-    # 使用类变量存储所有任务
-    _tasks: Dict[str, Dict[str, Any]] = {}
+        Args:
+            session_factory: 数据库会话工厂
+            events_poll_interval: 转发其他进程写入的进度的轮询间隔（秒），默认使用配置，0表示不转发
+        """
+        self.session_factory = session_factory
+        if events_poll_interval is None:
+            events_poll_interval = settings.task_events_poll_interval
+        self.events = TaskEventBus(fetch=self.get_tasks, poll_interval=events_poll_interval)
 
-    @classmethod
-    def create_task(cls, task_type: str, **metadata) -> str:
+    def create_task(self,
+                    task_type: str,
+                    user_id: Optional[str] = None,
+                    max_attempts: Optional[int] = None,
+                    **payload) -> str:
         """
         创建新任务
 
         Args:
             task_type: 任务类型（如 'translate_article'）
-            **metadata: 任务相关的元数据
+            user_id: 任务所属用户
+            max_attempts: 最多执行次数，默认使用配置
+            **payload: 任务参数（需可JSON序列化）
 
         Returns:
             任务ID
         """
-        task_id = str(uuid.uuid4())
-        cls._tasks[task_id] = {
-            "id": task_id,
-            "type": task_type,
-            "status": TaskStatus.PENDING,
-            "progress": 0,
-            "total": 0,
-            "current_step": None,
-            "result": None,
-            "error": None,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
-            **metadata
-        }
-        return task_id
+        now = datetime.utcnow()
+        task = Task(
+            type=task_type,
+            userId=user_id,
+            payload=_dumps(payload),
+            status=TaskStatus.PENDING.value,
+            maxAttempts=max_attempts or settings.task_max_attempts,
+            runAfter=now,
+            createdAt=now,
+            updatedAt=now
+        )
+        db = self.session_factory()
+        try:
+            db.add(task)
+            db.commit()
+            return task.id
+        finally:
+            db.close()
 
-    @classmethod
     def update_task(
-        cls,
+        self,
         task_id: str,
         status: Optional[TaskStatus] = None,
         progress: Optional[int] = None,
         total: Optional[int] = None,
         current_step: Optional[str] = None,
         result: Optional[Any] = None,
-        error: Optional[str] = None,
-        **extra_data
+        error: Optional[str] = None
     ):
-        """更新任务状态"""
-        if task_id not in cls._tasks:
-            raise ValueError(f"Task {task_id} not found")
-
-        task = cls._tasks[task_id]
-
+        """更新任务状态和进度"""
+        values: Dict[Any, Any] = {Task.updatedAt: datetime.utcnow()}
         if status is not None:
-            task["status"] = status
+            values[Task.status] = TaskStatus(status).value
+            if status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+                values[Task.finishedAt] = values[Task.updatedAt]
         if progress is not None:
-            task["progress"] = progress
+            values[Task.progress] = progress
         if total is not None:
-            task["total"] = total
+            values[Task.total] = total
         if current_step is not None:
-            task["current_step"] = current_step
+            values[Task.currentStep] = current_step
         if result is not None:
-            task["result"] = result
+            values[Task.result] = _dumps(result)
         if error is not None:
-            task["error"] = error
+            values[Task.error] = error
 
-        task["updated_at"] = datetime.now().isoformat()
-        task.update(extra_data)
+        db = self.session_factory()
+        try:
+            updated = db.query(Task).filter(Task.id == task_id).update(values, synchronize_session=False)
+            db.commit()
+            if updated:
+                self._publish(db, task_id)
+        finally:
+            db.close()
+        if not updated:
+            raise ValueError(f"Task {task_id} not found")
 
-    @classmethod
-    def get_task(cls, task_id: str) -> Optional[Dict[str, Any]]:
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """获取任务信息"""
-        return cls._tasks.get(task_id)
+        db = self.session_factory()
+        try:
+            task = db.query(Task).filter(Task.id == task_id).first()
+            return self._to_dict(task) if task else None
+        finally:
+            db.close()
 
-    @classmethod
-    def delete_task(cls, task_id: str):
+    def get_tasks(self, task_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """批量获取任务信息（不存在的任务忽略）"""
+        if not task_ids:
+            return []
+        db = self.session_factory()
+        try:
+            return [self._to_dict(task) for task in db.query(Task).filter(Task.id.in_(list(task_ids)))]
+        finally:
+            db.close()
+
+    def delete_task(self, task_id: str):
         """删除任务"""
-        if task_id in cls._tasks:
-            del cls._tasks[task_id]
-
-    @classmethod
-    def cleanup_old_tasks(cls, max_age_hours: int = 24):
-        """清理旧任务"""
-        from datetime import timedelta
-        now = datetime.now()
-        cutoff = now - timedelta(hours=max_age_hours)
-
-        to_delete = []
-        for task_id, task in cls._tasks.items():
-            created_at = datetime.fromisoformat(task["created_at"])
-            if created_at < cutoff:
-                to_delete.append(task_id)
-
-        for task_id in to_delete:
-            del cls._tasks[task_id]
-
-        return len(to_delete)
+        db = self.session_factory()
+        try:
+            db.query(Task).filter(Task.id == task_id).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def cleanup_old_tasks(self, max_age_hours: Optional[int] = None) -> int:
+        """
+        清理已结束的旧任务
+
+        Args:
+            max_age_hours: 保留时长（小时），默认使用配置
+
+        Returns:
+            删除的任务数
+        """
+        hours = settings.task_retention_hours if max_age_hours is None else max_age_hours
+        cutoff = datetime.utcnow() - timedelta(hours=hours)
+        db = self.session_factory()
+        try:
+            deleted = db.query(Task).filter(
+                Task.status.in_([TaskStatus.COMPLETED.value, TaskStatus.FAILED.value]),
+                Task.finishedAt < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        if deleted:
+            logger.info(f"Cleaned up {deleted} finished tasks older than {hours}h")
+        return deleted
+
+    # ---- worker 接口 ----
+
+    def claim(self,
+              worker_id: str,
+              lease_seconds: int,
+              types: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        领取一个可执行的任务：等待中且已到重试时间，或租约已过期（原worker崩溃）
+
+        领取通过带条件的UPDATE完成，多个worker同时领取同一任务时只有一个成功。
+
+        Args:
+            worker_id: worker标识
+            lease_seconds: 租约时长（秒）
+            types: 只领取这些类型的任务，None表示全部
+
+        Returns:
+            任务信息，没有可执行的任务时返回None
+        """
+        now = datetime.utcnow()
+        claimable = or_(
+            and_(Task.status == TaskStatus.PENDING.value, Task.runAfter <= now),
+            and_(
+                Task.status == TaskStatus.RUNNING.value,
+                Task.leaseExpiresAt < now,
+                Task.attempts < Task.maxAttempts
+            )
+        )
+
+        db = self.session_factory()
+        try:
+            self._fail_abandoned(db, now)
+
+            query = db.query(Task.id).filter(claimable)
+            if types is not None:
+                query = query.filter(Task.type.in_(list(types)))
+            candidates = [row[0] for row in query.order_by(Task.createdAt).limit(_CLAIM_CANDIDATES)]
+
+            for task_id in candidates:
+                claimed = db.query(Task).filter(Task.id == task_id, claimable).update(
+                    {
+                        Task.status: TaskStatus.RUNNING.value,
+                        Task.attempts: Task.attempts + 1,
+                        Task.leaseOwner: worker_id,
+                        Task.leaseExpiresAt: now + timedelta(seconds=lease_seconds),
+                        Task.heartbeatAt: now,
+                        Task.updatedAt: now
+                    },
+                    synchronize_session=False
+                )
+                db.commit()
+                if claimed:
+                    task = self._to_dict(db.query(Task).filter(Task.id == task_id).one())
+                    self.events.publish(task_id, task)
+                    return task
+            return None
+        finally:
+            db.close()
+
+    def heartbeat(self, task_id: str, worker_id: str, lease_seconds: int) -> bool:
+        """
+        续约
+
+        Returns:
+            租约仍属于该worker时返回True；租约已被其他worker接管时返回False
+        """
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            renewed = db.query(Task).filter(
+                Task.id == task_id,
+                Task.leaseOwner == worker_id,
+                Task.status == TaskStatus.RUNNING.value
+            ).update(
+                {Task.leaseExpiresAt: now + timedelta(seconds=lease_seconds), Task.heartbeatAt: now},
+                synchronize_session=False
+            )
+            db.commit()
+            return bool(renewed)
+        finally:
+            db.close()
+
+    def complete(self, task_id: str, worker_id: str, result: Any = None) -> bool:
+        """标记任务完成（仅当租约仍属于该worker）"""
+        now = datetime.utcnow()
+        values = {
+            Task.status: TaskStatus.COMPLETED.value,
+            Task.leaseOwner: None,
+            Task.leaseExpiresAt: None,
+            Task.updatedAt: now,
+            Task.finishedAt: now
+        }
+        if result is not None:
+            values[Task.result] = _dumps(result)
+        return self._finish(task_id, worker_id, values)
+
+    def fail(self, task_id: str, worker_id: str, error: str, retry: bool = True) -> Optional[TaskStatus]:
+        """
+        记录任务失败：未超过最大次数时按指数退避重新排队，否则标记为失败
+
+        Args:
+            task_id: 任务ID
+            worker_id: worker标识
+            error: 错误信息
+            retry: 是否允许重试
+
+        Returns:
+            任务的新状态，租约已不属于该worker时返回None
+        """
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            task = db.query(Task).filter(Task.id == task_id, Task.leaseOwner == worker_id).first()
+            if task is None:
+                return None
+            if retry and task.attempts < task.maxAttempts:
+                delay = settings.task_retry_backoff_seconds * 2 ** max(0, task.attempts - 1)
+                task.status = TaskStatus.PENDING.value
+                task.runAfter = now + timedelta(seconds=delay)
+                logger.warning(f"Task {task_id} failed (attempt {task.attempts}/{task.maxAttempts}), retrying in {delay}s: {error}")
+            else:
+                task.status = TaskStatus.FAILED.value
+                task.finishedAt = now
+            task.error = error
+            task.leaseOwner = None
+            task.leaseExpiresAt = None
+            task.updatedAt = now
+            db.commit()
+            self._publish(db, task_id)
+            return TaskStatus(task.status)
+        finally:
+            db.close()
+
+    def release(self, task_id: str, worker_id: str) -> bool:
+        """worker正常退出时交还未完成的任务，不计入执行次数"""
+        return self._finish(task_id, worker_id, {
+            Task.status: TaskStatus.PENDING.value,
+            Task.attempts: Task.attempts - 1,
+            Task.leaseOwner: None,
+            Task.leaseExpiresAt: None,
+            Task.updatedAt: datetime.utcnow()
+        })
+
+    def _finish(self, task_id: str, worker_id: str, values: Dict[Any, Any]) -> bool:
+        db = self.session_factory()
+        try:
+            updated = db.query(Task).filter(
+                Task.id == task_id, Task.leaseOwner == worker_id
+            ).update(values, synchronize_session=False)
+            db.commit()
+            if updated:
+                self._publish(db, task_id)
+            return bool(updated)
+        finally:
+            db.close()
+
+    def _publish(self, db: Session, task_id: str):
+        """把任务的最新状态推送给本进程的订阅者"""
+        if not self.events.has_subscribers(task_id):
+            return
+        task = db.query(Task).filter(Task.id == task_id).first()
+        if task is not None:
+            self.events.publish(task_id, self._to_dict(task))
+
+    def _fail_abandoned(self, db: Session, now: datetime):
+        """租约过期且已用完执行次数的任务（反复导致worker崩溃）不再领取"""
+        abandoned = db.query(Task).filter(
+            Task.status == TaskStatus.RUNNING.value,
+            Task.leaseExpiresAt < now,
+            Task.attempts >= Task.maxAttempts
+        ).update(
+            {
+                Task.status: TaskStatus.FAILED.value,
+                Task.error: "Worker lost (lease expired)",
+                Task.leaseOwner: None,
+                Task.updatedAt: now,
+                Task.finishedAt: now
+            },
+            synchronize_session=False
+        )
+        if abandoned:
+            db.commit()
+            logger.warning(f"Marked {abandoned} abandoned tasks as failed")
+
+    @staticmethod
+    def _to_dict(task: Task) -> Dict[str, Any]:
+        return {
+            "id": task.id,
+            "type": task.type,
+            "user_id": task.userId,
+            "payload": _loads(task.payload) or {},
+            "status": TaskStatus(task.status),
+            "progress": task.progress or 0,
+            "total": task.total or 0,
+            "current_step": task.currentStep,
+            "result": _loads(task.result),
+            "error": task.error,
+            "attempts": task.attempts or 0,
+            "max_attempts": task.maxAttempts,
+            "created_at": _isoformat(task.createdAt),
+            "updated_at": _isoformat(task.updatedAt),
+            "finished_at": _isoformat(task.finishedAt)
+        }
 
 
 # 全局任务跟踪器实例
@@ -0,0 +1,140 @@
+"""
+上传文件的流式保存与内容寻址存储
+- 按块把上传内容写入磁盘，超过大小限制立即中止，不把整个文件读入内存
+- 写入的同时计算SHA-256，文件以哈希命名（uploads/blobs/ab/abcdef....pdf），
+  内容相同的文件只保存一份，解析结果也按哈希缓存，重复上传不再重新解析
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+import hashlib
+import os
+import tempfile
+
+from fastapi import UploadFile
+
+from ..config import settings
+
+
+class UploadTooLarge(Exception):
+    """上传内容超过大小限制"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"File too large (max {limit // (1024 * 1024)}MB)")
+        self.limit = limit
+
+
+@dataclass
+class StoredUpload:
+    sha256: str
+    path: str
+    size: int
+    created: bool  # False 表示内容已存在，未写入新文件
+
+
+def blob_dir() -> str:
+    return os.path.join(settings.upload_dir, "blobs")
+
+
+def blob_path(sha256: str, ext: str) -> str:
+    """内容寻址路径：按哈希前两位分目录"""
+    return os.path.join(blob_dir(), sha256[:2], f"{sha256}{ext}")
+
+
+async def stream_to_file(upload: UploadFile, path: str, max_size: int) -> tuple:
+    """
+    把上传内容按块写入文件，同时计算SHA-256
+
+    Args:
+        upload: 上传的文件
+        path: 目标文件路径
+        max_size: 大小上限（字节）
+
+    Returns:
+        (sha256, 字节数)
+
+    Raises:
+        UploadTooLarge: 超过大小上限（已写入的部分会被删除）
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        # 客户端声明的大小已超限时不必读取
+        if upload.size is not None and upload.size > max_size:
+            raise UploadTooLarge(max_size)
+        with open(path, "wb") as f:
+            while True:
+                chunk = await upload.read(settings.upload_chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(max_size)
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return digest.hexdigest(), size
+
+
+async def stream_to_temp(upload: UploadFile, directory: str, max_size: int) -> tuple:
+    """
+    把上传内容流式写入目录中的临时文件（与最终文件同一文件系统，之后可原子重命名）
+
+    Returns:
+        (临时文件路径, sha256, 字节数)
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    os.close(fd)
+    sha256, size = await stream_to_file(upload, tmp_path, max_size)
+    return tmp_path, sha256, size
+
+
+async def store_upload(upload: UploadFile, ext: str, max_size: int) -> StoredUpload:
+    """
+    流式保存上传文件到内容寻址存储
+
+    Args:
+        upload: 上传的文件
+        ext: 保存的扩展名（含点）
+        max_size: 大小上限（字节）
+
+    Returns:
+        保存结果；内容已存在时直接返回已有文件
+    """
+    tmp_path, sha256, size = await stream_to_temp(upload, blob_dir(), max_size)
+    path = blob_path(sha256, ext)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        # 内容已存在：更新修改时间，清理任务不会删除刚被复用的文件
+        os.utime(path)
+        os.remove(tmp_path)
+        return StoredUpload(sha256=sha256, path=path, size=size, created=False)
+    except FileNotFoundError:
+        pass
+    os.replace(tmp_path, path)
+    return StoredUpload(sha256=sha256, path=path, size=size, created=True)
+
+
+def parsed_cache_path(path: str) -> str:
+    """解析结果缓存文件（与内容寻址文件放在一起）"""
+    return f"{path}.parsed.txt"
+
+
+def read_parsed(path: str) -> Optional[str]:
+    cache = parsed_cache_path(path)
+    if os.path.exists(cache):
+        with open(cache, "r", encoding="utf-8") as f:
+            return f.read()
+    return None
+
+
+def write_parsed(path: str, content: str) -> None:
+    cache = parsed_cache_path(path)
+    tmp = f"{cache}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp, cache)
@@ -0,0 +1,217 @@
+"""
+Background task worker.
+后台任务worker：从数据库领取任务并执行，可与API进程内的worker并存，也可以多进程部署。
+
+用法:
+    python -m app.worker
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+
+from .config import settings
+from .utils.task_tracker import TaskTracker, task_tracker, PermanentTaskError
+from .services.upload_registry import sweep_uploads
+
+logger = logging.getLogger(__name__)
+
+# 任务处理函数：接收任务信息，返回任务结果
+TaskHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+# 清理已结束任务和过期上传文件的间隔（秒）
+_CLEANUP_INTERVAL = 3600
+
+
+def default_handlers() -> Dict[str, TaskHandler]:
+    """按任务类型注册的处理函数"""
+    from .services.article_translation import translate_article_job
+    from .services.knowledge_service import build_knowledge_job
+
+    return {
+        "translate_article": translate_article_job,
+        "build_knowledge": build_knowledge_job,
+    }
+
+
+class TaskWorker:
+    """任务worker"""
+
+    def __init__(self,
+                 tracker: TaskTracker = task_tracker,
+                 handlers: Optional[Dict[str, TaskHandler]] = None,
+                 concurrency: Optional[int] = None,
+                 poll_interval: Optional[float] = None,
+                 lease_seconds: Optional[int] = None,
+                 heartbeat_seconds: Optional[float] = None,
+                 types: Optional[Iterable[str]] = None):
+        """
+        初始化worker（未指定的参数使用配置）
+
+        Args:
+            tracker: 任务存储
+            handlers: 任务类型 -> 处理函数
+            concurrency: 同时执行的任务数
+            poll_interval: 没有任务时的轮询间隔（秒）
+            lease_seconds: 租约时长（秒）
+            heartbeat_seconds: 续约间隔（秒）
+            types: 只执行这些类型的任务，默认为handlers中的全部类型
+        """
+        self.tracker = tracker
+        self.handlers = handlers if handlers is not None else default_handlers()
+        self.concurrency = max(1, concurrency or settings.task_worker_concurrency)
+        self.poll_interval = poll_interval or settings.task_poll_interval
+        self.lease_seconds = lease_seconds or settings.task_lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds or settings.task_heartbeat_seconds
+        self.types = list(types) if types is not None else list(self.handlers)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def run_once(self) -> bool:
+        """
+        领取并执行一个任务
+
+        Returns:
+            是否领取到任务
+        """
+        task = await asyncio.to_thread(self.tracker.claim, self.worker_id, self.lease_seconds, self.types)
+        if task is None:
+            return False
+        await self.execute(task)
+        return True
+
+    async def execute(self, task: Dict[str, Any]):
+        """执行已领取的任务，执行期间定期续约"""
+        task_id = task["id"]
+        handler = self.handlers.get(task["type"])
+        if handler is None:
+            await asyncio.to_thread(
+                self.tracker.fail, task_id, self.worker_id, f"Unknown task type: {task['type']}", False
+            )
+            return
+
+        logger.info(f"▶️ [Task {task_id}] Running {task['type']} (attempt {task['attempts']}/{task['max_attempts']})")
+        job = asyncio.ensure_future(handler(task))
+        lease_lost = asyncio.Event()
+        heartbeat = asyncio.create_task(self._heartbeat(task_id, job, lease_lost))
+        try:
+            result = await job
+        except asyncio.CancelledError:
+            if lease_lost.is_set():
+                # 任务已被其他worker接管，放弃本次结果
+                logger.warning(f"[Task {task_id}] Lease lost, abandoned")
+                return
+            # worker退出：交还任务，由其他worker继续
+            await asyncio.to_thread(self.tracker.release, task_id, self.worker_id)
+            raise
+        except PermanentTaskError as e:
+            logger.error(f"❌ [Task {task_id}] Failed: {e}")
+            await asyncio.to_thread(self.tracker.fail, task_id, self.worker_id, str(e), False)
+        except Exception as e:
+            logger.error(f"❌ [Task {task_id}] Failed: {e}")
+            await asyncio.to_thread(self.tracker.fail, task_id, self.worker_id, str(e), True)
+        else:
+            await asyncio.to_thread(self.tracker.complete, task_id, self.worker_id, result)
+            logger.info(f"✅ [Task {task_id}] Completed")
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, task_id: str, job: asyncio.Future, lease_lost: asyncio.Event):
+        while not job.done():
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                alive = await asyncio.to_thread(self.tracker.heartbeat, task_id, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                # 续约失败（如数据库暂时不可用）时继续执行，下次再试
+                logger.warning(f"[Task {task_id}] Heartbeat failed: {e}")
+                continue
+            if not alive:
+                lease_lost.set()
+                job.cancel()
+                return
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """
+        持续领取并执行任务，直到stop被设置
+
+        Args:
+            stop: 停止信号
+        """
+        stop = stop or asyncio.Event()
+        running = set()
+        last_cleanup = 0.0
+        logger.info(f"Task worker {self.worker_id} started (types={self.types}, concurrency={self.concurrency})")
+
+        try:
+            while not stop.is_set():
+                if time.monotonic() - last_cleanup > _CLEANUP_INTERVAL:
+                    last_cleanup = time.monotonic()
+                    try:
+                        await asyncio.to_thread(self.tracker.cleanup_old_tasks)
+                    except Exception as e:
+                        logger.warning(f"Task cleanup failed: {e}")
+                    # 过期的上传记录总是删除；只有开启清理时才删除文件
+                    try:
+                        await asyncio.to_thread(
+                            sweep_uploads, self.tracker.session_factory,
+                            settings.upload_dir if settings.upload_sweep_enabled else None
+                        )
+                    except Exception as e:
+                        logger.warning(f"Upload sweep failed: {e}")
+
+                task = None
+                if len(running) < self.concurrency:
+                    try:
+                        task = await asyncio.to_thread(
+                            self.tracker.claim, self.worker_id, self.lease_seconds, self.types
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to claim task: {e}")
+
+                if task is not None:
+                    job = asyncio.create_task(self.execute(task))
+                    running.add(job)
+                    job.add_done_callback(running.discard)
+                    continue
+
+                # 空闲或已满：等待轮询间隔、停止信号或有任务结束
+                waiters = [asyncio.ensure_future(stop.wait())]
+                try:
+                    await asyncio.wait(
+                        waiters + list(running), timeout=self.poll_interval,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    waiters[0].cancel()
+        finally:
+            for job in running:
+                job.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            logger.info(f"Task worker {self.worker_id} stopped")
+
+
+def main():
+    """独立worker进程入口"""
+    from .database import create_tables, run_migrations, engine
+    from .services.search_index import ensure_search_index
+
+    logging.basicConfig(
+        level=settings.log_level.upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    create_tables()
+    run_migrations()
+    # worker写入的文章同样需要维护搜索索引
+    ensure_search_index(engine)
+
+    try:
+        asyncio.run(TaskWorker().run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
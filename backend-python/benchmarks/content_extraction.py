@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+网页正文提取测试
+
+对比原实现（BeautifulSoup html.parser 多次遍历 + 固定选择器 + 整块交给 html2text）
+与 lxml 单次遍历 + Readability 式打分（app.services.content_extractor）的每页耗时，
+以及正文召回率（正文段落标记出现在结果中的比例）和噪声率（导航、侧栏、评论等标记混入结果的比例）。
+
+生成的语料模拟新闻页面：大量导航链接、侧栏、评论区、内联脚本；一半页面的正文在 <article> 中，
+另一半只有 class 提示（固定选择器找不到，只能退回整个 body）。
+
+用法:
+    python benchmarks/content_extraction.py --pages 40 --paragraphs 60
+    python benchmarks/content_extraction.py --input saved_pages/   # 已保存的 .html 文件，只统计耗时
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import html2text
+import markdown
+from bs4 import BeautifulSoup
+
+from app.services.content_extractor import extract_article
+
+URL = "https://news.example.com/2024/05/story.html"
+
+SENTENCES = [
+    "城市更新项目在今年第一季度进入实施阶段，涉及道路、管网和公共空间的整体改造",
+    "The committee reviewed the proposal, heard from residents, and asked for a revised budget",
+    "根据公开数据，参与调查的企业中有超过六成表示，将在下半年增加研发投入",
+    "Analysts said the decision, while expected, could shift borrowing costs for months",
+    "专家指出，数据共享机制尚不完善，跨部门协作仍是推进中的主要难点",
+]
+
+
+def paragraph(rng: random.Random, marker: str) -> str:
+    text = "，".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 4)))
+    link = f' 详见<a href="/topic/{rng.randint(1, 99)}">相关报道</a>。' if rng.random() < 0.2 else "。"
+    return f"<p>{marker} {text}{link}</p>"
+
+
+def make_page(n: int, paragraphs: int) -> tuple:
+    """
+    生成一个新闻页面
+
+    Returns:
+        (HTML, 正文标记列表, 噪声标记列表)
+    """
+    rng = random.Random(n)
+    body_markers = [f"BODY{n}x{i}" for i in range(paragraphs)]
+    noise_markers = []
+
+    def noise(kind: str) -> str:
+        marker = f"NOISE{n}{kind}{len(noise_markers)}"
+        noise_markers.append(marker)
+        return marker
+
+    nav = "".join(f'<li><a href="/section/{i}">{noise("nav")} 频道{i}</a></li>' for i in range(60))
+    sidebar = "".join(
+        f'<div class="related-item"><a href="/story/{i}.html">{noise("side")} 推荐阅读：{SENTENCES[i % 5]}</a></div>'
+        for i in range(25)
+    )
+    comments = "".join(
+        f'<div class="comment"><p>{noise("comment")} 网友评论：{SENTENCES[i % 5]}，说得很好，支持</p></div>'
+        for i in range(15)
+    )
+    share = f'<div class="share-tools"><a href="javascript:void(0)">{noise("share")} 分享到微博</a></div>'
+    scripts = "".join(f"<script>window.__DATA_{i}__ = {json.dumps({'items': list(range(200))})};</script>"
+                      for i in range(5))
+    images = "".join(f'<p><img data-src="/img/{n}-{i}.jpg" alt="配图{i}"></p>' for i in range(3))
+    content = "".join(paragraph(rng, marker) for marker in body_markers) + images
+    if n % 2 == 0:
+        main = f'<article><h1>标题 {n}</h1>{content}</article>'
+    else:
+        main = f'<div class="story-body"><h1>标题 {n}</h1>{content}</div>'
+
+    page = f"""<!DOCTYPE html><html><head><title>新闻 {n}</title>
+<style>body {{ font: 14px sans-serif }}</style>{scripts}</head><body>
+<header class="masthead"><ul class="menu">{nav}</ul></header>
+<div class="layout"><div class="main-col">{share}{main}<div id="comments">{comments}</div></div>
+<div class="sidebar">{sidebar}</div></div>
+<footer><p>{noise("footer")} 版权所有 © 2024 示例新闻网，未经许可不得转载，违者必究</p></footer>
+</body></html>"""
+    return page, body_markers, noise_markers
+
+
+def legacy_extract(html: str, url: str) -> str:
+    """原实现（app/api/upload.py 中的 BeautifulSoup 路径，含编辑器HTML渲染），返回Markdown"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(['script', 'style']):
+        script.decompose()
+    for img in soup.find_all('img'):
+        if img.get('src'):
+            img['src'] = urljoin(url, img['src'])
+        elif img.get('data-src'):
+            img['src'] = urljoin(url, img['data-src'])
+    for link in soup.find_all('a'):
+        href = link.get('href')
+        if href and not href.startswith(('javascript:', '#', 'mailto:')):
+            link['href'] = urljoin(url, href)
+        else:
+            link.replace_with(link.get_text())
+    main_content = None
+    for selector in ['article', 'main', '[role="main"]', '.post-content', '.article-content', '.entry-content']:
+        main_content = soup.select_one(selector)
+        if main_content:
+            break
+    if not main_content:
+        main_content = soup.find('body') or soup
+    h = html2text.HTML2Text()
+    h.body_width = 0
+    h.default_image_alt = 'Image'
+    h.protect_links = True
+    h.wrap_links = False
+    h.unicode_snob = True
+    markdown_content = h.handle(str(main_content))
+    markdown_content = re.sub(r'\[([^\]]+)\]\(javascript:[^\)]*\)', r'\1', markdown_content)
+    markdown_text = re.sub(r'\n\s*\n', '\n\n', markdown_content).strip()
+    markdown.markdown(markdown_text, extensions=['extra', 'codehilite', 'tables', 'toc', 'nl2br'])
+    soup.find('title')
+    return markdown_text
+
+
+def measure(label: str, extract, corpus: list, repeat: int) -> dict:
+    times = []
+    recall = []
+    leaked = []
+    for page, body_markers, noise_markers in corpus:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            text = extract(page)
+            best = min(best or float("inf"), time.perf_counter() - start)
+        times.append(best)
+        if body_markers:
+            recall.append(sum(m in text for m in body_markers) / len(body_markers))
+            leaked.append(sum(m in text for m in noise_markers) / len(noise_markers))
+    result = {
+        "label": label,
+        "pages": len(corpus),
+        "mean_ms": round(statistics.mean(times) * 1000, 1),
+        "p95_ms": round(sorted(times)[int(len(times) * 0.95) - 1 if len(times) > 1 else 0] * 1000, 1),
+    }
+    if recall:
+        result["body_recall"] = round(statistics.mean(recall), 3)
+        result["noise_rate"] = round(statistics.mean(leaked), 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="网页正文提取测试")
+    parser.add_argument("--pages", type=int, default=40, help="生成的页面数")
+    parser.add_argument("--paragraphs", type=int, default=60, help="每页正文段落数")
+    parser.add_argument("--input", help="已保存的 .html 文件目录（不统计召回率）")
+    parser.add_argument("--repeat", type=int, default=3, help="每页重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    if args.input:
+        corpus = []
+        for name in sorted(os.listdir(args.input)):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(args.input, name), "r", encoding="utf-8", errors="replace") as f:
+                    corpus.append((f.read(), [], []))
+    else:
+        corpus = [make_page(n, args.paragraphs) for n in range(args.pages)]
+    size = sum(len(page) for page, _, _ in corpus) / max(len(corpus), 1)
+    print(f"{len(corpus)} 个页面, 平均 {size / 1024:.0f} KB")
+
+    results = [
+        measure("bs4_selectors", lambda page: legacy_extract(page, URL), corpus, args.repeat),
+        measure("lxml_readability", lambda page: extract_article(page, URL).markdown, corpus, args.repeat),
+    ]
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+PDF文本提取测试
+
+对比在事件循环中直接提取（原实现：逐页 extract_text + 字符串累加）
+与进程池按页码范围并行提取的总耗时、首页输出时间和事件循环最大停顿。
+
+用法:
+    python benchmarks/pdf_extraction.py --pages 300
+    python benchmarks/pdf_extraction.py --input book.pdf --workers 4 --pages-per-task 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PyPDF2
+
+from app.config import settings
+from app.utils import pdf_text
+
+
+def make_pdf(path: str, pages: int) -> None:
+    """生成每页约40行文字的PDF"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for n in range(1, pages + 1):
+        lines = " ".join(f"0 -16 Td (Page {n} line {i}: the quick brown fox jumps over the lazy dog) Tj"
+                         for i in range(40))
+        stream = f"BT /F1 10 Tf 40 760 Td {lines} ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+async def watch_loop(stop: asyncio.Event, lags: list, interval: float = 0.005) -> None:
+    """每隔interval醒来一次，记录实际醒来时间比预期晚了多少"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run(label: str, extract) -> dict:
+    stop = asyncio.Event()
+    lags = []
+    watcher = asyncio.create_task(watch_loop(stop, lags))
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    first, chars = await extract(start)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+    return {
+        "label": label,
+        "seconds": round(elapsed, 3),
+        "first_page_seconds": round(first, 3),
+        "max_loop_stall_ms": round(max(lags) * 1000, 1),
+        "chars": chars,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF文本提取测试")
+    parser.add_argument("--pages", type=int, default=300, help="生成的PDF页数")
+    parser.add_argument("--input", help="使用已有的PDF文件")
+    parser.add_argument("--workers", type=int, default=None, help="提取进程数")
+    parser.add_argument("--pages-per-task", type=int, default=settings.pdf_pages_per_task, help="每个任务的页数")
+    args = parser.parse_args()
+
+    path = args.input
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(), "bench.pdf")
+        make_pdf(path, args.pages)
+    settings.pdf_extract_workers = args.workers
+    settings.pdf_pages_per_task = args.pages_per_task
+
+    async def inline(start):
+        # 原实现：在事件循环中同步提取
+        content = ""
+        first = None
+        with open(path, "rb") as f:
+            for page in PyPDF2.PdfReader(f).pages:
+                content += page.extract_text() + "\n"
+                first = first or time.perf_counter() - start
+        return first, len(content)
+
+    async def pooled(start):
+        parts = []
+        first = None
+        async for _, text in pdf_text.iter_pdf_pages(path):
+            parts.append(text)
+            parts.append("\n")
+            first = first or time.perf_counter() - start
+        return first, len("".join(parts))
+
+    async def bench():
+        # 预热进程池，避免把子进程启动时间算进提取耗时
+        pages = await asyncio.get_running_loop().run_in_executor(pdf_text._get_pool(), pdf_text.count_pages, path)
+        print(f"{path}: {pages} 页, {os.path.getsize(path) / 1024:.0f} KB, "
+              f"{pdf_text._worker_count()} 个进程, 每任务 {settings.pdf_pages_per_task} 页")
+        return [await run("inline", inline), await run("process_pool", pooled)]
+
+    try:
+        results = asyncio.run(bench())
+    finally:
+        pdf_text.shutdown_pool()
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
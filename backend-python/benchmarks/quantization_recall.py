@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+量化索引召回率测试（recall@k harness）
+
+对比 float32 暴力检索（基准）与 int8/float16 量化索引（含/不含全精度重打分）
+的 recall@k、单次查询延迟和索引内存占用。
+
+用法:
+    python benchmarks/quantization_recall.py --vectors 20000 --dim 512 --queries 200
+    python benchmarks/quantization_recall.py --embeddings my_vectors.npy --json results.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agent.knowledge.quantization import QuantizedIndex
+
+
+def make_clustered_vectors(n: int, dim: int, n_clusters: int = 200, seed: int = 42) -> np.ndarray:
+    """生成带聚类结构的归一化向量，比均匀随机向量更接近真实嵌入分布"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_queries(vectors: np.ndarray, n_queries: int, seed: int = 7) -> np.ndarray:
+    """在已有向量附近扰动生成查询"""
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), size=n_queries)]
+    queries = picks + 0.3 * rng.standard_normal(picks.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """float32暴力检索得到的真实top-k"""
+    scores = queries @ vectors.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+
+def evaluate(index: QuantizedIndex, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    """计算recall@k与查询延迟"""
+    hits = 0
+    latencies = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        ids, _ = index.search(query, n_results=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len({int(doc_id) for doc_id in ids} & set(expected.tolist()))
+
+    latencies.sort()
+    return {
+        f"recall@{k}": round(hits / (len(queries) * k), 4),
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        "index_memory_bytes": index.memory_bytes(),
+        "full_precision_bytes": index.full_precision_bytes(),
+        "compression_ratio": round(index.full_precision_bytes() / max(1, index.memory_bytes()), 2)
+    }
+
+
+def run(vectors: np.ndarray, queries: np.ndarray, k: int, rescore_factor: int) -> dict:
+    truth = exact_top_k(vectors, queries, k)
+    ids = [str(i) for i in range(len(vectors))]
+
+    configs = [
+        ("int8", rescore_factor),
+        ("int8", 1),  # 不重打分，观察量化本身的召回损失
+        ("float16", rescore_factor),
+    ]
+
+    results = {
+        "vectors": int(vectors.shape[0]),
+        "dimension": int(vectors.shape[1]),
+        "queries": int(len(queries)),
+        "k": k,
+        "runs": []
+    }
+
+    for mode, factor in configs:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = QuantizedIndex(tmp_dir, mode=mode, rescore_factor=factor)
+            start = time.perf_counter()
+            index.add(ids, vectors)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            metrics = evaluate(index, queries, truth, k)
+            metrics.update({"mode": mode, "rescore_factor": factor, "build_ms": round(build_ms, 1)})
+            results["runs"].append(metrics)
+
+            print(f"{mode:8} rescore x{factor:<2} | recall@{k}: {metrics[f'recall@{k}']:.4f} | "
+                  f"p50 {metrics['p50_ms']:.2f}ms | memory {metrics['index_memory_bytes'] / 1e6:.1f}MB "
+                  f"(x{metrics['compression_ratio']} smaller)")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized index recall@k harness")
+    parser.add_argument("--embeddings", help="真实向量文件(.npy)，不提供则生成合成数据")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--json", help="结果输出路径")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        vectors = np.load(args.embeddings).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    else:
+        vectors = make_clustered_vectors(args.vectors, args.dim)
+    queries = make_queries(vectors, args.queries)
+
+    results = run(vectors, queries, args.k, args.rescore_factor)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
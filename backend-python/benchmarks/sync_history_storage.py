@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+同步记录存储测试（SyncHistory storage benchmark）
+
+用数据库中真实文章的内容模拟多次同步（每次改动若干段落），对比：
+- 旧方式：每条同步记录保存完整的 contentBefore / contentAfter
+- 逐条zlib：两份全文分别压缩
+- 内容版本：去重 + 增量 + 关键帧（app/services/revision_store.py）
+并测量冷缓存下还原单个版本的延迟。源数据库只读打开；若其中的同步记录带有内容，也会直接回放这些记录。
+
+用法:
+    python benchmarks/sync_history_storage.py --database muses.db --syncs 30
+    python benchmarks/sync_history_storage.py --database muses.db --json results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+
+from app.models.content_revision import ContentRevision
+from app.services import revision_store
+from app.utils.delta_codec import compress_text
+
+PARAGRAPH = re.compile(r"(?<=</p>)|(?<=\n\n)")
+
+
+def open_readonly(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+
+
+def load_articles(conn: sqlite3.Connection, limit: int):
+    rows = conn.execute(
+        'SELECT id, content FROM "Article" WHERE content IS NOT NULL AND content != \'\' LIMIT ?', (limit,)
+    ).fetchall()
+    return [(article_id, content) for article_id, content in rows]
+
+
+def load_sync_history(conn: sqlite3.Connection):
+    """已有同步记录中带内容的部分（按文章、时间排序）"""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info("SyncHistory")')}
+    if not {"contentBefore", "contentAfter"} <= columns:
+        return []
+    return conn.execute(
+        'SELECT "articleId", "contentBefore", "contentAfter" FROM "SyncHistory" '
+        'WHERE "contentBefore" IS NOT NULL OR "contentAfter" IS NOT NULL ORDER BY "articleId", "createdAt"'
+    ).fetchall()
+
+
+def edit(content: str, rng: random.Random) -> str:
+    """模拟一次编辑：修改、插入或删除一到三个段落"""
+    parts = [part for part in PARAGRAPH.split(content) if part] or [content]
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(parts))
+        action = rng.random()
+        if action < 0.6:
+            words = parts[i].split(" ")
+            j = rng.randrange(len(words))
+            words[j] = words[j] + f" 修订{rng.randint(0, 9999)}"
+            parts[i] = " ".join(words)
+        elif action < 0.85:
+            parts.insert(i, f"<p>新增段落 {rng.randint(0, 9999)}：补充说明与示例。</p>")
+        elif len(parts) > 1:
+            parts.pop(i)
+    return "".join(parts)
+
+
+def simulate(articles, syncs: int, seed: int):
+    """为每篇文章生成同步记录序列 (articleId, before, after)"""
+    rng = random.Random(seed)
+    records = []
+    for article_id, content in articles:
+        current = content
+        for _ in range(syncs):
+            after = edit(current, rng)
+            records.append((article_id, current, after))
+            current = after
+    return records
+
+
+def run(records):
+    """把同步记录写入临时数据库的内容版本中，返回统计结果"""
+    path = os.path.join(tempfile.mkdtemp(), "revisions.db")
+    engine = create_engine(f"sqlite:///{path}")
+    ContentRevision.__table__.create(bind=engine)
+    revision_store.clear_cache()
+
+    legacy = zlib_each = 0
+    revision_ids = []
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for article_id, before, after in records:
+            for content in (before, after):
+                if content is None:
+                    continue
+                legacy += len(content.encode("utf-8"))
+                zlib_each += len(compress_text(content))
+                revision_ids.append(revision_store.save_revision(conn, article_id, content))
+    write_seconds = time.perf_counter() - start
+
+    latencies = []
+    with engine.connect() as conn:
+        stats = revision_store.storage_stats(conn)
+        for revision_id in revision_ids:
+            revision_store.clear_cache()
+            t0 = time.perf_counter()
+            revision_store.load_revision(conn, revision_id)
+            latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+
+    return {
+        "records": len(records),
+        "legacy_bytes": legacy,
+        "zlib_each_bytes": zlib_each,
+        "revision_bytes": stats["stored_bytes"],
+        "revisions": stats["revisions"],
+        "keyframes": stats["keyframes"],
+        "deltas": stats["deltas"],
+        "ratio_vs_legacy": round(legacy / max(stats["stored_bytes"], 1), 1),
+        "ratio_vs_zlib_each": round(zlib_each / max(stats["stored_bytes"], 1), 1),
+        "write_ms_per_record": round(write_seconds * 1000 / max(len(records), 1), 2),
+        "read_p50_ms": round(latencies[len(latencies) // 2], 2) if latencies else 0,
+        "read_p99_ms": round(latencies[int(len(latencies) * 0.99)], 2) if latencies else 0,
+    }
+
+
+def print_result(name, result):
+    print(f"\n[{name}] {result['records']} 条同步记录")
+    print(f"  全文存储      {result['legacy_bytes']:>12,} bytes")
+    print(f"  逐条zlib      {result['zlib_each_bytes']:>12,} bytes")
+    print(f"  内容版本      {result['revision_bytes']:>12,} bytes  "
+          f"({result['revisions']} 个版本: {result['keyframes']} 全文 + {result['deltas']} 增量)")
+    print(f"  节省          {result['ratio_vs_legacy']}x（相对全文） / {result['ratio_vs_zlib_each']}x（相对逐条zlib）")
+    print(f"  写入 {result['write_ms_per_record']} ms/条, 冷读取 p50 {result['read_p50_ms']} ms, "
+          f"p99 {result['read_p99_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SyncHistory content storage benchmark")
+    parser.add_argument("--database", default="muses.db", help="SQLite数据库文件（只读）")
+    parser.add_argument("--articles", type=int, default=100, help="最多使用的文章数")
+    parser.add_argument("--syncs", type=int, default=30, help="每篇文章模拟的同步次数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="结果写入JSON文件")
+    args = parser.parse_args()
+
+    source = open_readonly(args.database)
+    articles = load_articles(source, args.articles)
+    history = load_sync_history(source)
+    source.close()
+
+    results = {}
+    if history:
+        results["recorded"] = run(history)
+        print_result("已有同步记录", results["recorded"])
+    if articles:
+        results["simulated"] = run(simulate(articles, args.syncs, args.seed))
+        print_result(f"模拟同步（{len(articles)} 篇文章 x {args.syncs} 次）", results["simulated"])
+    if not results:
+        print("数据库中没有可用的文章内容")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+测试文章批量导入：NDJSON流式解析、按批事务、externalId幂等，以及并发迁移脚本的断点续传（临时SQLite数据库）
+"""
+import sys
+import os
+import json
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+import uvicorn
+
+from app.main import app
+from app.dependencies import get_current_user
+from app.models import Article, Agent, User
+from app.schemas.user import User as UserSchema
+from app.services.article_counts import article_counts
+from testing_support import app_client
+
+
+def seed(Session):
+    db = Session()
+    db.add(User(id="u1", username="alice"))
+    db.add_all([Agent(id="a1", userId="u1", name="writer"), Agent(id="b1", userId="u2", name="other")])
+    db.commit()
+    db.close()
+    article_counts.clear()
+
+
+def ndjson(*items):
+    return b"".join(item if isinstance(item, bytes) else
+                    (item if isinstance(item, str) else json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+                    for item in items)
+
+
+def item(n, **kwargs):
+    return {"externalId": f"ext{n}", "agentId": "a1", "title": f"文章{n}", "content": f"正文{n}", **kwargs}
+
+
+def test_bulk_ingest():
+    """测试按批写入、保留时间、Agent映射、逐行报告错误和重复发送幂等"""
+    with app_client("bulk.db", bulk_ingest_batch_size=2) as env:
+        seed(env.Session)
+        Session = env.Session
+        client = env.client
+        body = ndjson(
+            item(0, createdAt="2023-05-01T08:00:00+08:00", updatedAt="2023-06-01 00:00:00",
+                 publishStatus="published", metadata={"k": 1}),
+            item(1, agentId=None, agentName="writer"),
+            "not json\n",
+            item(2, agentId="b1"),  # 其他用户的Agent
+            "\n",
+            item(3),
+            item(3),  # 同一请求中重复
+            item(4, title=""),
+            item(5),
+            b'{"externalId": "ext6", "title": "\xe6\x96"}\n',  # 非法UTF-8
+        )
+        response = client.post("/api/articles/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+        assert response.status_code == 200
+        result = response.json()
+        assert (result["created"], result["existing"], result["failed"]) == (4, 1, 4)
+        by_line = {entry["line"]: entry for entry in result["items"]}
+        assert by_line[3]["status"] == "failed" and by_line[4]["error"] == "Invalid agent"
+        assert by_line[10]["status"] == "failed" and by_line[10]["error"].startswith("Invalid UTF-8")
+        assert by_line[7]["id"] == by_line[6]["id"] and by_line[8]["externalId"] == "ext4"
+
+        db = Session()
+        first = db.query(Article).filter(Article.externalId == "ext0").one()
+        assert first.createdAt == datetime(2023, 5, 1, 0, 0) and first.updatedAt == datetime(2023, 6, 1)
+        assert first.publishStatus == "published" and json.loads(first.article_metadata) == {"k": 1}
+        assert db.query(Article).count() == 4
+        db.close()
+
+        # 重新发送整个请求：不产生重复文章，返回已有ID
+        again = client.post("/api/articles/bulk", content=body).json()
+        assert (again["created"], again["existing"]) == (0, 5)
+        assert {e["id"] for e in again["items"] if e["id"]} == {e["id"] for e in result["items"] if e["id"]}
+        assert client.get("/api/articles", params={"view": "summary"}).json()["total"] == 4
+        print("✅ 批量导入正常")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_local_db(n_articles):
+    """迁移脚本读取的本地数据库（只需要脚本用到的列）"""
+    path = os.path.join(tempfile.mkdtemp(), "local.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Agent (id TEXT, name TEXT, isDefault INTEGER)")
+    conn.execute("CREATE TABLE Article (id TEXT, agentId TEXT, title TEXT, content TEXT, summary TEXT, "
+                 "publishStatus TEXT, publishedAt TEXT, githubUrl TEXT, repoPath TEXT, sourceFiles TEXT, "
+                 "article_metadata TEXT, createdAt TEXT, updatedAt TEXT)")
+    conn.execute("INSERT INTO Agent VALUES ('local-a', 'writer', 1)")
+    conn.executemany("INSERT INTO Article VALUES (?, 'local-a', ?, ?, NULL, 'draft', NULL, NULL, NULL, NULL, NULL, ?, ?)", [
+        (f"local{i:03d}", f"文章{i}", f"正文{i}", f"2024-01-01 00:{i // 60:02d}:{i % 60:02d}", "2024-02-01 00:00:00")
+        for i in range(n_articles)
+    ])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_migration_script_resumes():
+    """测试迁移脚本并发发送批次，中断后按状态文件续传且不产生重复"""
+    import migrate_local_to_remote as migration
+
+    with app_client("bulk.db") as env:
+        seed(env.Session)
+        Session = env.Session
+        user = UserSchema(id="u1", username="alice", createdAt=datetime.now(), updatedAt=datetime.now())
+        app.dependency_overrides[get_current_user] = lambda: user
+
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+
+        local_db = make_local_db(95)
+        state_file = os.path.join(tempfile.mkdtemp(), "state.json")
+        api = f"http://127.0.0.1:{port}"
+        send = migration.BulkUploader.send
+        calls = []
+
+        def flaky_send(self, lines):
+            calls.append(len(lines))
+            if len(calls) == 3:
+                raise RuntimeError("connection lost")
+            return send(self, lines)
+
+        try:
+            migration.BulkUploader.send = flaky_send
+            migration.migrate("token", api, local_db, batch_size=10, concurrency=3, state_file=state_file)
+            with open(state_file) as f:
+                assert len(json.load(f)["done"]) == 85  # 一个批次失败
+
+            migration.BulkUploader.send = send
+            migration.migrate("token", api, local_db, batch_size=10, concurrency=3, state_file=state_file)
+            with open(state_file) as f:
+                assert len(json.load(f)["done"]) == 95
+
+            # 丢失状态文件后重跑：服务端按externalId跳过
+            migration.migrate("token", api, local_db, batch_size=10, concurrency=3, state_file="")
+            db = Session()
+            assert db.query(Article).count() == 95
+            article = db.query(Article).filter(Article.externalId == "local061").one()
+            assert article.agentId == "a1" and article.createdAt == datetime(2024, 1, 1, 0, 1, 1)
+            db.close()
+        finally:
+            migration.BulkUploader.send = send
+            server.should_exit = True
+            thread.join(5)
+        print("✅ 迁移脚本续传正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("文章批量导入测试")
+    print("=" * 60)
+    test_bulk_ingest()
+    test_migration_script_resumes()
+    print("=" * 60)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+测试文章导出：NDJSON与Markdown zip流式输出、frontmatter、用户隔离（临时SQLite数据库）
+"""
+import sys
+import os
+import io
+import json
+import zipfile
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.models import Article, Agent, User
+from app.services.article_export import zip_stream, to_markdown, markdown_filename, html_to_markdown
+from testing_support import app_client
+
+
+def seed(Session, n_articles=7):
+    db = Session()
+    db.add_all([User(id="u1", username="alice"), User(id="u2", username="bob")])
+    db.add_all([Agent(id="a1", userId="u1", name="writer"), Agent(id="a2", userId="u2", name="other")])
+    base = datetime(2024, 1, 1)
+    db.add_all([
+        Article(id=f"art{i}", userId="u1", agentId="a1", title=f'文章 {i}: "引号"/斜杠',
+                content=f"# 标题{i}\n\n正文{i}", publishStatus="published" if i % 2 else "draft",
+                article_metadata=json.dumps({"n": i}), createdAt=base + timedelta(minutes=i))
+        for i in range(n_articles)
+    ])
+    db.add(Article(id="bob1", userId="u2", agentId="a2", title="bob", content="secret"))
+    db.commit()
+    db.close()
+
+
+def test_ndjson_export():
+    """测试NDJSON按创建时间逐行导出，跨多个游标批次且只包含当前用户的文章"""
+    with app_client("export.db", export_batch_size=2) as env:
+        seed(env.Session)
+        client = env.client
+        response = client.get("/api/articles/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert "attachment" in response.headers["content-disposition"]
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["id"] for r in records] == [f"art{i}" for i in range(7)]
+        assert records[3]["agent"] == "writer" and records[3]["metadata"] == {"n": 3}
+        assert records[3]["content"] == "# 标题3\n\n正文3"
+
+        published = client.get("/api/articles/export", params={"status": "published"}).text.splitlines()
+        assert len(published) == 3
+        assert client.get("/api/articles/export", params={"format": "csv"}).status_code == 422
+        print("✅ NDJSON导出正常")
+
+
+def test_zip_export():
+    """测试zip包内每篇文章一个带frontmatter的Markdown文件"""
+    with app_client("export.db") as env:
+        seed(env.Session)
+        client = env.client
+        response = client.get("/api/articles/export", params={"format": "zip"})
+        assert response.status_code == 200 and response.headers["content-type"] == "application/zip"
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert archive.testzip() is None
+        names = archive.namelist()
+        assert len(names) == 7 and all("/" not in name and name.endswith(".md") for name in names)
+
+        text = archive.read(names[0]).decode("utf-8")
+        header, body = text.split("\n---\n\n", 1)
+        fields = dict(line.split(": ", 1) for line in header.splitlines()[1:])
+        assert json.loads(fields["title"]) == '文章 0: "引号"/斜杠'
+        assert json.loads(fields["id"]) == "art0" and json.loads(fields["agent"]) == "writer"
+        assert body == "# 标题0\n\n正文0"
+        print("✅ zip导出正常")
+
+
+def test_zip_streams_incrementally():
+    """测试zip在读取后续文章前就输出已压缩的文件"""
+    consumed = []
+
+    def records():
+        for i in range(3):
+            consumed.append(i)
+            yield {"id": f"id{i}", "title": f"t{i}", "content": "x" * 10000, "updatedAt": "2024-01-01T00:00:00"}
+
+    stream = zip_stream(records())
+    first = next(stream)
+    assert consumed == [0] and first.startswith(b"PK")
+    data = first + b"".join(stream)
+    assert zipfile.ZipFile(io.BytesIO(data)).read("t2-id2.md").endswith(b"x" * 10000)
+    assert markdown_filename({"id": "abcdefgh123", "title": "../a:b"}) == "a-b-abcdefgh.md"
+    assert to_markdown({"id": "1", "title": "t", "content": "c"}) == '---\nid: "1"\ntitle: "t"\n---\n\nc'
+    assert to_markdown({"id": "1", "content": "<p>a <b>b</b></p>"}) == '---\nid: "1"\n---\n\na **b**'
+    print("✅ zip流式输出正常")
+
+
+def test_html_content_to_markdown():
+    """测试HTML正文转换为Markdown：标题、强调、链接、图片、列表和代码块，Markdown正文原样保留"""
+    html = ('<h2>小节</h2><p>正文 <strong>粗体</strong> <a href="https://example.com">链接</a></p>'
+            '<p><img src="/api/upload/images/u1/x.png" alt="图"></p><ul><li>一</li><li>二</li></ul>'
+            '<pre><code>x = 1\n  y</code></pre>')
+    markdown = html_to_markdown(html)
+    assert markdown.startswith("## 小节\n\n正文 **粗体** [链接](https://example.com)")
+    assert "![图](/api/upload/images/u1/x.png)" in markdown and "* 一\n  * 二" in markdown
+    assert "x = 1\n  y" in markdown and "<" not in markdown and "\n\n\n" not in markdown
+    assert html_to_markdown("# 标题\n\n正文 <b>行内</b>") == "# 标题\n\n正文 <b>行内</b>"
+    print("✅ HTML正文转换正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("文章导出测试")
+    print("=" * 60)
+    test_ndjson_export()
+    test_zip_export()
+    test_zip_streams_incrementally()
+    test_html_content_to_markdown()
+    print("=" * 60)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+测试文章列表：summary视图、游标分页、计数缓存和查询次数（临时SQLite数据库）
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event, text
+
+from app.models import Article, Agent, User
+from app.services.article_counts import article_counts
+from testing_support import app_client
+
+
+def seed(Session, n_articles=25):
+    db = Session()
+    db.add(User(id="u1", username="alice"))
+    db.add_all([Agent(id=f"a{i}", userId="u1", name=f"writer{i}") for i in range(3)])
+    base = datetime(2024, 1, 1)
+    db.add_all([
+        Article(id=f"art{i:03d}", userId="u1", agentId=f"a{i % 3}", title=f"文章{i}",
+                content="<p>正文</p>" * 100, publishStatus="published" if i % 2 else "draft",
+                # 每两篇共享同一创建时间，验证id作为第二排序键
+                createdAt=base + timedelta(minutes=i // 2))
+        for i in range(n_articles)
+    ])
+    db.commit()
+    db.close()
+    article_counts.clear()
+
+
+def count_queries(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_summary_view_without_n_plus_one():
+    """测试summary视图不返回正文，且查询次数与每页数量无关"""
+    with app_client("listing.db") as env:
+        seed(env.Session)
+        client, engine = env.client, env.engine
+        statements = count_queries(engine)
+
+        response = client.get("/api/articles", params={"view": "summary", "page_size": 20})
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["articles"]) == 20 and data["total"] == 25
+        assert "content" not in data["articles"][0]
+        assert data["articles"][0]["agent"]["name"].startswith("writer")
+        assert len(statements) == 3  # 用户 + 计数 + 列表（Agent随列表一起查询）
+        assert not any("content" in sql for sql in statements[1:])
+
+        full = client.get("/api/articles", params={"page_size": 5}).json()
+        assert full["articles"][0]["content"].startswith("<p>")
+        assert len(statements) == 5  # 计数命中缓存
+        print("✅ summary视图与查询次数正常")
+
+
+def test_cursor_pagination():
+    """测试游标分页不重复、不遗漏，并与偏移分页顺序一致"""
+    with app_client("listing.db") as env:
+        seed(env.Session)
+        client = env.client
+
+        seen, cursor = [], None
+        while True:
+            params = {"view": "summary", "page_size": 7, "sort_order": "asc"}
+            if cursor:
+                params["cursor"] = cursor
+            data = client.get("/api/articles", params=params).json()
+            seen.extend(article["id"] for article in data["articles"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        assert seen == [f"art{i:03d}" for i in range(25)]
+        assert client.get("/api/articles", params={"cursor": "not-a-cursor"}).status_code == 400
+        assert client.get("/api/articles", params={"cursor": cursor or "x", "sort_by": "title"}).status_code == 400
+        print("✅ 游标分页正常")
+
+
+def test_count_cache_invalidation():
+    """测试新增、删除、状态变化后计数缓存失效，以及其他进程的写入通过版本号使缓存失效"""
+    with app_client("listing.db") as env:
+        seed(env.Session, n_articles=4)
+        client, Session = env.client, env.Session
+        assert client.get("/api/articles", params={"status": "draft"}).json()["total"] == 2
+
+        db = Session()
+        db.add(Article(id="new", userId="u1", agentId="a0", title="新文章", content="<p></p>", publishStatus="draft"))
+        db.commit()
+        assert client.get("/api/articles", params={"status": "draft"}).json()["total"] == 3
+
+        db.query(Article).filter(Article.id == "new").one().publishStatus = "published"
+        db.commit()
+        assert client.get("/api/articles", params={"status": "draft"}).json()["total"] == 2
+
+        db.delete(db.query(Article).filter(Article.id == "new").one())
+        db.commit()
+        assert client.get("/api/articles").json()["total"] == 4
+
+        # 模拟其他worker进程的写入：本进程收不到mapper事件，只能看到提交后的版本号
+        db.execute(text(
+            'INSERT INTO "Article" (id, "userId", "agentId", title, content, "publishStatus", version, "createdAt", "updatedAt") '
+            "VALUES ('other', 'u1', 'a0', '其他进程', '<p></p>', 'draft', 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        ))
+        db.commit()
+        assert client.get("/api/articles").json()["total"] == 4  # 版本号未变，命中缓存
+        db.execute(text('UPDATE "User" SET "articlesVersion" = "articlesVersion" + 1 WHERE id = \'u1\''))
+        db.commit()
+        assert client.get("/api/articles").json()["total"] == 5
+        print("✅ 计数缓存失效正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("文章列表测试")
+    print("=" * 60)
+    test_summary_view_without_n_plus_one()
+    test_cursor_pagination()
+    test_count_cache_invalidation()
+    print("=" * 60)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+测试HTML正文转换与批量入库（使用内存中的嵌入器和存储，不加载模型）
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.agent.knowledge.chunker import html_to_text, looks_like_html
+from app.agent.knowledge.retriever import KnowledgeRetriever
+
+
+class RecordingEmbedder:
+    """记录每次embed调用的批大小"""
+
+    def __init__(self):
+        self.calls = []
+
+    def count_tokens(self, text):
+        return len(text)
+
+    def embed(self, texts):
+        self.calls.append(len(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class RecordingStore:
+    """记录每次add调用写入的元数据"""
+
+    query_cache = None
+
+    def __init__(self):
+        self.calls = []
+
+    def add(self, texts, embeddings, metadatas=None, ids=None):
+        self.calls.append(metadatas)
+        return [f"chunk_{sum(len(c) for c in self.calls[:-1]) + i}" for i in range(len(texts))]
+
+
+def test_html_to_text():
+    """测试HTML转换：标题转为Markdown标题，代码块保留格式，脚本被丢弃"""
+    html = (
+        "<h2>T</h2><p>a <b>b</b>&amp;c</p><script>alert(1)</script>"
+        "<pre>x = 1\n  y</pre><ul><li>one</li><li></li></ul>"
+    )
+    assert looks_like_html(html)
+    assert not looks_like_html("# 标题\n\n正文 a < b")
+    assert html_to_text(html) == "## T\n\na b&c\n\n```\nx = 1\n  y\n```\n\n- one"
+    print("✅ HTML转换正常")
+
+
+def test_add_documents_batches_across_documents():
+    """测试多篇文档的块合并为固定大小的批次，每批只嵌入和写入一次"""
+    embedder, store = RecordingEmbedder(), RecordingStore()
+    retriever = KnowledgeRetriever(embedder=embedder, store=store)
+    documents = [
+        {
+            "text": "".join(f"<h1>第{i}章 第{j}节</h1><p>{'正文内容。' * 10}</p>" for j in range(3)),
+            "metadata": {"article_id": i, "created_at": None}
+        }
+        for i in range(10)
+    ]
+
+    ids = retriever.add_documents(documents, chunk_strategy="markdown", batch_size=8)
+
+    assert len(ids) == 30
+    assert embedder.calls == [8, 8, 8, 6]
+    assert len(store.calls) == 4
+    metadatas = [meta for call in store.calls for meta in call]
+    assert all("created_at" not in meta for meta in metadatas)
+    assert len({meta["doc_id"] for meta in metadatas}) == 10
+    assert all("<" not in meta.get("header", "") for meta in metadatas)
+    print("✅ 跨文档批量嵌入正常")
+
+
+def test_add_documents_skips_empty():
+    """测试空文档被跳过，不产生嵌入调用"""
+    embedder, store = RecordingEmbedder(), RecordingStore()
+    retriever = KnowledgeRetriever(embedder=embedder, store=store)
+
+    report = {}
+    assert retriever.add_documents([{"text": "<p></p>"}, {"text": ""}], report=report) == []
+    assert embedder.calls == [] and store.calls == []
+    assert report == {"documents": 0, "failed": []}
+    print("✅ 空文档跳过正常")
+
+
+def test_add_documents_reports_failures():
+    """测试分块失败的文档被跳过并计入report，只统计产生了块的文档"""
+    embedder, store = RecordingEmbedder(), RecordingStore()
+    retriever = KnowledgeRetriever(embedder=embedder, store=store)
+    chunk_markdown = retriever.chunker.chunk_markdown
+
+    def flaky(text, metadata):
+        if metadata.get("article_id") == "bad":
+            raise ValueError("boom")
+        return chunk_markdown(text, metadata)
+
+    retriever.chunker.chunk_markdown = flaky
+    documents = [
+        {"text": "# A\n\n正文", "metadata": {"article_id": "ok"}},
+        {"text": "# B\n\n正文", "metadata": {"article_id": "bad"}},
+        {"text": "<p></p>", "metadata": {"article_id": "empty"}},
+    ]
+
+    report = {}
+    ids = retriever.add_documents(documents, chunk_strategy="markdown", report=report)
+    assert len(ids) == 1
+    assert report == {"documents": 1, "failed": ["bad"]}
+    print("✅ 分块失败统计正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("批量入库测试")
+    print("=" * 60)
+    test_html_to_text()
+    test_add_documents_batches_across_documents()
+    test_add_documents_skips_empty()
+    test_add_documents_reports_failures()
+    print("=" * 60)
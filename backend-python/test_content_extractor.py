@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+测试网页正文提取：清理与地址绝对化、按打分选择正文（无 <article> 的页面、<br> 分段的页面、
+拆成多个相邻块的正文），以及无法打分时退回 body
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.content_extractor import extract_article
+
+URL = "https://news.example.com/2024/05/story.html"
+SENTENCE = "记者从有关部门获悉，今年以来，全市新建改造城市道路超过一百公里，公共交通分担率持续提升"
+
+
+def news_page(main: str) -> str:
+    nav = "".join(f'<li><a href="/section/{i}">导航频道{i}</a></li>' for i in range(30))
+    related = "".join(f'<li><a href="/story/{i}.html">推荐阅读：{SENTENCE}</a></li>' for i in range(10))
+    comments = "".join(f'<div class="comment-item"><p>网友评论{i}：{SENTENCE}，支持</p></div>' for i in range(6))
+    return f"""<html><head><title> 城市交通报道 </title><script>var tracking = "脚本内容";</script></head>
+<body><div class="header"><ul class="menu">{nav}</ul></div>
+<div class="wrap"><div class="col">{main}<div id="comments">{comments}</div></div>
+<div class="sidebar"><ul>{related}</ul></div></div>
+<footer><p>版权所有，未经许可不得转载，违者必究，联系电话等信息</p></footer></body></html>"""
+
+
+def test_cleanup_and_scoring():
+    """测试没有 <article> 时按打分找到正文，导航、侧栏、评论、脚本和注释都不进入结果，地址被绝对化"""
+    main = f"""<div class="story-body"><h1>正文标题</h1>
+<p>第一段 {SENTENCE}<script>document.write("广告")</script>，脚本后的文字保留。</p>
+<!-- 编辑备注 -->
+<p>第二段 {SENTENCE}，详见<a href="/topic/7">专题页面</a>和<a href="javascript:void(0)">展开全文</a>。</p>
+<p>第三段 {SENTENCE}<a href="#top">返回顶部</a>。</p>
+<p><img data-src="/img/a.jpg" alt="配图"><img src="img/b.png" alt="示意图"></p></div>"""
+    article = extract_article(news_page(main), URL)
+
+    assert article.title == "城市交通报道"
+    text = article.markdown
+    for expected in ("正文标题", "第一段", "脚本后的文字保留", "第二段", "第三段", "返回顶部"):
+        assert expected in text, expected
+    for unexpected in ("导航频道", "推荐阅读", "网友评论", "版权所有", "脚本内容", "广告", "编辑备注", "javascript"):
+        assert unexpected not in text, unexpected
+    assert "[专题页面](<https://news.example.com/topic/7>)" in text
+    assert "展开全文" in text and "(#top)" not in text
+    assert "![配图](https://news.example.com/img/a.jpg)" in text
+    assert "![示意图](https://news.example.com/2024/05/img/b.png)" in text
+    assert "<h1" in article.html and "第二段" in article.html
+    print("✅ 清理与正文打分正常")
+
+
+def test_br_paragraphs_and_siblings():
+    """测试 <br> 分段的正文，以及拆成相邻多个块的正文都被完整提取"""
+    br_main = f'<div class="txt">甲段 {SENTENCE}<br><br>乙段 {SENTENCE}<br><br>丙段 {SENTENCE}</div>'
+    text = extract_article(news_page(br_main), URL).markdown
+    assert "甲段" in text and "丙段" in text and "导航频道" not in text and "网友评论" not in text
+
+    split = "".join(
+        f'<div class="content-part">' + "".join(f"<p>块{b}段{i} {SENTENCE}。</p>" for i in range(4)) + "</div>"
+        for b in range(3)
+    )
+    text = extract_article(news_page(f"<div>{split}</div>"), URL).markdown
+    assert all(f"块{b}段3" in text for b in range(3))
+    assert "推荐阅读" not in text
+    print("✅ <br>分段与相邻正文块提取正常")
+
+
+def test_fallbacks():
+    """测试没有可打分段落时使用整个 body，空文档返回URL作为标题"""
+    short = extract_article("<html><head><title>短页面</title></head><body><div>只有一句话</div></body></html>", URL)
+    assert short.title == "短页面" and short.markdown == "只有一句话"
+
+    empty = extract_article("", URL)
+    assert empty.title == URL and empty.markdown == "" and empty.html == ""
+
+    untitled = extract_article(f"<p>{SENTENCE}</p>", URL)
+    assert untitled.title == URL and SENTENCE in untitled.markdown
+
+    # 带编码声明的XHTML页面（lxml 不接受带编码声明的 str）
+    xhtml = extract_article(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">\n'
+        f'<html xmlns="http://www.w3.org/1999/xhtml"><head><title>XHTML页面</title></head>'
+        f'<body><div class="content"><p>{SENTENCE}，第一段。</p><p>{SENTENCE}，第二段。</p></div></body></html>',
+        URL
+    )
+    assert xhtml.title == "XHTML页面" and "第一段" in xhtml.markdown and "第二段" in xhtml.markdown
+
+    # 选出的正文太短：退回整个 body，列表中的内容不丢失
+    items = "".join(f"<li>条目{i} {SENTENCE}</li>" for i in range(6))
+    short_best = extract_article(
+        f"<html><body><div class='lead'><p>导语 {SENTENCE}</p></div><div><ul>{items}</ul></div></body></html>", URL
+    )
+    assert "导语" in short_best.markdown and "条目5" in short_best.markdown
+    print("✅ 退回策略正常")
+
+
+def test_form_wrapped_page():
+    """测试整页包在 <form> 中的页面（ASP.NET WebForms）能提取正文，只删除表单控件"""
+    paragraphs = "".join(f"<p>第{i}段 {SENTENCE}。</p>" for i in range(5))
+    page = f"""<html><head><title>政务公开</title></head><body><form id="aspnetForm" method="post">
+<input type="hidden" name="__VIEWSTATE" value="dDwtMTA4">
+<div class="content">{paragraphs}</div>
+<aside class="links"><a href="/a">友情链接</a></aside>
+<select name="jump"><option>站点导航</option></select><button>搜索</button>
+</form></body></html>"""
+    text = extract_article(page, URL).markdown
+    assert all(f"第{i}段" in text for i in range(5))
+    assert "站点导航" not in text and "搜索" not in text and "VIEWSTATE" not in text
+
+    # 正文中的 <aside> 有正文段落时保留
+    note = f'<aside><p>延伸阅读 {SENTENCE}，{SENTENCE}。</p></aside>'
+    text = extract_article(f"<html><body><article>{paragraphs}{note}</article></body></html>", URL).markdown
+    assert "延伸阅读" in text
+    print("✅ 表单包裹的页面提取正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("网页正文提取测试")
+    print("=" * 60)
+    test_cleanup_and_scoring()
+    test_br_paragraphs_and_siblings()
+    test_fallbacks()
+    test_form_wrapped_page()
+    print("=" * 60)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+测试RAG上下文打包（不调用嵌入模型）
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.agent.knowledge.chunker import TextChunker, approximate_token_count
+from app.agent.knowledge.packer import ContextPacker
+
+
+def _results_from(text: str, doc_id: str, scores):
+    chunks = TextChunker(chunk_size=120, chunk_overlap=40).chunk_text(text, {"doc_id": doc_id})
+    return [
+        {"text": chunk["text"], "metadata": chunk["metadata"], "score": score}
+        for chunk, score in zip(chunks, scores)
+    ]
+
+
+def test_merge_overlap_and_order():
+    """测试同源相邻块去重叠并按原文顺序排列"""
+    text = "".join(f"这是第{i}句话，用来测试重叠去除。" for i in range(12))
+    results = _results_from(text, "doc-a", [0.5, 0.9, 0.7])
+    assert len(results) == 3
+
+    packed = ContextPacker().pack(results, max_tokens=10000)
+
+    assert packed.chunks_used == 3
+    assert packed.tokens_saved > 0
+    assert packed.text.index("第0句") < packed.text.index("第5句")
+    assert packed.text.count("第4句话") == 1
+    assert packed.sources == [{"doc_id": "doc-a", "chunks": 3}]
+    print(f"✅ 重叠去除正常（节省 {packed.tokens_saved} tokens）")
+
+
+def test_exact_budget():
+    """测试不超过token预算，且最后一块截断后尽量填满"""
+    results = [
+        {"text": f"第{i}篇：" + "检索增强生成需要控制上下文成本。" * 10, "metadata": {"doc_id": f"d{i}"}, "score": 1 - i / 10}
+        for i in range(5)
+    ]
+    packer = ContextPacker(min_truncated_tokens=8)
+    packed = packer.pack(results, max_tokens=300)
+
+    assert packed.tokens == approximate_token_count(packed.text)
+    assert 300 - 16 <= packed.tokens <= 300
+    assert packed.truncated
+    assert packed.chunks_dropped > 0
+    print("✅ token预算正常")
+
+
+def test_sources_ranked_by_score():
+    """测试不同来源按最高相关度排序"""
+    results = [
+        {"text": "低相关来源的内容。", "metadata": {"doc_id": "low"}, "score": 0.2},
+        {"text": "高相关来源的内容。", "metadata": {"doc_id": "high"}, "score": 0.9},
+    ]
+    packed = ContextPacker().pack(results, max_tokens=1000)
+    assert packed.text.startswith("高相关")
+    assert packed.tokens_saved == 0
+    print("✅ 来源排序正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("上下文打包测试")
+    print("=" * 60)
+    test_merge_overlap_and_order()
+    test_exact_budget()
+    test_sources_ranked_by_score()
+    print("=" * 60)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+测试条件请求：ETag生成、If-None-Match返回304且不加载正文（临时SQLite数据库）
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from starlette.requests import Request
+
+from app.models import Article, Agent, User, ChatHistory
+from app.models.sync_history import SyncHistory
+from app.services.article_counts import article_counts
+from app.utils.http_cache import weak_etag, etag_matches
+from testing_support import app_client
+
+
+def seed(Session):
+    db = Session()
+    db.add(User(id="u1", username="alice"))
+    db.add_all([Agent(id=f"a{i}", userId="u1", name=f"writer{i}") for i in range(2)])
+    db.add_all([
+        Article(id=f"art{i}", userId="u1", agentId=f"a{i % 2}", title=f"文章{i}", content="<p>正文</p>" * 50)
+        for i in range(3)
+    ])
+    db.add(ChatHistory(articleId="art0", userId="u1", agentId="a0", role="user", content="hi", sequence=0))
+    db.add(SyncHistory(articleId="art0", userId="u1", syncType="pull_from_github",
+                       syncDirection="github_to_local", syncStatus="success", contentAfter="x" * 1000))
+    db.commit()
+    db.close()
+    article_counts.clear()
+
+
+def revalidate(client, url, **params):
+    """首次请求取得ETag，再带If-None-Match请求"""
+    first = client.get(url, params=params)
+    assert first.status_code == 200 and first.headers["etag"].startswith('W/"')
+    assert first.headers["cache-control"] == "private, no-cache"
+    second = client.get(url, params=params, headers={"If-None-Match": first.headers["etag"]})
+    return first.headers["etag"], second
+
+
+def test_etag_matching():
+    """测试弱比较、多个候选和通配符"""
+    etag = weak_etag("article", "u1", "art0", 1)
+    assert etag == weak_etag("article", "u1", "art0", 1) != weak_etag("article", "u1", "art0", 2)
+
+    def request(value):
+        return Request({"type": "http", "headers": [(b"if-none-match", value.encode())]})
+
+    assert etag_matches(request(etag), etag)
+    assert etag_matches(request(f'"other", {etag[2:]}'), etag)
+    assert etag_matches(request("*"), etag)
+    assert not etag_matches(request('W/"other"'), etag)
+    print("✅ ETag匹配正常")
+
+
+def test_article_not_modified_without_content():
+    """测试文章详情和列表命中时返回304且不查询正文，修改后ETag变化"""
+    with app_client("cache.db") as env:
+        seed(env.Session)
+        client, engine, Session = env.client, env.engine, env.Session
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        etag, response = revalidate(client, "/api/articles/art0")
+        assert response.status_code == 304 and response.content == b""
+        statements.clear()
+        assert client.get("/api/articles/art0", headers={"If-None-Match": etag}).status_code == 304
+        assert len(statements) == 2 and not any("content" in sql for sql in statements)  # 用户 + 版本号
+
+        list_etag, response = revalidate(client, "/api/articles", view="summary")
+        assert response.status_code == 304
+        _, response = revalidate(client, "/api/articles")
+        assert response.status_code == 304
+
+        # 修改文章标题和Agent名称都会使ETag失效
+        db = Session()
+        db.query(Article).filter(Article.id == "art0").one().title = "新标题"
+        db.commit()
+        response = client.get("/api/articles/art0", headers={"If-None-Match": etag})
+        assert response.status_code == 200 and response.json()["article"]["title"] == "新标题"
+        assert response.headers["etag"] != etag
+        assert client.get("/api/articles", params={"view": "summary"},
+                          headers={"If-None-Match": list_etag}).status_code == 200
+
+        etag = client.get("/api/articles/art1").headers["etag"]
+        db.query(Agent).filter(Agent.id == "a1").one().name = "renamed"
+        db.commit()
+        assert client.get("/api/articles/art1", headers={"If-None-Match": etag}).status_code == 200
+        assert client.get("/api/articles/missing", headers={"If-None-Match": etag}).status_code == 404
+        print("✅ 文章条件请求正常")
+
+
+def test_agents_and_history():
+    """测试Agent列表、对话历史和同步记录的条件请求"""
+    with app_client("cache.db") as env:
+        seed(env.Session)
+        client, Session = env.client, env.Session
+
+        etag, response = revalidate(client, "/api/agents")
+        assert response.status_code == 304
+        db = Session()
+        db.query(Agent).filter(Agent.userId == "u1").update({"isDefault": True})  # 批量更新也递增版本
+        db.commit()
+        assert client.get("/api/agents", headers={"If-None-Match": etag}).status_code == 200
+
+        etag, response = revalidate(client, "/api/chat-history/art0")
+        assert response.status_code == 304
+        saved = client.post("/api/chat-history/save", json={
+            "articleId": "art0", "agentId": "a0", "messages": [{"role": "user", "content": "hi"}]
+        })
+        assert saved.status_code == 200
+        assert client.get("/api/chat-history/art0", headers={"If-None-Match": etag}).status_code == 200
+
+        history_etag, response = revalidate(client, "/api/sync/history/art0")
+        assert response.status_code == 304
+        status_etag, response = revalidate(client, "/api/sync/status/art0")
+        assert response.status_code == 304
+        db.add(SyncHistory(articleId="art0", userId="u1", syncType="pull_from_github",
+                           syncDirection="github_to_local", syncStatus="failed"))
+        db.commit()
+        assert client.get("/api/sync/history/art0", headers={"If-None-Match": history_etag}).status_code == 200
+        assert client.get("/api/sync/status/art0", headers={"If-None-Match": status_etag}).status_code == 200
+        print("✅ Agent与历史记录条件请求正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("条件请求测试")
+    print("=" * 60)
+    test_etag_matching()
+    test_article_not_modified_without_content()
+    test_agents_and_history()
+    print("=" * 60)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+测试共享HTTP抓取：大小上限、磁盘缓存与ETag/Last-Modified重新验证，以及批量URL导入的并发限制（本地HTTP服务器、临时目录和SQLite数据库）
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import settings
+from app.models import Agent, Article, User
+from app.services.http_fetcher import HttpFetcher, FetchTooLarge
+from testing_support import app_client
+
+
+class Origin(BaseHTTPRequestHandler):
+    """记录请求的测试服务器"""
+    requests = []
+    active = {}
+    peak = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def page(self, title, headers=(), status=200):
+        body = f"<html><head><title>{title}</title></head><body><article><p>{title} 正文</p></article></body></html>"
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        host = self.headers["Host"].split(":")[0]
+        with self.lock:
+            Origin.requests.append((self.path, dict(self.headers)))
+            Origin.active[host] = Origin.active.get(host, 0) + 1
+            Origin.peak[host] = max(Origin.peak.get(host, 0), Origin.active[host])
+        try:
+            if self.path == "/etag":
+                if self.headers.get("If-None-Match") == '"v1"':
+                    self.send_response(304)
+                    self.send_header("ETag", '"v1"')
+                    self.end_headers()
+                else:
+                    self.page("ETag", [("ETag", '"v1"'), ("Cache-Control", "no-cache")])
+            elif self.path == "/modified":
+                if self.headers.get("If-Modified-Since") == "Mon, 01 Jan 2024 00:00:00 GMT":
+                    self.send_response(304)
+                    self.end_headers()
+                else:
+                    self.page("Modified", [("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT"),
+                                           ("Cache-Control", "max-age=0")])
+            elif self.path == "/fresh":
+                self.page("Fresh", [("Cache-Control", "max-age=60")])
+            elif self.path == "/nostore":
+                self.page("NoStore", [("Cache-Control", "no-store")])
+            elif self.path == "/big":
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.end_headers()  # 不声明长度，只能在读取时截断
+                for _ in range(64):
+                    self.wfile.write(b"x" * 1024)
+            elif self.path == "/missing":
+                self.page("Missing", status=404)
+            elif self.path.startswith("/slow"):
+                time.sleep(0.2)
+                self.page(f"Slow {self.path}", [("Cache-Control", "no-store")])
+            else:
+                self.page("Other")
+        finally:
+            with self.lock:
+                Origin.active[host] -= 1
+
+
+def start_origin():
+    Origin.requests, Origin.active, Origin.peak = [], {}, {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Origin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def paths():
+    return [path for path, _ in Origin.requests]
+
+
+def test_fetch_cache_and_limits():
+    """测试新鲜缓存不发请求、过期后带验证头且304使用缓存、no-store不缓存、超过大小上限中止"""
+    server, port = start_origin()
+    base = f"http://127.0.0.1:{port}"
+    fetcher = HttpFetcher(cache_dir=tempfile.mkdtemp())
+    original = settings.fetch_max_bytes
+    settings.fetch_max_bytes = 16 * 1024
+    try:
+        async def run():
+            first = await fetcher.fetch(f"{base}/fresh")
+            second = await fetcher.fetch(f"{base}/fresh")
+            assert not first.from_cache and second.from_cache and second.text == first.text
+            assert paths().count("/fresh") == 1
+
+            etag = await fetcher.fetch(f"{base}/etag")
+            again = await fetcher.fetch(f"{base}/etag")
+            assert again.from_cache and again.content == etag.content and "ETag 正文" in again.text
+            assert Origin.requests[-1][1].get("If-None-Match") == '"v1"'
+
+            await fetcher.fetch(f"{base}/modified")
+            assert (await fetcher.fetch(f"{base}/modified")).from_cache
+            assert Origin.requests[-1][1].get("If-Modified-Since") == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+            await fetcher.fetch(f"{base}/nostore")
+            assert not (await fetcher.fetch(f"{base}/nostore")).from_cache
+
+            try:
+                await fetcher.fetch(f"{base}/big")
+                assert False, "expected FetchTooLarge"
+            except FetchTooLarge:
+                pass
+            try:
+                await fetcher.fetch(f"{base}/missing")
+                assert False, "expected HTTPStatusError"
+            except Exception as e:
+                assert "404" in str(e)
+            await fetcher.aclose()
+
+        asyncio.run(run())
+
+        # 超过缓存总大小上限时淘汰最早的条目
+        original_cache = settings.fetch_cache_max_bytes
+        settings.fetch_cache_max_bytes = 1
+        try:
+            asyncio.run(fetcher.fetch(f"{base}/other"))
+            bodies = [f for _, _, files in os.walk(fetcher.cache_dir) for f in files if f.endswith(".body")]
+            assert bodies == []
+        finally:
+            settings.fetch_cache_max_bytes = original_cache
+    finally:
+        settings.fetch_max_bytes = original
+        server.shutdown()
+    print("✅ 抓取缓存与大小上限正常")
+
+
+def seed(Session):
+    db = Session()
+    db.add(User(id="u1", username="alice"))
+    db.add(Agent(id="a1", userId="u1", name="writer", isDefault=True))
+    db.commit()
+    db.close()
+
+
+def test_fetch_urls_batch():
+    """测试批量导入按完成顺序返回、每个主机的并发受限，失败的URL不影响其他URL"""
+    server, port = start_origin()
+    try:
+        with app_client("fetch.db", upload_dir=tempfile.mkdtemp(), fetch_per_host_concurrency=2) as env:
+            seed(env.Session)
+            client, Session = env.client, env.Session
+            urls = [f"http://127.0.0.1:{port}/slow{i}" for i in range(6)]
+            urls += [f"http://localhost:{port}/slow-local", f"http://127.0.0.1:{port}/missing"]
+            started = time.perf_counter()
+            response = client.post("/api/upload/fetch-urls", json={"urls": urls})
+            elapsed = time.perf_counter() - started
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            results, done = lines[:-1], lines[-1]
+            assert done == {"type": "done", "succeeded": 7, "failed": 1}
+            assert sorted(r["index"] for r in results) == list(range(8))
+            failed = [r for r in results if not r["success"]]
+            assert failed[0]["url"].endswith("/missing") and failed[0]["error"].startswith("无法访问URL") \
+                and "404" in failed[0]["error"]
+
+            # 同一主机最多2个并发：6个0.2秒的请求至少需要3轮
+            assert Origin.peak["127.0.0.1"] == 2 and elapsed >= 0.6
+            # 不同主机的请求同时进行，localhost的请求比127.0.0.1的最后一个更早完成
+            order = [r["url"] for r in results]
+            assert order.index(f"http://localhost:{port}/slow-local") < len(order) - 2
+
+            db = Session()
+            assert db.query(Article).count() == 7
+            db.close()
+
+            single = client.post("/api/upload/fetch-url", json={"url": f"http://127.0.0.1:{port}/fresh"}).json()
+            assert single["title"] == "Fresh" and not single["cached"]
+            again = client.post("/api/upload/fetch-url", json={"url": f"http://127.0.0.1:{port}/fresh"}).json()
+            assert again["cached"] and paths().count("/fresh") == 1
+
+            too_many = client.post("/api/upload/fetch-urls",
+                                   json={"urls": ["a"] * (settings.fetch_batch_max_urls + 1)})
+            assert too_many.status_code >= 400
+    finally:
+        server.shutdown()
+    print("✅ 批量URL导入正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("HTTP抓取测试")
+    print("=" * 60)
+    test_fetch_cache_and_limits()
+    test_fetch_urls_batch()
+    print("=" * 60)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+测试图片处理流水线：一次解码生成主图、WebP响应式版本和占位图，按内容哈希复用，发布HTML时添加srcset（临时上传目录和SQLite数据库）
+"""
+import sys
+import os
+import io
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from app.config import settings
+from app.utils import image_pipeline
+from app.utils.image_pipeline import process_image, add_srcset, file_hash
+from testing_support import app_client
+
+
+def image_bytes(size, format="JPEG", mode="RGB"):
+    buffer = io.BytesIO()
+    image = Image.new(mode, size)
+    # 渐变内容，避免纯色图片压缩后过小
+    image.putdata([(x % 256, y % 256, (x + y) % 256) + ((x % 256,) if mode == "RGBA" else ())
+                   for y in range(size[1]) for x in range(size[0])])
+    image.save(buffer, format)
+    return buffer.getvalue()
+
+
+def test_process_image_variants():
+    """测试主图缩放、比主图窄的WebP版本、占位图，以及清单命中时不重新处理"""
+    directory = tempfile.mkdtemp()
+    source = os.path.join(directory, "upload.part")
+    with open(source, "wb") as f:
+        f.write(image_bytes((2400, 1200)))
+
+    manifest = process_image(source, directory, "a" * 32, ".jpg")
+    assert (manifest["width"], manifest["height"]) == (1920, 960)
+    assert [v["width"] for v in manifest["variants"]] == [480, 960, 1440, 1920]
+    assert manifest["placeholder"].startswith("data:image/webp;base64,") and len(manifest["placeholder"]) < 600
+    with Image.open(os.path.join(directory, "a" * 32 + ".jpg")) as main:
+        assert main.size == (1920, 960) and main.format == "JPEG"
+    for variant in manifest["variants"]:
+        with Image.open(os.path.join(directory, variant["file"])) as image:
+            assert image.format == "WEBP" and image.size == (variant["width"], variant["height"])
+    largest = manifest["variants"][-1]["size"]
+    assert largest < os.path.getsize(os.path.join(directory, "a" * 32 + ".jpg"))
+    # 清单记录每个输出文件字节的哈希（图片服务的强ETag）
+    files = ["a" * 32 + ".jpg"] + [variant["file"] for variant in manifest["variants"]]
+    assert manifest["hashes"] == {name: file_hash(os.path.join(directory, name)) for name in files}
+
+    # 清单命中：不读取上传内容
+    os.remove(source)
+    assert process_image(source, directory, "a" * 32, ".jpg") == manifest
+
+    # 小图只生成与主图同宽的一个版本；透明PNG保留透明度
+    with open(source, "wb") as f:
+        f.write(image_bytes((300, 200), "PNG", "RGBA"))
+    small = process_image(source, directory, "b" * 32, ".png")
+    assert [v["width"] for v in small["variants"]] == [300]
+    with Image.open(os.path.join(directory, small["variants"][0]["file"])) as image:
+        assert image.mode == "RGBA"
+
+    # 无法解码的内容原样保存
+    with open(source, "wb") as f:
+        f.write(b"not an image")
+    assert process_image(source, directory, "c" * 32, ".gif") is None
+    assert open(os.path.join(directory, "c" * 32 + ".gif"), "rb").read() == b"not an image"
+    print("✅ 一次解码生成响应式版本")
+
+
+def test_upload_srcset_and_publish_rewrite():
+    """测试上传返回srcset、版本可访问、发布HTML添加srcset，删除记录时一并删除版本文件"""
+    with app_client("uploads.db", upload_dir=tempfile.mkdtemp()) as env:
+        client = env.client
+        uploaded = client.post("/api/upload/image",
+                               files={"file": ("photo.jpg", image_bytes((1000, 500)), "image/jpeg")}).json()["file"]
+        base = f"/api/upload/images/u1/"
+        assert uploaded["srcset"] == ", ".join(
+            f"{base}{uploaded['sha256'][:32]}-{w}w.webp {w}w" for w in (480, 960, 1000)
+        )
+        assert (uploaded["width"], uploaded["height"]) == (1000, 500) and uploaded["placeholder"]
+        variant_url = uploaded["srcset"].split(", ")[0].split(" ")[0]
+        response = client.get(variant_url)
+        assert response.status_code == 200 and response.headers["content-type"] == "image/webp"
+
+        html = (f'<p><img alt="a" src="{uploaded["url"]}"></p>'
+                f'<img src="{uploaded["url"]}" srcset="custom 1x"/>'
+                f'<img src="https://example.com/x.png">')
+        rewritten = add_srcset(html)
+        assert f'<img alt="a" src="{uploaded["url"]}" srcset="{uploaded["srcset"]}" ' \
+               f'sizes="{image_pipeline.DEFAULT_SIZES}" width="1000" height="500">' in rewritten
+        assert rewritten.count("srcset=") == 2 and 'srcset="custom 1x"/>' in rewritten
+
+        files = set(os.listdir(os.path.join(settings.upload_dir, "images", "u1")))
+        assert len(files) == 5  # 主图、3个WebP版本、清单
+        assert client.delete(f"/api/upload/{uploaded['id']}").json()["success"]
+        assert os.listdir(os.path.join(settings.upload_dir, "images", "u1")) == []
+        print("✅ srcset 返回与发布改写正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("图片处理流水线测试")
+    print("=" * 60)
+    test_process_image_variants()
+    test_upload_srcset_and_publish_rewrite()
+    print("=" * 60)
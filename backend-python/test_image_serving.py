@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+测试上传图片的服务：长期缓存头、ETag（清单中的文件哈希、原样保存的文件名、早期清单的弱ETag）与304、
+Range请求，以及静态文件挂载模式（临时上传目录）
+"""
+import sys
+import os
+import hashlib
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.config import settings
+from app.utils.image_pipeline import file_hash
+from app.utils.static_images import ImageStaticFiles, IMMUTABLE_CACHE_CONTROL
+
+
+ORIGINAL_UPLOAD_DIR = settings.upload_dir
+STEM = "0123456789abcdef0123456789abcdef"
+RAW_STEM = "1" * 32  # 原样保存（无清单）
+LEGACY_STEM = "2" * 32  # 清单中没有文件哈希
+
+
+def make_images():
+    settings.upload_dir = tempfile.mkdtemp()
+    directory = os.path.join(settings.upload_dir, "images", "u1")
+    os.makedirs(directory)
+    data = bytes(range(256)) * 40
+    for name in (f"{STEM}.png", f"{STEM}-480w.webp", f"{RAW_STEM}.gif", f"{LEGACY_STEM}-480w.webp"):
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(data)
+    digest = file_hash(os.path.join(directory, f"{STEM}-480w.webp"))
+    manifests = {
+        STEM: {"variants": [{"width": 480, "file": f"{STEM}-480w.webp"}], "hashes": {f"{STEM}-480w.webp": digest}},
+        LEGACY_STEM: {"variants": [{"width": 480, "file": f"{LEGACY_STEM}-480w.webp"}]},
+    }
+    for stem, manifest in manifests.items():
+        with open(os.path.join(directory, f"{stem}.json"), "w") as f:
+            json.dump(manifest, f)
+    return directory, data
+
+
+def check_serving(client, prefix, data):
+    url = f"{prefix}/u1/{STEM}-480w.webp"
+    response = client.get(url)
+    etag = f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+    assert response.status_code == 200 and response.content == data
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["etag"] == etag and response.headers["content-type"] == "image/webp"
+    assert response.headers["accept-ranges"] == "bytes"
+
+    cached = client.get(url, headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["etag"] == response.headers["etag"]
+    assert cached.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+    partial = client.get(url, headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206 and partial.content == data[100:200]
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(data)}"
+    # If-Range 与当前ETag一致时返回部分内容，不一致时返回完整内容
+    assert client.get(url, headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+    assert client.get(url, headers={"Range": "bytes=0-9", "If-Range": f'"{STEM}-480w"'}).status_code == 200
+
+    # 没有清单的文件：文件名即内容哈希
+    raw = client.get(f"{prefix}/u1/{RAW_STEM}.gif")
+    assert raw.status_code == 200 and raw.headers["etag"] == f'"{RAW_STEM}"'
+
+    # 清单中没有文件哈希：弱ETag，仍可304，但 If-Range 不再返回部分内容
+    legacy_url = f"{prefix}/u1/{LEGACY_STEM}-480w.webp"
+    legacy = client.get(legacy_url)
+    assert legacy.headers["etag"] == f'W/"{LEGACY_STEM}-480w"'
+    assert client.get(legacy_url, headers={"If-None-Match": legacy.headers["etag"]}).status_code == 304
+    assert client.get(legacy_url, headers={"Range": "bytes=0-9", "If-Range": legacy.headers["etag"]}).status_code == 200
+
+    head = client.head(url)
+    assert head.status_code == 200 and head.headers["content-length"] == str(len(data)) and head.content == b""
+
+    # 清单、不存在的文件和目录穿越都返回404
+    assert client.get(f"{prefix}/u1/{STEM}.json").status_code == 404
+    assert client.get(f"{prefix}/u1/missing.png").status_code == 404
+    assert client.get(f"{prefix}/..%2Fimages/{STEM}.png").status_code == 404
+
+
+def test_route_serving():
+    """测试接口提供图片时的缓存头、304和Range"""
+    _, data = make_images()
+    try:
+        check_serving(TestClient(app, base_url="http://localhost"), "/api/upload/images", data)
+    finally:
+        settings.upload_dir = ORIGINAL_UPLOAD_DIR
+    print("✅ 接口图片服务正常")
+
+
+def test_static_mount():
+    """测试静态挂载模式使用相同的缓存行为"""
+    directory, data = make_images()
+    try:
+        static_app = FastAPI()
+        static_app.mount("/images", ImageStaticFiles(directory=os.path.dirname(directory)))
+        check_serving(TestClient(static_app), "/images", data)
+    finally:
+        settings.upload_dir = ORIGINAL_UPLOAD_DIR
+    print("✅ 静态挂载图片服务正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("图片服务测试")
+    print("=" * 60)
+    test_route_serving()
+    test_static_mount()
+    print("=" * 60)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+测试ONNX编码器的池化与归一化，以及与PyTorch（sentence-transformers）路径的一致性
+（需要onnxruntime；PyTorch对比需要sentence-transformers，整模型对比还需要配置 KNOWLEDGE_ONNX_DIR）
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.agent.knowledge import embedder as embedder_module
+from app.agent.knowledge.embedder import OnnxEncoder, TextEmbedder
+
+VOCAB = {"[PAD]": 0, "[CLS]": 1, "a": 2, "b": 3, "c": 4, "d": 5}
+TABLE = np.random.default_rng(0).standard_normal((len(VOCAB), 8)).astype(np.float32)
+TEXTS = ["a b c d a", "b", "c d", "d a b"]
+
+
+class TableSession:
+    """按token id查表得到隐藏状态，代替Transformer"""
+
+    def get_inputs(self):
+        return []
+
+    def run(self, outputs, feeds):
+        return [TABLE[feeds["input_ids"]]]
+
+
+def make_encoder(pooling):
+    """绕过模型文件加载，构造使用查表会话和词表分词器的编码器"""
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import WhitespaceSplit
+    from tokenizers.processors import TemplateProcessing
+
+    tokenizer = Tokenizer(WordLevel(VOCAB, unk_token="[PAD]"))
+    tokenizer.pre_tokenizer = WhitespaceSplit()
+    tokenizer.post_processor = TemplateProcessing(single="[CLS] $A", special_tokens=[("[CLS]", 1)])
+    tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+    encoder = OnnxEncoder.__new__(OnnxEncoder)
+    encoder.pooling, encoder.dimension = pooling, TABLE.shape[1]
+    encoder.session, encoder.input_names = TableSession(), {"input_ids", "attention_mask"}
+    encoder.tokenizer = encoder.counter = tokenizer
+    return encoder
+
+
+def expected(pooling):
+    """逐条计算（不padding）的池化结果"""
+    rows = []
+    for text in TEXTS:
+        hidden = TABLE[[1] + [VOCAB[token] for token in text.split()]]
+        rows.append(hidden[0] if pooling == "cls" else hidden.mean(axis=0))
+    rows = np.array(rows)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_pooling_and_normalization():
+    """测试mean池化不计padding、cls池化取首个token、结果归一化，且与分批和排序无关"""
+    pytest.importorskip("onnxruntime")
+    for pooling in ("mean", "cls"):
+        vectors = make_encoder(pooling).encode(TEXTS, batch_size=3)
+        assert vectors.dtype == np.float32
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-6)
+        assert np.allclose(vectors, expected(pooling), atol=1e-6)
+        assert np.allclose(vectors, make_encoder(pooling).encode(TEXTS, batch_size=1), atol=1e-6)
+    print("✅ ONNX池化与归一化正常")
+
+
+def test_matches_torch_pooling():
+    """测试在相同隐藏状态上与sentence-transformers的Pooling + Normalize结果一致"""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("sentence_transformers")
+    import torch
+    from sentence_transformers.models import Normalize, Pooling
+
+    tokenizer = make_encoder("mean").tokenizer
+    encodings = tokenizer.encode_batch(TEXTS)
+    input_ids = torch.tensor([e.ids for e in encodings])
+    features = {
+        "token_embeddings": torch.from_numpy(TABLE)[input_ids],
+        "attention_mask": torch.tensor([e.attention_mask for e in encodings])
+    }
+    for pooling in ("mean", "cls"):
+        reference = Normalize()(Pooling(TABLE.shape[1], pooling_mode=pooling)(dict(features)))
+        vectors = make_encoder(pooling).encode(TEXTS)
+        assert np.allclose(vectors, reference["sentence_embedding"].numpy(), atol=1e-5)
+    print("✅ 与PyTorch池化一致")
+
+
+def test_exported_model_matches_torch():
+    """测试导出的ONNX模型与PyTorch模型的向量一致（int8量化模型允许少量误差）"""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("sentence_transformers")
+    if not settings.knowledge_onnx_dir:
+        pytest.skip("KNOWLEDGE_ONNX_DIR is not set")
+
+    onnx = TextEmbedder(backend="onnx", onnx_dir=settings.knowledge_onnx_dir)
+    torch_embedder = TextEmbedder(onnx.onnx.model_name)
+    texts = ["向量数据库的索引结构", "retrieval augmented generation", "写作助手"]
+    similarity = (onnx.embed(texts) * torch_embedder.embed(texts)).sum(axis=1)
+    assert similarity.min() > (0.99 if onnx.onnx.model_file == "model_quantized.onnx" else 0.9999)
+    print("✅ 导出模型与PyTorch一致")
+
+
+def test_explicit_onnx_does_not_fall_back():
+    """测试显式要求onnx但加载失败时抛出异常，而不是静默退回torch"""
+    missing = os.path.join(os.path.dirname(os.path.abspath(__file__)), "no-such-onnx-dir")
+    expected_error = ImportError if embedder_module.ort is None else FileNotFoundError
+    with pytest.raises(expected_error):
+        TextEmbedder(backend="onnx", onnx_dir=missing)
+    print("✅ ONNX加载失败时报错")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("ONNX编码器测试")
+    print("=" * 60)
+    test_pooling_and_normalization()
+    test_matches_torch_pooling()
+    test_exported_model_matches_torch()
+    test_explicit_onnx_does_not_fall_back()
+    print("=" * 60)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+测试PDF文本提取：进程池按页码范围并行提取、按页序流式输出、解析结果缓存（临时上传目录和SQLite数据库）
+"""
+import sys
+import os
+import json
+import asyncio
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import settings
+from app.models import UploadedFile
+from app.utils import pdf_text
+from testing_support import app_client
+
+
+def make_pdf(pages):
+    """生成每页一行文字的PDF（Page 1, Page 2, ...）"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for n in range(1, pages + 1):
+        stream = f"BT /F1 24 Tf 72 720 Td (Page {n}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def test_page_ranges_in_order():
+    """测试按页码范围拆分后仍按页序输出，结果与逐页提取一致"""
+    path = os.path.join(tempfile.mkdtemp(), "doc.pdf")
+    with open(path, "wb") as f:
+        f.write(make_pdf(23))
+    assert pdf_text.page_ranges(23, 10) == [(0, 10), (10, 20), (20, 23)]
+
+    original = settings.pdf_pages_per_task
+    settings.pdf_pages_per_task = 4
+    try:
+        async def collect():
+            return [item async for item in pdf_text.iter_pdf_pages(path)]
+
+        pages = asyncio.run(collect())
+        assert [index for index, _ in pages] == list(range(23))
+        assert [text.strip() for _, text in pages] == [f"Page {n}" for n in range(1, 24)]
+        assert asyncio.run(pdf_text.extract_pdf_text(path)) == "".join(
+            text + "\n" for text in pdf_text.extract_pages(path, 0, 23)
+        )
+    finally:
+        settings.pdf_pages_per_task = original
+        pdf_text.shutdown_pool()
+    print("✅ 分范围并行提取按页序输出")
+
+
+def test_parse_stream_and_cache():
+    """测试流式解析逐页输出并写入缓存，之后的解析直接使用缓存"""
+    try:
+        with app_client("uploads.db", upload_dir=tempfile.mkdtemp(), pdf_pages_per_task=3) as env:
+            client, Session = env.client, env.Session
+            uploaded = client.post("/api/upload/file",
+                                   files={"file": ("doc.pdf", make_pdf(7), "application/pdf")}).json()["file"]
+
+            response = client.post("/api/upload/parse/stream", json={"fileId": uploaded["id"]})
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            events = [json.loads(line) for line in response.text.splitlines()]
+            assert [e["page"] for e in events[:-1]] == list(range(7))
+            assert events[-1] == {"type": "done", "pages": 7, "word_count": events[-1]["word_count"], "cached": False}
+
+            db = Session()
+            assert db.get(UploadedFile, uploaded["id"]).parsedPath == uploaded["path"] + ".parsed.txt"
+            db.close()
+
+            # 删除原文件后仍能解析，说明使用了缓存
+            os.remove(uploaded["path"])
+            parsed = client.post("/api/upload/parse", json={"fileId": uploaded["id"]}).json()
+            assert parsed["content"] == "".join(e["text"] + "\n" for e in events[:-1])
+            assert parsed["word_count"] == events[-1]["word_count"]
+            cached = [json.loads(line) for line in
+                      client.post("/api/upload/parse/stream", json={"fileId": uploaded["id"]}).text.splitlines()]
+            assert cached[0] == {"type": "content", "content": parsed["content"]} and cached[-1]["cached"]
+
+            # 损坏的PDF：流中输出错误，不写缓存
+            broken = client.post("/api/upload/file",
+                                 files={"file": ("bad.pdf", b"%PDF-1.4 broken", "application/pdf")}).json()["file"]
+            events = [json.loads(line) for line in
+                      client.post("/api/upload/parse/stream", json={"fileId": broken["id"]}).text.splitlines()]
+            assert events[-1]["type"] == "error" and not os.path.exists(broken["path"] + ".parsed.txt")
+    finally:
+        pdf_text.shutdown_pool()
+    print("✅ 流式解析与缓存正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("PDF文本提取测试")
+    print("=" * 60)
+    test_page_ranges_in_order()
+    test_parse_stream_and_cache()
+    print("=" * 60)
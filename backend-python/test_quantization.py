@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+测试量化向量索引（不调用嵌入模型）
+"""
+import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from app.agent.knowledge.quantization import QuantizedIndex
+from app.agent.knowledge.storage import VectorStore
+
+
+def _random_vectors(n: int, dim: int = 64, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_int8_round_trip():
+    """测试int8量化误差在可接受范围内"""
+    vectors = _random_vectors(100)
+    codes, scales = QuantizedIndex.quantize(vectors, "int8")
+
+    assert codes.dtype == np.int8
+    restored = codes.astype(np.float32) * scales[:, None]
+    assert np.abs(restored - vectors).max() < 0.01
+    print("✅ int8量化误差正常")
+
+
+def test_search_matches_exact():
+    """测试量化检索 + 全精度重打分与精确检索一致"""
+    vectors = _random_vectors(500)
+    ids = [f"doc_{i}" for i in range(len(vectors))]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = QuantizedIndex(tmp_dir, mode="int8", rescore_factor=4)
+        index.add(ids, vectors)
+
+        for query in vectors[:20]:
+            expected = np.argsort(-(vectors @ query))[:5]
+            found, distances = index.search(query, n_results=5)
+            assert found == [ids[i] for i in expected]
+            assert distances == sorted(distances)
+
+        assert index.memory_bytes() * 3 < index.full_precision_bytes()
+    print("✅ 量化检索结果与精确检索一致")
+
+
+def test_persistence_and_mutation():
+    """测试更新、删除、过滤和重新加载"""
+    vectors = _random_vectors(10)
+    ids = [f"doc_{i}" for i in range(10)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = QuantizedIndex(tmp_dir, mode="float16")
+        index.add(ids, vectors)
+        index.delete(["doc_0", "doc_1"])
+        index.update(["doc_2"], vectors[0:1])
+
+        reloaded = QuantizedIndex(tmp_dir, mode="float16")
+        assert len(reloaded) == 8
+        assert "doc_0" not in reloaded
+
+        found, _ = reloaded.search(vectors[0], n_results=1)
+        assert found == ["doc_2"]
+
+        found, _ = reloaded.search(vectors[5], n_results=3, candidate_ids=["doc_8", "doc_9"])
+        assert set(found) == {"doc_8", "doc_9"}
+
+        reloaded.clear()
+        assert len(QuantizedIndex(tmp_dir, mode="float16")) == 0
+    print("✅ 持久化与增删改正常")
+
+
+def _segment_file(index_dir: str, name: str) -> str:
+    with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+        return os.path.join(index_dir, json.load(f)["segment"], name)
+
+
+def test_append_only_writes():
+    """测试分批添加只追加新行、中断写入的数据被丢弃、切换量化方式和旧版索引转换"""
+    vectors = _random_vectors(300)
+    ids = [f"doc_{i}" for i in range(len(vectors))]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = QuantizedIndex(tmp_dir, mode="int8")
+        index.add(ids[:100], vectors[:100])
+        full_path = _segment_file(tmp_dir, "full.bin")
+        with open(full_path, "rb") as f:
+            first_batch = f.read()
+        for start in range(100, 300, 50):
+            index.add(ids[start:start + 50], vectors[start:start + 50])
+
+        # 同一段文件追加写入，已有的行没有被重写
+        assert _segment_file(tmp_dir, "full.bin") == full_path
+        with open(full_path, "rb") as f:
+            data = f.read()
+        assert len(data) == vectors.nbytes and data.startswith(first_batch)
+
+        # 最后一次提交之后写入了一半的数据：重新加载时丢弃
+        with open(_segment_file(tmp_dir, "codes.bin"), "ab") as f:
+            f.write(b"\x01" * 64)
+        with open(_segment_file(tmp_dir, "ids.txt"), "a", encoding="utf-8") as f:
+            f.write("torn\n")
+        reloaded = QuantizedIndex(tmp_dir, mode="int8")
+        assert len(reloaded) == 300 and "torn" not in reloaded
+        assert reloaded.search(vectors[250], n_results=1)[0] == ["doc_250"]
+        reloaded.add(["doc_new"], vectors[:1])
+        assert len(QuantizedIndex(tmp_dir, mode="int8")) == 301
+
+        # 切换量化方式时用全精度向量重新量化
+        switched = QuantizedIndex(tmp_dir, mode="float16")
+        assert switched._codes.dtype == np.float16 and len(switched) == 301
+        assert switched.search(vectors[7], n_results=1)[0] == ["doc_7"]
+        assert len([name for name in os.listdir(tmp_dir) if name.startswith("segment-")]) == 1
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 旧版格式（ids.json + .npy）加载时转换
+        codes, scales = QuantizedIndex.quantize(vectors[:10], "int8")
+        with open(os.path.join(tmp_dir, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump(ids[:10], f)
+        np.save(os.path.join(tmp_dir, "codes.npy"), codes)
+        np.save(os.path.join(tmp_dir, "scales.npy"), scales)
+        np.save(os.path.join(tmp_dir, "full.npy"), vectors[:10])
+        legacy = QuantizedIndex(tmp_dir, mode="int8")
+        assert len(legacy) == 10 and legacy.search(vectors[3], n_results=1)[0] == ["doc_3"]
+        assert not os.path.exists(os.path.join(tmp_dir, "ids.json"))
+        assert len(QuantizedIndex(tmp_dir, mode="int8")) == 10
+    print("✅ 追加写入与格式转换正常")
+
+
+def test_vector_store_mode_switch():
+    """测试已有集合开启量化时从Chroma重建索引，量化模式创建的集合不能关闭量化"""
+    vectors = _random_vectors(30)
+    ids = [f"doc_{i}" for i in range(30)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plain = VectorStore(tmp_dir, collection_name="plain_docs")
+        plain.add([f"text {i}" for i in range(20)], vectors[:20], ids=ids[:20])
+
+        quantized = VectorStore(tmp_dir, collection_name="plain_docs", quantization="int8", client=plain.client)
+        assert quantized.storage == "full" and len(quantized.quantized) == 20
+        assert quantized.search(vectors[4], n_results=1)["ids"] == ["doc_4"]
+        # 集合中仍是真实向量，新文档也写入真实向量
+        quantized.add([f"text {i}" for i in range(20, 30)], vectors[20:], ids=ids[20:])
+        assert len(quantized.collection.get(ids=["doc_25"], include=["embeddings"])["embeddings"][0]) == 64
+        assert VectorStore(tmp_dir, collection_name="plain_docs", client=plain.client).count() == 30
+
+        created = VectorStore(tmp_dir, collection_name="quantized_docs", quantization="float16", client=plain.client)
+        created.add(["a", "b"], vectors[:2], ids=["a", "b"])
+        assert created.storage == "placeholder"
+        try:
+            VectorStore(tmp_dir, collection_name="quantized_docs", client=plain.client)
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        reopened = VectorStore(tmp_dir, collection_name="quantized_docs", quantization="int8", client=plain.client)
+        assert reopened.search(vectors[1], n_results=1)["ids"] == ["b"]
+    print("✅ 量化模式切换正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("量化向量索引测试")
+    print("=" * 60)
+    test_int8_round_trip()
+    test_search_matches_exact()
+    test_persistence_and_mutation()
+    test_append_only_writes()
+    test_vector_store_mode_switch()
+    print("=" * 60)
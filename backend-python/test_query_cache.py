@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+测试检索结果缓存（不调用嵌入模型）
+"""
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.agent.knowledge.cache import QueryCache, normalize_query
+
+
+def test_normalized_key():
+    """测试查询规范化后命中同一缓存键"""
+    assert normalize_query("  RAG　检索\n技巧 ") == "rag 检索 技巧"
+    key_a = QueryCache.make_key("c1", 0, "RAG 检索", 5, {"source": "article"})
+    key_b = QueryCache.make_key("c1", 0, " rag  检索", 5, {"source": "article"})
+    assert key_a == key_b
+    assert key_a != QueryCache.make_key("c1", 1, "RAG 检索", 5, {"source": "article"})
+    assert key_a != QueryCache.make_key("c1", 0, "RAG 检索", 3, {"source": "article"})
+    print("✅ 缓存键规范化正常")
+
+
+def test_version_bump_invalidates():
+    """测试版本号递增后旧结果不再命中，且有界LRU淘汰最旧条目"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = QueryCache(os.path.join(tmp_dir, "cache.sqlite3"), max_entries=2)
+
+        key = cache.make_key("c1", cache.version("c1"), "query", 5)
+        cache.set(key, "c1", [{"text": "a", "score": 0.9}])
+        assert cache.get(key) == [{"text": "a", "score": 0.9}]
+
+        cache.get(key)[0]["text"] = "mutated"
+        assert cache.get(key)[0]["text"] == "a"
+
+        assert cache.bump("c1") == 1
+        assert cache.get(cache.make_key("c1", cache.version("c1"), "query", 5)) is None
+
+        for i in range(3):
+            cache.set(f"k{i}", "c1", i)
+        assert cache.get("k0") is None and cache.get("k2") == 2
+
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["hits"] == 4 and stats["misses"] == 2
+    print("✅ 版本失效与LRU淘汰正常")
+
+
+def test_shared_tier():
+    """测试共享层在不同缓存实例（模拟不同worker）之间复用结果"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "cache.sqlite3")
+        worker_a = QueryCache(path, shared=True)
+        worker_b = QueryCache(path, shared=True)
+
+        key = worker_a.make_key("c1", worker_a.version("c1"), "query", 5)
+        worker_a.set(key, "c1", [{"text": "shared"}])
+        assert worker_b.get(key) == [{"text": "shared"}]
+        assert worker_b.stats()["shared_hits"] == 1
+
+        worker_b.bump("c1")
+        assert worker_a.version("c1") == 1
+        assert worker_b.get(worker_b.make_key("c1", worker_b.version("c1"), "query", 5)) is None
+    print("✅ 共享缓存层正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("检索结果缓存测试")
+    print("=" * 60)
+    test_normalized_key()
+    test_version_bump_invalidates()
+    test_shared_tier()
+    print("=" * 60)
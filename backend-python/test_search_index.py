@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+测试文章全文索引（临时SQLite数据库）
+"""
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, desc, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Article, Agent, User
+from app.services.search_index import (
+    CJK_TABLE, ensure_search_index, search_hits, resolve_snippets, segment_cjk, cjk_bigrams
+)
+
+
+def make_session():
+    path = os.path.join(tempfile.mkdtemp(), "search.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id="u1", username="alice"))
+    db.add(User(id="u2", username="bob"))
+    db.add(Agent(id="a1", userId="u1", name="writer"))
+    db.add(Agent(id="a2", userId="u2", name="writer"))
+    db.commit()
+    return engine, db
+
+
+def search(db, user_id, query):
+    hits = search_hits(db, user_id, query)
+    rows = (
+        db.query(Article, hits.c.snippet)
+        .join(hits, hits.c.article_id == Article.id)
+        .order_by(hits.c.rank, desc(Article.createdAt))
+        .all()
+    )
+    snippets = resolve_snippets(db, query, [(article.id, snippet) for article, snippet in rows])
+    return [(article.id, snippets.get(article.id)) for article, _ in rows]
+
+
+def test_backfill_and_ranking():
+    """测试启动回填、按用户隔离，以及标题命中排在正文命中之前"""
+    engine, db = make_session()
+    db.add(Article(id="body", userId="u1", agentId="a1", title="随笔",
+                   content="<p>今天聊聊向量数据库的索引结构</p>"))
+    db.add(Article(id="title", userId="u1", agentId="a1", title="向量数据库入门",
+                   content="<p>入门内容</p>"))
+    db.add(Article(id="other", userId="u2", agentId="a2", title="向量数据库",
+                   content="<p>别人的文章</p>"))
+    db.commit()
+
+    assert ensure_search_index(engine) == 3
+    assert ensure_search_index(engine) == 0
+
+    results = search(db, "u1", "向量数据库")
+    assert [article_id for article_id, _ in results] == ["title", "body"]
+    assert "<mark>向量数据库</mark>" in dict(results)["body"]
+    print("✅ 回填与排序正常")
+
+
+def test_sync_on_write():
+    """测试创建、修改、删除后索引同步，且索引的是HTML中的纯文本"""
+    engine, db = make_session()
+    ensure_search_index(engine)
+
+    article = Article(id="x", userId="u1", agentId="a1", title="Draft",
+                      content='<p class="highlight">retrieval <b>augmented</b> generation</p>')
+    db.add(article)
+    db.commit()
+    assert [r[0] for r in search(db, "u1", "retrieval augmented")] == ["x"]
+    assert search(db, "u1", "highlight") == []
+
+    article.content = "<p>completely different</p>"
+    db.commit()
+    assert search(db, "u1", "retrieval") == []
+    assert [r[0] for r in search(db, "u1", "different")] == ["x"]
+
+    db.delete(article)
+    db.commit()
+    assert search(db, "u1", "different") == []
+    print("✅ 写入同步正常")
+
+
+def test_short_terms_and_escaping():
+    """测试少于3个字符的词退回LIKE匹配，片段中的HTML被转义"""
+    engine, db = make_session()
+    ensure_search_index(engine)
+    db.add(Article(id="y", userId="u1", agentId="a1", title="比较",
+                   content="<p>如果 a &lt; b 则交换，AI 会处理</p>"))
+    db.commit()
+
+    results = search(db, "u1", "AI")
+    assert [r[0] for r in results] == ["y"]
+    assert "&lt;" in results[0][1] and "<mark>AI</mark>" in results[0][1]
+    assert search(db, "u1", "100%") == []
+    print("✅ 短词匹配与转义正常")
+
+
+def test_two_character_cjk_terms():
+    """测试两个字的中文词走二元组索引（随写入、修改、删除同步），单字只在候选集上做LIKE"""
+    engine, db = make_session()
+    db.add(Article(id="old", userId="u1", agentId="a1", title="旧文章", content="<p>关于写作的笔记</p>"))
+    db.commit()
+    ensure_search_index(engine)
+
+    article = Article(id="w", userId="u1", agentId="a1", title="随笔", content="<p>写作助手的 AI 功能</p>")
+    db.add(article)
+    db.add(Article(id="z", userId="u2", agentId="a2", title="写作", content="<p>别人的文章</p>"))
+    db.commit()
+
+    sql = str(search_hits(db, "u1", "写作"))
+    assert CJK_TABLE in sql and "LIKE" not in sql
+    assert sorted(r[0] for r in search(db, "u1", "写作")) == ["old", "w"]
+    assert [r[0] for r in search(db, "u1", "写作 AI")] == ["w"]
+    assert [r[0] for r in search(db, "u1", "助手 写")] == ["w"]
+    assert "<mark>写作</mark>" in dict(search(db, "u1", "写作"))["w"]
+    assert search(db, "u1", "作助手 笔记") == []
+
+    article.content = "<p>完全不同的内容</p>"
+    db.commit()
+    assert [r[0] for r in search(db, "u1", "写作")] == ["old"]
+    assert [r[0] for r in search(db, "u1", "不同")] == ["w"]
+    db.delete(article)
+    db.commit()
+    assert search(db, "u1", "不同") == []
+
+    # 升级：已有索引行补建二元组索引
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP TABLE "{CJK_TABLE}"'))
+    assert ensure_search_index(engine) == 0
+    assert [r[0] for r in search(db, "u1", "笔记")] == ["old"]
+    print("✅ 中文二字词索引正常")
+
+
+def test_segment_cjk():
+    """测试分词预处理：中文切为二元组，英文保持不变（二元组索引只保留中文）"""
+    assert segment_cjk("RAG检索增强").split() == ["rag", "检索", "索增", "增强"]
+    assert segment_cjk("写").split() == ["写"]
+    assert cjk_bigrams("RAG检索 and 增强").split() == ["检索", "增强"]
+    print("✅ 中文二元切分正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("全文索引测试")
+    print("=" * 60)
+    test_backfill_and_ranking()
+    test_sync_on_write()
+    test_short_terms_and_escaping()
+    test_two_character_cjk_terms()
+    test_segment_cjk()
+    print("=" * 60)
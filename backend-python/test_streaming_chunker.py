@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+测试流式分块器（不调用嵌入模型）
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.agent.knowledge.chunker import StreamingChunker, approximate_token_count
+
+
+def test_token_budget_and_offsets():
+    """测试每块token数不超过上限，且偏移量能还原原文"""
+    text = "\n\n".join(
+        "写作助手需要理解作者的风格。" * 8 + " Token-aware chunks stay within the limit." * 3
+        for _ in range(20)
+    )
+    chunker = StreamingChunker(chunk_size=64, chunk_overlap=8)
+    chunks = list(chunker.iter_chunks(text, {"title": "test"}, markdown=False))
+
+    assert len(chunks) > 1
+    for i, chunk in enumerate(chunks):
+        meta = chunk["metadata"]
+        assert meta["chunk_index"] == i
+        assert meta["title"] == "test"
+        assert meta["token_count"] <= 64
+        assert approximate_token_count(chunk["text"]) <= 64
+        assert text[meta["start_offset"]:meta["end_offset"]].strip() == chunk["text"]
+    print("✅ token上限与偏移量正常")
+
+
+def test_markdown_breadcrumbs():
+    """测试标题面包屑，以及代码块中的#不被当作标题"""
+    text = (
+        "# 第一章\n\n引言段落。\n\n"
+        "## 第一节\n\n```python\n# not a header\nprint(1)\n```\n\n正文内容。\n\n"
+        "# 第二章\n\n结尾。"
+    )
+    chunks = list(StreamingChunker(chunk_size=256).iter_chunks(text))
+    crumbs = [chunk["metadata"]["breadcrumbs"] for chunk in chunks]
+
+    assert crumbs == ["第一章", "第一章 > 第一节", "第二章"]
+    assert "# not a header" in chunks[1]["text"]
+    assert chunks[1]["metadata"]["section_level"] == 2
+    print("✅ Markdown面包屑正常")
+
+
+def test_large_code_fence():
+    """测试超长代码块只在行边界切分，放得下的代码块整体保留"""
+    code_lines = [f"result_{i} = compute(a. b, value={i}). strip()  # 第{i}行。注释" for i in range(200)]
+    fence = "```python\n" + "\n".join(code_lines) + "\n```"
+    text = f"# 代码\n\n前言段落。\n\n{fence}\n\n结尾段落。"
+    chunks = list(StreamingChunker(chunk_size=64, chunk_overlap=0).iter_chunks(text))
+
+    complete_lines = set(code_lines) | {"```python", "```", "前言段落。", "结尾段落。", ""}
+    for chunk in chunks:
+        assert chunk["metadata"]["token_count"] <= 64
+        assert all(line.strip() in complete_lines for line in chunk["text"].splitlines()), chunk["text"]
+    joined = "\n".join(chunk["text"] for chunk in chunks)
+    assert all(line in joined for line in code_lines)
+    assert all(chunk["metadata"]["token_count"] > 32 for chunk in chunks[:-1])  # 多行合并成块
+
+    small = "```\nx = a. b\ny = c. d\n```"
+    chunks = list(StreamingChunker(chunk_size=64).iter_chunks(f"说明。\n\n{small}"))
+    assert len(chunks) == 1 and small in chunks[0]["text"]
+    print("✅ 代码块按行切分正常")
+
+
+def test_custom_token_counter():
+    """测试使用外部分词器计数"""
+    chunker = StreamingChunker(chunk_size=10, chunk_overlap=0, token_counter=lambda s: len(s.split()))
+    chunks = list(chunker.iter_chunks(" ".join(["word"] * 35), markdown=False))
+
+    assert all(chunk["metadata"]["token_count"] <= 10 for chunk in chunks)
+    assert sum(len(chunk["text"].split()) for chunk in chunks) == 35
+    print("✅ 自定义token计数正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("流式分块器测试")
+    print("=" * 60)
+    test_token_budget_and_offsets()
+    test_markdown_breadcrumbs()
+    test_large_code_fence()
+    test_custom_token_counter()
+    print("=" * 60)
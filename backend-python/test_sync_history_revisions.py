@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+测试同步记录的内容版本存储：增量编解码、去重、关键帧、透明读写和旧数据迁移（临时SQLite数据库）
+"""
+import sys
+import os
+import tempfile
+import subprocess
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Article, Agent, User, ContentRevision
+from app.models.sync_history import SyncHistory
+from app.services import revision_store
+from app.utils.delta_codec import make_delta, apply_delta
+
+BASE = "".join(f"<p>第{i}段：同步内容示例，包含一些重复的文字。</p>\n" for i in range(200))
+
+
+def make_session_factory():
+    path = os.path.join(tempfile.mkdtemp(), "revisions.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(User(id="u1", username="alice"))
+    db.add(Agent(id="a0", userId="u1", name="writer"))
+    db.add(Article(id="art0", userId="u1", agentId="a0", title="文章", content=BASE))
+    db.commit()
+    db.close()
+    revision_store.clear_cache()
+    return engine, Session, path
+
+
+def sync_record(**kwargs):
+    return SyncHistory(articleId="art0", userId="u1", syncType="pull_from_github",
+                       syncDirection="github_to_local", syncStatus="success", **kwargs)
+
+
+def test_delta_round_trip():
+    """测试增量编解码（含无换行的HTML和空文本）"""
+    for base in (BASE, BASE.replace("\n", ""), "", "plain text without tags"):
+        target = base.replace("第7段", "第七段") + "<p>结尾</p>"
+        target = target[:len(target) // 3] + "插入" + target[len(target) // 3:]
+        assert apply_delta(base, make_delta(base, target)) == target
+        assert apply_delta(base, make_delta(base, "")) == ""
+    assert len(make_delta(BASE, BASE.replace("第7段", "第七段"))) < 100
+    print("✅ 增量编解码正常")
+
+
+def test_dedupe_deltas_and_keyframes():
+    """测试相同内容复用版本、增量链长度受限、还原结果可校验"""
+    engine, _, _ = make_session_factory()
+    contents = [BASE]
+    for i in range(40):
+        contents.append(contents[-1].replace(f"第{i}段", f"第{i}段（修订）"))
+
+    with engine.begin() as conn:
+        ids = [revision_store.save_revision(conn, "art0", content) for content in contents]
+        assert revision_store.save_revision(conn, "art0", contents[5]) == ids[5]
+        stats = revision_store.storage_stats(conn)
+
+    assert stats["revisions"] == len(contents)
+    assert stats["deltas"] > stats["keyframes"] >= 3
+    assert stats["stored_bytes"] * 20 < stats["raw_bytes"]
+
+    with engine.connect() as conn:
+        depths = [row[0] for row in conn.execute(text('SELECT depth FROM "ContentRevision"'))]
+        assert max(depths) < revision_store.KEYFRAME_INTERVAL
+        revision_store.clear_cache()
+        assert [revision_store.load_revision(conn, rid) for rid in ids] == contents
+        assert revision_store.load_revision(conn, "missing") is None
+
+        # 数据损坏时校验失败而不是返回错误内容
+        conn.execute(text('UPDATE "ContentRevision" SET sha256 = \'bad\' WHERE id = :id'), {"id": ids[3]})
+        revision_store.clear_cache()
+        try:
+            revision_store.load_revision(conn, ids[3])
+            assert False, "expected checksum failure"
+        except ValueError:
+            pass
+    print("✅ 去重、增量与关键帧正常")
+
+
+def test_transparent_read_write():
+    """测试SyncHistory.contentBefore/contentAfter透明读写"""
+    engine, Session, _ = make_session_factory()
+    edited = BASE.replace("第3段", "第三段")
+
+    db = Session()
+    db.add(sync_record(contentBefore=BASE, contentAfter=edited))
+    db.add(sync_record(contentBefore=edited, contentAfter=edited + "<p>新段落</p>"))
+    db.add(sync_record())
+    db.commit()
+    db.close()
+
+    with engine.connect() as conn:
+        legacy = conn.execute(text('SELECT COUNT(*) FROM "SyncHistory" WHERE "contentBefore" IS NOT NULL')).scalar()
+        assert legacy == 0
+        assert revision_store.storage_stats(conn)["revisions"] == 3  # edited 只存一次
+
+    revision_store.clear_cache()
+    db = Session()
+    records = db.query(SyncHistory).order_by(SyncHistory.createdAt).all()
+    assert [(r.contentBefore, r.contentAfter) for r in records] == [
+        (BASE, edited), (edited, edited + "<p>新段落</p>"), (None, None)
+    ]
+    assert records[0].contentAfterRevisionId == records[1].contentBeforeRevisionId
+    db.close()
+    print("✅ 透明读写正常")
+
+
+def test_migration_script():
+    """测试迁移脚本把旧记录的全文转换为内容版本，且可重复执行"""
+    engine, Session, path = make_session_factory()
+    contents = [BASE.replace(f"第{i}段", f"第{i}段！") for i in range(6)]
+    with engine.begin() as conn:
+        for i in range(5):
+            conn.execute(text(
+                'INSERT INTO "SyncHistory" (id, "articleId", "userId", "syncType", "syncDirection", "syncStatus", '
+                '"contentBefore", "contentAfter", "createdAt") VALUES '
+                '(:id, \'art0\', \'u1\', \'pull_from_github\', \'github_to_local\', \'success\', :before, :after, :at)'
+            ), {"id": f"h{i}", "before": contents[i], "after": contents[i + 1], "at": f"2024-01-0{i + 1} 00:00:00"})
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts",
+                          "migrate_sync_history_revisions.py")
+    run = lambda *args: subprocess.run([sys.executable, script, "--database", f"sqlite:///{path}", *args],
+                                       capture_output=True, text=True, check=True).stdout
+
+    assert "Dry run" in run("--dry-run", "--batch-size", "2")
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT COUNT(*) FROM "ContentRevision"')).scalar() == 0
+
+    output = run("--batch-size", "2", "--vacuum")
+    assert "Rows with legacy content: 5" in output and "smaller" in output
+    assert "Rows with legacy content: 0" in run()
+
+    revision_store.clear_cache()
+    db = Session()
+    records = db.query(SyncHistory).order_by(SyncHistory.createdAt).all()
+    assert [(r.contentBefore, r.contentAfter) for r in records] == list(zip(contents, contents[1:]))
+    assert all(r.legacyContentBefore is None for r in records)
+    assert db.query(ContentRevision).count() == 6
+    db.close()
+    print("✅ 迁移脚本正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("同步记录内容版本测试")
+    print("=" * 60)
+    test_delta_round_trip()
+    test_dedupe_deltas_and_keyframes()
+    test_transparent_read_write()
+    test_migration_script()
+    print("=" * 60)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+测试任务进度推送：进程内发布订阅、跨进程轮询转发和SSE端点（临时SQLite数据库）
+"""
+import sys
+import os
+import json
+import asyncio
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.api import tasks as tasks_api
+from app.services.auth_service import AuthService
+from app.utils.security import verify_task_events_token
+from app.utils.task_tracker import TaskTracker, TaskStatus
+from testing_support import app_client, make_session_factory
+
+
+def test_local_events_keep_transitions():
+    """测试进度更新被合并，状态转换按顺序全部送达"""
+    tracker = TaskTracker(make_session_factory("events.db"), events_poll_interval=0)
+    task_id = tracker.create_task("t", user_id="u1")
+
+    async def run():
+        subscription = tracker.events.subscribe(task_id)
+        tracker.claim("w1", 60)
+        for i in range(1, 51):
+            tracker.update_task(task_id, progress=i, total=50)
+        await asyncio.to_thread(tracker.complete, task_id, "w1", {"ok": True})
+
+        received = []
+        while not received or received[-1][1]["status"] != TaskStatus.COMPLETED:
+            task = await asyncio.wait_for(subscription.get(), 1)
+            received.append((subscription.kind(task), task))
+        tracker.events.unsubscribe(subscription)
+        return [(kind, task["status"], task["progress"]) for kind, task in received]
+
+    events = asyncio.run(run())
+    assert events == [("state", TaskStatus.RUNNING, 50), ("state", TaskStatus.COMPLETED, 50)]
+    assert not tracker.events.has_subscribers(task_id)
+    print("✅ 进程内推送正常")
+
+
+def test_cross_process_updates_are_polled():
+    """测试其他进程（另一个TaskTracker）写入的更新由轮询器转发"""
+    Session = make_session_factory("events.db")
+    worker_side = TaskTracker(Session, events_poll_interval=0)
+    api_side = TaskTracker(Session, events_poll_interval=0.05)
+    task_id = worker_side.create_task("t")
+
+    async def run():
+        subscription = api_side.events.subscribe(task_id)
+        worker_side.claim("w1", 60)
+        first = await asyncio.wait_for(subscription.get(), 1)
+        worker_side.update_task(task_id, progress=7)
+        second = await asyncio.wait_for(subscription.get(), 1)
+        api_side.events.unsubscribe(subscription)
+        await asyncio.sleep(0.1)  # 没有订阅者后轮询器退出
+        return first, second, len(api_side.events._pollers)
+
+    first, second, pollers = asyncio.run(run())
+    assert first["status"] == TaskStatus.RUNNING and second["progress"] == 7
+    assert pollers == 0
+    print("✅ 跨进程转发正常")
+
+
+def test_sse_endpoint():
+    """测试SSE端点使用任务令牌认证，推送当前状态和后续更新，任务结束后关闭"""
+    with app_client("events.db") as env:
+        tracker = TaskTracker(env.Session, events_poll_interval=0)
+        tasks_api.task_tracker, original = tracker, tasks_api.task_tracker
+        try:
+            client = env.client
+            task_id = tracker.create_task("t", user_id="u1")
+            other = tracker.create_task("t", user_id="u2")
+
+            # EventSource 不能发送Authorization头：先取任务令牌，再放在查询参数中
+            token = client.post(f"/api/tasks/{task_id}/events/token").json()["token"]
+            assert client.post(f"/api/tasks/{other}/events/token").status_code == 400
+            assert client.post("/api/tasks/missing/events/token").status_code == 404
+            assert client.get(f"/api/tasks/{task_id}/events").status_code == 401
+            assert client.get(f"/api/tasks/{task_id}/events?token=invalid").status_code == 401
+            # 令牌只对签发的任务有效，也不能作为登录令牌使用
+            assert client.get(f"/api/tasks/{other}/events?token={token}").status_code == 401
+            assert client.get(f"/api/tasks/{task_id}/events",
+                              headers={"Authorization": f"Bearer {token}"}).status_code == 401
+            assert verify_task_events_token(token, task_id) == "u1"
+            assert AuthService.verify_user_token(token, None) is None
+
+            def work():
+                time.sleep(0.3)
+                tracker.claim("w1", 60)
+                tracker.update_task(task_id, progress=1, total=2)
+                time.sleep(0.1)
+                tracker.complete(task_id, "w1", {"article_id": "a"})
+
+            # TestClient在应用返回完整响应后才交回控制，更新需要在请求前由其他线程安排好
+            threading.Thread(target=work).start()
+            events = []
+            with client.stream("GET", f"/api/tasks/{task_id}/events?token={token}") as response:
+                assert response.headers["content-type"].startswith("text/event-stream")
+                kind = None
+                for line in response.iter_lines():
+                    if line.startswith("event: "):
+                        kind = line[7:]
+                    elif line.startswith("data: "):
+                        events.append((kind, json.loads(line[6:])))
+
+            # 认领与进度更新可能被合并为一个事件，状态转换必定逐个送达
+            assert [data["status"] for kind, data in events if kind == "state"] == ["pending", "running", "completed"]
+            assert all(data["status"] == "running" for kind, data in events if kind == "progress")
+            assert events[-1][1]["result"] == {"article_id": "a"}
+            assert client.get(f"/api/tasks/{task_id}").json()["status"] == "completed"
+        finally:
+            tasks_api.task_tracker = original
+    print("✅ SSE端点正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("任务进度推送测试")
+    print("=" * 60)
+    test_local_events_keep_transitions()
+    test_cross_process_updates_are_polled()
+    test_sse_endpoint()
+    print("=" * 60)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+测试数据库任务存储与worker：租约领取、续约、崩溃接管、重试和清理（临时SQLite数据库）
+"""
+import sys
+import os
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base
+from app.models import Task
+from app.utils.task_tracker import TaskTracker, TaskStatus, PermanentTaskError
+from app.worker import TaskWorker
+
+
+def make_tracker():
+    path = os.path.join(tempfile.mkdtemp(), "tasks.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return TaskTracker(session_factory=Session), Session
+
+
+def test_claim_is_exclusive():
+    """测试任务只能被一个worker领取，完成后保存结果"""
+    tracker, _ = make_tracker()
+    task_id = tracker.create_task("translate_article", user_id="u1", article_id="a1")
+
+    task = tracker.claim("w1", lease_seconds=60)
+    assert task["id"] == task_id and task["payload"] == {"article_id": "a1"}
+    assert task["status"] == TaskStatus.RUNNING and task["attempts"] == 1
+    assert tracker.claim("w2", lease_seconds=60) is None
+
+    tracker.update_task(task_id, progress=3, total=5, current_step="step")
+    assert tracker.heartbeat(task_id, "w1", 60) and not tracker.heartbeat(task_id, "w2", 60)
+    assert not tracker.complete(task_id, "w2", {"x": 1})
+    assert tracker.complete(task_id, "w1", {"article_id": "new"})
+
+    task = tracker.get_task(task_id)
+    assert task["status"] == TaskStatus.COMPLETED and task["result"] == {"article_id": "new"}
+    assert (task["progress"], task["total"], task["user_id"]) == (3, 5, "u1")
+    print("✅ 任务独占领取正常")
+
+
+def test_expired_lease_is_reclaimed():
+    """测试worker崩溃（租约过期）后任务被其他worker接管，次数用完后标记失败"""
+    tracker, _ = make_tracker()
+    task_id = tracker.create_task("t", max_attempts=2)
+
+    assert tracker.claim("w1", lease_seconds=-1)["attempts"] == 1
+    task = tracker.claim("w2", lease_seconds=-1)
+    assert task["id"] == task_id and task["attempts"] == 2
+    assert not tracker.complete(task_id, "w1")  # 旧worker的结果被丢弃
+
+    assert tracker.claim("w3", lease_seconds=60) is None
+    task = tracker.get_task(task_id)
+    assert task["status"] == TaskStatus.FAILED and "lease" in task["error"]
+    print("✅ 租约过期接管正常")
+
+
+def test_retry_with_backoff():
+    """测试失败后按退避时间重试，不可重试错误直接失败"""
+    tracker, Session = make_tracker()
+    task_id = tracker.create_task("t", max_attempts=2)
+
+    tracker.claim("w1", 60)
+    assert tracker.fail(task_id, "w1", "boom") == TaskStatus.PENDING
+    assert tracker.claim("w1", 60) is None  # 退避中
+
+    db = Session()
+    db.query(Task).update({Task.runAfter: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    assert tracker.claim("w1", 60)["attempts"] == 2
+    assert tracker.fail(task_id, "w1", "boom again") == TaskStatus.FAILED
+    assert tracker.get_task(task_id)["error"] == "boom again"
+
+    other = tracker.create_task("t")
+    tracker.claim("w1", 60)
+    assert tracker.fail(other, "w1", "missing", retry=False) == TaskStatus.FAILED
+    print("✅ 退避重试正常")
+
+
+def test_cleanup_old_tasks():
+    """测试只清理超过保留时长的已结束任务"""
+    tracker, Session = make_tracker()
+    done = tracker.create_task("t")
+    pending = tracker.create_task("t")
+    tracker.claim("w1", 60)
+    tracker.complete(done, "w1")
+
+    assert tracker.cleanup_old_tasks(max_age_hours=1) == 0
+    db = Session()
+    db.query(Task).update({Task.finishedAt: datetime.utcnow() - timedelta(hours=2)})
+    db.commit()
+    assert tracker.cleanup_old_tasks(max_age_hours=1) == 1
+    assert tracker.get_task(done) is None and tracker.get_task(pending) is not None
+    print("✅ 任务清理正常")
+
+
+def test_worker_runs_handlers():
+    """测试worker并发执行任务、续约，并按错误类型重试或失败"""
+    tracker, _ = make_tracker()
+    active = {"now": 0, "max": 0}
+
+    async def slow(task):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.15)
+        active["now"] -= 1
+        tracker.update_task(task["id"], progress=1)
+        return {"n": task["payload"]["n"]}
+
+    async def missing(task):
+        raise PermanentTaskError("not found")
+
+    async def flaky(task):
+        raise RuntimeError("temporary")
+
+    ids = [tracker.create_task("slow", n=i) for i in range(4)]
+    bad = tracker.create_task("missing")
+    retried = tracker.create_task("flaky")
+    unknown = tracker.create_task("unknown")
+
+    worker = TaskWorker(tracker, {"slow": slow, "missing": missing, "flaky": flaky},
+                        concurrency=2, poll_interval=0.05, lease_seconds=1, heartbeat_seconds=0.05,
+                        types=["slow", "missing", "flaky", "unknown"])
+
+    async def run():
+        stop = asyncio.Event()
+        runner = asyncio.create_task(worker.run(stop))
+        await asyncio.sleep(0.8)
+        stop.set()
+        await runner
+
+    # 开启上传清理时只清理临时上传目录，不影响仓库中的 uploads
+    original_dir, original_sweep = settings.upload_dir, settings.upload_sweep_enabled
+    settings.upload_dir, settings.upload_sweep_enabled = tempfile.mkdtemp(), True
+    try:
+        asyncio.run(run())
+    finally:
+        settings.upload_dir, settings.upload_sweep_enabled = original_dir, original_sweep
+
+    assert [tracker.get_task(i)["result"] for i in ids] == [{"n": i} for i in range(4)]
+    assert active["max"] == 2
+    assert tracker.get_task(bad)["status"] == TaskStatus.FAILED
+    assert tracker.get_task(unknown)["status"] == TaskStatus.FAILED
+    task = tracker.get_task(retried)
+    assert task["status"] == TaskStatus.PENDING and task["error"] == "temporary"
+    print("✅ worker执行任务正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("任务存储测试")
+    print("=" * 60)
+    test_claim_is_exclusive()
+    test_expired_lease_is_reclaimed()
+    test_retry_with_backoff()
+    test_cleanup_old_tasks()
+    test_worker_runs_handlers()
+    print("=" * 60)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+测试多租户分片知识库（直接写入向量，不调用嵌入模型）
+"""
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from app.agent.knowledge import tenancy as tenancy_module
+from app.agent.knowledge.tenancy import KnowledgeTenancy, scope_where
+
+
+def _vectors(n: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, 16)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_scope_where():
+    """测试租户条件与已有过滤条件合并"""
+    assert scope_where("t1") == {"tenant_id": "t1"}
+    assert scope_where("t1", {"source": "a"}) == {"$and": [{"tenant_id": "t1"}, {"source": "a"}]}
+    assert scope_where("t1", {"source": "a", "lang": "zh"}) == {
+        "$and": [{"tenant_id": "t1"}, {"source": "a"}, {"lang": "zh"}]
+    }
+    print("✅ 过滤条件合并正常")
+
+
+def test_tenant_isolation():
+    """测试不同租户共用分片时数据互相隔离"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tenancy = KnowledgeTenancy(tmp_dir, n_shards=1)
+        alice, bob = tenancy.store("user_alice"), tenancy.store("user_bob")
+
+        alice_ids = alice.add(["a1", "a2"], _vectors(2, 0), [{"source": "x"}, {"source": "y"}])
+        bob_ids = bob.add(["b1"], _vectors(1, 1))
+
+        assert alice.count() == 2 and bob.count() == 1
+        found = bob.search(_vectors(1, 0)[0], n_results=5)
+        assert found["documents"] == ["b1"]
+        found = alice.search(_vectors(1, 0)[0], n_results=5, where={"source": "y"})
+        assert found["documents"] == ["a2"]
+
+        # 跨租户删除被忽略，更新则报错
+        bob.delete(alice_ids)
+        assert alice.count() == 2
+        try:
+            bob.update(alice_ids[:1], documents=["hijack"])
+            assert False, "cross-tenant update should fail"
+        except KeyError:
+            pass
+
+        alice.clear()
+        assert alice.count() == 0 and bob.count() == 1
+        assert bob.get_all()["ids"] == bob_ids
+
+        # 计数和清空按批分页读取ID
+        batch = tenancy_module._ID_BATCH
+        tenancy_module._ID_BATCH = 3
+        try:
+            alice.add([f"p{i}" for i in range(7)], _vectors(7, 2))
+            assert alice.count() == 7 and bob.count() == 1
+            alice.clear()
+            assert alice.count() == 0 and bob.count() == 1
+        finally:
+            tenancy_module._ID_BATCH = batch
+    print("✅ 租户隔离正常")
+
+
+def test_layout_is_stable():
+    """测试分片数写入布局文件，重新打开时租户映射不变"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        first = KnowledgeTenancy(tmp_dir, n_shards=8)
+        shard = first.shard_for("agent_42")
+
+        reopened = KnowledgeTenancy(tmp_dir, n_shards=32)
+        assert reopened.n_shards == 8
+        assert reopened.shard_for("agent_42") == shard
+        assert len(first.client.list_collections()) == 0  # 分片按需创建
+    print("✅ 分片布局稳定")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("多租户知识库测试")
+    print("=" * 60)
+    test_scope_where()
+    test_tenant_isolation()
+    test_layout_is_stable()
+    print("=" * 60)
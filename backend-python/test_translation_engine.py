@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+测试批量翻译引擎（使用模拟的模型调用，不请求真实API）
+"""
+import sys
+import os
+import asyncio
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.translation_engine import (
+    Segment, TranslationEngine, TranslationCheckpoint,
+    extract_segments, plan_batches, parse_batch
+)
+
+
+class FakeModel:
+    """按标记逐段返回 "T:原文"；可指定某些批次打乱标记，或某些原文报错"""
+
+    def __init__(self, misalign=(), fail=(), delay=0.01):
+        self.misalign = set(misalign)
+        self.fail = set(fail)
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, system, prompt, max_tokens):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if "# 待翻译段落" not in prompt:
+                text = prompt.split("\n")[1]
+                self.calls.append(("single", text))
+                if text in self.fail:
+                    raise RuntimeError("model error")
+                return f"T:{text}"
+
+            texts = [line for line in prompt.split("\n")[3:] if line and not line.startswith(("<<<", "#", "逐段"))]
+            self.calls.append(("batch", texts))
+            if any(text in self.misalign for text in texts):
+                return "\n".join(f"T:{text}" for text in texts)  # 丢失标记
+            return "\n".join(f"<<<SEG {i}>>>\nT:{text}" for i, text in enumerate(texts))
+        finally:
+            self.active -= 1
+
+
+def make_segments(n):
+    return [Segment(index=i, tag="p", text=f"段落{i}" * 10) for i in range(n)]
+
+
+def test_extract_and_plan():
+    """测试段落提取与按预算打包"""
+    segments, images = extract_segments('<h1>标题</h1><p>正文</p><p> </p><img src="a.png"><li>条目</li>')
+    assert [(s.tag, s.text) for s in segments] == [("h1", "标题"), ("p", "正文"), ("li", "条目")]
+    assert images == ['<img src="a.png"/>']
+
+    batches = plan_batches(make_segments(10), max_tokens=100, max_segments=4)
+    assert [len(b) for b in batches] == [4, 4, 2]  # 每段约23 token
+    assert [s.index for b in batches for s in b] == list(range(10))
+    print("✅ 段落提取与分批正常")
+
+
+def test_parse_batch():
+    """测试标记对齐校验"""
+    assert parse_batch("<<<SEG 0>>>\nA\n<<<SEG 1>>>\nB\n", 2) == ["A", "B"]
+    assert parse_batch("<<<SEG 1>>>\nB\n<<<SEG 0>>>\nA", 2) is None
+    assert parse_batch("<<<SEG 0>>>\nA\n<<<SEG 1>>>\n", 2) is None
+    assert parse_batch("A\nB", 2) is None
+    print("✅ 标记对齐校验正常")
+
+
+def test_concurrent_batches_with_fallback():
+    """测试批次并发受限、对齐失败退回逐段、失败段落保留原文"""
+    segments = make_segments(40)
+    model = FakeModel(misalign={segments[6].text}, fail={segments[6].text})
+    progress = []
+    engine = TranslationEngine(model, "system", max_batch_tokens=200, max_batch_segments=5,
+                               concurrency=3, on_progress=lambda done, total: progress.append(done))
+
+    translations = asyncio.run(engine.translate(segments))
+
+    assert len(translations) == 40
+    assert translations[6] == segments[6].text
+    assert all(t == f"T:{s.text}" for i, (s, t) in enumerate(zip(segments, translations)) if i != 6)
+    assert model.max_active <= 3
+    assert engine.stats["fallback_batches"] == 1 and engine.stats["failed_segments"] == 1
+    assert sum(1 for kind, _ in model.calls if kind == "batch") == 8
+    assert progress[-1] == 40
+
+    # 协程函数形式的进度回调会被等待
+    reported = []
+
+    async def on_progress(done, total):
+        await asyncio.sleep(0)
+        reported.append((done, total))
+
+    engine = TranslationEngine(FakeModel(), "system", max_batch_tokens=200, max_batch_segments=5,
+                               concurrency=3, on_progress=on_progress)
+    asyncio.run(engine.translate(segments))
+    assert reported[0] == (0, 40) and reported[-1] == (40, 40) and len(reported) == 9
+    print("✅ 并发批量翻译与逐段回退正常")
+
+
+def test_resume_from_checkpoint():
+    """测试中断后续跑只翻译未完成的批次"""
+    path = os.path.join(tempfile.mkdtemp(), "job.json")
+    segments = make_segments(20)
+    first = FakeModel(fail={segments[12].text}, misalign={segments[12].text})
+    asyncio.run(TranslationEngine(first, "system", max_batch_tokens=200, max_batch_segments=5,
+                                  checkpoint=TranslationCheckpoint(path)).translate(segments))
+
+    # 含失败段落的批次未写入检查点
+    assert len(TranslationCheckpoint(path)) == 3
+
+    second = FakeModel()
+    engine = TranslationEngine(second, "system", max_batch_tokens=200, max_batch_segments=5,
+                               checkpoint=TranslationCheckpoint(path))
+    translations = asyncio.run(engine.translate(segments))
+
+    assert translations == [f"T:{s.text}" for s in segments]
+    assert engine.stats["resumed_batches"] == 3
+    assert len(second.calls) == 1
+    print("✅ 检查点续跑正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("批量翻译引擎测试")
+    print("=" * 60)
+    test_extract_and_plan()
+    test_parse_batch()
+    test_concurrent_batches_with_fallback()
+    test_resume_from_checkpoint()
+    print("=" * 60)
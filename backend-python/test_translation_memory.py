@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+测试翻译记忆（临时SQLite数据库）
+"""
+import sys
+import os
+import asyncio
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.services.translation_engine import Segment, TranslationEngine
+from app.services.translation_memory import TranslationMemory, fuzzy_key, exact_key
+
+
+def make_memory(**kwargs):
+    path = os.path.join(tempfile.mkdtemp(), "tm.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return TranslationMemory(session_factory=sessionmaker(bind=engine), **kwargs)
+
+
+def test_keys():
+    """测试精确键只规范化空白，近似键忽略句末标点、标点旁的空格、全角和大小写，保留数字中的符号"""
+    assert exact_key("你好  世界") == exact_key(" 你好 世界\n")
+    assert exact_key("你好，世界") != exact_key("你好,世界")
+    assert fuzzy_key("你好，世界！") == fuzzy_key("你好, 世界")
+    assert fuzzy_key("Hello World.") == fuzzy_key("hello   world")
+    assert fuzzy_key("温度：２５℃。") == fuzzy_key("温度: 25℃")
+
+    # 数字中的符号和代码名称中的标点决定含义，不能共用译文
+    assert fuzzy_key("-5") != fuzzy_key("5")
+    assert fuzzy_key("增长 1.2%") != fuzzy_key("增长 12%")
+    assert fuzzy_key("共 1,000 元") != fuzzy_key("共 1000 元")
+    assert fuzzy_key("C#") != fuzzy_key("C")
+    assert fuzzy_key("C++") != fuzzy_key("C")
+    assert fuzzy_key("1 2") != fuzzy_key("12")
+    assert fuzzy_key("版本 2.0.") == fuzzy_key("版本 2.0")
+    print("✅ 匹配键正常")
+
+
+def test_exact_and_fuzzy_lookup():
+    """测试精确命中、近似命中、作用域隔离和命中率"""
+    memory = make_memory()
+    scope = memory.scope("en", "style-a", "model-x")
+    assert scope.store(["你好，世界。", "第二段"], ["Hello, world.", "Second"]) == 2
+    assert scope.store(["你好，世界。"], ["Hello again"]) == 0
+
+    assert scope.lookup(["你好，世界。", "你好 , 世界", "没见过"]) == ["Hello, world.", "Hello, world.", None]
+    assert memory.scope("en", "style-b", "model-x").lookup(["第二段"]) == [None]
+    assert memory.scope("ja", "style-a", "model-x").lookup(["第二段"]) == [None]
+    assert make_memory(fuzzy=False).scope("en", "s", "m").lookup(["x"]) == [None]
+
+    stats = memory.stats()
+    assert stats["entries"] == 2
+    assert (stats["exact_hits"], stats["fuzzy_hits"], stats["misses"]) == (1, 1, 3)
+    assert stats["hit_rate"] == 0.4
+    print("✅ 精确/近似匹配与命中率正常")
+
+
+def test_prune_keeps_recently_used():
+    """测试超出容量时淘汰最久未使用的条目"""
+    memory = make_memory(max_entries=3)
+    scope = memory.scope("en", "s", "m")
+    for i in range(5):
+        scope.store([f"段落{i}"], [f"P{i}"])
+    scope.lookup(["段落0"])
+
+    assert memory.prune() == 2
+    assert scope.lookup(["段落0", "段落4"]) == ["P0", "P4"]
+    assert memory.stats()["entries"] == 3
+    print("✅ 容量淘汰正常")
+
+
+def test_engine_uses_memory():
+    """测试翻译引擎只为未命中的段落请求模型，新译文写回记忆"""
+    memory = make_memory()
+    scope = memory.scope("en", "s", "m")
+    scope.store(["旧段落"], ["Old"])
+    prompts = []
+
+    async def call_model(system, prompt, max_tokens):
+        prompts.append(prompt)
+        texts = [line for line in prompt.split("\n") if line.startswith("新")]
+        return "\n".join(f"<<<SEG {i}>>>\nT:{text}" for i, text in enumerate(texts))
+
+    segments = [Segment(0, "p", "旧段落"), Segment(1, "p", "新段落一"), Segment(2, "p", "新段落二")]
+    engine = TranslationEngine(call_model, "system", memory=scope)
+    assert asyncio.run(engine.translate(segments)) == ["Old", "T:新段落一", "T:新段落二"]
+    assert engine.stats["memory_hits"] == 1
+    assert len(prompts) == 1 and "旧段落" not in prompts[0]
+
+    # 再次翻译同一篇文章不请求模型
+    prompts.clear()
+    assert asyncio.run(TranslationEngine(call_model, "system", memory=scope).translate(segments))[1] == "T:新段落一"
+    assert prompts == []
+    print("✅ 翻译引擎复用记忆正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("翻译记忆测试")
+    print("=" * 60)
+    test_keys()
+    test_exact_and_fuzzy_lookup()
+    test_prune_keeps_recently_used()
+    test_engine_uses_memory()
+    print("=" * 60)
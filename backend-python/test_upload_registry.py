@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+测试上传记录持久化：不同进程（独立连接池）共享上传记录、过期记录不可用，以及孤立文件清理（临时上传目录和SQLite数据库）
+"""
+import sys
+import os
+import time
+import tempfile
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.models import UploadedFile
+from app.services.upload_registry import sweep_uploads
+from testing_support import app_client, use_db, use_user
+
+
+def session_factory(path):
+    """每次调用都新建engine，相当于另一个worker进程连接同一个数据库"""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    return sessionmaker(bind=engine)
+
+
+def age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_shared_between_workers():
+    """测试在一个worker上传、在另一个worker解析和删除，其他用户无权访问"""
+    with app_client("uploads.db", upload_dir=tempfile.mkdtemp()) as env:
+        client, db_path = env.client, env.engine.url.database
+        uploaded = client.post("/api/upload/file", files={"file": ("a.md", b"# shared", "text/markdown")}).json()["file"]
+        assert uploaded["expiresAt"] and uploaded["sha256"]
+
+        use_db(session_factory(db_path))
+        parsed = client.post("/api/upload/parse", json={"fileId": uploaded["id"]}).json()
+        assert parsed["content"] == "# shared"
+
+        Session = session_factory(db_path)
+        db = Session()
+        record = db.get(UploadedFile, uploaded["id"])
+        assert record.userId == "u1" and record.parsedPath == uploaded["path"] + ".parsed.txt"
+        db.close()
+
+        use_user("u2")
+        assert "Access denied" in client.post("/api/upload/parse", json={"fileId": uploaded["id"]}).text
+        use_user("u1")
+
+        assert client.delete(f"/api/upload/{uploaded['id']}").json()["success"]
+        assert not os.path.exists(uploaded["path"]) and not os.path.exists(record.parsedPath)
+        assert "File not found" in client.post("/api/upload/parse", json={"fileId": uploaded["id"]}).text
+        print("✅ 上传记录跨进程共享正常")
+
+
+def test_sweep_expired_and_orphans():
+    """测试清理过期记录和内容寻址目录中的孤立文件，保留仍被引用的文件、正在写入的文件、登记之前的文件和图片"""
+    with app_client("uploads.db", upload_dir=tempfile.mkdtemp()) as env:
+        client, Session = env.client, env.Session
+        expired = client.post("/api/upload/file", files={"file": ("old.md", b"old", "text/markdown")}).json()["file"]
+        client.post("/api/upload/parse", json={"fileId": expired["id"]})
+        kept = client.post("/api/upload/file", files={"file": ("new.md", b"new", "text/markdown")}).json()["file"]
+
+        db = Session()
+        db.get(UploadedFile, expired["id"]).expiresAt = datetime.utcnow() - timedelta(minutes=1)
+        db.commit()
+        db.close()
+        # 过期后立即不可用，不必等清理任务
+        assert "File not found" in client.post("/api/upload/parse", json={"fileId": expired["id"]}).text
+
+        # 登记之前的上传、网页导入的.md、图片都不在内容寻址目录中，不被当作孤立文件
+        legacy = os.path.join(settings.upload_dir, "legacy.md")
+        orphan = os.path.join(settings.upload_dir, "blobs", "ab", "ab" * 32 + ".md")
+        partial = os.path.join(settings.upload_dir, "blobs", "upload.part")
+        image_dir = os.path.join(settings.upload_dir, "images", "u1")
+        os.makedirs(image_dir)
+        image = os.path.join(image_dir, "embedded.png")
+        os.makedirs(os.path.dirname(orphan), exist_ok=True)
+        for path in (legacy, orphan, partial, image):
+            with open(path, "wb") as f:
+                f.write(b"x")
+        for path in (expired["path"], expired["path"] + ".parsed.txt", kept["path"], legacy, orphan, image):
+            age(path, 7200)
+
+        stats = sweep_uploads(Session, settings.upload_dir, grace_seconds=3600)
+        assert stats == {"records": 1, "files": 3}
+        assert not os.path.exists(expired["path"]) and not os.path.exists(expired["path"] + ".parsed.txt")
+        assert not os.path.exists(orphan)
+        assert os.path.exists(kept["path"]) and os.path.exists(partial)
+        assert os.path.exists(legacy) and os.path.exists(image)
+
+        db = Session()
+        assert [r.id for r in db.query(UploadedFile)] == [kept["id"]]
+        db.close()
+        assert sweep_uploads(Session, settings.upload_dir, grace_seconds=3600) == {"records": 0, "files": 0}
+
+        # 过期记录的文件不在上传目录内时不删除
+        outside = os.path.join(tempfile.mkdtemp(), "outside.md")
+        with open(outside, "wb") as f:
+            f.write(b"x")
+        db = Session()
+        db.add(UploadedFile(userId="u1", kind="url", path=outside, size=1,
+                            createdAt=datetime.utcnow(), expiresAt=datetime.utcnow() - timedelta(minutes=1)))
+        db.commit()
+        db.close()
+        assert sweep_uploads(Session, settings.upload_dir, grace_seconds=3600) == {"records": 1, "files": 0}
+        assert os.path.exists(outside)
+
+        # 过期记录的文件刚被写入（宽限期内）时只删除记录，保留文件
+        fresh = client.post("/api/upload/file", files={"file": ("fresh.md", b"fresh", "text/markdown")}).json()["file"]
+        db = Session()
+        db.get(UploadedFile, fresh["id"]).expiresAt = datetime.utcnow() - timedelta(minutes=1)
+        db.commit()
+        db.close()
+        assert sweep_uploads(Session, settings.upload_dir, grace_seconds=3600) == {"records": 1, "files": 0}
+        assert os.path.exists(fresh["path"])
+
+        # 未开启文件清理（upload_dir为None）时仍删除过期记录，但不删除任何文件
+        age(fresh["path"], 7200)
+        stale = client.post("/api/upload/file", files={"file": ("stale.md", b"stale", "text/markdown")}).json()["file"]
+        age(stale["path"], 7200)
+        db = Session()
+        db.get(UploadedFile, stale["id"]).expiresAt = datetime.utcnow() - timedelta(minutes=1)
+        db.commit()
+        db.close()
+        assert sweep_uploads(Session, None, grace_seconds=3600) == {"records": 1, "files": 0}
+        assert os.path.exists(stale["path"]) and os.path.exists(fresh["path"])
+        db = Session()
+        assert [r.id for r in db.query(UploadedFile)] == [kept["id"]]
+        db.close()
+
+        # 同一内容重新上传会刷新修改时间，清理任务不会删除刚被复用的文件
+        age(kept["path"], 7200)
+        again = client.post("/api/upload/file", files={"file": ("again.md", b"new", "text/markdown")}).json()["file"]
+        db = Session()
+        db.query(UploadedFile).delete()
+        db.commit()
+        db.close()
+        sweep_uploads(Session, settings.upload_dir, grace_seconds=3600)
+        assert os.path.exists(again["path"])
+        print("✅ 过期记录与孤立文件清理正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("上传记录持久化测试")
+    print("=" * 60)
+    test_shared_between_workers()
+    test_sweep_expired_and_orphans()
+    print("=" * 60)
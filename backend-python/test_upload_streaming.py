@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+测试上传流式保存：分块写入、超限提前中止、内容寻址去重和解析结果缓存（临时上传目录和SQLite数据库）
+"""
+import sys
+import os
+import io
+import asyncio
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from app.config import settings
+from app.utils.upload_store import stream_to_file, UploadTooLarge
+from testing_support import app_client, use_settings
+
+
+def stored_files(root):
+    return sorted(os.path.relpath(os.path.join(d, f), root) for d, _, files in os.walk(root) for f in files)
+
+
+class ChunkedUpload:
+    """只记录读取请求的上传对象"""
+
+    def __init__(self, total, size=None):
+        self.remaining = total
+        self.size = size
+        self.reads = []
+
+    async def read(self, n=-1):
+        self.reads.append(n)
+        chunk = b"x" * min(n, self.remaining)
+        self.remaining -= len(chunk)
+        return chunk
+
+
+def test_stream_to_file_bounded():
+    """测试按块读取、超限后停止读取并删除部分文件"""
+    path = os.path.join(tempfile.mkdtemp(), "f")
+    upload = ChunkedUpload(5 * settings.upload_chunk_size)
+    sha256, size = asyncio.run(stream_to_file(upload, path, 10 * settings.upload_chunk_size))
+    assert size == 5 * settings.upload_chunk_size and len(sha256) == 64
+    assert set(upload.reads) == {settings.upload_chunk_size}
+
+    upload = ChunkedUpload(50 * settings.upload_chunk_size)
+    try:
+        asyncio.run(stream_to_file(upload, path, 3 * settings.upload_chunk_size))
+        assert False, "expected UploadTooLarge"
+    except UploadTooLarge:
+        pass
+    assert len(upload.reads) == 4 and not os.path.exists(path)
+
+    # 声明的大小已超限时不读取
+    upload = ChunkedUpload(100, size=100)
+    try:
+        asyncio.run(stream_to_file(upload, path, 10))
+        assert False, "expected UploadTooLarge"
+    except UploadTooLarge:
+        pass
+    assert upload.reads == []
+    print("✅ 分块写入与提前中止正常")
+
+
+def test_file_dedupe_and_parse_cache():
+    """测试相同文件只存一份、解析结果复用，删除一条记录不影响另一条"""
+    with app_client("uploads.db", upload_dir=tempfile.mkdtemp()) as env:
+        client = env.client
+        first = client.post("/api/upload/file", files={"file": ("a.md", b"# hello\n\nworld", "text/markdown")}).json()
+        second = client.post("/api/upload/file", files={"file": ("b.md", b"# hello\n\nworld", "text/markdown")}).json()
+        assert first["file"]["id"] != second["file"]["id"]
+        assert first["file"]["path"] == second["file"]["path"] and first["file"]["sha256"] == second["file"]["sha256"]
+        assert stored_files(settings.upload_dir) == [os.path.relpath(first["file"]["path"], settings.upload_dir)]
+
+        parsed = client.post("/api/upload/parse", json={"fileId": first["file"]["id"]}).json()
+        assert parsed["content"] == "# hello\n\nworld"
+        # 修改原文件后，第二次解析仍返回缓存结果，说明没有重新解析
+        with open(first["file"]["path"], "w") as f:
+            f.write("changed")
+        assert client.post("/api/upload/parse", json={"fileId": second["file"]["id"]}).json()["content"] == parsed["content"]
+
+        assert client.delete(f"/api/upload/{first['file']['id']}").json()["success"]
+        assert os.path.exists(second["file"]["path"])
+        client.delete(f"/api/upload/{second['file']['id']}")
+        assert stored_files(settings.upload_dir) == []
+
+        with use_settings(max_file_size=1024):
+            response = client.post("/api/upload/file", files={"file": ("big.txt", b"x" * 4096, "text/plain")})
+        assert response.status_code >= 400 and "too large" in response.text
+        assert stored_files(settings.upload_dir) == []
+        print("✅ 文件去重与解析缓存正常")
+
+
+def test_image_dedupe():
+    """测试同一图片重复上传复用已优化的文件"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 30, 30)).save(buffer, "PNG")
+    png = buffer.getvalue()
+    with app_client("uploads.db", upload_dir=tempfile.mkdtemp()) as env:
+        client = env.client
+        first = client.post("/api/upload/image", files={"file": ("a.png", png, "image/png")}).json()["file"]
+        stored = stored_files(settings.upload_dir)
+        second = client.post("/api/upload/image", files={"file": ("b.png", png, "image/png")}).json()["file"]
+        assert first["url"] == second["url"] and first["srcset"] == second["srcset"]
+        assert stored_files(settings.upload_dir) == stored
+        assert os.path.relpath(first["path"], settings.upload_dir) in stored
+        assert client.get(first["url"]).content == open(first["path"], "rb").read()
+
+        with use_settings(max_image_size=16):
+            response = client.post("/api/upload/image", files={"file": ("c.png", png, "image/png")})
+        assert response.status_code >= 400 and stored_files(settings.upload_dir) == stored
+        print("✅ 图片去重正常")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("上传流式保存测试")
+    print("=" * 60)
+    test_stream_to_file_bounded()
+    test_file_dedupe_and_parse_cache()
+    test_image_dedupe()
+    print("=" * 60)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+测试公用工具：临时SQLite数据库、依赖覆盖和配置修改，退出时恢复原状
+Shared helpers for the test scripts (usable from pytest and from the __main__ runners).
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.config import settings
+from app.database import Base, get_db
+from app.dependencies import get_current_user_db
+from app.models import User
+
+
+def make_session_factory(name: str = "test.db") -> sessionmaker:
+    """
+    在临时目录中创建SQLite数据库并建表
+
+    Args:
+        name: 数据库文件名
+
+    Returns:
+        绑定到该数据库的会话工厂（engine 可通过 Session.kw["bind"] 取得）
+    """
+    path = os.path.join(tempfile.mkdtemp(), name)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def use_db(Session: sessionmaker):
+    """让 get_db 使用给定的会话工厂"""
+    def override_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_db
+
+
+def use_user(user_id: str):
+    """
+    让 get_current_user_db 返回指定用户
+
+    数据库中有该用户时返回用户记录，否则返回只带id的对象（上传等接口只用到用户id）
+    """
+    app.dependency_overrides[get_current_user_db] = (
+        lambda db=Depends(get_db): db.get(User, user_id) or SimpleNamespace(id=user_id)
+    )
+
+
+@contextmanager
+def use_settings(**values):
+    """临时修改配置，退出时恢复原值"""
+    original = {name: getattr(settings, name) for name in values}
+    try:
+        for name, value in values.items():
+            setattr(settings, name, value)
+        yield settings
+    finally:
+        for name, value in original.items():
+            setattr(settings, name, value)
+
+
+@contextmanager
+def app_client(db_name: str = "test.db", user_id: str = "u1", **setting_values):
+    """
+    使用临时数据库和指定用户运行app，退出时恢复依赖覆盖和配置
+
+    Args:
+        db_name: 临时数据库文件名
+        user_id: 当前用户ID
+        **setting_values: 测试期间修改的配置，如 upload_dir=tempfile.mkdtemp()
+
+    Yields:
+        包含 client、Session 和 engine 的对象
+    """
+    overrides = dict(app.dependency_overrides)
+    Session = make_session_factory(db_name)
+    try:
+        with use_settings(**setting_values):
+            use_db(Session)
+            use_user(user_id)
+            yield SimpleNamespace(
+                client=TestClient(app, base_url="http://localhost"),
+                Session=Session,
+                engine=Session.kw["bind"]
+            )
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(overrides)
@@ -1,7 +1,7 @@
 "use client";
 
 import { useState, useEffect } from "react";
-import { api } from "@/lib/api";
+import { api, subscribeTaskEvents } from "@/lib/api";
 import { Clock, CheckCircle2, XCircle, Loader2, FileText, ChevronRight, X } from "lucide-react";
 import {
   Dialog,
@@ -81,43 +81,87 @@ export function TaskCenter({ isOpen, onClose, onArticleClick }: TaskCenterProps)
     };
   }, [isOpen]);
 
-  // 轮询更新进行中的任务
+  // 订阅进行中任务的进度推送（SSE），订阅失败的任务回退为每2秒轮询
   useEffect(() => {
     if (!isOpen) return;
 
-    // 每2秒轮询一次进行中的任务
-    const interval = setInterval(async () => {
+    let cancelled = false;
+    const subscriptions = new Map<string, () => void>();
+    const polledTasks = new Set<string>();
+
+    // 把任务的最新状态写回本地存储
+    const applyUpdate = (taskId: string, updatedTask: Partial<Task>) => {
       const storedTasks = localStorage.getItem('muses_tasks');
       if (!storedTasks) return;
 
       const taskList: Task[] = JSON.parse(storedTasks);
-      const runningTasks = taskList.filter(t => t.status === 'pending' || t.status === 'running');
+      const updatedTasks = taskList.map(t =>
+        t.taskId === taskId ? { ...t, ...updatedTask } : t
+      );
+      localStorage.setItem('muses_tasks', JSON.stringify(updatedTasks));
 
-      if (runningTasks.length === 0) return;
+      // 触发更新事件
+      window.dispatchEvent(new Event('muses-task-update'));
+    };
 
-      // 更新每个运行中任务的状态
-      for (const task of runningTasks) {
-        try {
-          const response = await api.get(`/api/articles/tasks/${task.taskId}`);
-          const updatedTask = response.data;
+    const subscribe = async (taskId: string) => {
+      subscriptions.set(taskId, () => {});
+      const fallback = () => {
+        subscriptions.delete(taskId);
+        polledTasks.add(taskId);
+      };
+      try {
+        const unsubscribe = await subscribeTaskEvents(
+          taskId,
+          (task) => {
+            applyUpdate(taskId, task);
+            if (task.status === 'completed' || task.status === 'failed') {
+              subscriptions.delete(taskId);
+            }
+          },
+          fallback
+        );
+        if (cancelled) {
+          unsubscribe();
+        } else if (subscriptions.has(taskId)) {
+          subscriptions.set(taskId, unsubscribe);
+        }
+      } catch (error) {
+        console.error(`Failed to subscribe to task ${taskId}:`, error);
+        fallback();
+      }
+    };
+
+    const sync = async () => {
+      const storedTasks = localStorage.getItem('muses_tasks');
+      if (!storedTasks) return;
 
-          // 更新任务列表
-          const updatedTasks = taskList.map(t =>
-            t.taskId === task.taskId ? { ...t, ...updatedTask } : t
-          );
-          localStorage.setItem('muses_tasks', JSON.stringify(updatedTasks));
+      const taskList: Task[] = JSON.parse(storedTasks);
+      const runningTasks = taskList.filter(t => t.status === 'pending' || t.status === 'running');
 
-          // 触发更新事件
-          window.dispatchEvent(new Event('muses-task-update'));
+      for (const task of runningTasks) {
+        if (subscriptions.has(task.taskId)) continue;
+        if (!polledTasks.has(task.taskId)) {
+          subscribe(task.taskId);
+          continue;
+        }
+        try {
+          const response = await api.get(`/api/tasks/${task.taskId}`);
+          applyUpdate(task.taskId, response.data);
         } catch (error) {
           console.error(`Failed to update task ${task.taskId}:`, error);
         }
       }
+    };
 
-      fetchTasks();
-    }, 2000);
+    sync();
+    const interval = setInterval(sync, 2000);
 
-    return () => clearInterval(interval);
+    return () => {
+      cancelled = true;
+      clearInterval(interval);
+      subscriptions.forEach(unsubscribe => unsubscribe());
+    };
   }, [isOpen]);
 
   // 获取任务类型显示名称
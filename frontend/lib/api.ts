@@ -78,4 +78,34 @@ export const processApi = {
   }
 };
 
+// 任务进度推送（SSE）
+// 浏览器的 EventSource 不能携带 Authorization 头：先获取只对该任务有效的短期令牌，再放在查询参数中
+export const subscribeTaskEvents = async (
+  taskId: string,
+  onUpdate: (task: any) => void,
+  onError?: () => void
+): Promise<() => void> => {
+  const response = await api.post(`/api/tasks/${taskId}/events/token`);
+  const source = new EventSource(
+    `${API_URL}/api/tasks/${taskId}/events?token=${encodeURIComponent(response.data.token)}`
+  );
+
+  const handleEvent = (event: MessageEvent) => {
+    const task = JSON.parse(event.data);
+    onUpdate(task);
+    // 任务结束后服务器会关闭连接，先关闭避免 EventSource 自动重连
+    if (task.status === 'completed' || task.status === 'failed') {
+      source.close();
+    }
+  };
+  source.addEventListener('state', handleEvent as EventListener);
+  source.addEventListener('progress', handleEvent as EventListener);
+  source.onerror = () => {
+    source.close();
+    onError?.();
+  };
+
+  return () => source.close();
+};
+
 export default api;
\ No newline at end of file
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Export the knowledge-base embedding model to ONNX (optionally int8-quantized).
+
+Usage:
+  pip install "optimum[onnxruntime]" torch
+  python3 scripts/export_onnx_embedder.py --output backend-python/onnx_models/bge-small-zh
+
+Then run the backend with:
+  KNOWLEDGE_EMBEDDING_BACKEND=onnx KNOWLEDGE_ONNX_DIR=onnx_models/bge-small-zh
+
+Only the export step needs torch/optimum; serving with the ONNX backend needs
+onnxruntime and tokenizers (both already installed with chromadb).
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend-python"))
+
+from app.agent.knowledge.embedder import export_onnx_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export embedding model to ONNX")
+    parser.add_argument("--model", default="BAAI/bge-small-zh-v1.5")
+    parser.add_argument("--output", required=True, help="Output directory")
+    parser.add_argument("--no-quantize", action="store_true", help="Skip dynamic int8 quantization")
+    args = parser.parse_args()
+
+    config = export_onnx_model(args.model, args.output, quantize=not args.no_quantize)
+    print(json.dumps(config, indent=2))
+    for name in sorted(os.listdir(args.output)):
+        if name.endswith(".onnx"):
+            size_mb = os.path.getsize(os.path.join(args.output, name)) / 1e6
+            print(f"{name}: {size_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
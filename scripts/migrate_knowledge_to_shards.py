@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Migrate per-tenant Chroma collections into the sharded knowledge layout.
+
+Usage:
+  python3 scripts/migrate_knowledge_to_shards.py --persist-dir backend-python/knowledge_db
+  python3 scripts/migrate_knowledge_to_shards.py --persist-dir backend-python/agent_knowledge --drop-source
+
+This script:
+  - Finds legacy collections named user_<id>_knowledge / agent_<id>_knowledge
+  - Copies documents, metadata and stored vectors into knowledge_shard_NNN
+    collections with a tenant_id metadata field (no re-embedding)
+  - Reads full-precision vectors from the quantized index when the legacy
+    collection was created with quantization enabled
+  - Is idempotent: documents already present in the target shard are skipped
+  - Optionally drops each legacy collection after it has been copied and verified
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend-python"))
+
+from app.agent.knowledge.quantization import QuantizedIndex
+from app.agent.knowledge.tenancy import KnowledgeTenancy, TENANT_KEY
+
+LEGACY_COLLECTION = re.compile(r"^(user|agent)_(.+)_knowledge$")
+
+
+def legacy_vectors(persist_dir, collection_name, ids, embeddings, mode):
+    """Return full-precision vectors for ids, preferring the quantized index if present."""
+    index_dir = os.path.join(persist_dir, "quantized", collection_name)
+    if mode and os.path.exists(os.path.join(index_dir, "ids.json")):
+        return QuantizedIndex(index_dir, mode=mode).get_full(ids)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def migrate_collection(tenancy, collection, batch_size, quantization, dry_run):
+    """Copy one legacy collection into its tenant shard. Returns (tenant_id, total, copied, skipped)."""
+    kind, owner = LEGACY_COLLECTION.match(collection.name).groups()
+    tenant_id = f"{kind}_{owner}"
+    store = tenancy.store(tenant_id)
+    total = collection.count()
+    copied = skipped = 0
+
+    for offset in range(0, total, batch_size):
+        batch = collection.get(
+            limit=batch_size,
+            offset=offset,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        # 迁移后的ID加租户前缀，保证在共享分片中唯一
+        target_ids = [f"{tenant_id}:{doc_id}" for doc_id in batch["ids"]]
+        existing = set(store.collection.get(ids=target_ids, include=[])["ids"])
+        keep = [i for i, target_id in enumerate(target_ids) if target_id not in existing]
+        skipped += len(target_ids) - len(keep)
+        if not keep or dry_run:
+            copied += len(keep)
+            continue
+
+        vectors = legacy_vectors(
+            tenancy.persist_dir, collection.name, [batch["ids"][i] for i in keep],
+            [batch["embeddings"][i] for i in keep], quantization
+        )
+        store.add(
+            texts=[batch["documents"][i] for i in keep],
+            embeddings=vectors,
+            metadatas=[dict(batch["metadatas"][i] or {}) for i in keep],
+            ids=[target_ids[i] for i in keep]
+        )
+        copied += len(keep)
+
+    return tenant_id, total, copied, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate per-tenant knowledge collections into shards")
+    parser.add_argument("--persist-dir", required=True, help="Chroma persist directory")
+    parser.add_argument("--shards", type=int, default=16, help="Shard count (only used for a new layout)")
+    parser.add_argument("--quantization", choices=["int8", "float16"], default=None,
+                        help="Quantization mode of the legacy and target stores")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--drop-source", action="store_true", help="Delete legacy collections after copying")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be copied")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.persist_dir):
+        print(f"Persist directory not found: {args.persist_dir}")
+        sys.exit(1)
+
+    tenancy = KnowledgeTenancy(args.persist_dir, n_shards=args.shards, quantization=args.quantization)
+    legacy = [c for c in tenancy.client.list_collections() if LEGACY_COLLECTION.match(c.name)]
+    print(f"Found {len(legacy)} legacy collections ({tenancy.n_shards} shards)")
+
+    failed = 0
+    for collection in legacy:
+        try:
+            tenant_id, total, copied, skipped = migrate_collection(
+                tenancy, collection, args.batch_size, args.quantization, args.dry_run
+            )
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {collection.name}: {e}")
+            continue
+
+        print(f"  {collection.name} -> {tenancy.shard_name(tenancy.shard_for(tenant_id))} "
+              f"[{TENANT_KEY}={tenant_id}]: {copied} copied, {skipped} already present")
+
+        if args.drop_source and not args.dry_run:
+            migrated = tenancy.store(tenant_id).count()
+            if migrated < total:
+                failed += 1
+                print(f"  ❌ {collection.name}: only {migrated}/{total} documents in shard, keeping source")
+                continue
+            tenancy.client.delete_collection(collection.name)
+            shutil.rmtree(os.path.join(args.persist_dir, "quantized", collection.name), ignore_errors=True)
+            print(f"  dropped {collection.name}")
+
+    print("Done" if not failed else f"Done with {failed} failures")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
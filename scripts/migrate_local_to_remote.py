@@ -5,12 +5,16 @@ Migrate local SQLite data to remote Cloud SQL via the backend API.
 Usage:
   1. Login on the remote site, get your JWT token from localStorage
   2. Run: python3 scripts/migrate_local_to_remote.py --token YOUR_JWT_TOKEN
+     Options: --batch-size 200 --concurrency 4 --state-file migrate_state.json
 
 This script:
   - Reads articles and agents from local SQLite
   - Creates agents on remote (if not exist)
-  - Creates articles on remote with correct agent mapping
+  - Streams articles to /api/articles/bulk as NDJSON batches, several batches
+    in parallel, with correct agent mapping
   - Preserves original timestamps and metadata
+  - Is resumable: completed batches are recorded in the state file, and the
+    server skips articles whose external id (the local article id) already exists
 """
 
 import sqlite3
@@ -19,32 +23,47 @@ import argparse
 import json
 import sys
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 # Remote API URL
 REMOTE_API = "https://muses-backend-3xt2w2bjba-de.a.run.app"
 LOCAL_DB = os.path.join(os.path.dirname(__file__), "..", "backend-python", "muses.db")
+STATE_FILE = "migrate_local_to_remote.state.json"
 
+MAX_RETRIES = 3
 
-def get_local_data(db_path):
-    """Read agents and articles from local SQLite."""
+
+def get_local_agents(db_path):
+    """Read agents from local SQLite."""
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
-
-    # Get agents
     agents = [dict(row) for row in conn.execute("SELECT * FROM Agent").fetchall()]
-    print(f"Found {len(agents)} local agents")
-
-    # Get articles
-    articles = [dict(row) for row in conn.execute(
-        "SELECT * FROM Article ORDER BY createdAt ASC"
-    ).fetchall()]
-    print(f"Found {len(articles)} local articles")
-
+    total = conn.execute("SELECT COUNT(*) FROM Article").fetchone()[0]
     conn.close()
-    return agents, articles
+    print(f"Found {len(agents)} local agents, {total} local articles")
+    return agents
 
 
-def create_remote_agent(session, agent):
+def iter_local_article_batches(db_path, batch_size, done):
+    """Yield batches of local articles in creation order, skipping already migrated ones."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.execute("SELECT * FROM Article ORDER BY createdAt ASC, id ASC")
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            batch = [dict(row) for row in rows if row["id"] not in done]
+            if batch:
+                yield batch
+    finally:
+        conn.close()
+
+
+def create_remote_agent(session, api, agent):
     """Create an agent on the remote server, return the remote agent ID."""
     payload = {
         "name": agent["name"],
@@ -60,7 +79,7 @@ def create_remote_agent(session, agent):
         "isDefault": bool(agent.get("isDefault", False)),
     }
 
-    resp = session.post(f"{REMOTE_API}/api/agents", json=payload)
+    resp = session.post(f"{api}/api/agents", json=payload)
     if resp.status_code == 200:
         data = resp.json()
         remote_id = data.get("agent", {}).get("id") or data.get("id")
@@ -71,9 +90,9 @@ def create_remote_agent(session, agent):
         return None
 
 
-def get_remote_agents(session):
+def get_remote_agents(session, api):
     """Get existing agents on remote."""
-    resp = session.get(f"{REMOTE_API}/api/agents")
+    resp = session.get(f"{api}/api/agents")
     if resp.status_code == 200:
         data = resp.json()
         agents = data.get("agents", [])
@@ -81,44 +100,87 @@ def get_remote_agents(session):
     return {}
 
 
-def create_remote_article(session, article, agent_id):
-    """Create an article on remote."""
-    payload = {
+def article_line(article, agent_id):
+    """One NDJSON line for /api/articles/bulk."""
+    return {
+        "externalId": article["id"],
         "agentId": agent_id,
         "title": article["title"],
         "content": article["content"] or "",
-        "summary": article.get("summary", ""),
+        "summary": article.get("summary"),
+        "publishStatus": article.get("publishStatus") or "draft",
+        "publishedAt": article.get("publishedAt"),
+        "githubUrl": article.get("githubUrl"),
+        "repoPath": article.get("repoPath"),
+        "sourceFiles": article.get("sourceFiles"),
+        "metadata": article.get("article_metadata"),
+        "createdAt": article.get("createdAt"),
+        "updatedAt": article.get("updatedAt"),
     }
 
-    resp = session.post(f"{REMOTE_API}/api/articles", json=payload)
-    if resp.status_code == 200:
-        data = resp.json()
-        remote_id = data.get("article", {}).get("id") or data.get("id")
-        print(f"  Created article '{article['title'][:40]}' -> {remote_id}")
-        return remote_id
-    else:
-        print(f"  Failed to create article '{article['title'][:40]}': {resp.status_code} {resp.text}")
-        return None
-
 
-def get_remote_articles(session):
-    """Get existing articles on remote."""
-    resp = session.get(f"{REMOTE_API}/api/articles")
-    if resp.status_code == 200:
-        data = resp.json()
-        articles = data.get("articles", [])
-        return {a["title"]: a["id"] for a in articles}
-    return {}
-
-
-def migrate(token):
+class StateFile:
+    """Local article ids whose batch was accepted by the server."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.done = set(json.load(f).get("done", []))
+
+    def add(self, ids):
+        with self.lock:
+            self.done.update(ids)
+            if not self.path:
+                return
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"done": sorted(self.done)}, f)
+            os.replace(tmp, self.path)
+
+
+class BulkUploader:
+    """Sends article batches to /api/articles/bulk, one requests.Session per thread."""
+
+    def __init__(self, api, token):
+        self.api = api
+        self.token = token
+        self.local = threading.local()
+
+    def session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+            self.local.session.headers["Authorization"] = f"Bearer {self.token}"
+            self.local.session.headers["Content-Type"] = "application/x-ndjson"
+        return self.local.session
+
+    def send(self, lines):
+        """Stream one batch; retries on network errors and 5xx. Returns the bulk response."""
+        for attempt in range(MAX_RETRIES + 1):
+            body = (json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n" for line in lines)
+            try:
+                resp = self.session().post(f"{self.api}/api/articles/bulk", data=body, timeout=300)
+                if resp.status_code < 500:
+                    resp.raise_for_status()
+                    return resp.json()
+                error = f"{resp.status_code} {resp.text[:200]}"
+            except requests.ConnectionError as e:
+                error = str(e)
+            if attempt < MAX_RETRIES:
+                time.sleep(2 ** attempt)
+        raise RuntimeError(f"bulk upload failed after {MAX_RETRIES + 1} attempts: {error}")
+
+
+def migrate(token, api=REMOTE_API, db_path=LOCAL_DB, batch_size=200, concurrency=4, state_file=STATE_FILE):
     """Main migration flow."""
     # Setup session with auth
     session = requests.Session()
     session.headers["Authorization"] = f"Bearer {token}"
 
     # Verify auth
-    resp = session.get(f"{REMOTE_API}/api/auth/verify")
+    resp = session.get(f"{api}/api/auth/verify")
     if resp.status_code != 200:
         print(f"Auth failed: {resp.status_code} {resp.text}")
         sys.exit(1)
@@ -126,12 +188,12 @@ def migrate(token):
     print(f"Authenticated as: {user.get('username')} (id: {user.get('id')})")
 
     # Read local data
-    agents, articles = get_local_data(os.path.abspath(LOCAL_DB))
+    db_path = os.path.abspath(db_path)
+    agents = get_local_agents(db_path)
 
-    # Get existing remote data to avoid duplicates
-    remote_agents = get_remote_agents(session)
-    remote_articles = get_remote_articles(session)
-    print(f"Remote has {len(remote_agents)} agents, {len(remote_articles)} articles")
+    # Get existing remote agents to avoid duplicates
+    remote_agents = get_remote_agents(session, api)
+    print(f"Remote has {len(remote_agents)} agents")
 
     # Migrate agents, build local->remote ID mapping
     agent_id_map = {}
@@ -143,49 +205,76 @@ def migrate(token):
             agent_id_map[local_id] = remote_agents[name]
             print(f"  Agent '{name}' already exists -> {remote_agents[name]}")
         else:
-            remote_id = create_remote_agent(session, agent)
+            remote_id = create_remote_agent(session, api, agent)
             if remote_id:
                 agent_id_map[local_id] = remote_id
 
     # Migrate articles
     print("\n--- Migrating Articles ---")
-    created = 0
-    skipped = 0
-    failed = 0
-    for article in articles:
-        title = article["title"]
-
-        # Skip if already exists on remote
-        if title in remote_articles:
-            print(f"  Skipped (exists): '{title[:40]}'")
-            skipped += 1
-            continue
-
-        # Map agent ID
-        local_agent_id = article["agentId"]
-        remote_agent_id = agent_id_map.get(local_agent_id)
-        if not remote_agent_id:
-            # Use the first available remote agent as fallback
-            if agent_id_map:
-                remote_agent_id = list(agent_id_map.values())[0]
-                print(f"  Warning: agent {local_agent_id} not mapped, using fallback")
-            else:
-                print(f"  Error: no agents available, cannot create '{title[:40]}'")
-                failed += 1
-                continue
-
-        remote_id = create_remote_article(session, article, remote_agent_id)
-        if remote_id:
-            created += 1
-        else:
-            failed += 1
+    state = StateFile(state_file)
+    if state.done:
+        print(f"  Resuming: {len(state.done)} articles already migrated")
+    uploader = BulkUploader(api, token)
+    totals = {"created": 0, "existing": 0, "failed": 0}
+    fallback_agent = next(iter(agent_id_map.values()), None)
+
+    def upload(batch):
+        lines, skipped = [], []
+        for article in batch:
+            remote_agent_id = agent_id_map.get(article["agentId"])
+            if not remote_agent_id:
+                # Use the first available remote agent as fallback
+                if fallback_agent:
+                    remote_agent_id = fallback_agent
+                    print(f"  Warning: agent {article['agentId']} not mapped, using fallback")
+                else:
+                    skipped.append(article["title"])
+                    continue
+            lines.append(article_line(article, remote_agent_id))
+        result = uploader.send(lines) if lines else {"items": []}
+        failures = [item for item in result["items"] if item["status"] == "failed"]
+        state.add(item["externalId"] for item in result["items"] if item["status"] != "failed")
+        for item in failures:
+            print(f"  Failed '{item.get('externalId')}': {item.get('error')}")
+        for title in skipped:
+            print(f"  Error: no agents available, cannot create '{title[:40]}'")
+        return result, len(skipped)
+
+    # Keep at most 2x concurrency batches in memory while reading the local database
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = set()
+
+        def collect(futures):
+            for future in futures:
+                try:
+                    result, skipped = future.result()
+                except Exception as e:
+                    print(f"  Batch failed: {e} (rerun to resume)")
+                    continue
+                for key in ("created", "existing", "failed"):
+                    totals[key] += result.get(key, 0)
+                totals["failed"] += skipped
+                print(f"  Progress: {totals['created']} created, {totals['existing']} existing, "
+                      f"{totals['failed']} failed")
+
+        for batch in iter_local_article_batches(db_path, batch_size, state.done):
+            if len(in_flight) >= concurrency * 2:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+            in_flight.add(executor.submit(upload, batch))
+        collect(wait(in_flight)[0])
 
     print(f"\n--- Migration Complete ---")
-    print(f"Created: {created}, Skipped: {skipped}, Failed: {failed}")
+    print(f"Created: {totals['created']}, Skipped (exists): {totals['existing']}, Failed: {totals['failed']}")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Migrate local Muses data to remote")
     parser.add_argument("--token", required=True, help="JWT token from remote login")
+    parser.add_argument("--api", default=REMOTE_API, help="Remote backend URL")
+    parser.add_argument("--db", default=LOCAL_DB, help="Local SQLite database")
+    parser.add_argument("--batch-size", type=int, default=200, help="Articles per bulk request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Bulk requests in flight")
+    parser.add_argument("--state-file", default=STATE_FILE, help="Resume state (empty to disable)")
     args = parser.parse_args()
-    migrate(args.token)
+    migrate(args.token, args.api, args.db, args.batch_size, args.concurrency, args.state_file)
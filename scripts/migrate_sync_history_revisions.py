@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Move full-text SyncHistory content into delta-compressed content revisions.
+
+Usage:
+  cd backend-python && python3 ../scripts/migrate_sync_history_revisions.py --dry-run
+  python3 scripts/migrate_sync_history_revisions.py --database sqlite:///backend-python/muses.db --vacuum
+
+This script:
+  - Adds the ContentRevision table and the SyncHistory revision columns if missing
+  - Replays each article's sync rows in creation order, storing contentBefore /
+    contentAfter as deduplicated revisions (compressed keyframes plus deltas)
+  - Clears the legacy text columns of every migrated row
+  - Is resumable: each batch commits on its own and migrated rows are skipped
+  - Reports legacy bytes against stored bytes; --dry-run rolls the data changes back
+    (the new table and columns are still created)
+  - Optionally runs VACUUM so SQLite returns the freed pages to the filesystem
+"""
+
+import argparse
+import os
+import sys
+
+from sqlalchemy import create_engine, inspect, or_, select, text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend-python"))
+
+from app.config import settings
+from app.models.content_revision import ContentRevision
+from app.models.sync_history import SyncHistory
+from app.services.revision_store import save_revision, storage_stats
+
+history = SyncHistory.__table__
+
+
+def ensure_schema(engine):
+    """Create the revision table and columns (same as run_migrations for this change)."""
+    ContentRevision.__table__.create(bind=engine, checkfirst=True)
+    existing = {c["name"] for c in inspect(engine).get_columns("SyncHistory")}
+    with engine.begin() as conn:
+        for col in ("contentBeforeRevisionId", "contentAfterRevisionId"):
+            if col not in existing:
+                conn.execute(text(f'ALTER TABLE "SyncHistory" ADD COLUMN "{col}" VARCHAR'))
+
+
+def pending_ids(conn):
+    """IDs of rows that still carry legacy text, grouped by article in creation order."""
+    query = (
+        select(history.c.id)
+        .where(or_(history.c.contentBefore.isnot(None), history.c.contentAfter.isnot(None)))
+        .order_by(history.c.articleId, history.c.createdAt, history.c.id)
+    )
+    return [row[0] for row in conn.execute(query)]
+
+
+def migrate_rows(conn, ids):
+    """Convert one batch of rows. Returns the legacy text size in bytes."""
+    legacy_bytes = 0
+    rows = conn.execute(
+        select(history.c.id, history.c.articleId, history.c.contentBefore, history.c.contentAfter)
+        .where(history.c.id.in_(ids))
+        .order_by(history.c.articleId, history.c.createdAt, history.c.id)
+    ).all()
+    for row in rows:
+        values = {"contentBefore": None, "contentAfter": None}
+        for field in ("contentBefore", "contentAfter"):
+            content = getattr(row, field)
+            if content is not None:
+                legacy_bytes += len(content.encode("utf-8"))
+                values[f"{field}RevisionId"] = save_revision(conn, row.articleId, content)
+        conn.execute(history.update().where(history.c.id == row.id).values(**values))
+    return legacy_bytes
+
+
+def database_file(url):
+    return url.database if url.get_backend_name() == "sqlite" and url.database else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default=settings.database_url)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true", help="report savings without keeping any change")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the SQLite file afterwards")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database)
+    path = database_file(engine.url)
+    size_before = os.path.getsize(path) if path and os.path.exists(path) else None
+    if "SyncHistory" not in inspect(engine).get_table_names():
+        print("No SyncHistory table, nothing to migrate")
+        return
+
+    ensure_schema(engine)
+    legacy_bytes = 0
+    conn = engine.connect()
+    try:
+        stored_before = storage_stats(conn)["stored_bytes"]
+        ids = pending_ids(conn)
+        print(f"Rows with legacy content: {len(ids)}")
+        for start in range(0, len(ids), args.batch_size):
+            legacy_bytes += migrate_rows(conn, ids[start:start + args.batch_size])
+            if not args.dry_run:
+                conn.commit()
+            print(f"  migrated {min(start + args.batch_size, len(ids))}/{len(ids)}")
+        stored_bytes = storage_stats(conn)["stored_bytes"] - stored_before
+    finally:
+        conn.rollback()
+        conn.close()
+
+    ratio = legacy_bytes / stored_bytes if stored_bytes else 0
+    print(f"Legacy text: {legacy_bytes} bytes -> revisions: {stored_bytes} bytes"
+          + (f" ({ratio:.1f}x smaller)" if stored_bytes else ""))
+    if args.dry_run:
+        print("Dry run: no changes kept")
+        return
+
+    if args.vacuum and path:
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+        print(f"Database file: {size_before} -> {os.path.getsize(path)} bytes")
+
+
+if __name__ == "__main__":
+    main()